@@ -0,0 +1,321 @@
+'''This module runs several datasets at once from the command line. Instead of
+building a Parameters instance in main.py and uncommenting its run statement,
+every dataset is described in a manifest file, by default datasets.json, which
+holds all the datasets used in Bubrig and Gibson 2025. Each dataset has a name
+(which is also the name of its output file), the model it uses
+("deterministic" or "stochastic"), and the values given to the setter methods
+of the Parameters class in deterministic_parameters.py or
+stochastic_parameters.py. For instance, the manifest entry
+
+    "figure_4_low_res_data": {
+        "model": "stochastic",
+        "description": "Figure 4 - Extinction versus variation in bottleneck frequency",
+        "parameters": {
+            "n_reps": 10,
+            "time_till_bottleneck_mean": [10, 610, 100],
+            "fractional_timestep_size": 1.0
+        }
+    }
+
+does the same as
+
+    p7 = stoch_params.Parameters()
+    p7.set_file_name("figure_4_low_res_data")
+    p7.set_n_reps(10)
+    p7.set_time_till_bottleneck_mean(10, 610, 100)
+    p7.set_fractional_timestep_size(1.0)
+    stoch_model.run(p7)
+
+A list is given to its setter as separate arguments, an object as keyword
+arguments (e.g. "reducers": {"reducers": ["ExtinctionProbability"],
+"keep_trajectories": false}), and any other value as the only argument. The
+manifest can also be a .toml file with the same layout, on Python 3.11 or
+later.
+
+Every dataset is checked by its setters before anything is run. The selected
+datasets are then run in a shared pool of worker processes, one dataset per
+worker at a time, starting with the ones that are expected to take the longest
+(see get_cost) so that a long dataset isn't left running on its own at the
+end. The time that every dataset took is printed once it is done. Examples:
+
+    python batch.py --list
+    python batch.py "figure_s6_low_res_*" --workers 4
+    python batch.py figure_1_max_prev_data figure_2_data
+
+The functions in this module and their descriptions:
+----------------------------
+
+main
+    Reads the command line arguments, then runs the selected datasets or
+    lists them.
+read_manifest
+    Reads the datasets of a manifest file.
+get_parameters
+    Builds the Parameters instance of a dataset with its setter methods.
+select_datasets
+    Returns the names of the datasets that match the patterns given on the
+    command line.
+get_cost
+    Estimates how long a dataset takes to run, as a number of timesteps.
+run_datasets
+    Runs datasets in a shared pool of worker processes, the most costly first.
+run_dataset
+    Runs one dataset inside a worker process.
+'''
+
+import argparse
+import copy
+import fnmatch
+import json
+import math
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import deterministiccode.deterministic_parameters as det_params
+import deterministiccode.deterministic_model as det_model
+import stochasticcode.stochastic_parameters as stoch_params
+import stochasticcode.stochastic_model as stoch_model
+
+#The parameters and model modules of every model that a dataset can use
+MODELS: dict = {"deterministic": (det_params, det_model),
+                "stochastic": (stoch_params, stoch_model)}
+
+#The series number and random number generator of every model before it has run anything
+INITIAL_STATES: dict = {model_name: (model.series, copy.deepcopy(model.random_number_generator))
+                        for model_name, (parameters_module, model) in MODELS.items()}
+
+#The rangeable parameters, whose number of values multiply into the number of parameter sets
+RANGEABLE_PARAMETERS: list[str] = ["initial_prevalence", "bottleneck_size_mean",
+                                   "bottleneck_size_cv", "time_till_bottleneck_mean",
+                                   "time_till_bottleneck_cv", "host_birth_rate",
+                                   "parasite_fecundity_effect", "s_death_rate",
+                                   "i_death_rate", "r_death_rate", "transmission_rate",
+                                   "recovery_rate"]
+
+def main(arguments: list[str] = None) -> None:
+    '''Reads the command line arguments, then either lists the selected
+    datasets with their estimated cost, or runs them and prints how long each
+    of them took. Exits with an error if a dataset is invalid or fails to run.
+
+    arguments: list[str]
+        The command line arguments. Defaults to those given to this script.
+    '''
+    parser = argparse.ArgumentParser(description="Runs the datasets of a manifest file "
+                                                 "in a shared pool of worker processes.")
+    parser.add_argument("datasets", nargs="*",
+                        help="names of the datasets to run, which may contain wildcards "
+                             "(e.g. \"figure_s6_*\"). Defaults to every dataset.")
+    parser.add_argument("--manifest", default="datasets.json",
+                        help="the manifest file (.json or .toml). Defaults to datasets.json.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="the number of worker processes. Defaults to the number of CPUs.")
+    parser.add_argument("--list", action="store_true",
+                        help="list the selected datasets and their estimated cost instead "
+                             "of running them")
+    arguments = parser.parse_args(arguments)
+
+    try:
+        manifest = read_manifest(arguments.manifest)
+        names = select_datasets(manifest, arguments.datasets)
+        datasets = {name: get_parameters(name, manifest[name]) for name in names}
+    except (OSError, ValueError) as error:
+        parser.error(" ".join(str(error).split()))
+
+    if arguments.list:
+        for name, (model_name, parameters) in datasets.items():
+            print(f"{name:<40} {model_name:<14} {get_cost(parameters):>10.3g} timesteps")
+        return
+
+    wall_times, failures = run_datasets(datasets, arguments.workers)
+
+    print(f"\n{'Dataset':<40} {'Estimated cost':>14} {'Wall time':>12}")
+    for name, (model_name, parameters) in datasets.items():
+        wall_time = f"{wall_times[name]:.1f} s" if name in wall_times else "failed"
+        print(f"{name:<40} {get_cost(parameters):>14.3g} {wall_time:>12}")
+    if failures:
+        raise SystemExit(f"{len(failures)} of {len(datasets)} datasets failed")
+
+def read_manifest(file_path: str) -> dict:
+    '''Reads the datasets of a manifest file (see the top of this module for
+    its layout). Files ending in .toml are read as TOML, and every other file
+    as JSON.
+
+    file_path: str
+        The path of the manifest file
+
+    Returns dict
+        Maps the name of every dataset to its description, in the order of
+        the file
+
+    Raises ValueError
+        If the file has no "datasets" table, or is a .toml file on a version
+        of Python without the tomllib module
+    '''
+    if file_path.endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError:
+            raise ValueError(f'''The manifest {file_path} in batch.py can only be read
+                             on Python 3.11 or later. Use a .json manifest instead.''')
+        with open(file_path, 'rb') as f:
+            manifest = tomllib.load(f)
+    else:
+        with open(file_path) as f:
+            manifest = json.load(f)
+
+    if not isinstance(manifest.get("datasets"), dict):
+        raise ValueError(f'''The manifest {file_path} in batch.py has no "datasets"
+                         table''')
+    return manifest["datasets"]
+
+def get_parameters(name: str, dataset: dict) -> tuple:
+    '''Builds the Parameters instance of a dataset. The file name is set to the
+    name of the dataset, and then every setter method in the "parameters"
+    table of the dataset is called with its value, in order, so the values are
+    checked exactly as they would be in main.py.
+
+    name: str
+        The name of the dataset
+    dataset: dict
+        The description of the dataset from read_manifest
+
+    Returns tuple(str, Parameters)
+        The model of the dataset ("deterministic" or "stochastic") and the
+        Parameters instance from deterministic_parameters.py or
+        stochastic_parameters.py
+
+    Raises ValueError
+        If the model isn't known, a setter method doesn't exist, or a setter
+        method doesn't accept its value
+    '''
+    model_name = dataset.get("model")
+    if model_name not in MODELS:
+        raise ValueError(f'''The dataset {name} in batch.py only takes
+                         model="deterministic" or model="stochastic"''')
+
+    parameters = MODELS[model_name][0].Parameters()
+    parameters.set_file_name(name)
+    for parameter_name, value in dataset.get("parameters", {}).items():
+        setter = getattr(parameters, f"set_{parameter_name}", None)
+        if setter is None:
+            raise ValueError(f'''The dataset {name} in batch.py has the parameter
+                             {parameter_name}, which has no set_{parameter_name}
+                             method in {model_name}_parameters.py''')
+        try:
+            if isinstance(value, list):
+                setter(*value)
+            elif isinstance(value, dict):
+                setter(**value)
+            else:
+                setter(value)
+        except (TypeError, ValueError) as error:
+            raise ValueError(f'''The dataset {name} in batch.py has an invalid value
+                             for {parameter_name}: {error}''') from error
+    return model_name, parameters
+
+def select_datasets(manifest: dict, patterns: list[str]) -> list[str]:
+    '''Returns the names of the datasets that match any of the patterns, which
+    may contain the wildcards of the fnmatch module (e.g. "figure_s6_*").
+
+    manifest: dict
+        The datasets from read_manifest
+    patterns: list[str]
+        The patterns given on the command line. If empty, every dataset is
+        selected.
+
+    Returns list[str]
+        The names of the selected datasets, in the order of the manifest
+
+    Raises ValueError
+        If a pattern doesn't match any dataset
+    '''
+    if not patterns:
+        return list(manifest)
+
+    for pattern in patterns:
+        if not fnmatch.filter(manifest, pattern):
+            raise ValueError(f'''The manifest in batch.py has no dataset that matches
+                             {pattern}''')
+    return [name for name in manifest
+            if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)]
+
+def get_cost(parameters) -> float:
+    '''Estimates how long a dataset takes to run, as the number of timesteps
+    that it simulates: the number of parameter sets, times the number of
+    replicates, times the number of bottlenecks, times the average number of
+    timepoints between bottlenecks, divided by the fractional timestep size.
+    Only the order of the datasets matters, so everything that makes a
+    timestep cheaper or more expensive (e.g. the engine) is left out.
+
+    parameters: an instance of the Parameters class in
+    deterministic_parameters.py or stochastic_parameters.py
+        The parameters of the dataset
+
+    Returns float
+        The estimated number of timesteps
+    '''
+    n_parameter_sets = math.prod(len(getattr(parameters, name))
+                                 for name in RANGEABLE_PARAMETERS)
+    n_reps = getattr(parameters, "n_reps", 1)
+    n_timepoints = parameters.n_bottlenecks * np.mean(parameters.time_till_bottleneck_mean)
+    return float(n_parameter_sets * n_reps * n_timepoints / parameters.fractional_timestep_size)
+
+def run_datasets(datasets: dict, n_workers: int = None) -> tuple[dict, dict]:
+    '''Runs datasets in a shared pool of worker processes, one dataset per
+    worker at a time. The datasets are handed out from the most to the least
+    costly (see get_cost), so that the long datasets start first and the short
+    ones fill in the gaps. The time that every dataset took is printed as soon
+    as it is done.
+
+    datasets: dict
+        Maps the name of every dataset to its model and Parameters instance
+        (see get_parameters)
+    n_workers: int
+        The number of worker processes. Defaults to the number of CPUs.
+
+    Returns tuple(dict, dict)
+        The first element maps the name of every dataset that finished to its
+        wall time in seconds. The second element maps the name of every
+        dataset that failed to its exception.
+    '''
+    wall_times = {}
+    failures = {}
+    names = sorted(datasets, key=lambda name: get_cost(datasets[name][1]), reverse=True)
+    with ProcessPoolExecutor(max_workers=n_workers or os.cpu_count()) as executor:
+        futures = {executor.submit(run_dataset, datasets[name]): name for name in names}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                wall_times[name] = future.result()
+                print(f"Finished {name} in {wall_times[name]:.1f} s")
+            except Exception as error:
+                failures[name] = error
+                print(f"Failed {name}: {error!r}")
+    return wall_times, failures
+
+def run_dataset(dataset: tuple) -> float:
+    '''Runs one dataset inside a worker process of run_datasets.
+
+    dataset: tuple
+        The model of the dataset and its Parameters instance (see
+        get_parameters)
+
+    Returns float
+        The wall time of the run in seconds
+    '''
+    model_name, parameters = dataset
+    #A worker runs several datasets one after the other, so every dataset starts from
+    #the series number and random number generator of INITIAL_STATES, as if it were 
+    #the only dataset run from main.py
+    model = MODELS[model_name][1]
+    series, random_number_generator = INITIAL_STATES[model_name]
+    model.series = series
+    model.random_number_generator = copy.deepcopy(random_number_generator)
+    start_time = time.perf_counter()
+    model.run(parameters)
+    return time.perf_counter() - start_time
+
+if __name__ == "__main__":
+    main()
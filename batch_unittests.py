@@ -0,0 +1,165 @@
+import unittest
+import json
+import os
+
+import deterministiccode.deterministic_model as det_model
+import stochasticcode.stochastic_parameters as stoch_params
+import stochasticcode.stochastic_model as stoch_model
+import batch as b
+
+
+class TestReadManifest(unittest.TestCase):
+    def tearDown(self):
+        if os.path.exists("output/test_manifest.json"):
+            os.remove("output/test_manifest.json")
+
+    def test_datasets(self):
+        manifest = b.read_manifest("datasets.json")
+        self.assertEqual(len(manifest), 42)
+        for name, dataset in manifest.items():
+            with self.subTest(name=name):
+                model_name, parameters = b.get_parameters(name, dataset)
+                self.assertEqual(parameters.file_name, name)
+
+    def test_same_as_main(self):
+        #Dataset p7 of main.py
+        p7 = stoch_params.Parameters()
+        p7.set_file_name("figure_4_low_res_data")
+        p7.set_n_reps(10)
+        p7.set_n_bottlenecks(100)
+        p7.set_burn_in(99)
+        p7.set_time_till_bottleneck_mean(10, 610, 100)
+        p7.set_time_till_bottleneck_cv(0, 1.0, 0.5)
+        p7.set_fractional_timestep_size(1.0)
+
+        manifest = b.read_manifest("datasets.json")
+        model_name, parameters = b.get_parameters("figure_4_low_res_data",
+                                                  manifest["figure_4_low_res_data"])
+        self.assertEqual(model_name, "stochastic")
+        self.assertEqual(vars(parameters), vars(p7))
+
+    def test_no_datasets(self):
+        with open("output/test_manifest.json", 'w') as f:
+            json.dump({"figure_1_data": {}}, f)
+        with self.assertRaises(ValueError):
+            b.read_manifest("output/test_manifest.json")
+
+class TestGetParameters(unittest.TestCase):
+    def test_arguments(self):
+        model_name, parameters = b.get_parameters("test_get_parameters", {
+            "model": "deterministic",
+            "parameters": {"n_bottlenecks": 5,
+                           "transmission_rate": [0.0001, 0.0003, 0.0001],
+                           "reducers": {"reducers": ["PrevalenceExtrema"],
+                                        "keep_trajectories": True}}})
+        self.assertEqual(model_name, "deterministic")
+        self.assertEqual(parameters.n_bottlenecks, 5)
+        self.assertEqual(len(parameters.transmission_rate), 3)
+        self.assertEqual(parameters.reducers, ["PrevalenceExtrema"])
+        self.assertTrue(parameters.keep_trajectories)
+
+    def test_invalid_model(self):
+        with self.assertRaises(ValueError):
+            b.get_parameters("test_get_parameters", {"model": "Stochastic"})
+
+    def test_invalid_parameter(self):
+        with self.assertRaises(ValueError):
+            b.get_parameters("test_get_parameters", {"model": "deterministic",
+                                                     "parameters": {"n_reps": 10}})
+
+    def test_invalid_value(self):
+        with self.assertRaises(ValueError):
+            b.get_parameters("test_get_parameters", {"model": "stochastic",
+                                                     "parameters": {"engine": "Fast"}})
+        with self.assertRaises(ValueError):
+            b.get_parameters("test_get_parameters", {"model": "stochastic",
+                                                     "parameters": {"n_reps": [1, 2, 3, 4]}})
+
+class TestSelectDatasets(unittest.TestCase):
+    def test_select(self):
+        manifest = b.read_manifest("datasets.json")
+        self.assertEqual(b.select_datasets(manifest, []), list(manifest))
+        self.assertEqual(b.select_datasets(manifest, ["figure_2_data", "figure_1_*"]),
+                         ["figure_1_max_prev_data", "figure_1_prev_range_data",
+                          "figure_2_data"])
+
+    def test_no_match(self):
+        with self.assertRaises(ValueError):
+            b.select_datasets(b.read_manifest("datasets.json"), ["figure_9_*"])
+
+class TestGetCost(unittest.TestCase):
+    def test_cost(self):
+        p1 = stoch_params.Parameters()
+        p1.set_n_reps(10)
+        p1.set_n_bottlenecks(4)
+        p1.set_time_till_bottleneck_mean(100, 300, 100)
+        p1.set_transmission_rate(0.0001, 0.0002, 0.0001)
+        p1.set_fractional_timestep_size(0.5)
+        self.assertEqual(b.get_cost(p1), 6 * 10 * 4 * 200 / 0.5)
+
+    def test_low_res(self):
+        manifest = b.read_manifest("datasets.json")
+        full = b.get_parameters("figure_4_data", manifest["figure_4_data"])[1]
+        low_res = b.get_parameters("figure_4_low_res_data",
+                                   manifest["figure_4_low_res_data"])[1]
+        self.assertGreater(b.get_cost(full), b.get_cost(low_res))
+
+class TestRunDatasets(unittest.TestCase):
+    '''Every dataset should write exactly the same data as running it on its
+    own, no matter which worker runs it or what that worker ran before.
+    '''
+    file_names = ["test_batch_deterministic", "test_batch_stochastic_1",
+                  "test_batch_stochastic_2", "test_batch_deterministic_checkpoint",
+                  "test_batch_stochastic_checkpoint", "test_batch_deterministic_parallel",
+                  "test_batch_stochastic_parallel"]
+
+    def tearDown(self):
+        det_model.series = 1
+        stoch_model.series = 1
+        for file_name in self.file_names + [f"{file_name}_alone" for file_name in self.file_names]:
+            if os.path.exists(f"output/{file_name}.csv"):
+                os.remove(f"output/{file_name}.csv")
+
+    def get_datasets(self, suffix = ""):
+        datasets = {}
+        for file_name in self.file_names:
+            model_name = "deterministic" if "deterministic" in file_name else "stochastic"
+            parameters = {"n_bottlenecks": 3, "time_till_bottleneck_mean": [20, 40, 10]}
+            if model_name == "stochastic":
+                parameters["n_reps"] = 2
+            if file_name.endswith("checkpoint"):
+                parameters["checkpoint_interval"] = 1
+            if file_name.endswith("parallel"):
+                parameters["engine"] = "Parallel"
+                parameters["n_workers"] = 2
+            datasets[file_name + suffix] = b.get_parameters(file_name + suffix,
+                                                            {"model": model_name,
+                                                             "parameters": parameters})
+        return datasets
+
+    def test_run(self):
+        wall_times, failures = b.run_datasets(self.get_datasets(), n_workers=2)
+        self.assertEqual(failures, {})
+        self.assertEqual(set(wall_times), set(self.file_names))
+
+        for name, (model_name, parameters) in self.get_datasets("_alone").items():
+            model = b.MODELS[model_name][1]
+            model.series = 1
+            model.run(parameters)
+            model.series = 1
+            with open(f"output/{name}.csv") as f1, open(f"output/{name[:-6]}.csv") as f2:
+                self.assertEqual(f1.read(), f2.read())
+
+    def test_failure(self):
+        datasets = self.get_datasets()
+        datasets["test_batch_deterministic"][1].initial_popsize = None
+        wall_times, failures = b.run_datasets(datasets, n_workers=2)
+        self.assertEqual(set(failures), {"test_batch_deterministic"})
+        self.assertEqual(len(wall_times), len(self.file_names) - 1)
+
+
+def run_tests():
+    unittest.main()
+
+if __name__ == '__main__':
+    unittest.main()
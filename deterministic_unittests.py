@@ -1,8 +1,15 @@
 import unittest
+import csv
+import os
+import shutil
+import statistics
+import numpy as np
 
 import deterministiccode.deterministic_parameters as p
 import deterministiccode.deterministic_model as m
 import deterministiccode.logger as l
+import deterministiccode.reducers as red
+import deterministiccode.result_cache as rc
 
 
 ####Testing parameters.py
@@ -464,6 +471,179 @@ class TestSetFractionalTimestepSize(unittest.TestCase):
         p1.set_fractional_timestep_size(value)
         self.assertEqual(p1.fractional_timestep_size, value)
 
+class TestSetIntegrator(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertEqual(p1.integrator, "Euler")
+
+    def test_set(self):
+        value = "Adaptive"
+        p1 = p.Parameters()
+        p1.set_integrator(value)
+        self.assertEqual(p1.integrator, value)
+
+    def test_for_error(self):
+        p1 = p.Parameters()
+        self.assertRaises(ValueError, p1.set_integrator, "Incorrect String")
+
+class TestSetIntegratorTolerance(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertEqual(p1.integrator_tolerance, 1e-6)
+
+    def test_set(self):
+        value = 1e-8
+        p1 = p.Parameters()
+        p1.set_integrator_tolerance(value)
+        self.assertEqual(p1.integrator_tolerance, value)
+
+class TestSetCycleConvergenceTolerance(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertIsNone(p1.cycle_convergence_tolerance)
+
+    def test_set(self):
+        value = 1e-6
+        p1 = p.Parameters()
+        p1.set_cycle_convergence_tolerance(value)
+        self.assertEqual(p1.cycle_convergence_tolerance, value)
+
+class TestSetEngine(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertEqual(p1.engine, "Serial")
+
+    def test_set(self):
+        for value in ["Sweep", "Parallel", "Serial"]:
+            p1 = p.Parameters()
+            p1.set_engine(value)
+            self.assertEqual(p1.engine, value)
+
+    def test_for_error(self):
+        p1 = p.Parameters()
+        self.assertRaises(ValueError, p1.set_engine, "Incorrect String")
+
+class TestSetSweepChunkSize(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertEqual(p1.sweep_chunk_size, 1000)
+
+    def test_set(self):
+        value = 10
+        p1 = p.Parameters()
+        p1.set_sweep_chunk_size(value)
+        self.assertEqual(p1.sweep_chunk_size, value)
+
+class TestSetNWorkers(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertIsNone(p1.n_workers)
+
+    def test_set(self):
+        value = 4
+        p1 = p.Parameters()
+        p1.set_n_workers(value)
+        self.assertEqual(p1.n_workers, value)
+
+class TestSetSeed(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertEqual(p1.seed, 92500169789667897205027529303633824467)
+
+    def test_set(self):
+        value = 1
+        p1 = p.Parameters()
+        p1.set_seed(value)
+        self.assertEqual(p1.seed, value)
+
+class TestSetOutputFormat(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertEqual(p1.output_format, "Wide")
+
+    def test_set(self):
+        p1 = p.Parameters()
+        p1.set_output_format("Normalized")
+        self.assertEqual(p1.output_format, "Normalized")
+
+    def test_invalid(self):
+        p1 = p.Parameters()
+        with self.assertRaises(ValueError):
+            p1.set_output_format("Long")
+
+    def test_set_binary(self):
+        p1 = p.Parameters()
+        p1.set_output_format("Binary")
+        self.assertEqual(p1.output_format, "Binary")
+
+class TestSetReducers(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertEqual(p1.reducers, [])
+        self.assertTrue(p1.keep_trajectories)
+
+    def test_set(self):
+        p1 = p.Parameters()
+        p1.set_reducers(["PrevalenceExtrema"])
+        self.assertEqual(p1.reducers, ["PrevalenceExtrema"])
+        self.assertFalse(p1.keep_trajectories)
+
+    def test_keep_trajectories(self):
+        p1 = p.Parameters()
+        p1.set_reducers(["PrevalenceExtrema"], keep_trajectories=True)
+        self.assertTrue(p1.keep_trajectories)
+
+    def test_invalid(self):
+        p1 = p.Parameters()
+        with self.assertRaises(ValueError):
+            p1.set_reducers(["Mean"])
+
+class TestSetExportSchedule(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertFalse(p1.export_schedule)
+
+    def test_set(self):
+        p1 = p.Parameters()
+        p1.set_export_schedule(True)
+        self.assertTrue(p1.export_schedule)
+
+class TestSetReplaySchedule(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertIsNone(p1.replay_schedule)
+
+    def test_set(self):
+        value = "data_bottleneck_schedule"
+        p1 = p.Parameters()
+        p1.set_replay_schedule(value)
+        self.assertEqual(p1.replay_schedule, value)
+
+class TestSetCheckpointInterval(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertEqual(p1.checkpoint_interval, 0)
+
+    def test_set(self):
+        p1 = p.Parameters()
+        p1.set_checkpoint_interval(5)
+        self.assertEqual(p1.checkpoint_interval, 5)
+
+    def test_invalid(self):
+        p1 = p.Parameters()
+        with self.assertRaises(ValueError):
+            p1.set_checkpoint_interval(-1)
+
+class TestSetResultCache(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertFalse(p1.result_cache)
+
+    def test_set(self):
+        p1 = p.Parameters()
+        p1.set_result_cache(True)
+        self.assertTrue(p1.result_cache)
+
 class TestGetRange(unittest.TestCase):
     def test_max_zero(self):
         min = 10
@@ -524,6 +704,48 @@ class TestGetRange(unittest.TestCase):
 
 
 ####Testing model.py
+def run_model(file_name: str, engine: str, **settings) -> str:
+    '''Runs the model on a few short parameter sets and returns the data it
+    wrote. Every setting is given to the setter method of the same name (a
+    tuple is given as separate arguments), after the defaults of these tests.
+    The series number and the random number generator are reset first, so
+    every run starts from the same state.
+    '''
+    p1 = p.Parameters()
+    p1.set_file_name(file_name)
+    p1.set_n_bottlenecks(3)
+    p1.set_engine(engine)
+    p1.set_n_workers(2)
+    for name, value in settings.items():
+        setter = getattr(p1, f"set_{name}")
+        if isinstance(value, tuple):
+            setter(*value)
+        else:
+            setter(value)
+
+    m.series = 1
+    m.random_number_generator = np.random.default_rng(p1.seed)
+    m.run(p1)
+    return read_output(file_name)
+
+def read_output(file_name: str) -> str:
+    '''Returns the contents of a .csv file in the output folder.'''
+    with open(f"output/{file_name}.csv") as f:
+        return f.read()
+
+def remove_output(file_names: list[str]) -> None:
+    '''Removes the .csv files, bottleneck schedules, and checkpoints that runs
+    of run_model have written, and resets the series number and the random
+    number generator of the model.
+    '''
+    m.series = 1
+    m.random_number_generator = np.random.default_rng(92500169789667897205027529303633824467)
+    for file_name in file_names:
+        for path in [f"output/{file_name}.csv", f"output/{file_name}_bottleneck_schedule.csv",
+                     f"output/{file_name}_checkpoint.pkl"]:
+            if os.path.exists(path):
+                os.remove(path)
+
 class TestRunModel(unittest.TestCase):
     '''The main unique things in this function are incrementing the series
     number and calling run_timepoint multiple times. I will run a model with
@@ -576,6 +798,45 @@ class TestRunModel(unittest.TestCase):
         self.assertAlmostEqual(s, 14.641)
         
 
+class TestRunSegment(unittest.TestCase):
+    '''run_segment should give the same final population state as run_model,
+    whether or not run_model logs the data.
+    '''
+    def tearDown(self):
+        m.series = 1
+
+    def test_same_as_logged(self):
+        model_parameters = {"n_timepoints": 50, "fractional_timestep_size": 0.1,
+                            "s": 900, "i": 100, "r": 0,
+                            "birth_function": m.get_regulated_births,
+                            "host_birth_rate": 0.1, "carrying_capacity": 1000,
+                            "parasite_fecundity_effect": 0,
+                            "transmission_function": m.get_ddt_infections,
+                            "transmission_rate": 0.0001, "s_death_rate": 0.01,
+                            "i_death_rate": 0.01, "r_death_rate": 0.01,
+                            "recovery_rate": 0.01}
+        dataframe = l.Dataframe(file_name = "test1")
+        logged = m.run_model(dataframe, is_logging = True, **model_parameters)
+        not_logged = m.run_model(dataframe, is_logging = False, **model_parameters)
+        self.assertEqual(logged, m.run_segment(**model_parameters))
+        self.assertEqual(logged, not_logged)
+        self.assertEqual(dataframe.n_rows, 51)
+        self.assertEqual(m.series, 3)
+
+    def test_adaptive(self):
+        model_parameters = {"n_timepoints": 20, "fractional_timestep_size": 1.0,
+                            "s": 900, "i": 100, "r": 0,
+                            "birth_function": m.get_regulated_births,
+                            "host_birth_rate": 0.1, "carrying_capacity": 1000,
+                            "parasite_fecundity_effect": 0,
+                            "transmission_function": m.get_ddt_infections,
+                            "transmission_rate": 0.0001, "s_death_rate": 0,
+                            "i_death_rate": 0, "r_death_rate": 0,
+                            "recovery_rate": 0, "integrator": "Adaptive"}
+        logged = m.run_model(l.Dataframe(file_name = "test1"), is_logging = True,
+                             **model_parameters)
+        self.assertEqual(logged, m.run_segment(**model_parameters))
+
 class TestRunTimepoint(unittest.TestCase):
     '''Combines the results from several sub functions that are tested below.
     The main thing is to check that it is combining them correctly and that it
@@ -657,6 +918,123 @@ class TestRunTimepoint(unittest.TestCase):
         self.assertEqual(i, 0)
         self.assertEqual(r, 0)
 
+class TestRunParameterSet(unittest.TestCase):
+    '''With regular bottlenecks and a cycle convergence tolerance, the burn-in
+    should stop early but log (almost) the same cycle with the same series 
+    numbers as running every burn-in cycle.
+    '''
+    def tearDown(self):
+        m.series = 1
+
+    def run_cycles(self, cycle_convergence_tolerance, time_till_bottleneck_cv=0):
+        dataframe = l.Dataframe(file_name = "test")
+        dataframe.add_constant_data({})
+        m.series = 1
+        n_cycles = m.run_parameter_set(dataframe, n_bottlenecks=52, burn_in=50,
+                                       initial_popsize=1000, initial_prevalence=0.5,
+                                       bottleneck_size_mean=100, bottleneck_size_cv=0,
+                                       time_till_bottleneck_mean=100, 
+                                       time_till_bottleneck_cv=time_till_bottleneck_cv,
+                                       host_birth_rate=0.1, carrying_capacity=1000,
+                                       birth_function=m.get_regulated_births,
+                                       parasite_fecundity_effect=0, s_death_rate=0,
+                                       i_death_rate=0, r_death_rate=0,
+                                       transmission_rate=0.0002,
+                                       transmission_function=m.get_ddt_infections,
+                                       recovery_rate=0, fractional_timestep_size=0.1,
+                                       cycle_convergence_tolerance=cycle_convergence_tolerance)
+        return n_cycles, dataframe.get_data_rows()
+
+    def test_without_detection(self):
+        n_cycles, data_rows = self.run_cycles(None)
+        self.assertEqual(n_cycles, 52)
+        self.assertEqual(m.series, 53)
+
+    def test_detection(self):
+        full_n_cycles, full_data_rows = self.run_cycles(None)
+        n_cycles, data_rows = self.run_cycles(1e-6)
+
+        self.assertLess(n_cycles, full_n_cycles)
+        self.assertEqual(m.series, 53)
+        self.assertEqual(len(data_rows), len(full_data_rows))
+        for row, full_row in zip(data_rows, full_data_rows):
+            self.assertEqual(row["Series"], full_row["Series"])
+            self.assertEqual(row["Timepoint"], full_row["Timepoint"])
+            self.assertAlmostEqual(row["I"], full_row["I"], places=3)
+
+    def test_no_detection_with_variance(self):
+        n_cycles, data_rows = self.run_cycles(1e-6, time_till_bottleneck_cv=0.1)
+        self.assertEqual(n_cycles, 52)
+
+class TestRunTimepointAdaptive(unittest.TestCase):
+    '''Exponential growth has an exact solution (s * e^rate per timepoint) so
+    the adaptive integrator can be checked directly against it. An epidemic
+    is checked against the Euler integrator with very small substeps.
+    '''
+    def test_exponential_births(self):
+        s, i, r, step_size = m.run_timepoint_adaptive(1.0, 1e-8, 10, 0, 0,
+                                                      m.get_exponential_births,
+                                                      0.1, None, 0,
+                                                      m.get_ddt_infections, 0,
+                                                      0, 0, 0, 0)
+        self.assertAlmostEqual(s, 10 * np.exp(0.1), places=6)
+        self.assertEqual(i, 0)
+        self.assertEqual(r, 0)
+        self.assertLessEqual(step_size, 1.0)
+
+    def test_matches_small_euler_steps(self):
+        arguments = (m.get_regulated_births, 0.1, 1000, 0, m.get_ddt_infections,
+                     0.0005, 0.01, 0.05, 0.01, 0.02)
+        s_euler, i_euler, r_euler = 900, 100, 0
+        for timepoint in range(20):
+            s_euler, i_euler, r_euler = m.run_timepoint(0.0001, s_euler, i_euler,
+                                                        r_euler, *arguments)
+        s, i, r = 900, 100, 0
+        step_size = 1.0
+        for timepoint in range(20):
+            s, i, r, step_size = m.run_timepoint_adaptive(step_size, 1e-8, s, i,
+                                                          r, *arguments)
+        self.assertAlmostEqual(s, s_euler, delta=0.1)
+        self.assertAlmostEqual(i, i_euler, delta=0.1)
+        self.assertAlmostEqual(r, r_euler, delta=0.1)
+
+    def test_arrays(self):
+        arguments = (m.get_regulated_births, 0.1, 1000, 0, m.get_ddt_infections,
+                     0.0005, 0.01, 0.05, 0.01, 0.02)
+        s, i, r, step_size = m.run_timepoint_adaptive(1.0, 1e-8,
+                                                      np.array([900.0, 500.0]),
+                                                      np.array([100.0, 10.0]),
+                                                      np.array([0.0, 0.0]),
+                                                      *arguments)
+        s_single, i_single, r_single, step_size = m.run_timepoint_adaptive(1.0, 1e-8,
+                                                                           500, 10,
+                                                                           0, *arguments)
+        self.assertAlmostEqual(s[1], s_single, places=5)
+        self.assertAlmostEqual(i[1], i_single, places=5)
+        self.assertAlmostEqual(r[1], r_single, places=5)
+
+    def test_lanes_take_own_steps(self):
+        #The second lane has a far higher transmission rate, so it needs far smaller steps
+        arguments = (m.get_regulated_births, 0.1, 1000, 0, m.get_ddt_infections,
+                     np.array([0.0005, 0.5]), 0.01, 0.05, 0.01, 0.02)
+        s, i, r = np.array([900.0, 900.0]), np.array([100.0, 100.0]), np.array([0.0, 0.0])
+        step_size = 1.0
+        for timepoint in range(5):
+            s, i, r, step_size = m.run_timepoint_adaptive(step_size, 1e-8, s, i, r,
+                                                          *arguments)
+        for lane in range(2):
+            lane_arguments = arguments[:5] + (arguments[5][lane],) + arguments[6:]
+            s_single, i_single, r_single = 900, 100, 0
+            single_step_size = 1.0
+            for timepoint in range(5):
+                s_single, i_single, r_single, single_step_size = m.run_timepoint_adaptive(
+                    single_step_size, 1e-8, s_single, i_single, r_single, *lane_arguments)
+            self.assertEqual(s[lane], s_single)
+            self.assertEqual(i[lane], i_single)
+            self.assertEqual(r[lane], r_single)
+            self.assertEqual(step_size[lane], single_step_size)
+        self.assertGreater(step_size[0], step_size[1])
+
 class TestGetTimeTillBottleneck(unittest.TestCase):
 
     def test_no_variance(self):
@@ -727,6 +1105,26 @@ class TestGetBottleneckSize(unittest.TestCase):
         self.assertLessEqual(mean, bottleneck_size_mean + tolerance)
             
         
+class TestGetPositiveNormalDraws(unittest.TestCase):
+    
+    def test_no_variance(self):
+        self.assertEqual(m.get_positive_normal_draws(100, 0, 3), [100, 100, 100])
+
+    def test_positive(self):
+        draws = m.get_positive_normal_draws(2, 5.0, 10000)
+
+        self.assertEqual(len(draws), 10000)
+        self.assertGreater(min(draws), 0)
+
+    def test_truncated_distribution(self):
+        #The chance of a 1 when redrawing until the rounded value is positive
+        normal = statistics.NormalDist(2, 4)
+        chance = ((normal.cdf(1.5) - normal.cdf(0.5)) / (1 - normal.cdf(0.5)))
+        n_draws = 100000
+
+        draws = np.array(m.get_positive_normal_draws(2, 2.0, n_draws))
+        self.assertAlmostEqual(np.mean(draws == 1), chance, delta=0.005)
+
 class TestGetBottleneckSurvivors(unittest.TestCase):
     
     def test_s_bottleneck(self):
@@ -812,6 +1210,315 @@ class TestGetBottleneckSurvivors(unittest.TestCase):
 
 
 
+class TestRunSweep(unittest.TestCase):
+    '''The sweep engine should produce exactly the same data as running the
+    parameter sets one at a time, including when the bottleneck timing and
+    size are drawn at random, and no matter how the parameter sets are split
+    into chunks.
+    '''
+    settings = {"n_bottlenecks": 4, "burn_in": 1, "time_till_bottleneck_mean": (20, 40, 10),
+                "time_till_bottleneck_cv": (0, 0.5, 0.5), "bottleneck_size_cv": 0.1,
+                "transmission_rate": (0.0001, 0.0002, 0.0001),
+                "fractional_timestep_size": 0.1, "sweep_chunk_size": 5}
+
+    def tearDown(self):
+        remove_output(["test_sweep_serial", "test_sweep_sweep"])
+
+    def test_matches_serial(self):
+        serial_data = run_model("test_sweep_serial", "Serial", **self.settings)
+        serial_series = m.series
+        sweep_data = run_model("test_sweep_sweep", "Sweep", **self.settings)
+
+        self.assertEqual(m.series, serial_series)
+        self.assertEqual(sweep_data, serial_data)
+
+    def test_adaptive_matches_serial(self):
+        #A fast epidemic, so that the lanes need steps of different sizes
+        serial_data = run_model("test_sweep_serial", "Serial", **self.settings,
+                                integrator="Adaptive", recovery_rate=0.5)
+        serial_series = m.series
+        sweep_data = run_model("test_sweep_sweep", "Sweep", **self.settings,
+                               integrator="Adaptive", recovery_rate=0.5)
+
+        self.assertEqual(m.series, serial_series)
+        self.assertEqual(sweep_data, serial_data)
+
+    def test_cycle_convergence_not_allowed(self):
+        with self.assertRaises(ValueError):
+            run_model("test_sweep_sweep", "Sweep", **self.settings,
+                      cycle_convergence_tolerance=0.01)
+
+
+class TestResumeRun(unittest.TestCase):
+    '''A run that is interrupted after a checkpoint, and then run again with
+    the same parameters, should resume after the checkpoint and write exactly
+    the same files as a run that wasn't interrupted.
+    '''
+    class Interruption(Exception):
+        pass
+
+    settings = {"time_till_bottleneck_mean": (20, 50, 10), "time_till_bottleneck_cv": 0.5,
+                "bottleneck_size_cv": 0.2, "sweep_chunk_size": 2, "export_schedule": True,
+                "checkpoint_interval": 1}
+
+    def setUp(self):
+        self.save_checkpoint = m.save_checkpoint
+
+    def tearDown(self):
+        m.save_checkpoint = self.save_checkpoint
+        remove_output(["test_resume_uninterrupted", "test_resume_interrupted"])
+
+    def run_engine(self, engine, file_name, interrupt_after = None, **settings):
+        def save_checkpoint(checkpoint, n_completed, **state):
+            self.save_checkpoint(checkpoint, n_completed, **state)
+            if interrupt_after is not None and n_completed >= interrupt_after:
+                #Part of the next parameter set has already been written
+                with open(f"output/{file_name}.csv", 'a') as f:
+                    f.write("1,2,3\n")
+                raise self.Interruption()
+        m.save_checkpoint = save_checkpoint
+        try:
+            run_model(file_name, engine, **dict(self.settings, **settings))
+        except self.Interruption:
+            pass
+
+    def read_files(self, file_name):
+        return [read_output(file_name), read_output(f"{file_name}_bottleneck_schedule")]
+
+    def test_resume(self):
+        for engine in ["Serial", "Sweep"]:
+            with self.subTest(engine=engine):
+                self.run_engine(engine, "test_resume_uninterrupted")
+                self.run_engine(engine, "test_resume_interrupted", interrupt_after=2)
+                self.assertTrue(os.path.exists("output/test_resume_interrupted_checkpoint.pkl"))
+                self.run_engine(engine, "test_resume_interrupted")
+
+                self.assertEqual(self.read_files("test_resume_interrupted"),
+                                 self.read_files("test_resume_uninterrupted"))
+                self.assertFalse(os.path.exists("output/test_resume_interrupted_checkpoint.pkl"))
+
+    def test_different_parameters(self):
+        self.run_engine("Serial", "test_resume_interrupted", interrupt_after=1)
+        with self.assertRaises(ValueError):
+            self.run_engine("Serial", "test_resume_interrupted", n_bottlenecks=4)
+
+class TestResultCache(unittest.TestCase):
+    '''A run that takes some of its parameter sets from the result cache 
+    should write exactly the same data as a run that calculates all of them,
+    no matter which engine calculated the cached parameter sets.
+    '''
+    settings = {"time_till_bottleneck_cv": 0.5, "sweep_chunk_size": 2}
+
+    def setUp(self):
+        self.cache_folder = rc.CACHE_FOLDER
+        rc.CACHE_FOLDER = "output/test_result_cache"
+
+    def tearDown(self):
+        rc.CACHE_FOLDER = self.cache_folder
+        if os.path.exists("output/test_result_cache"):
+            shutil.rmtree("output/test_result_cache")
+        remove_output(["test_cache_cached", "test_cache_calculated"])
+
+    def test_extended_range(self):
+        for engine in ["Serial", "Sweep", "Parallel"]:
+            with self.subTest(engine=engine):
+                run_model("test_cache_cached", engine, **self.settings,
+                          time_till_bottleneck_mean=(20, 40, 10), result_cache=True)
+                self.assertEqual(len(os.listdir("output/test_result_cache")), 3)
+                cached = run_model("test_cache_cached", engine, **self.settings,
+                                   time_till_bottleneck_mean=(20, 60, 10), result_cache=True)
+                self.assertEqual(len(os.listdir("output/test_result_cache")), 5)
+                calculated = run_model("test_cache_calculated", engine, **self.settings,
+                                       time_till_bottleneck_mean=(20, 60, 10))
+                self.assertEqual(cached, calculated)
+                shutil.rmtree("output/test_result_cache")
+
+    def test_serial_and_parallel_share(self):
+        settings = dict(self.settings, time_till_bottleneck_mean=(20, 60, 10),
+                        time_till_bottleneck_cv=0)
+        run_model("test_cache_calculated", "Serial", **settings, result_cache=True)
+        self.assertEqual(run_model("test_cache_cached", "Parallel", **settings,
+                                   result_cache=True),
+                         run_model("test_cache_calculated", "Serial", **settings))
+        self.assertEqual(len(os.listdir("output/test_result_cache")), 5)
+
+    def test_sweep_not_shared(self):
+        #The "Sweep" engine doesn't give exactly the same data as the others
+        settings = dict(self.settings, time_till_bottleneck_mean=(20, 60, 10),
+                        integrator="Adaptive", result_cache=True)
+        run_model("test_cache_calculated", "Serial", **settings)
+        run_model("test_cache_cached", "Sweep", **settings)
+        self.assertEqual(len(os.listdir("output/test_result_cache")), 10)
+
+    def test_different_schedules(self):
+        cache = rc.ResultCache()
+        p1 = p.Parameters()
+        parameter_set = [p1.initial_prevalence[0], 100, 0, 100, 0, 0.1, 0, 0.01, 0.01,
+                         0.01, 0.001, 0.1]
+        schedule = ([100, 100], [100, 100])
+        self.assertEqual(cache.get_key(p1, parameter_set, schedule),
+                         cache.get_key(p.Parameters(), parameter_set, ([100, 100], [100, 100])))
+        self.assertNotEqual(cache.get_key(p1, parameter_set, schedule),
+                            cache.get_key(p1, parameter_set, ([100, 99], [100, 100])))
+
+class TestRunParallel(unittest.TestCase):
+    '''The parallel engine should write exactly the same data no matter how 
+    many workers are used, and the same data as the serial engine when the
+    bottlenecks aren't random.
+    '''
+    settings = {"burn_in": 1, "time_till_bottleneck_mean": (20, 60, 20),
+                "fractional_timestep_size": 0.1}
+
+    def tearDown(self):
+        remove_output(["test_parallel_1", "test_parallel_3", "test_parallel_serial"])
+
+    def test_worker_count(self):
+        data_1 = run_model("test_parallel_1", "Parallel", **self.settings, n_workers=1,
+                           time_till_bottleneck_cv=0.2, bottleneck_size_cv=0.2)
+        series_1 = m.series
+        data_3 = run_model("test_parallel_3", "Parallel", **self.settings, n_workers=3,
+                           time_till_bottleneck_cv=0.2, bottleneck_size_cv=0.2)
+
+        self.assertEqual(data_3, data_1)
+        self.assertEqual(m.series, series_1)
+
+    def test_matches_serial(self):
+        data = run_model("test_parallel_1", "Parallel", **self.settings)
+        series = m.series
+        serial_data = run_model("test_parallel_serial", "Serial", **self.settings)
+
+        self.assertEqual(data, serial_data)
+        self.assertEqual(series, m.series)
+
+class TestReplaySchedule(unittest.TestCase):
+    '''A run that replays the exported schedule of another run should have
+    exactly the same bottlenecks and therefore exactly the same data, for 
+    every engine.
+    '''
+    settings = {"n_bottlenecks": 4, "time_till_bottleneck_mean": (20, 40, 20),
+                "time_till_bottleneck_cv": 0.5, "bottleneck_size_cv": 0.2,
+                "fractional_timestep_size": 0.1}
+
+    def tearDown(self):
+        remove_output(["test_schedule_drawn", "test_schedule_other"])
+
+    def test_replay(self):
+        for engine in ["Serial", "Sweep", "Parallel"]:
+            with self.subTest(engine=engine):
+                drawn_data = run_model("test_schedule_drawn", engine, **self.settings,
+                                       seed=1, export_schedule=True)
+                other_data = run_model("test_schedule_other", engine, **self.settings,
+                                       seed=2,
+                                       replay_schedule="test_schedule_drawn_bottleneck_schedule")
+                self.assertEqual(other_data, drawn_data)
+
+    def test_export(self):
+        run_model("test_schedule_drawn", "Serial", **self.settings, seed=1, export_schedule=True)
+        with open("output/test_schedule_drawn_bottleneck_schedule.csv", newline='') as f:
+            rows = list(csv.DictReader(f))
+
+        self.assertEqual(len(rows), 2*4)
+        self.assertEqual([row["Bottleneck"] for row in rows], ["0", "1", "2", "3"]*2)
+        self.assertTrue(all(int(row["TimeTillBottleneck"]) >= 1 for row in rows))
+        self.assertTrue(all(float(row["BottleneckSize"]) >= 1 for row in rows))
+
+    def test_different_bottlenecks(self):
+        run_model("test_schedule_drawn", "Serial", **self.settings, seed=1, export_schedule=True)
+        with self.assertRaises(ValueError):
+            run_model("test_schedule_other", "Serial", **dict(self.settings, n_bottlenecks=5),
+                      seed=1, replay_schedule="test_schedule_drawn_bottleneck_schedule")
+
+    def test_other_parameter_sets(self):
+        for engine in ["Serial", "Sweep", "Parallel"]:
+            with self.subTest(engine=engine):
+                drawn_data = run_model("test_schedule_drawn", engine,
+                                       **dict(self.settings,
+                                              time_till_bottleneck_mean=(20, 60, 20)),
+                                       seed=1, export_schedule=True).splitlines()
+                #The last two parameter sets of the drawn run, one position earlier
+                other_data = run_model("test_schedule_other", engine,
+                                       **dict(self.settings,
+                                              time_till_bottleneck_mean=(40, 60, 20)),
+                                       seed=2,
+                                       replay_schedule="test_schedule_drawn_bottleneck_schedule")
+                other_data = other_data.splitlines()
+
+                #The rows of the last two parameter sets, apart from their Series numbers
+                series_column = drawn_data[0].split(",").index("Series")
+                for row, other_row in zip(drawn_data[-len(other_data) + 1:], other_data[1:]):
+                    row, other_row = row.split(","), other_row.split(",")
+                    del row[series_column], other_row[series_column]
+                    self.assertEqual(row, other_row)
+
+    def test_missing_parameter_set(self):
+        run_model("test_schedule_drawn", "Serial", **self.settings, seed=1, export_schedule=True)
+        with self.assertRaises(ValueError):
+            run_model("test_schedule_other", "Serial",
+                      **dict(self.settings, time_till_bottleneck_mean=(20, 80, 20)),
+                      seed=1, replay_schedule="test_schedule_drawn_bottleneck_schedule")
+
+class TestRunPeriodicOrbits(unittest.TestCase):
+    '''The periodic cycles found directly should be the same as the cycles 
+    that a long burn-in settles onto.
+    '''
+    def tearDown(self):
+        m.series = 1
+        if os.path.exists("output/test_orbits.csv"):
+            os.remove("output/test_orbits.csv")
+
+    def get_parameters(self):
+        p1 = p.Parameters()
+        p1.set_file_name("test_orbits")
+        p1.set_initial_prevalence(0.5)
+        p1.set_time_till_bottleneck_mean(50, 150, 50)
+        p1.set_host_birth_rate(0.1)
+        p1.set_transmission_rate(0.0002)
+        p1.set_fractional_timestep_size(0.1)
+        return p1
+
+    def test_matches_burn_in(self):
+        p1 = self.get_parameters()
+        orbits = m.run_periodic_orbits(p1, is_logging=False)
+        self.assertEqual(len(orbits), 3)
+
+        for orbit in orbits:
+            self.assertTrue(orbit["Converged"])
+            dataframe = l.Dataframe(file_name = "test")
+            dataframe.add_constant_data({})
+            m.run_parameter_set(dataframe, n_bottlenecks=200, burn_in=199,
+                                initial_popsize=1000, initial_prevalence=0.5,
+                                bottleneck_size_mean=100, bottleneck_size_cv=0,
+                                time_till_bottleneck_mean=orbit["ParameterSet"][3],
+                                time_till_bottleneck_cv=0, host_birth_rate=0.1,
+                                carrying_capacity=1000,
+                                birth_function=m.get_regulated_births,
+                                parasite_fecundity_effect=0, s_death_rate=0,
+                                i_death_rate=0, r_death_rate=0,
+                                transmission_rate=0.0002,
+                                transmission_function=m.get_ddt_infections,
+                                recovery_rate=0, fractional_timestep_size=0.1)
+            prevalence = [row["I"] / (row["S"] + row["I"] + row["R"])
+                          for row in dataframe.get_data_rows()]
+            self.assertAlmostEqual(orbit["PMax"], max(prevalence), places=6)
+            self.assertAlmostEqual(orbit["PMin"], min(prevalence), places=6)
+
+    def test_logging(self):
+        p1 = self.get_parameters()
+        m.run_periodic_orbits(p1)
+        with open("output/test_orbits.csv") as f:
+            rows = f.read().splitlines()
+        #A header, then 51, 101, and 151 timepoints for the three parameter sets
+        self.assertEqual(len(rows), 1 + 51 + 101 + 151)
+        self.assertEqual(m.series, 4)
+
+    def test_for_error(self):
+        p1 = self.get_parameters()
+        p1.set_recovery_rate(0.01)
+        self.assertRaises(ValueError, m.run_periodic_orbits, p1)
+        p1 = self.get_parameters()
+        p1.set_bottleneck_size_cv(0.1)
+        self.assertRaises(ValueError, m.run_periodic_orbits, p1)
+
 class TestGetRegulatedBirths(unittest.TestCase):
 
     def test_no_host_birth(self):
@@ -1449,6 +2156,173 @@ class TestGetRecoveries(unittest.TestCase):
         self.assertEqual(new_recoveries, 1)
 
 
+####Testing logger.py
+class TestWriteData(unittest.TestCase):
+    '''Each call to write_data should only append the rows logged since the
+    previous call, below a single header, and then forget them.
+    '''
+    def tearDown(self):
+        if os.path.exists("output/test_write_data.csv"):
+            os.remove("output/test_write_data.csv")
+
+    def test_streaming(self):
+        dataframe = l.Dataframe(file_name = "test_write_data")
+        dataframe.add_constant_data({"BirthRate": 0.1})
+        dataframe.log_data(True, [[1, 0, 10, 0, 0], [1, 1, 11, 0, 0]])
+        dataframe.write_data()
+        self.assertEqual(dataframe.get_data_rows(), [])
+
+        dataframe.add_constant_data({"BirthRate": 0.2})
+        dataframe.log_data(True, [[2, 0, 10, 0, 0]])
+        dataframe.write_data()
+        self.assertEqual(dataframe.get_data_rows(), [])
+
+        with open("output/test_write_data.csv") as f:
+            rows = f.read().splitlines()
+        self.assertEqual(rows, ["Series,Timepoint,S,I,R,BirthRate",
+                                "1,0,10.0,0.0,0.0,0.1", "1,1,11.0,0.0,0.0,0.1",
+                                "2,0,10.0,0.0,0.0,0.2"])
+
+    def test_overwrites_old_file(self):
+        with open("output/test_write_data.csv", "w") as f:
+            f.write("old data\n")
+        dataframe = l.Dataframe(file_name = "test_write_data")
+        dataframe.add_constant_data({"BirthRate": 0.1})
+        dataframe.write_data()
+
+        with open("output/test_write_data.csv") as f:
+            rows = f.read().splitlines()
+        self.assertEqual(len(rows), 1)
+
+class TestWriteNormalizedData(unittest.TestCase):
+    '''The "Normalized" format should write every parameter set once to the 
+    params file, and join_normalized_data should rebuild the "Wide" file.
+    '''
+    def tearDown(self):
+        for suffix in ["", "_params", "_series", "_wide"]:
+            if os.path.exists(f"output/test_write_data{suffix}.csv"):
+                os.remove(f"output/test_write_data{suffix}.csv")
+
+    def log(self, dataframe):
+        dataframe.add_constant_data({"BirthRate": 0.1, "DeathRate": 0.5})
+        dataframe.log_data(True, [[1, 0, 10, 0, 0], [1, 1, 11, 0, 0]])
+        dataframe.write_data()
+        dataframe.add_constant_data({"BirthRate": 0.2, "DeathRate": 0.5})
+        dataframe.log_data(True, [[2, 0, 20, 0, 0]])
+        dataframe.write_data()
+
+    def test_normalized(self):
+        dataframe = l.Dataframe(file_name = "test_write_data", 
+                                output_format = "Normalized")
+        self.log(dataframe)
+
+        with open("output/test_write_data_params.csv") as f:
+            rows = f.read().splitlines()
+        self.assertEqual(rows, ["ParamSetID,BirthRate,DeathRate", 
+                                "0,0.1,0.5", "1,0.2,0.5"])
+        with open("output/test_write_data_series.csv") as f:
+            rows = f.read().splitlines()
+        self.assertEqual(rows, ["ParamSetID,Series,Timepoint,S,I,R", '0,1,0,10.0,0.0,0.0', '0,1,1,11.0,0.0,0.0', '1,2,0,20.0,0.0,0.0'])
+
+    def test_join(self):
+        self.log(l.Dataframe(file_name = "test_write_data"))
+        os.rename("output/test_write_data.csv", "output/test_write_data_wide.csv")
+        self.log(l.Dataframe(file_name = "test_write_data", 
+                             output_format = "Normalized"))
+        l.join_normalized_data("test_write_data")
+
+        with open("output/test_write_data_wide.csv") as f:
+            wide = f.read()
+        with open("output/test_write_data.csv") as f:
+            joined = f.read()
+        self.assertEqual(joined, wide)
+
+class TestWriteBinaryData(unittest.TestCase):
+    '''The "Binary" format should append every column to its .npy file, and
+    read_binary_data should give back the same rows and constant values.
+    '''
+    def tearDown(self):
+        if os.path.exists("output/test_write_data"):
+            shutil.rmtree("output/test_write_data")
+
+    def test_binary(self):
+        dataframe = l.Dataframe(file_name = "test_write_data", 
+                                output_format = "Binary")
+        dataframe.add_constant_data({"BirthRate": 0.1, "BirthType": "Regulated"})
+        dataframe.log_data(True, [[1, 0, 10, 0, 0], [1, 1, 11, 0.5, 0]])
+        expected_rows = dataframe.get_data_rows()
+        dataframe.write_data()
+        dataframe.add_constant_data({"BirthRate": 0.2, "BirthType": "Regulated"})
+        dataframe.log_data(True, [[2, 0, 20, 0, 0]])
+        expected_rows += dataframe.get_data_rows()
+        dataframe.write_data()
+
+        columns, parameter_sets = l.read_binary_data("test_write_data")
+        self.assertIsInstance(columns["S"], np.memmap)
+        self.assertEqual(parameter_sets, {0: {"BirthRate": 0.1, "BirthType": "Regulated"},
+                                          1: {"BirthRate": 0.2, "BirthType": "Regulated"}})
+        rows = [dict({column_name: column[index] for column_name, column in columns.items()
+                      if column_name != "ParamSetID"}, 
+                     **parameter_sets[columns["ParamSetID"][index]])
+                for index in range(len(columns["S"]))]
+        self.assertEqual(rows, expected_rows)
+
+####Testing reducers.py
+class TestPrevalenceExtrema(unittest.TestCase):
+    '''The reducer should keep the first highest and lowest prevalence of each
+    parameter set, and the dataframe should only write the summaries when it
+    isn't keeping the rows.
+    '''
+    def tearDown(self):
+        for suffix in ["", "_prevalence_extrema"]:
+            if os.path.exists(f"output/test_reducers{suffix}.csv"):
+                os.remove(f"output/test_reducers{suffix}.csv")
+
+    def test_reduce(self):
+        reducer = red.PrevalenceExtrema()
+        summary = reducer.reduce(None, np.array([[1, 0], [1, 1], [1, 2]]),
+                                 np.array([[90, 10, 0], [50, 50, 0], [0, 0, 0]]))
+        self.assertEqual(summary, [0.5, 1, 1, 0.0, 1, 2])
+
+        summary = reducer.reduce(summary, np.array([[2, 0], [2, 1]]),
+                                 np.array([[50, 50, 0], [40, 60, 0]]))
+        self.assertEqual(summary, [0.6, 2, 1, 0.0, 1, 2])
+
+    def test_summary_only(self):
+        dataframe = l.Dataframe(file_name = "test_reducers", 
+                                reducers = [red.PrevalenceExtrema()],
+                                is_keeping_rows = False)
+        for birth_rate in [0.1, 0.2]:
+            dataframe.add_constant_data({"BirthRate": birth_rate})
+            dataframe.log_data(True, [[1, 0, 90, 10, 0], [1, 1, 80, 20 * birth_rate, 0]])
+            self.assertEqual(dataframe.get_data_rows(), [])
+            dataframe.write_data()
+
+        self.assertFalse(os.path.exists("output/test_reducers.csv"))
+        with open("output/test_reducers_prevalence_extrema.csv") as f:
+            rows = f.read().splitlines()
+        self.assertEqual(rows, ["BirthRate,PMax,PMaxSeries,PMaxTimepoint,PMin,PMinSeries,PMinTimepoint",
+                                "0.1,0.1,1,0,0.024390243902439025,1,1",
+                                "0.2,0.1,1,0,0.047619047619047616,1,1"])
+
+    def test_run(self):
+        p1 = p.Parameters()
+        p1.set_file_name("test_reducers")
+        p1.set_n_bottlenecks(3)
+        p1.set_reducers(["PrevalenceExtrema"], keep_trajectories=True)
+        m.run(p1)
+
+        with open("output/test_reducers.csv") as f:
+            rows = list(csv.DictReader(f))
+        with open("output/test_reducers_prevalence_extrema.csv") as f:
+            summary = list(csv.DictReader(f))
+        prevalence = [float(row["I"]) / (float(row["S"]) + float(row["I"]) + float(row["R"]))
+                      for row in rows]
+        self.assertEqual(len(summary), 1)
+        self.assertAlmostEqual(float(summary[0]["PMax"]), max(prevalence))
+        self.assertAlmostEqual(float(summary[0]["PMin"]), min(prevalence))
+
+
 def run_tests():
     unittest.main()
 
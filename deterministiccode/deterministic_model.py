@@ -33,6 +33,23 @@ run
     combinations, which means that you can vary one parameter across a range to
     get a one-dimensional parameter space, two parameters across ranges to get
     a two-dimensional parameter space, etc.
+get_replayed_schedules
+    Reads the bottleneck schedules of an earlier run that should be replayed,
+    if any.
+get_schedule
+    Returns the timing and size of every bottleneck of a parameter set, 
+    either replayed or drawn in one go.
+resume_run
+    Goes back to the last checkpoint of an interrupted run, if there is one
+    (see checkpoint.py).
+save_checkpoint
+    Saves a checkpoint of the run every checkpoint_interval parameter sets.
+get_result_cache
+    Creates the cache of the results of parameter sets, if it has been turned
+    on (see result_cache.py).
+run_cached
+    Logs the data of a parameter set from the result cache, or runs it and
+    stores its data in the cache.
 log_parameter_set
     Gives the parameters and their values for this parameter set to a dataframe in the
     logger module so that the logger can make sure to fill in these columns in
@@ -41,7 +58,8 @@ log_parameter_set
 run_parameter_set
     Runs the model such that the initial population experiences periods of
     normal population growth/parasite transmission punctuated by bottleneck 
-    events.
+    events. Can optionally skip the rest of the burn-in once the population has
+    settled onto its periodic cycle.
 get_time_till_bottleneck
     Returns the number of timesteps until the next bottleneck.
     This will be a whole number value. The value could be exact and 
@@ -54,16 +72,57 @@ get_bottleneck_size
     or pulled from a normal distribution. This function also ensures that at 
     least one host makes it through the bottleneck (the bottleneck cannot be of 
     size zero or a negative number)
+get_positive_normal_draws
+    Draws whole numbers from a rounded normal distribution on the condition 
+    that they are positive, by inverse transform sampling instead of redrawing.
 run_model
     Runs multiple timepoints of the model, returns the final population state,
     and logs the data generated (if not in a burn-in period).
+run_segment
+    Used by run_model during a burn-in period. Runs multiple timepoints of the
+    model and only returns the final population state, without building any
+    rows of data.
 run_timepoint
     Runs and returns the results of a single timepoint of the model. This 
     timepoint may be run in one step, or in multiple fractional steps.
+run_timepoint_adaptive
+    Used instead of run_timepoint when the "Adaptive" integrator is selected.
+    Runs a single timepoint of the model with the adaptive-step 
+    Dormand-Prince method.
+get_rates
+    Returns the instantaneous rates of change of S, I, and R.
 get_bottleneck_survivors
     Subjects the host population to a bottleneck by scaling the entire 
     population down to equal the bottleneck size, which perfectly preserves the 
     value of parasite prevalence.
+run_sweep
+    Used instead of looping over run_parameter_set when the "Sweep" engine is
+    selected. Runs every parameter set together as numpy arrays, in chunks of
+    bounded size.
+run_batch
+    Runs several parameter sets ("lanes") of the model in lock-step, masking
+    out lanes whose bottleneck comes earlier than the others.
+run_model_batched
+    The batched equivalent of run_model.
+log_batch
+    Logs the trajectories of one parameter set from the output of run_batch.
+run_parallel
+    Used instead of looping over run_parameter_set when the "Parallel" engine
+    is selected. Spreads the parameter sets across worker processes and logs
+    their data in order.
+run_task
+    Runs one parameter set inside a worker process.
+run_periodic_orbits
+    An alternative to "run" for regular bottlenecks. Solves directly for the
+    periodic boom-bust cycle of every parameter set instead of simulating a 
+    long burn-in, logs one cycle per parameter set, and returns the cycles' 
+    maximum and minimum prevalence.
+find_periodic_orbits
+    Finds the post-bottleneck prevalence that is repeated every bottleneck 
+    cycle, using the secant method on several parameter sets at once.
+get_next_prevalence
+    Runs one bottleneck cycle from a given post-bottleneck prevalence and
+    returns the prevalence after the next bottleneck.
 get_regulated_births
     Calculates and returns the number of new hosts that should be born in this
     timestep due to a birth process which is regulated by carrying capacity
@@ -90,11 +149,19 @@ get_recoveries
     in this timestep
 '''
 
+import os
+import math
+import statistics
 import numpy as np
 import itertools as iter
+from concurrent.futures import ProcessPoolExecutor
 from typing import Callable
 
 import deterministiccode.logger as logger
+import deterministiccode.reducers as reducers
+import deterministiccode.schedule as schedule_module
+import deterministiccode.checkpoint as checkpoint_module
+import deterministiccode.result_cache as result_cache_module
 
 random_number_generator = np.random.default_rng(92500169789667897205027529303633824467)
 series = 1
@@ -109,13 +176,20 @@ def run(parameters) -> None:
     method in this function takes thoses lists and returns a list of all possible
     combinations, which means that you can vary one parameter across a range to
     get a one-dimensional parameter space, two parameters across ranges to get
-    a two-dimensional parameter space, etc.
+    a two-dimensional parameter space, etc. If checkpoint_interval is set, the
+    run saves checkpoints as it goes, and resumes from the last one if it was
+    interrupted (see checkpoint.py). If result_cache is set, parameter sets 
+    that an earlier run has already calculated are taken from the cache (see
+    result_cache.py).
 
     parameters: an instance of the Parameters class in parameters.py
         Contains attributes which are the parameter values that the model
         should be run with. See parameters.py for more detail.
     '''
-    dataframe = logger.Dataframe(file_name = parameters.file_name)
+    dataframe = logger.Dataframe(file_name = parameters.file_name,
+                                 output_format = parameters.output_format,
+                                 reducers = reducers.get_reducers(parameters.reducers),
+                                 is_keeping_rows = parameters.keep_trajectories)
 
     all_parameter_sets = iter.product(parameters.initial_prevalence,
                                       parameters.bottleneck_size_mean,
@@ -129,29 +203,232 @@ def run(parameters) -> None:
                                       parameters.r_death_rate,
                                       parameters.transmission_rate,
                                       parameters.recovery_rate)
-    for parameter_set in all_parameter_sets:
+
+    result_cache = get_result_cache(parameters)
+
+    if parameters.engine == "Sweep":
+        run_sweep(dataframe, parameters, list(all_parameter_sets), result_cache)
+        return
+
+    if parameters.engine == "Parallel":
+        run_parallel(dataframe, parameters, list(all_parameter_sets), result_cache)
+        return
+
+    replayed_schedules = get_replayed_schedules(parameters)
+    schedule_summary = schedule_module.BottleneckSchedule() if parameters.export_schedule else None
+    checkpoint = checkpoint_module.Checkpoint(parameters, dataframe, [schedule_summary])
+    n_completed = len(resume_run(checkpoint)["completed_parameter_sets"])
+
+    for parameter_set_index, parameter_set in iter.islice(enumerate(all_parameter_sets),
+                                                          n_completed, None):
         log_parameter_set(dataframe, parameters, parameter_set)
-        run_parameter_set(dataframe, n_bottlenecks=parameters.n_bottlenecks,
-                          burn_in = parameters.burn_in,
-                          initial_popsize=parameters.initial_popsize,
-                          initial_prevalence=parameter_set[0],
-                          bottleneck_size_mean=parameter_set[1],
-                          bottleneck_size_cv=parameter_set[2],
-                          time_till_bottleneck_mean=parameter_set[3],
-                          time_till_bottleneck_cv=parameter_set[4],
-                          host_birth_rate=parameter_set[5],
-                          carrying_capacity=parameters.carrying_capacity,
-                          birth_function=parameters.birth_function,
-                          parasite_fecundity_effect=parameter_set[6],
-                          s_death_rate=parameter_set[7],
-                          i_death_rate=parameter_set[8],
-                          r_death_rate=parameter_set[9],
-                          transmission_rate=parameter_set[10],
-                          transmission_function=parameters.transmission_function,
-                          recovery_rate=parameter_set[11],
-                          fractional_timestep_size=parameters.fractional_timestep_size)
+        bottleneck_schedule = get_schedule(parameters, parameter_set, replayed_schedules)
+        n_cycles = run_cached(dataframe, parameters, parameter_set, bottleneck_schedule,
+                              result_cache,
+                              lambda set_dataframe:
+                              run_parameter_set(set_dataframe,
+                                                n_bottlenecks=parameters.n_bottlenecks,
+                                                burn_in = parameters.burn_in,
+                                                initial_popsize=parameters.initial_popsize,
+                                                initial_prevalence=parameter_set[0],
+                                                bottleneck_size_mean=parameter_set[1],
+                                                bottleneck_size_cv=parameter_set[2],
+                                                time_till_bottleneck_mean=parameter_set[3],
+                                                time_till_bottleneck_cv=parameter_set[4],
+                                                host_birth_rate=parameter_set[5],
+                                                carrying_capacity=parameters.carrying_capacity,
+                                                birth_function=parameters.birth_function,
+                                                parasite_fecundity_effect=parameter_set[6],
+                                                s_death_rate=parameter_set[7],
+                                                i_death_rate=parameter_set[8],
+                                                r_death_rate=parameter_set[9],
+                                                transmission_rate=parameter_set[10],
+                                                transmission_function=parameters.transmission_function,
+                                                recovery_rate=parameter_set[11],
+                                                fractional_timestep_size=parameters.fractional_timestep_size,
+                                                integrator=parameters.integrator,
+                                                integrator_tolerance=parameters.integrator_tolerance,
+                                                cycle_convergence_tolerance=parameters.cycle_convergence_tolerance,
+                                                schedule=bottleneck_schedule))
+        if parameters.cycle_convergence_tolerance is not None and n_cycles is not None:
+            print(f"Simulated {n_cycles} of {parameters.n_bottlenecks} bottleneck cycles")
         dataframe.write_data()
+        if schedule_summary is not None:
+            schedule_summary.add_schedule(dataframe,
+                                          schedule_module.get_parameter_set_key(parameter_set),
+                                          *bottleneck_schedule)
+            schedule_summary.write_summary(dataframe)
+        save_checkpoint(checkpoint, parameter_set_index + 1)
+    checkpoint.finish()
+
+    if result_cache is not None:
+        statistics = result_cache.get_statistics()
+        print(f"Result cache: {statistics['Hits']} parameter sets reused, "
+              f"{statistics['Misses']} calculated")
         
+def get_replayed_schedules(parameters):
+    '''Reads the bottleneck schedules of an earlier run that should be 
+    replayed (see schedule.py), unless no schedule is being replayed.
+
+    parameters: an instance of the Parameters class in parameters.py
+        Contains the replay_schedule parameter. See parameters.py for more 
+        detail.
+
+    Returns dict
+        See read_schedules in schedule.py, or None if replay_schedule is None
+    '''
+    if parameters.replay_schedule is None:
+        return None
+    return schedule_module.read_schedules(parameters.replay_schedule)
+
+def get_schedule(parameters, parameter_set: list, replayed_schedules: dict = None,
+                 generator = None) -> tuple:
+    '''Returns the bottleneck schedule of a parameter set: the one of the 
+    replayed run if a schedule is being replayed, and otherwise a newly drawn
+    one. The timing of every bottleneck is drawn first, then the size of 
+    every bottleneck (see get_positive_normal_draws).
+
+    parameters: an instance of the Parameters class in parameters.py
+        Contains the n_bottlenecks parameter. See parameters.py for more 
+        detail.
+    parameter_set: list
+        The rangeable parameter values of the parameter set, in the order 
+        produced by the iter.product method in the "run" function. A replayed
+        schedule is found by these values (see get_parameter_set_key in 
+        schedule.py), so the replayed run can range the parameters differently
+        as long as it only has parameter sets of the run it replays
+    replayed_schedules: dict
+        See get_replayed_schedules
+    generator: np.random.Generator
+        The random number generator to draw from. Defaults to the one of this
+        module
+
+    Returns tuple(list, list)
+        The number of timepoints until every bottleneck, and the size of 
+        every bottleneck
+
+    Raises ValueError
+        If the replayed run has no schedule for this parameter set, or one 
+        with a different number of bottlenecks
+    '''
+    if replayed_schedules is None:
+        return (get_positive_normal_draws(parameter_set[3], parameter_set[4],
+                                          parameters.n_bottlenecks, generator),
+                get_positive_normal_draws(parameter_set[1], parameter_set[2],
+                                          parameters.n_bottlenecks, generator))
+
+    parameter_set_key = schedule_module.get_parameter_set_key(parameter_set)
+    bottleneck_schedule = replayed_schedules.get(parameter_set_key)
+    if (bottleneck_schedule is None or
+        len(bottleneck_schedule[0]) != parameters.n_bottlenecks):
+        raise ValueError(f'''The schedule replayed from {parameters.replay_schedule} in 
+                         model.py has no schedule for parameter set 
+                         {parameter_set} with {parameters.n_bottlenecks} 
+                         bottlenecks''')
+    return bottleneck_schedule
+        
+def resume_run(checkpoint) -> dict:
+    '''Goes back to the last checkpoint of an interrupted run, if there is
+    one (see resume in checkpoint.py), and restores the series number and the
+    random number generator of this module to what they were at the 
+    checkpoint.
+
+    checkpoint: an instance of the Checkpoint class from checkpoint.py
+        The checkpoints of the run
+
+    Returns dict
+        The state saved with the checkpoint (see save_checkpoint), with the 
+        indices of the completed parameter sets under 
+        "completed_parameter_sets", which is empty if the run starts from the
+        beginning
+    '''
+    global series
+    global random_number_generator
+
+    state = checkpoint.resume()
+    if state is None:
+        return {"completed_parameter_sets": []}
+    series = state["series"]
+    random_number_generator = state["random_number_generator"]
+    return state
+
+def save_checkpoint(checkpoint, n_completed: int, **state) -> None:
+    '''Saves a checkpoint of the run (see update in checkpoint.py) if 
+    checkpoint_interval parameter sets have been completed since the last one,
+    with the series number and the random number generator of this module.
+    Has to be called right after the data of a parameter set are written.
+
+    checkpoint: an instance of the Checkpoint class from checkpoint.py
+        The checkpoints of the run
+    n_completed: int
+        The number of parameter sets completed so far
+    state
+        Anything else that carries over to the next parameter set, e.g. a 
+        series number that hasn't been stored in this module yet
+    '''
+    checkpoint.update(n_completed, {"series": series,
+                                    "random_number_generator": random_number_generator,
+                                    **state})
+
+def get_result_cache(parameters):
+    '''Creates the cache of the results of parameter sets (see 
+    result_cache.py), or returns None if it hasn't been turned on.
+
+    parameters: an instance of the Parameters class in parameters.py
+        Contains the result_cache parameter. See parameters.py for more 
+        detail.
+
+    Returns an instance of the ResultCache class from result_cache.py, or 
+    None if result_cache is False
+    '''
+    if not parameters.result_cache:
+        return None
+    return result_cache_module.ResultCache()
+
+def run_cached(dataframe, parameters, parameter_set: list, bottleneck_schedule: tuple,
+               result_cache, run: Callable):
+    '''Logs the data of a parameter set to the dataframe. If the parameter set
+    has been calculated before, its data are taken from the result cache (see 
+    result_cache.py), and otherwise it is run and its data are stored in the
+    cache. Either way, the series numbers carry on as if it had been run.
+
+    dataframe: an instance of the Dataframe class from logger.py
+        Stores the data as it comes in from the simulation, and already holds
+        the constant data of the parameter set
+    parameters: an instance of the Parameters class in parameters.py
+        The parameters of the run
+    parameter_set: list
+        The rangeable parameter values of the parameter set, in the order 
+        produced by the iter.product method in the "run" function
+    bottleneck_schedule: tuple
+        See get_schedule
+    result_cache: an instance of the ResultCache class from result_cache.py
+        If None, the parameter set is simply run
+    run: Callable
+        Takes a dataframe, and runs the parameter set and logs its data to it
+
+    Returns whatever run returns, or None if the data were taken from the 
+    cache
+    '''
+    global series
+
+    if result_cache is None:
+        return run(dataframe)
+
+    key = result_cache.get_key(parameters, parameter_set, bottleneck_schedule)
+    set_dataframe = logger.Dataframe(file_name = parameters.file_name)
+    log_parameter_set(set_dataframe, parameters, parameter_set)
+    first_series = series
+    n_series = result_cache.load(key, set_dataframe, first_series)
+    result = None
+    if n_series is None:
+        result = run(set_dataframe)
+        result_cache.save(key, set_dataframe, first_series, series - first_series)
+    else:
+        series = first_series + n_series
+    dataframe.merge(set_dataframe)
+    return result
+
 def log_parameter_set(dataframe, parameters, parameter_set: list) -> None:
     '''Gives the parameters and their values for this parameter set to the
     logger module so that the logger can make sure to fill in these columns in
@@ -200,10 +477,23 @@ def run_parameter_set(dataframe, n_bottlenecks: int, burn_in: int, initial_popsi
                       parasite_fecundity_effect: float, s_death_rate: float, 
                       i_death_rate: float, r_death_rate: float,
                       transmission_rate: float, transmission_function: Callable,
-                      recovery_rate: float, fractional_timestep_size: float) -> None:
+                      recovery_rate: float, fractional_timestep_size: float,
+                      integrator: str = "Euler",
+                      integrator_tolerance: float = 1e-6,
+                      cycle_convergence_tolerance: float = None,
+                      schedule: tuple = None) -> int:
     '''Runs the model such that the initial population experiences periods of
     normal population growth/parasite transmission punctuated by bottleneck 
-    events.
+    events. 
+    
+    If cycle_convergence_tolerance is given and the bottlenecks are
+    completely regular (both coefficients of variation are zero), every 
+    bottleneck cycle is the same deterministic map from one post-bottleneck 
+    state to the next. Once the post-bottleneck state stops changing, the 
+    population has settled onto its periodic boom-bust cycle, so the remaining
+    burn-in cycles would only repeat it. In that case they are skipped, and the
+    model jumps straight to the first logged cycle. The series number still
+    advances as if the skipped cycles had been run.
 
     dataframe: an instance of the Dataframe class from logger.py
         Stores the data as it comes in from the simulation and contains methods
@@ -264,35 +554,73 @@ def run_parameter_set(dataframe, n_bottlenecks: int, burn_in: int, initial_popsi
         substeps to improve accuracy. The value is the size of the timestep, so
         a value of 0.1 means that the timestep will be run in 10 substeps of size 
         0.1
+    integrator: str
+        Either "Euler", to integrate each timepoint in fixed substeps of size
+        fractional_timestep_size, or "Adaptive", to integrate each timepoint
+        with the adaptive Dormand-Prince method (see run_timepoint_adaptive)
+    integrator_tolerance: float
+        Only used by the "Adaptive" integrator. The error that each adaptive
+        step is allowed to make, relative to the size of S, I, and R
+    cycle_convergence_tolerance: float
+        If None (the default), every burn-in cycle is run. Otherwise, the 
+        largest change in S, I, or R (in number of hosts) between two 
+        consecutive post-bottleneck states below which the population is
+        considered to have converged onto its periodic cycle
+    schedule: tuple(list, list)
+        The number of timepoints until every bottleneck and the size of every
+        bottleneck (see get_schedule). If None, they are drawn here.
+
+    Returns int
+        The number of bottleneck cycles that were actually simulated
     '''
+    global series
     
     i = initial_popsize * initial_prevalence
     s = initial_popsize - i
     r = 0
 
-    for n in range(n_bottlenecks):
+    if schedule is None:
+        schedule = (get_positive_normal_draws(time_till_bottleneck_mean,
+                                              time_till_bottleneck_cv, n_bottlenecks),
+                    get_positive_normal_draws(bottleneck_size_mean, bottleneck_size_cv,
+                                              n_bottlenecks))
+    all_time_till_bottleneck, all_bottleneck_size = schedule
+
+    is_detecting_cycle = (cycle_convergence_tolerance is not None and
+                          bottleneck_size_cv == 0 and time_till_bottleneck_cv == 0)
+    n_cycles = 0
+    n = 0
+    while n < n_bottlenecks:
         is_logging = (n >= burn_in)
-        time_till_bottleneck = get_time_till_bottleneck(time_till_bottleneck_mean,
-                                                        time_till_bottleneck_cv)
+        time_till_bottleneck = all_time_till_bottleneck[n]
         s, i, r = run_model(dataframe, is_logging, time_till_bottleneck, 
                             fractional_timestep_size, s, i, r, birth_function, 
                             host_birth_rate, carrying_capacity, 
                             parasite_fecundity_effect, transmission_function, 
                             transmission_rate, s_death_rate, i_death_rate, 
-                            r_death_rate, recovery_rate)
-        bottleneck_size = get_bottleneck_size(bottleneck_size_mean,
-                                              bottleneck_size_cv)
-        s, i, r = get_bottleneck_survivors(s, i, r, bottleneck_size)
+                            r_death_rate, recovery_rate, integrator,
+                            integrator_tolerance)
+        s, i, r = get_bottleneck_survivors(s, i, r, all_bottleneck_size[n])
+        n_cycles += 1
+        n += 1
+
+        if is_detecting_cycle and n < burn_in:
+            if n > 1 and max(abs(s - previous_s), abs(i - previous_i),
+                             abs(r - previous_r)) <= cycle_convergence_tolerance:
+                series += burn_in - n
+                n = burn_in
+            previous_s, previous_i, previous_r = s, i, r
+
+    return n_cycles
     
 def get_time_till_bottleneck(time_till_bottleneck_mean: int,
                              time_till_bottleneck_cv: float) -> int:
     '''This function returns the number of timesteps until the next bottleneck.
     This will be a whole number value. The value could be exact and 
     predetermined, or pulled from a normal distribution. This function ensures
-    that the value returned is nonnegative and nonzero, simply by setting the 
-    initial value to zero and resampling until it pulls a positive number. This
-    should only take one try in a majority of cases but may take a couple tries
-    if the mean is very low and the variance is high.
+    that the value returned is nonnegative and nonzero, by drawing from the 
+    normal distribution on the condition that it rounds to a positive number
+    (see get_positive_normal_draws).
      
     time_till_bottleneck_mean: int
         The mean number of timesteps until the next bottleneck occurs
@@ -308,23 +636,17 @@ def get_time_till_bottleneck(time_till_bottleneck_mean: int,
     if time_till_bottleneck_cv == 0:
         return time_till_bottleneck_mean
     
-    standard_deviation = time_till_bottleneck_cv * time_till_bottleneck_mean
-
-    time_till_bottleneck = 0
-    while time_till_bottleneck <= 0:    
-        time_till_bottleneck = round(random_number_generator.normal(time_till_bottleneck_mean,
-                                                                    standard_deviation))
-    return time_till_bottleneck
+    return get_positive_normal_draws(time_till_bottleneck_mean,
+                                     time_till_bottleneck_cv, 1)[0]
 
 def get_bottleneck_size(bottleneck_size_mean: int, 
                         bottleneck_size_cv: float) -> int:
     '''This function returns the size of the bottleneck, i.e. the number of hosts that should make
     it through the botteneck. This size could be exact and predetermined, or
-    pulled from a normal distribution. This function ensures
-    that the value returned is nonnegative, simply by setting the initial value
-    to a negative number and resampling until it pulls a positive number. This
-    should only take one try in a majority of cases but may take a couple tries
-    if the mean is very low and the variance is high.
+    pulled from a normal distribution. This function ensures that the value 
+    returned is positive, by drawing from the normal distribution on the 
+    condition that it rounds to a positive number (see 
+    get_positive_normal_draws).
 
     bottleneck_size_mean: int
         The mean number of hosts that survive this bottleneck
@@ -339,20 +661,62 @@ def get_bottleneck_size(bottleneck_size_mean: int,
     if bottleneck_size_cv == 0:
         return bottleneck_size_mean
     
-    standard_deviation = bottleneck_size_cv * bottleneck_size_mean
+    return get_positive_normal_draws(bottleneck_size_mean, bottleneck_size_cv, 1)[0]
+
+def get_positive_normal_draws(mean: float, cv: float, n_draws: int,
+                              generator = None) -> list:
+    '''Draws n_draws whole numbers from a normal distribution that is rounded
+    to whole numbers, on the condition that they are positive. Instead of 
+    redrawing until the rounded value is positive (which can take very many
+    tries when the mean is low and the variance is high), the values are drawn
+    by inverse transform sampling from the normal distribution truncated to 
+    the values that round to 1 or more: each uniform draw is scaled to the 
+    chance of landing above 0.5, and turned into a value with the inverse 
+    cumulative distribution function. This gives exactly the same distribution
+    as redrawing, with one uniform draw per value. The chances are counted 
+    from the upper tail, so that they aren't lost to rounding when 0.5 is far
+    below the mean.
+
+    mean: float
+        The mean of the normal distribution (before truncation)
+    cv: float
+        The coefficient of variation of the normal distribution (before 
+        truncation). If zero, every value is mean
+    n_draws: int
+        The number of values to draw
+    generator: np.random.Generator
+        The random number generator to draw from. Defaults to the one of this
+        module
+
+    Returns list
+        The n_draws values, all whole numbers greater than 0 (unless cv is 
+        zero)
+    '''
 
-    bottleneck_size = 0
-    while bottleneck_size <= 0:
-        bottleneck_size = round(random_number_generator.normal(bottleneck_size_mean,
-                                                            standard_deviation))
-    return bottleneck_size
+    if cv == 0:
+        return [mean] * n_draws
+
+    standard_deviation = cv * mean
+    lower_limit = (0.5 - mean) / standard_deviation
+    upper_tail = 0.5 * math.erfc(lower_limit / math.sqrt(2))
+
+    if generator is None:
+        generator = random_number_generator
+
+    #1 - random() lies in (0, 1], so the chances lie in (0, upper_tail]
+    chances = (1 - generator.random(n_draws)) * upper_tail
+    chances = np.clip(chances, np.finfo(float).tiny, np.nextafter(1, 0))
+    quantiles = -np.vectorize(statistics.NormalDist().inv_cdf)(chances)
+    draws = np.round(mean + standard_deviation * quantiles).astype(int)
+    return np.maximum(draws, 1).tolist()
 
 def run_model(dataframe, is_logging: bool, n_timepoints: int, 
               fractional_timestep_size: float, s: float, i: float, r: float, 
               birth_function: Callable, host_birth_rate: float, carrying_capacity: int, 
               parasite_fecundity_effect: float, transmission_function: Callable,
               transmission_rate: float, s_death_rate: float, i_death_rate: float,
-              r_death_rate: float, recovery_rate: float) -> tuple[float]:
+              r_death_rate: float, recovery_rate: float, integrator: str = "Euler",
+              integrator_tolerance: float = 1e-6) -> tuple[float]:
     '''Runs multiple timepoints of the model, returns the final population state,
     and (possibly) logs the data generated.
 
@@ -406,6 +770,13 @@ def run_model(dataframe, is_logging: bool, n_timepoints: int,
     recovery_rate: float
         The rate at which infected hosts recover from the disease and convert to
         R (recovered) hosts. Often represented by gamma in the literature
+    integrator: str
+        Either "Euler", to integrate each timepoint in fixed substeps of size
+        fractional_timestep_size, or "Adaptive", to integrate each timepoint
+        with the adaptive Dormand-Prince method (see run_timepoint_adaptive)
+    integrator_tolerance: float
+        Only used by the "Adaptive" integrator. The error that each adaptive
+        step is allowed to make, relative to the size of S, I, and R
 
     Returns tuple[float]
         The first element is s, the updated number of susceptible hosts after
@@ -416,15 +787,37 @@ def run_model(dataframe, is_logging: bool, n_timepoints: int,
     
     global series
 
+    if not is_logging:
+        s, i, r = run_segment(n_timepoints, fractional_timestep_size, s, i, r, 
+                              birth_function, host_birth_rate, carrying_capacity,
+                              parasite_fecundity_effect, transmission_function,
+                              transmission_rate, s_death_rate, i_death_rate,
+                              r_death_rate, recovery_rate, integrator, 
+                              integrator_tolerance)
+        series += 1
+        return s, i, r
+
     new_data = []
     new_data.append([series, 0, s, i, r])
 
+    step_size = 1.0
     for timepoint in range(int(n_timepoints)):
-        s, i, r = run_timepoint(fractional_timestep_size, s, i, r, birth_function,
-                                host_birth_rate, carrying_capacity, 
-                                parasite_fecundity_effect, transmission_function,
-                                transmission_rate, s_death_rate, i_death_rate,
-                                r_death_rate, recovery_rate)
+        if integrator == "Adaptive":
+            s, i, r, step_size = run_timepoint_adaptive(step_size, integrator_tolerance,
+                                                        s, i, r, birth_function,
+                                                        host_birth_rate, 
+                                                        carrying_capacity,
+                                                        parasite_fecundity_effect,
+                                                        transmission_function,
+                                                        transmission_rate,
+                                                        s_death_rate, i_death_rate,
+                                                        r_death_rate, recovery_rate)
+        else:
+            s, i, r = run_timepoint(fractional_timestep_size, s, i, r, birth_function,
+                                    host_birth_rate, carrying_capacity, 
+                                    parasite_fecundity_effect, transmission_function,
+                                    transmission_rate, s_death_rate, i_death_rate,
+                                    r_death_rate, recovery_rate)
        
         new_data.append([series, timepoint+1, s, i, r])
     
@@ -432,6 +825,79 @@ def run_model(dataframe, is_logging: bool, n_timepoints: int,
     series += 1
     return s, i, r
 
+def run_segment(n_timepoints: int, fractional_timestep_size: float, s: float, 
+                i: float, r: float, birth_function: Callable, host_birth_rate: float,
+                carrying_capacity: int, parasite_fecundity_effect: float,
+                transmission_function: Callable, transmission_rate: float,
+                s_death_rate: float, i_death_rate: float, r_death_rate: float,
+                recovery_rate: float, integrator: str = "Euler",
+                integrator_tolerance: float = 1e-6) -> tuple[float]:
+    '''Runs multiple timepoints of the model in exactly the same way as 
+    run_model, but only keeps the current population state, so nothing is
+    built or allocated per timepoint. run_model uses this during a burn-in 
+    period, when none of the timepoints would be logged anyway. It takes 
+    nothing but the model parameters, so any other engine that only needs the
+    state at the end of a period can use it too.
+
+    n_timepoints: int
+        The number of timepoints the model will be run for
+    fractional_timestep_size: float
+        See run_model
+    s: float
+        The number of susceptible hosts at the start of the period
+    i: float
+        The number of infected hosts at the start of the period
+    r: float
+        The number of recovered hosts at the start of the period
+    birth_function: Callable
+        See run_model
+    host_birth_rate: float
+        See run_model
+    carrying_capacity: int
+        See run_model
+    parasite_fecundity_effect: float
+        See run_model
+    transmission_function: Callable
+        See run_model
+    transmission_rate: float
+        See run_model
+    s_death_rate: float
+        See run_model
+    i_death_rate: float
+        See run_model
+    r_death_rate: float
+        See run_model
+    recovery_rate: float
+        See run_model
+    integrator: str
+        See run_model
+    integrator_tolerance: float
+        See run_model
+
+    Returns tuple[float]
+        The values of s, i, and r at the end of the period
+    '''
+    
+    step_size = 1.0
+    for _ in range(int(n_timepoints)):
+        if integrator == "Adaptive":
+            s, i, r, step_size = run_timepoint_adaptive(step_size, integrator_tolerance,
+                                                        s, i, r, birth_function,
+                                                        host_birth_rate, 
+                                                        carrying_capacity,
+                                                        parasite_fecundity_effect,
+                                                        transmission_function,
+                                                        transmission_rate,
+                                                        s_death_rate, i_death_rate,
+                                                        r_death_rate, recovery_rate)
+        else:
+            s, i, r = run_timepoint(fractional_timestep_size, s, i, r, birth_function,
+                                    host_birth_rate, carrying_capacity, 
+                                    parasite_fecundity_effect, transmission_function,
+                                    transmission_rate, s_death_rate, i_death_rate,
+                                    r_death_rate, recovery_rate)
+    return s, i, r
+
 def run_timepoint(fractional_timestep_size: float, s: float, i: float, r: float,
                   birth_function: Callable, host_birth_rate: float,
                   carrying_capacity: int, parasite_fecundity_effect: float,
@@ -506,6 +972,117 @@ def run_timepoint(fractional_timestep_size: float, s: float, i: float, r: float,
     
     return s, i, r
 
+def run_timepoint_adaptive(step_size: float, tolerance: float, s: float, i: float,
+                           r: float, birth_function: Callable, host_birth_rate: float,
+                           carrying_capacity: int, parasite_fecundity_effect: float,
+                           transmission_function: Callable, transmission_rate: float,
+                           s_death_rate: float, i_death_rate: float,
+                           r_death_rate: float, recovery_rate: float) -> tuple:
+    '''Runs and returns the results of a single timepoint of the model using
+    the adaptive Dormand-Prince method instead of fixed Euler substeps. Each
+    step is taken with a 5th order Runge-Kutta formula, and the difference with
+    an embedded 4th order formula is used as an estimate of the error made in
+    that step. Steps with too much error are retried with a smaller step size,
+    and the step size grows again wherever the dynamics are smooth, so only a
+    handful of steps are needed per timepoint. The step size that worked at the
+    end of this timepoint is returned so that the next timepoint can start with
+    it. Works on single values of s, i, and r as well as on numpy arrays (in
+    which case every element takes and retries its own steps, exactly as if
+    it were run on its own).
+
+    step_size: float or np.ndarray
+        The size of the first step to try, for every element. At most 1 (a 
+        whole timepoint)
+    tolerance: float
+        The error that each step is allowed to make, relative to the size of 
+        S, I, and R (with the same value used as an absolute number of hosts
+        when S, I, or R are close to zero)
+
+    See run_timepoint for an explanation of all other arguments.
+
+    Returns tuple
+        The updated values of s, i, and r after running this timepoint, and
+        the step size (of every element) to start the next timepoint with
+    '''
+
+    rates = (birth_function, host_birth_rate, carrying_capacity, 
+             parasite_fecundity_effect, transmission_function, transmission_rate,
+             s_death_rate, i_death_rate, r_death_rate, recovery_rate)
+    y = np.array([s, i, r], dtype=float)
+    k1 = get_rates(y, *rates)
+    time = np.zeros(y.shape[1:])
+    step_size = step_size + time
+
+    while np.any(time < 1.0):
+        #Elements that have reached the end of the timepoint take steps of size 0
+        h = np.minimum(step_size, 1.0 - time)
+        k2 = get_rates(y + h * (k1 / 5), *rates)
+        k3 = get_rates(y + h * (3 / 40 * k1 + 9 / 40 * k2), *rates)
+        k4 = get_rates(y + h * (44 / 45 * k1 - 56 / 15 * k2 + 32 / 9 * k3), *rates)
+        k5 = get_rates(y + h * (19372 / 6561 * k1 - 25360 / 2187 * k2 
+                                + 64448 / 6561 * k3 - 212 / 729 * k4), *rates)
+        k6 = get_rates(y + h * (9017 / 3168 * k1 - 355 / 33 * k2 + 46732 / 5247 * k3
+                                + 49 / 176 * k4 - 5103 / 18656 * k5), *rates)
+        new_y = y + h * (35 / 384 * k1 + 500 / 1113 * k3 + 125 / 192 * k4
+                         - 2187 / 6784 * k5 + 11 / 84 * k6)
+        k7 = get_rates(new_y, *rates)
+
+        #Difference between the 5th order solution and the embedded 4th order one
+        error_estimate = h * (71 / 57600 * k1 - 71 / 16695 * k3 + 71 / 1920 * k4
+                              - 17253 / 339200 * k5 + 22 / 525 * k6 - 1 / 40 * k7)
+        scale = tolerance * (1 + np.maximum(np.abs(y), np.abs(new_y)))
+        #One error per element, from whichever of S, I, and R is least accurate. It is
+        #kept as an array even for single values, since numpy works out powers of
+        #arrays slightly differently from powers of single values
+        error = np.asarray(np.max(np.abs(error_estimate) / scale, axis=0))
+
+        with np.errstate(divide="ignore"):
+            step_factor = np.where(error == 0, 5,
+                                   np.minimum(5, np.maximum(0.2, 0.9 * error ** -0.2)))
+        is_accepted = error <= 1
+        time = np.where(is_accepted, time + h, time)
+        y = np.where(is_accepted, new_y, y)
+        #The last stage of an accepted step is the first of the next
+        k1 = np.where(is_accepted, k7, k1)
+        #Steps cut short to end on the timepoint don't count
+        step_size = np.where(is_accepted,
+                             np.where(h == step_size, np.minimum(h * step_factor, 1.0),
+                                      step_size),
+                             h * step_factor)
+
+    return y[0], y[1], y[2], step_size
+
+def get_rates(y: np.ndarray, birth_function: Callable, host_birth_rate: float,
+              carrying_capacity: int, parasite_fecundity_effect: float,
+              transmission_function: Callable, transmission_rate: float,
+              s_death_rate: float, i_death_rate: float, r_death_rate: float,
+              recovery_rate: float) -> np.ndarray:
+    '''Calculates how fast S, I, and R are changing at this instant, using the
+    same birth, transmission, death, and recovery functions as run_timepoint
+    (with a timestep size of 1 so that they return rates per timestep).
+
+    y: np.ndarray
+        The current values of S, I, and R, stacked along the first axis
+
+    See run_timepoint for an explanation of all other arguments.
+
+    Returns np.ndarray
+        The rates of change of S, I, and R, stacked in the same way as y
+    '''
+
+    s, i, r = y
+    new_births = birth_function(s, i, r, host_birth_rate, carrying_capacity, 
+                                parasite_fecundity_effect, 1.0)
+    new_infections = transmission_function(s, i, r, transmission_rate, 1.0)
+    new_s_deaths = get_s_deaths(s, s_death_rate, 1.0)
+    new_i_deaths = get_i_deaths(i, i_death_rate, 1.0)
+    new_r_deaths = get_r_deaths(r, r_death_rate, 1.0)
+    new_recoveries = get_recoveries(i, recovery_rate, 1.0)
+
+    return np.array([new_births - new_infections - new_s_deaths,
+                     new_infections - new_i_deaths - new_recoveries,
+                     new_recoveries - new_r_deaths])
+
 def get_bottleneck_survivors(s: float, i: float, r: float, 
                              bottleneck_size: int) -> tuple:
     '''Subjects the host population to a bottleneck by scaling the entire 
@@ -536,6 +1113,609 @@ def get_bottleneck_survivors(s: float, i: float, r: float,
 
     return new_s, new_i, new_r
 
+def run_sweep(dataframe, parameters, all_parameter_sets: list,
+              result_cache = None) -> None:
+    '''Used instead of looping over run_parameter_set when the "Sweep" engine
+    is selected. Every parameter set becomes one lane of run_batch, so the
+    whole parameter space is integrated simultaneously. To keep memory bounded
+    for large parameter spaces, the parameter sets are split into chunks of at
+    most parameters.sweep_chunk_size lanes, and each chunk is logged and written
+    out before the next one is started. Because run_timepoint and 
+    run_timepoint_adaptive are pure arithmetic on every lane separately (the
+    "Adaptive" integrator picks the steps of every lane on its own), and the
+    bottleneck draws are made in the same order as run_parameter_set, the data
+    are identical to looping over run_parameter_set.
+
+    dataframe: an instance of the Dataframe class from logger.py
+        Stores the data as it comes in from the simulation and contains methods
+        to write data to .csv files in the output folder
+    parameters: an instance of the Parameter class from parameters.py
+        Contains the parameter values that are the same across all parameter 
+        sets. See parameters.py for more detail.
+    all_parameter_sets: list
+        Every combination of rangeable parameter values, in the order produced
+        by the iter.product method in the "run" function
+    result_cache: an instance of the ResultCache class from result_cache.py
+        If not None, only the lanes of a chunk that aren't in the cache are 
+        run, and the others are taken from it (see run_cached)
+
+    Raises ValueError
+        If cycle_convergence_tolerance isn't None, since the lanes of a chunk
+        run every burn-in bottleneck together and none of them can be skipped
+    '''
+
+    if parameters.cycle_convergence_tolerance is not None:
+        raise ValueError('''The cycle_convergence_tolerance in model.py can't be used with 
+                         the "Sweep" engine. Use the "Serial" or "Parallel" engine 
+                         instead.''')
+
+    chunk_size = max(1, parameters.sweep_chunk_size)
+    replayed_schedules = get_replayed_schedules(parameters)
+    schedule_summary = schedule_module.BottleneckSchedule() if parameters.export_schedule else None
+    checkpoint = checkpoint_module.Checkpoint(parameters, dataframe, [schedule_summary])
+    n_completed = len(resume_run(checkpoint)["completed_parameter_sets"])
+
+    #Checkpoints are only saved at the end of a chunk, so the chunks stay the same when resuming
+    for chunk_start in range(n_completed, len(all_parameter_sets), chunk_size):
+        chunk = all_parameter_sets[chunk_start:chunk_start + chunk_size]
+        #Drawn parameter set by parameter set, in the same order as run_parameter_set
+        schedules = [get_schedule(parameters, parameter_set, replayed_schedules)
+                     for parameter_set in chunk]
+        keys = {}
+        if result_cache is not None:
+            keys = {lane: result_cache.get_key(parameters, parameter_set, schedules[lane])
+                    for lane, parameter_set in enumerate(chunk)}
+        #Only the lanes that aren't in the result cache are run
+        run_lanes = [lane for lane in range(len(chunk))
+                     if lane not in keys or not result_cache.is_cached(keys[lane])]
+        #One row per lane, one column per rangeable parameter (in iter.product order)
+        lane_values = np.array([chunk[lane] for lane in run_lanes], dtype=float)
+        time_till_bottleneck = np.array([schedules[lane][0] for lane in run_lanes],
+                                        dtype=int).T
+        bottleneck_size = np.array([schedules[lane][1] for lane in run_lanes], dtype=float).T
+
+        logged_segments = None
+        if run_lanes:
+            logged_segments = run_batch(parameters.n_bottlenecks, parameters.burn_in,
+                                        parameters.initial_popsize,
+                                        initial_prevalence=lane_values[:, 0],
+                                        time_till_bottleneck=time_till_bottleneck,
+                                        bottleneck_size=bottleneck_size,
+                                        host_birth_rate=lane_values[:, 5],
+                                        carrying_capacity=parameters.carrying_capacity,
+                                        birth_function=parameters.birth_function,
+                                        parasite_fecundity_effect=lane_values[:, 6],
+                                        s_death_rate=lane_values[:, 7],
+                                        i_death_rate=lane_values[:, 8],
+                                        r_death_rate=lane_values[:, 9],
+                                        transmission_rate=lane_values[:, 10],
+                                        transmission_function=parameters.transmission_function,
+                                        recovery_rate=lane_values[:, 11],
+                                        fractional_timestep_size=parameters.fractional_timestep_size,
+                                        integrator=parameters.integrator,
+                                        integrator_tolerance=parameters.integrator_tolerance)
+
+        for lane, parameter_set in enumerate(chunk):
+            log_parameter_set(dataframe, parameters, parameter_set)
+            run_cached(dataframe, parameters, parameter_set, schedules[lane], result_cache,
+                       lambda set_dataframe:
+                       log_batch(set_dataframe, logged_segments, run_lanes.index(lane),
+                                 parameters.n_bottlenecks))
+            dataframe.write_data()
+            if schedule_summary is not None:
+                schedule_summary.add_schedule(dataframe,
+                                              schedule_module.get_parameter_set_key(parameter_set),
+                                              *schedules[lane])
+                schedule_summary.write_summary(dataframe)
+        save_checkpoint(checkpoint, chunk_start + len(chunk))
+    checkpoint.finish()
+
+    if result_cache is not None:
+        statistics = result_cache.get_statistics()
+        print(f"Result cache: {statistics['Hits']} parameter sets reused, "
+              f"{statistics['Misses']} calculated")
+
+def run_batch(n_bottlenecks: int, burn_in: int, initial_popsize: int,
+              initial_prevalence, time_till_bottleneck: np.ndarray,
+              bottleneck_size: np.ndarray, host_birth_rate, carrying_capacity: int,
+              birth_function: Callable, parasite_fecundity_effect, s_death_rate,
+              i_death_rate, r_death_rate, transmission_rate,
+              transmission_function: Callable, recovery_rate,
+              fractional_timestep_size: float, integrator: str = "Euler",
+              integrator_tolerance: float = 1e-6) -> list[tuple]:
+    '''Runs several parameter sets of the model in lock-step, holding the
+    state of every parameter set (a "lane") in numpy arrays. The rangeable
+    model parameters may either be single values shared by every lane or numpy
+    arrays with one value per lane. Lanes whose bottlenecks fall at different
+    times are kept in lock-step by masking: a lane that has reached its
+    bottleneck simply stops updating until every lane has reached theirs.
+
+    time_till_bottleneck: np.ndarray
+        An integer array of shape (n_bottlenecks, n_lanes) with the number of
+        timepoints before each bottleneck of each lane (see get_schedule)
+    bottleneck_size: np.ndarray
+        An array of shape (n_bottlenecks, n_lanes) with the size of each 
+        bottleneck of each lane (see get_schedule)
+
+    See run_parameter_set for an explanation of all other arguments.
+
+    Returns list[tuple]
+        One element for every bottleneck that occurs after the burn-in. Each
+        element is a tuple of (bottleneck number, numpy array with the number of
+        timepoints run by each lane, numpy array of shape
+        (max timepoints + 1, 3, n_lanes) with the values of S, I, and R for
+        every lane and timepoint). Entries past a lane's own number of
+        timepoints should be ignored.
+    '''
+
+    n_lanes = time_till_bottleneck.shape[1]
+    i = np.zeros(n_lanes) + initial_popsize * initial_prevalence
+    s = initial_popsize - i
+    r = np.zeros(n_lanes)
+
+    logged_segments = []
+    for n in range(n_bottlenecks):
+        is_logging = (n >= burn_in)
+        s, i, r, trajectory = run_model_batched(is_logging, time_till_bottleneck[n],
+                                                fractional_timestep_size, s, i, r,
+                                                birth_function, host_birth_rate,
+                                                carrying_capacity,
+                                                parasite_fecundity_effect,
+                                                transmission_function,
+                                                transmission_rate, s_death_rate,
+                                                i_death_rate, r_death_rate,
+                                                recovery_rate, integrator,
+                                                integrator_tolerance)
+        if is_logging:
+            logged_segments.append((n, time_till_bottleneck[n], trajectory))
+        s, i, r = get_bottleneck_survivors(s, i, r, bottleneck_size[n])
+
+    return logged_segments
+
+def run_model_batched(is_logging: bool, n_timepoints: np.ndarray,
+                      fractional_timestep_size: float, s: np.ndarray,
+                      i: np.ndarray, r: np.ndarray, birth_function: Callable,
+                      host_birth_rate, carrying_capacity: int,
+                      parasite_fecundity_effect, transmission_function: Callable,
+                      transmission_rate, s_death_rate, i_death_rate, r_death_rate,
+                      recovery_rate, integrator: str = "Euler",
+                      integrator_tolerance: float = 1e-6) -> tuple:
+    '''The batched equivalent of run_model. Runs every lane for its own number
+    of timepoints. All lanes are advanced together through run_timepoint (or
+    run_timepoint_adaptive, with a step size for every lane); once a lane has
+    run for its number of timepoints, it is masked out and keeps its final
+    state while the remaining lanes catch up.
+
+    is_logging: bool
+        If True, the full trajectory of every lane is stored and returned. If
+        False (e.g. during a burn-in period), only the final state is returned
+    n_timepoints: np.ndarray
+        An integer array with the number of timepoints each lane will be run for
+
+    See run_model for an explanation of all other arguments. The state
+    variables s, i, and r are numpy arrays with one value per lane, and the
+    rangeable model parameters may either be single values or numpy arrays with
+    one value per lane.
+
+    Returns tuple
+        The first three elements are the updated s, i, and r arrays. The fourth
+        element is None if is_logging is False, otherwise a numpy array of shape
+        (max(n_timepoints) + 1, 3, n_lanes) holding S, I, and R for every lane
+        and timepoint, starting with the state before the first timepoint
+    '''
+
+    max_timepoints = int(n_timepoints.max())
+    is_masking = (n_timepoints != max_timepoints).any()
+
+    trajectory = None
+    if is_logging:
+        trajectory = np.empty((max_timepoints + 1, 3, len(s)))
+        trajectory[0] = s, i, r
+
+    step_size = 1.0
+    for timepoint in range(max_timepoints):
+        if integrator == "Adaptive":
+            new_s, new_i, new_r, step_size = run_timepoint_adaptive(step_size,
+                                                                    integrator_tolerance,
+                                                                    s, i, r,
+                                                                    birth_function,
+                                                                    host_birth_rate,
+                                                                    carrying_capacity,
+                                                                    parasite_fecundity_effect,
+                                                                    transmission_function,
+                                                                    transmission_rate,
+                                                                    s_death_rate,
+                                                                    i_death_rate,
+                                                                    r_death_rate,
+                                                                    recovery_rate)
+        else:
+            new_s, new_i, new_r = run_timepoint(fractional_timestep_size, s, i, r,
+                                                birth_function, host_birth_rate,
+                                                carrying_capacity,
+                                                parasite_fecundity_effect,
+                                                transmission_function,
+                                                transmission_rate, s_death_rate,
+                                                i_death_rate, r_death_rate,
+                                                recovery_rate)
+        if is_masking:
+            is_active = timepoint < n_timepoints
+            new_s = np.where(is_active, new_s, s)
+            new_i = np.where(is_active, new_i, i)
+            new_r = np.where(is_active, new_r, r)
+        s, i, r = new_s, new_i, new_r
+
+        if is_logging:
+            trajectory[timepoint + 1] = s, i, r
+
+    return s, i, r, trajectory
+
+def log_batch(dataframe, logged_segments: list[tuple], lane: int,
+              n_bottlenecks: int) -> None:
+    '''Logs the trajectories of one parameter set from the output of 
+    run_batch. Series numbers are handed out bottleneck by bottleneck, exactly
+    as they would be if the parameter set had been run on its own with
+    run_model.
+
+    dataframe: an instance of the Dataframe class from logger.py
+        Stores the data as it comes in from the simulation and contains methods
+        to write data to .csv files in the output folder
+    logged_segments: list[tuple]
+        The output of run_batch
+    lane: int
+        The lane of run_batch that holds this parameter set
+    n_bottlenecks: int
+        The number of bottleneck events that the parameter set experienced
+    '''
+    global series
+
+    first_series = series
+    for n, n_timepoints, trajectory in logged_segments:
+        segment = trajectory[:n_timepoints[lane] + 1, :, lane]
+        dataframe.log_columns(True, [first_series + n, np.arange(len(segment)),
+                                     segment[:, 0], segment[:, 1], segment[:, 2]])
+    series = first_series + n_bottlenecks
+
+def run_parallel(dataframe, parameters, all_parameter_sets: list,
+                 result_cache = None) -> None:
+    '''Used instead of looping over run_parameter_set when the "Parallel" 
+    engine is selected. Every parameter set is run by run_task in one of 
+    parameters.n_workers worker processes. Every parameter set gets its own 
+    stream of random numbers, spawned from parameters.seed, from which its 
+    bottleneck schedule is drawn before it is handed to a worker, and its own
+    range of series numbers, both worked out in advance from the parameter 
+    set's position in the full run. The data are
+    therefore identical no matter how many workers there are or which worker 
+    runs which parameter set. The workers send their data back, and it is
+    written out in the same order as the "Serial" engine would. Parameter sets
+    that are in the result cache aren't handed to a worker at all.
+
+    dataframe: an instance of the Dataframe class from logger.py
+        Stores the data as it comes in from the simulation and contains methods
+        to write data to .csv files in the output folder
+    parameters: an instance of the Parameter class from parameters.py
+        Contains the parameter values that are the same across all parameter 
+        sets. See parameters.py for more detail.
+    all_parameter_sets: list
+        Every combination of rangeable parameter values, in the order produced
+        by the iter.product method in the "run" function
+    result_cache: an instance of the ResultCache class from result_cache.py
+        If not None, the data of every parameter set are taken from it if it has
+        been calculated before, and stored in it otherwise (see run_cached)
+    '''
+    global series
+
+    n_workers = parameters.n_workers or os.cpu_count()
+    n_bottlenecks = parameters.n_bottlenecks
+
+    replayed_schedules = get_replayed_schedules(parameters)
+    schedule_summary = schedule_module.BottleneckSchedule() if parameters.export_schedule else None
+    checkpoint = checkpoint_module.Checkpoint(parameters, dataframe, [schedule_summary])
+    n_completed = len(resume_run(checkpoint)["completed_parameter_sets"])
+    remaining_parameter_sets = list(enumerate(all_parameter_sets))[n_completed:]
+    parameter_set_seeds = np.random.SeedSequence(parameters.seed).spawn(len(all_parameter_sets))
+    schedules = {k: get_schedule(parameters, parameter_set, replayed_schedules,
+                                 np.random.default_rng(parameter_set_seeds[k]))
+                 for k, parameter_set in remaining_parameter_sets}
+    keys = {}
+    if result_cache is not None:
+        keys = {k: result_cache.get_key(parameters, parameter_set, schedules[k])
+                for k, parameter_set in remaining_parameter_sets}
+    tasks = [(parameters, parameter_set, schedules[k], series + (k - n_completed) * n_bottlenecks)
+             for k, parameter_set in remaining_parameter_sets
+             if k not in keys or not result_cache.is_cached(keys[k])]
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        results = executor.map(run_task, tasks)
+        for k, parameter_set in remaining_parameter_sets:
+            log_parameter_set(dataframe, parameters, parameter_set)
+            if result_cache is None:
+                dataframe.merge(next(results))
+            else:
+                #As in run_cached, but the series numbers are worked out in advance
+                set_dataframe = logger.Dataframe(file_name = parameters.file_name)
+                log_parameter_set(set_dataframe, parameters, parameter_set)
+                first_series = series + (k - n_completed) * n_bottlenecks
+                if result_cache.load(keys[k], set_dataframe, first_series) is None:
+                    set_dataframe.merge(next(results))
+                    result_cache.save(keys[k], set_dataframe, first_series, n_bottlenecks)
+                dataframe.merge(set_dataframe)
+            dataframe.write_data()
+            if schedule_summary is not None:
+                schedule_summary.add_schedule(dataframe,
+                                              schedule_module.get_parameter_set_key(parameter_set),
+                                              *schedules[k])
+                schedule_summary.write_summary(dataframe)
+            save_checkpoint(checkpoint, k + 1,
+                            series=series + (k + 1 - n_completed) * n_bottlenecks)
+    checkpoint.finish()
+
+    series += len(remaining_parameter_sets) * n_bottlenecks
+    if result_cache is not None:
+        statistics = result_cache.get_statistics()
+        print(f"Result cache: {statistics['Hits']} parameter sets reused, "
+              f"{statistics['Misses']} calculated")
+
+def run_task(task: tuple):
+    '''Runs one parameter set inside a worker process of the "Parallel" 
+    engine, and returns the data logged.
+
+    task: tuple
+        The Parameters instance, the parameter set, the bottleneck schedule of
+        the parameter set (drawn from its own np.random.SeedSequence, see 
+        run_parallel), and the series number of its first bottleneck
+
+    Returns an instance of the Dataframe class from logger.py
+        Holds the data logged by the parameter set
+    '''
+    global series
+
+    parameters, parameter_set, bottleneck_schedule, first_series = task
+    dataframe = logger.Dataframe(file_name = parameters.file_name)
+    log_parameter_set(dataframe, parameters, parameter_set)
+
+    series = first_series
+    run_parameter_set(dataframe, n_bottlenecks=parameters.n_bottlenecks,
+                      burn_in = parameters.burn_in,
+                      initial_popsize=parameters.initial_popsize,
+                      initial_prevalence=parameter_set[0],
+                      bottleneck_size_mean=parameter_set[1],
+                      bottleneck_size_cv=parameter_set[2],
+                      time_till_bottleneck_mean=parameter_set[3],
+                      time_till_bottleneck_cv=parameter_set[4],
+                      host_birth_rate=parameter_set[5],
+                      carrying_capacity=parameters.carrying_capacity,
+                      birth_function=parameters.birth_function,
+                      parasite_fecundity_effect=parameter_set[6],
+                      s_death_rate=parameter_set[7],
+                      i_death_rate=parameter_set[8],
+                      r_death_rate=parameter_set[9],
+                      transmission_rate=parameter_set[10],
+                      transmission_function=parameters.transmission_function,
+                      recovery_rate=parameter_set[11],
+                      fractional_timestep_size=parameters.fractional_timestep_size,
+                      integrator=parameters.integrator,
+                      integrator_tolerance=parameters.integrator_tolerance,
+                      cycle_convergence_tolerance=parameters.cycle_convergence_tolerance,
+                      schedule=bottleneck_schedule)
+    return dataframe
+
+def run_periodic_orbits(parameters, tolerance: float = 1e-10,
+                        max_iterations: int = 50, is_logging: bool = True) -> list[dict]:
+    '''An alternative to "run" for parameter spaces where every bottleneck is
+    exactly the same (both coefficients of variation are zero). In that case,
+    "run for time_till_bottleneck_mean timepoints, then bottleneck" is the same
+    map every cycle, and because a bottleneck preserves prevalence, the 
+    population after a bottleneck is fully described by its prevalence (as 
+    long as there is no recovery, so R stays zero). The periodic boom-bust
+    cycle that a long burn-in settles onto is a fixed point of this map, which
+    find_periodic_orbits solves for directly. One cycle of every parameter set
+    is then logged (with one series per parameter set) and written to the
+    .csv file, exactly like the last cycle of a long burn-in run would be.
+
+    parameters: an instance of the Parameters class in parameters.py
+        Contains attributes which are the parameter values that the model
+        should be run with. initial_prevalence is used as the starting guess
+        for the fixed point. n_bottlenecks and burn_in are ignored.
+    tolerance: float
+        The largest difference in prevalence between the start and end of a 
+        cycle for the cycle to count as periodic
+    max_iterations: int
+        The maximum number of secant iterations per parameter set
+    is_logging: bool
+        If False, nothing is written to the .csv file and only the returned
+        summary of every cycle is kept, which is much faster for large 
+        parameter spaces
+
+    Raises ValueError
+        If any parameter set has a nonzero bottleneck_size_cv, 
+        time_till_bottleneck_cv, or recovery_rate
+
+    Returns list[dict]
+        One dictionary per parameter set, in the order produced by 
+        iter.product, with the keys "ParameterSet" (the rangeable parameter
+        values), "Prevalence" (the post-bottleneck prevalence of the cycle),
+        "PMax" and "PMin" (the maximum and minimum prevalence over the cycle),
+        and "Converged" (whether the tolerance was reached)
+    '''
+    global series
+
+    if (any(parameters.bottleneck_size_cv) or any(parameters.time_till_bottleneck_cv)
+        or any(parameters.recovery_rate)):
+        raise ValueError('''The function run_periodic_orbits in model.py only takes
+                            parameters with bottleneck_size_cv=0, 
+                            time_till_bottleneck_cv=0, and recovery_rate=0.''')
+
+    dataframe = logger.Dataframe(file_name = parameters.file_name,
+                                 output_format = parameters.output_format)
+    all_parameter_sets = list(iter.product(parameters.initial_prevalence,
+                                           parameters.bottleneck_size_mean,
+                                           parameters.bottleneck_size_cv,
+                                           parameters.time_till_bottleneck_mean,
+                                           parameters.time_till_bottleneck_cv,
+                                           parameters.host_birth_rate,
+                                           parameters.parasite_fecundity_effect,
+                                           parameters.s_death_rate,
+                                           parameters.i_death_rate,
+                                           parameters.r_death_rate,
+                                           parameters.transmission_rate,
+                                           parameters.recovery_rate))
+    chunk_size = max(1, parameters.sweep_chunk_size)
+
+    orbits = []
+    for chunk_start in range(0, len(all_parameter_sets), chunk_size):
+        chunk = all_parameter_sets[chunk_start:chunk_start + chunk_size]
+        lane_values = np.array(chunk, dtype=float)
+        model_parameters = {"time_till_bottleneck": lane_values[:, 3].round().astype(int),
+                            "bottleneck_size": lane_values[:, 1],
+                            "host_birth_rate": lane_values[:, 5],
+                            "carrying_capacity": parameters.carrying_capacity,
+                            "birth_function": parameters.birth_function,
+                            "parasite_fecundity_effect": lane_values[:, 6],
+                            "s_death_rate": lane_values[:, 7],
+                            "i_death_rate": lane_values[:, 8],
+                            "r_death_rate": lane_values[:, 9],
+                            "transmission_rate": lane_values[:, 10],
+                            "transmission_function": parameters.transmission_function,
+                            "fractional_timestep_size": parameters.fractional_timestep_size,
+                            "integrator": parameters.integrator,
+                            "integrator_tolerance": parameters.integrator_tolerance}
+
+        prevalence, is_converged = find_periodic_orbits(lane_values[:, 0], tolerance,
+                                                        max_iterations, **model_parameters)
+        trajectory = get_next_prevalence(prevalence, is_logging=True,
+                                         **model_parameters)[1]
+
+        for lane, parameter_set in enumerate(chunk):
+            n_timepoints = model_parameters["time_till_bottleneck"][lane]
+            cycle = trajectory[:n_timepoints + 1, :, lane]
+            cycle_prevalence = cycle[:, 1] / cycle.sum(axis=1)
+
+            if is_logging:
+                log_parameter_set(dataframe, parameters, parameter_set)
+                dataframe.log_columns(is_logging, [series, np.arange(len(cycle)),
+                                                   cycle[:, 0], cycle[:, 1], cycle[:, 2]])
+                series += 1
+
+            orbits.append({"ParameterSet": parameter_set,
+                           "Prevalence": prevalence[lane],
+                           "PMax": cycle_prevalence.max(),
+                           "PMin": cycle_prevalence.min(),
+                           "Converged": bool(is_converged[lane])})
+        if is_logging:
+            dataframe.write_data()
+    return orbits
+
+def find_periodic_orbits(initial_prevalence: np.ndarray, tolerance: float,
+                         max_iterations: int, n_warm_up_cycles: int = 3,
+                         **model_parameters) -> tuple:
+    '''Solves for the post-bottleneck prevalence p that satisfies 
+    get_next_prevalence(p) = p for several parameter sets ("lanes") at once.
+    A few cycles are first simulated normally from initial_prevalence, which 
+    moves the guess close to the stable cycle (and away from the unstable
+    parasite-free state when the parasite can persist). The secant method then
+    converges in a handful of iterations. Whenever a secant step is undefined
+    or leaves the range of possible prevalences, that lane falls back to a
+    normal cycle instead. Lanes that have converged are no longer simulated.
+
+    initial_prevalence: np.ndarray
+        The starting guess for every lane
+    tolerance: float
+        The largest difference in prevalence between the start and end of a 
+        cycle for the cycle to count as periodic
+    max_iterations: int
+        The maximum number of secant iterations
+    n_warm_up_cycles: int
+        The number of cycles simulated normally before the secant method starts
+    model_parameters:
+        The keyword arguments of get_next_prevalence (other than prevalence
+        and is_logging)
+
+    Returns tuple(np.ndarray, np.ndarray)
+        The first element is the periodic post-bottleneck prevalence of every
+        lane. The second element is a boolean array that is True for the lanes
+        that reached the tolerance within max_iterations
+    '''
+
+    prevalence = np.array(initial_prevalence, dtype=float)
+    for cycle in range(n_warm_up_cycles):
+        prevalence = get_next_prevalence(prevalence, **model_parameters)[0]
+
+    previous_prevalence = prevalence
+    previous_difference = get_next_prevalence(prevalence, **model_parameters)[0] - prevalence
+    prevalence = previous_prevalence + previous_difference
+    difference = get_next_prevalence(prevalence, **model_parameters)[0] - prevalence
+
+    for iteration in range(max_iterations):
+        is_active = np.abs(difference) > tolerance
+        if not is_active.any():
+            break
+
+        slope_change = difference - previous_difference
+        with np.errstate(divide="ignore", invalid="ignore"):
+            secant_prevalence = prevalence - difference * (prevalence - previous_prevalence) / slope_change
+        is_secant_valid = ((slope_change != 0) & (secant_prevalence >= 0) &
+                           (secant_prevalence <= 1))
+        new_prevalence = np.where(is_secant_valid, secant_prevalence,
+                                  prevalence + difference)
+
+        #Only the lanes that haven't converged yet are simulated
+        active_parameters = {name: (value[is_active] if np.ndim(value) else value)
+                             for name, value in model_parameters.items()}
+        next_prevalence = get_next_prevalence(new_prevalence[is_active],
+                                              **active_parameters)[0]
+
+        previous_prevalence = np.where(is_active, prevalence, previous_prevalence)
+        previous_difference = np.where(is_active, difference, previous_difference)
+        prevalence = np.where(is_active, new_prevalence, prevalence)
+        difference[is_active] = next_prevalence - new_prevalence[is_active]
+
+    is_converged = np.abs(difference) <= tolerance
+    return prevalence, is_converged
+
+def get_next_prevalence(prevalence: np.ndarray, time_till_bottleneck: np.ndarray,
+                        bottleneck_size, host_birth_rate, carrying_capacity: int,
+                        birth_function: Callable, parasite_fecundity_effect,
+                        s_death_rate, i_death_rate, r_death_rate, transmission_rate,
+                        transmission_function: Callable, fractional_timestep_size: float,
+                        integrator: str = "Euler", integrator_tolerance: float = 1e-6,
+                        is_logging: bool = False) -> tuple:
+    '''Starts every lane just after a bottleneck, with bottleneck_size hosts at
+    the given prevalence (and no recovered hosts), runs the lanes until their
+    next bottleneck with run_model_batched, and returns the prevalence that
+    survives that bottleneck. Since get_bottleneck_survivors scales S, I, and R
+    down equally, this is the prevalence just before the bottleneck.
+
+    prevalence: np.ndarray
+        The post-bottleneck prevalence of every lane
+    time_till_bottleneck: np.ndarray
+        An integer array with the number of timepoints between bottlenecks for
+        every lane
+    bottleneck_size:
+        The number of hosts that survive each bottleneck, either a single value
+        or an array with one value per lane
+    is_logging: bool
+        If True, the trajectory of every lane over the cycle is also returned
+
+    See run_parameter_set for an explanation of all other arguments.
+
+    Returns tuple
+        The first element is the prevalence after the next bottleneck. The 
+        second element is None if is_logging is False, otherwise the trajectory
+        of the cycle as returned by run_model_batched
+    '''
+
+    i = bottleneck_size * prevalence
+    s = bottleneck_size - i
+    r = np.zeros(len(prevalence))
+    s, i, r, trajectory = run_model_batched(is_logging, time_till_bottleneck,
+                                            fractional_timestep_size, s, i, r,
+                                            birth_function, host_birth_rate,
+                                            carrying_capacity, parasite_fecundity_effect,
+                                            transmission_function, transmission_rate,
+                                            s_death_rate, i_death_rate, r_death_rate,
+                                            0, integrator, integrator_tolerance)
+    return i / (s + i + r), trajectory
+
 def get_regulated_births(s: float, i: float, r: float, host_birth_rate: float,
                         carrying_capacity: int, parasite_fecundity_effect: float,
                         fractional_timestep_size: float) -> float:
@@ -570,8 +1750,9 @@ def get_regulated_births(s: float, i: float, r: float, host_birth_rate: float,
     population_size = s + i + r
     
     birth_rate_multiplier = (carrying_capacity - population_size) / carrying_capacity
-    if birth_rate_multiplier < 0:
-        birth_rate_multiplier = 0
+    #Clamping negative multipliers to zero without an if statement means that
+    #this also works on numpy arrays of populations (see run_model_batched)
+    birth_rate_multiplier = birth_rate_multiplier * (birth_rate_multiplier > 0)
     effective_birth_rate = host_birth_rate * birth_rate_multiplier
     infected_birth_rate = effective_birth_rate * (1 - parasite_fecundity_effect)
 
@@ -194,6 +194,153 @@ fractional_timestep_size: float
     the fractional timestep size is one tenth of a whole timestep. 
     Not rangeable.
     Default = 0.01
+
+integrator: str
+    A name that represents how each timestep is integrated. A value of "Euler"
+    (the default) updates the model in fixed substeps of size 
+    fractional_timestep_size. A value of "Adaptive" instead uses the 
+    Dormand-Prince method, which chooses its own substep sizes so that the
+    error made in each substep stays below integrator_tolerance. This usually 
+    needs far fewer substeps than "Euler" for the same accuracy, and 
+    fractional_timestep_size is ignored. Trying to use any other value in the
+    method set_integrator will result in an error.
+    Possible values = "Euler", "Adaptive"
+    Default = "Euler"
+
+integrator_tolerance: float
+    Only used by the "Adaptive" integrator. The error that each substep is 
+    allowed to make, relative to the number of S, I, and R hosts. Smaller 
+    values are more accurate but need more substeps.
+    Not rangeable.
+    Default = 1e-6
+
+cycle_convergence_tolerance: float
+    Only used by the "Serial" and "Parallel" engines, for parameter sets where
+    both bottleneck_size_cv and time_till_bottleneck_cv are zero. If None (the 
+    default), every burn-in bottleneck is simulated. Otherwise, the population 
+    is considered to have settled onto its periodic boom-bust cycle once S, I,
+    and R after a bottleneck differ from those after the previous bottleneck by
+    no more than this many hosts, and the remaining burn-in bottlenecks are 
+    skipped. The number of bottleneck cycles that were actually simulated is 
+    printed for every parameter set by the "Serial" engine. The "Sweep" engine
+    runs the burn-in of every parameter set of a chunk together, so trying to
+    use a value of cycle_convergence_tolerance with it will result in an error.
+    Not rangeable.
+    Default = None
+
+engine: str
+    A name that represents how the parameter sets are run. A value of "Serial"
+    (the default) runs the parameter sets one after the other. A value of 
+    "Sweep" holds every parameter set in numpy arrays and advances them all 
+    together, which is much faster when there are many parameter sets. A value
+    of "Parallel" runs the parameter sets like "Serial", but spreads them across
+    several processes (see n_workers and seed below). Trying to use any other
+    value in the method set_engine will result in an error.
+    Possible values = "Serial", "Sweep", "Parallel"
+    Default = "Serial"
+
+sweep_chunk_size: int
+    Only used by the "Sweep" engine. The maximum number of parameter sets that
+    are held in memory and run together. Larger parameter spaces are split into
+    chunks of this size, which keeps memory use bounded no matter how many 
+    parameter sets are requested.
+    Not rangeable.
+    Default = 1000
+
+n_workers: int
+    Only used by the "Parallel" engine. The number of processes that run 
+    parameter sets at the same time. If None, one process per CPU is used.
+    Not rangeable.
+    Default = None
+
+seed: int
+    Only used by the "Parallel" engine. The root seed from which a separate 
+    stream of random numbers (for bottleneck timing and size) is created for 
+    every parameter set. Because each parameter set always gets the same 
+    stream, the data are identical no matter how many workers are used.
+    Not rangeable.
+    Default = 92500169789667897205027529303633824467
+
+output_format: str
+    How the output is written. A value of "Wide" (the default) writes a single
+    file_name.csv file, where every row holds the values of the variables and
+    the constant values of its parameter set. A value of "Normalized" writes 
+    the constant values only once per parameter set, to file_name_params.csv 
+    (with a ParamSetID column), and writes the variables to 
+    file_name_series.csv (with the ParamSetID of their parameter set). This
+    makes the output much smaller. The wide file can be rebuilt with the 
+    function join_normalized_data in logger.py. A value of "Binary" writes a
+    file_name folder with every column as a raw .npy array and the constant
+    values in a constants.json file, which is much faster to write and can be 
+    read without loading it into memory with the function read_binary_data in
+    logger.py. Trying to use any other value in the method set_output_format 
+    will result in an error.
+    Possible values = "Wide", "Normalized", "Binary"
+    Default = "Wide"
+
+reducers: list[str]
+    The names of the reducers (see reducers.py) that summarise every parameter
+    set while the model runs, each writing a file_name_<summary name>.csv file 
+    with one row per parameter set. "PrevalenceExtrema" keeps the highest and
+    lowest prevalence (and the Series and Timepoint at which they occurred),
+    which is all that is needed for plots like figure 2. Trying to use any 
+    other name in the method set_reducers will result in an error.
+    Possible values = any combination of "PrevalenceExtrema"
+    Not rangeable.
+    Default = [] (no reducers)
+
+keep_trajectories: bool
+    Whether the full trajectories (every timepoint of every series) are written
+    to the output file(s). Setting reducers with the method set_reducers turns
+    this off unless it is explicitly requested, so that only the summaries are
+    kept.
+    Not rangeable.
+    Default = True
+
+export_schedule: bool
+    Not used by run_periodic_orbits. Before a parameter set is run, the number
+    of timesteps until every bottleneck and the size of every bottleneck are
+    drawn in one go. If True, this schedule is written to 
+    file_name_bottleneck_schedule.csv, with one row per bottleneck (see 
+    schedule.py), so that the bottlenecks of a run can be checked or replayed.
+    Not rangeable.
+    Default = False
+
+replay_schedule: str
+    Not used by run_periodic_orbits. If not None, the name of a schedule file
+    written with export_schedule (minus the ".csv" extension) in the output 
+    folder, and the bottlenecks are taken from that file instead of being 
+    drawn. The parameter sets are matched by their values, so the run can 
+    range the parameters differently, but every parameter set has to be one 
+    of the run that wrote the file, with the same number of bottlenecks. Its
+    data are then exactly the same as in that run.
+    Not rangeable.
+    Default = None (the schedule is drawn)
+
+checkpoint_interval: int
+    Not used by run_periodic_orbits. The number of parameter sets between
+    checkpoints, or 0 for no checkpoints. A checkpoint 
+    (output/file_name_checkpoint.pkl) records which parameter sets are done,
+    how far the output files have been written, and the state of the random
+    number generator, so that a run that was interrupted can be resumed by 
+    running it again with the same parameters. The resumed run continues 
+    after the last checkpoint, and its output is identical to that of an 
+    uninterrupted run (see checkpoint.py). The checkpoint is removed when the
+    run is done.
+    With the "Sweep" engine, checkpoints are only saved at the end of a chunk
+    (see sweep_chunk_size).
+    Not rangeable.
+    Default = 0 (no checkpoints)
+
+result_cache: bool
+    Not used by run_periodic_orbits. If True, the data of every parameter set
+    are stored in the output/.cache folder under a hash of every input they 
+    depend on, including the bottleneck schedule (see result_cache.py), and a
+    later run that has a parameter set with exactly the same inputs (e.g. 
+    after a range has been extended) takes its data from the cache instead of
+    simulating it again. The data are exactly the same either way.
+    Not rangeable.
+    Default = False
 '''
 
 import numpy as np
@@ -235,6 +382,20 @@ class Parameters:
         self.transmission_function: Callable = det_model.get_ddt_infections
         self.recovery_rate: list[float] = [0]
         self.fractional_timestep_size: float = 0.01
+        self.integrator: str = "Euler"
+        self.integrator_tolerance: float = 1e-6
+        self.cycle_convergence_tolerance: float = None
+        self.engine: str = "Serial"
+        self.sweep_chunk_size: int = 1000
+        self.n_workers: int = None
+        self.seed: int = 92500169789667897205027529303633824467
+        self.output_format: str = "Wide"
+        self.reducers: list[str] = []
+        self.keep_trajectories: bool = True
+        self.export_schedule: bool = False
+        self.replay_schedule: str = None
+        self.checkpoint_interval: int = 0
+        self.result_cache: bool = False
 
     def set_file_name(self, file_name: str) -> None:
         '''Changes the file name of the output file from its default. This
@@ -611,6 +772,197 @@ class Parameters:
 
         self.fractional_timestep_size = fractional_timestep_size
 
+    def set_integrator(self, integrator: str) -> None:
+        '''Changes how each timestep is integrated. This model parameter is not
+        rangeable.
+
+        integrator: str
+            The only permitted values are "Euler", to integrate in fixed 
+            substeps of size fractional_timestep_size, or "Adaptive", to 
+            integrate with the adaptive-step Dormand-Prince method.
+
+        Raises ValueError
+            If integrator is something other than "Euler" or "Adaptive"
+        '''
+
+        if integrator in ["Euler", "Adaptive"]:
+            self.integrator = integrator
+        else:
+            raise ValueError('''The method set_integrator in parameters.py only takes
+                                integrator="Euler" or integrator="Adaptive".''')
+
+    def set_integrator_tolerance(self, integrator_tolerance: float) -> None:
+        '''Changes the model parameter integrator_tolerance from its default. 
+        This model parameter is not rangeable.
+
+        integrator_tolerance: float
+            The error that each substep of the "Adaptive" integrator is allowed
+            to make, relative to the number of S, I, and R hosts
+        '''
+
+        self.integrator_tolerance = integrator_tolerance
+
+    def set_cycle_convergence_tolerance(self, cycle_convergence_tolerance: float) -> None:
+        '''Changes the model parameter cycle_convergence_tolerance from its 
+        default. This model parameter is not rangeable.
+
+        cycle_convergence_tolerance: float
+            The largest change in S, I, or R (in number of hosts) between two 
+            consecutive post-bottleneck states below which the remaining 
+            burn-in bottlenecks are skipped, or None to run every burn-in 
+            bottleneck
+        '''
+
+        self.cycle_convergence_tolerance = cycle_convergence_tolerance
+
+    def set_engine(self, engine: str) -> None:
+        '''Changes how the parameter sets are run. This model parameter is not
+        rangeable.
+
+        engine: str
+            The only permitted values are "Serial", to run the parameter sets 
+            one after the other, "Sweep", to run all parameter sets together
+            as numpy arrays, or "Parallel", to run the parameter sets in 
+            several processes at once.
+
+        Raises ValueError
+            If engine is something other than "Serial", "Sweep" or "Parallel"
+        '''
+
+        if engine in ["Serial", "Sweep", "Parallel"]:
+            self.engine = engine
+        else:
+            raise ValueError('''The method set_engine in parameters.py only takes
+                                engine="Serial", engine="Sweep" or 
+                                engine="Parallel".''')
+
+    def set_sweep_chunk_size(self, sweep_chunk_size: int) -> None:
+        '''Changes the model parameter sweep_chunk_size from its default. This
+        model parameter is not rangeable.
+
+        sweep_chunk_size: int
+            The maximum number of parameter sets that the "Sweep" engine holds
+            in memory and runs together
+        '''
+
+        self.sweep_chunk_size = sweep_chunk_size
+
+    def set_n_workers(self, n_workers: int) -> None:
+        '''Changes the model parameter n_workers from its default. This model
+        parameter is not rangeable.
+
+        n_workers: int
+            The number of processes that the "Parallel" engine runs parameter
+            sets in, or None to use one process per CPU
+        '''
+
+        self.n_workers = n_workers
+
+    def set_seed(self, seed: int) -> None:
+        '''Changes the model parameter seed from its default. This model 
+        parameter is not rangeable.
+
+        seed: int
+            The root seed that the "Parallel" engine creates the random number
+            streams of every parameter set from
+        '''
+
+        self.seed = seed
+
+    def set_output_format(self, output_format: str) -> None:
+        '''Changes the model parameter output_format from its default. This 
+        model parameter is not rangeable.
+
+        output_format: str
+            A name that represents how the output is written, either "Wide", 
+            "Normalized", or "Binary"
+
+        Raises ValueError
+            If output_format is something other than "Wide", "Normalized", or 
+            "Binary"
+        '''
+
+        if output_format in ["Wide", "Normalized", "Binary"]:
+            self.output_format = output_format
+        else:
+            raise ValueError('''The method set_output_format in parameters.py only
+                                takes output_format="Wide", 
+                                output_format="Normalized", or 
+                                output_format="Binary".''')
+
+    def set_reducers(self, reducers: list[str], keep_trajectories: bool = False) -> None:
+        '''Changes the model parameters reducers and keep_trajectories from 
+        their defaults. These model parameters are not rangeable.
+
+        reducers: list[str]
+            The names of the reducers that summarise every parameter set. The 
+            only permitted name is "PrevalenceExtrema"
+        keep_trajectories: bool
+            Whether the full trajectories should still be written. Defaults to
+            False, so that only the summaries are kept
+
+        Raises ValueError
+            If reducers has a name other than "PrevalenceExtrema"
+        '''
+
+        if all(reducer in ["PrevalenceExtrema"] for reducer in reducers):
+            self.reducers = list(reducers)
+            self.keep_trajectories = keep_trajectories
+        else:
+            raise ValueError('''The method set_reducers in parameters.py only takes
+                                reducers=["PrevalenceExtrema"].''')
+
+    def set_export_schedule(self, export_schedule: bool) -> None:
+        '''Changes the model parameter export_schedule from its default. This
+        model parameter is not rangeable.
+
+        export_schedule: bool
+            Whether the bottleneck schedule of every parameter set is written
+            to file_name_bottleneck_schedule.csv
+        '''
+
+        self.export_schedule = export_schedule
+
+    def set_replay_schedule(self, replay_schedule: str) -> None:
+        '''Changes the model parameter replay_schedule from its default. This
+        model parameter is not rangeable.
+
+        replay_schedule: str
+            The name of a schedule file in the output folder (minus the ".csv"
+            extension) whose bottlenecks should be replayed, or None to draw
+            the bottlenecks
+        '''
+
+        self.replay_schedule = replay_schedule
+
+    def set_checkpoint_interval(self, checkpoint_interval: int) -> None:
+        '''Changes the model parameter checkpoint_interval from its default.
+        This model parameter is not rangeable.
+
+        checkpoint_interval: int
+            The number of parameter sets between checkpoints, or 0 for no
+            checkpoints
+
+        Raises ValueError
+            If checkpoint_interval is negative
+        '''
+
+        if checkpoint_interval < 0:
+            raise ValueError('''The method set_checkpoint_interval in parameters.py
+                                only takes a checkpoint_interval of 0 or more.''')
+        self.checkpoint_interval = checkpoint_interval
+
+    def set_result_cache(self, result_cache: bool) -> None:
+        '''Changes the model parameter result_cache from its default. This
+        model parameter is not rangeable.
+
+        result_cache: bool
+            Whether the data of every parameter set are taken from, and stored
+            in, the cache of earlier results
+        '''
+
+        self.result_cache = result_cache
+
     @staticmethod
     def get_range(min, max, step_size) -> list:
         '''Takes information about the characteristics of a desired parameter
@@ -1,9 +1,19 @@
 '''This module contains a single class Dataframe, which stores data column names, 
 stores values that should remain constant for all rows, logs incoming data from
 the model, and then outputs the full dataframe to a .csv file in the output
-folder.
+folder. The data are stored column by column in numpy arrays (whole numbers
+for Series and Timepoint, and decimals for S, I, and R), while the
+constant values are only stored once per parameter set, and are only copied
+into every row when the data are written. Alternatively, the data can be
+written in a "Normalized" format, where the constant values are written once
+per parameter set to a separate .csv file instead of on every row, or in a 
+"Binary" format, where every column is written as a raw numpy array that can be
+read back without loading the whole file into memory. Reducers (see 
+reducers.py) can be attached to a dataframe to summarise every parameter set
+as its rows are logged, in which case the rows themselves don't have to be 
+kept at all.
 
-Within the Dataframe class, there are four methods:
+Within the Dataframe class, there are twelve methods:
 __init__
     Initializes a new dataframe with some default set-up values and empty
     storage that can accept new data
@@ -21,15 +31,70 @@ log_data
     the incoming data (i.e. if the simulation is in the middle of a "burn in"
     where data doesn't need to be ouputed yet)
 
+log_columns
+    Does the same as log_data, but takes the data as one array per column,
+    which is much faster for the batched engines of the model
+
+add_rows
+    Hands new rows to the reducers, and adds them to the column arrays (making
+    room for them if necessary) unless the rows aren't kept
+
 write_data
-    Outputs the accumulated data into a .csv file in the output folder
+    Outputs the data accumulated since the last call into a .csv file (or, in
+    the "Normalized" format, two .csv files) in the output folder, and then 
+    forgets those data
+
+write_wide_data
+    Writes the data in the "Wide" format, with the constant values repeated on
+    every row
+
+write_normalized_data
+    Writes the data in the "Normalized" format, with the constant values in 
+    their own file
+
+write_binary_data
+    Writes the data in the "Binary" format, with one .npy file per column and 
+    a .json file for the constant values
+
+get_parameter_set_ids
+    Hands out a ParamSetID to every parameter set that is about to be written
+    in the "Normalized" or "Binary" format
+
+merge
+    Appends the rows logged by another dataframe (e.g. one filled in by a 
+    worker process) to this dataframe
+
+get_data_rows
+    Returns the rows that haven't been written yet as a list of dictionaries, 
+    which is convenient for inspecting the data
+
+The module also has four functions outside of the Dataframe class:
+join_normalized_data
+    Rebuilds the "Wide" .csv file from the two files written in the 
+    "Normalized" format
+
+read_binary_data
+    Opens the columns written in the "Binary" format as memory-mapped arrays, 
+    so that they can be sliced without loading them
+
+write_npy_column
+    Appends values to the end of a .npy file, and updates its header
+
+get_npy_header
+    Returns the fixed-size header of a .npy file holding a single column
 '''
 
 import csv
-
+import json
+import os
+import struct
+import numpy as np
 
 class Dataframe:
-    def __init__(self, file_name: str) -> None:
+    CHUNK_SIZE: int = 4096
+
+    def __init__(self, file_name: str, output_format: str = "Wide",
+                 reducers: list = None, is_keeping_rows: bool = True) -> None:
         '''Initializes a new dataframe with some default set-up values and empty
         storage that can accept new data
 
@@ -41,6 +106,26 @@ class Dataframe:
             extension). Note that if file_name is identical to an existing .csv
             file in the output folder, that file will be overwritten.
 
+        output_format: str
+            Either "Wide", to write a single .csv file where every row holds 
+            the constant values, or "Normalized", to write a 
+            <file_name>_params.csv file with one row of constant values per 
+            parameter set (identified by a ParamSetID column) and a 
+            <file_name>_series.csv file where every row only holds the 
+            ParamSetID and the variables, or "Binary", to write a 
+            <file_name> folder with one .npy file per variable (plus a 
+            ParamSetID.npy file) and a constants.json file with the constant 
+            values of every parameter set
+
+        reducers: list
+            Instances of the reducer classes in reducers.py, which see every 
+            row that is logged and write a summary of every parameter set 
+            whenever write_data is called. Defaults to no reducers.
+
+        is_keeping_rows: bool
+            If False, the rows are only handed to the reducers, and no 
+            trajectories are stored or written
+
         VARIABLE_COLUMN_NAMES: list[str]
             A list of column names specifically for variables that are expected
             to change row-to-row or series-to-series. Each column name is a string.
@@ -60,16 +145,45 @@ class Dataframe:
             constant data only need to be stored here once, then added to the 
             dataframe at the end.
 
-        data_rows: list[dict]
-            A list where each element is a dictionary of key-value pairs storing
-            data. Each element (dictionary) represented one row of data in the
-            final output .csv file. Within a dictionary, the key is the column
-            name and the value is the value of the variable corresponding to that
-            column. As data flows in from the simulation, those rows of data will
-            be tacked onto the end of this list.
-        '''
+        constant_sets: list[dict]
+            Every constant_data dictionary that rows logged since the last 
+            write_data belong to. Each row refers to one of these by its index.
+
+        integer_columns: np.ndarray
+            An integer array with one row per logged row of data and one column
+            per whole-number variable (Series and Timepoint). Rows are
+            preallocated in chunks of CHUNK_SIZE, so only the first n_rows rows
+            hold data.
+
+        float_columns: np.ndarray
+            A decimal array with one row per logged row of data and one column
+            per state variable (S, I, and R), preallocated like integer_columns
 
+        constant_indices: np.ndarray
+            An integer array with, for every logged row of data, the index of 
+            the constant_sets dictionary that the row belongs to
+
+        n_rows: int
+            The number of rows of data logged since the last write_data. Rows 
+            are forgotten once they have been written to the .csv file.
+
+        is_header_written: bool
+            False until write_data has created the .csv file and written its
+            header. After that, write_data only appends new rows to the file.
+
+        n_rows_written: int
+            The number of rows written by all calls of write_data so far
+
+        parameter_set_ids: dict
+            Only used by the "Normalized" and "Binary" formats. Maps every parameter set that
+            has been written (as a tuple of its constant column names and values)
+            to its ParamSetID
+        '''
+        
         self.file_name: str = file_name
+        self.output_format: str = output_format
+        self.reducers: list = [] if reducers is None else reducers
+        self.is_keeping_rows: bool = is_keeping_rows
         self.VARIABLE_COLUMN_NAMES: list[str] = ["Series",
                                                  "Timepoint",
                                                  "S",
@@ -77,7 +191,16 @@ class Dataframe:
                                                  "R"]
         self.CONSTANT_COLUMN_NAMES: list[str] = []
         self.constant_data: dict = {}
-        self.data_rows: list[dict] = []
+        self.constant_sets: list[dict] = [self.constant_data]
+        n_integer_columns = len(self.VARIABLE_COLUMN_NAMES) - 3
+        self.integer_columns: np.ndarray = np.empty((self.CHUNK_SIZE, n_integer_columns),
+                                                    dtype=np.int64)
+        self.float_columns: np.ndarray = np.empty((self.CHUNK_SIZE, 3))
+        self.constant_indices: np.ndarray = np.empty(self.CHUNK_SIZE, dtype=np.int64)
+        self.n_rows: int = 0
+        self.is_header_written: bool = False
+        self.n_rows_written: int = 0
+        self.parameter_set_ids: dict = {}
 
     def add_constant_data(self, constants: dict) -> None:
         '''Takes in and stores column names and variable values for parameters
@@ -90,10 +213,10 @@ class Dataframe:
             might be an element of the dictionary that has the key "Birth Rate" 
             (a string) and the value 0.05 (a float).
         '''
-        
         self.CONSTANT_COLUMN_NAMES = list(constants.keys())
         self.constant_data = constants
-
+        self.constant_sets.append(constants)
+    
     def log_data(self, is_logging: bool, new_data: list[list]) -> None:
         '''Logs several rows of new data coming from the simulation. These data 
         include the series (run of the simulation), timepoint number, and the 
@@ -117,26 +240,362 @@ class Dataframe:
         '''
         if not is_logging:
             return
-        if new_data is False:
+        if new_data is False or len(new_data) == 0:
+            return
+        
+        n_integer_columns = self.integer_columns.shape[1]
+        new_data = np.array(new_data, dtype=float)
+        self.add_rows(new_data[:, :n_integer_columns].astype(np.int64),
+                      new_data[:, n_integer_columns:])
+
+    def log_columns(self, is_logging: bool, new_columns: list) -> None:
+        '''Does the same as log_data, but takes the new data column by column.
+        This avoids building a list for every row, which makes logging the 
+        output of the batched engines much faster.
+
+        is_logging: bool
+            See log_data
+
+        new_columns: list
+            One element per column of VARIABLE_COLUMN_NAMES (the Series, the
+            Timepoint, and then S, I, and R). Each element is either
+            a numpy array with one value per new row or a single value that is
+            the same for every new row.
+        '''
+        if not is_logging:
             return
         
-        for row in new_data:
-            data_dict = {}
-            for column_index in range(len(row)):
-                column_name = self.VARIABLE_COLUMN_NAMES[column_index]
-                value = row[column_index]
-                data_dict[column_name] = value
-            data_dict.update(self.constant_data)
-            self.data_rows.append(data_dict)
+        n_new_rows = max(np.size(column) for column in new_columns)
+        n_integer_columns = self.integer_columns.shape[1]
+        integer_data = np.empty((n_new_rows, n_integer_columns), dtype=np.int64)
+        float_data = np.empty((n_new_rows, 3))
+        for column_index, column in enumerate(new_columns):
+            if column_index < n_integer_columns:
+                integer_data[:, column_index] = column
+            else:
+                float_data[:, column_index - n_integer_columns] = column
+        self.add_rows(integer_data, float_data)
+
+    def add_rows(self, integer_data: np.ndarray, float_data: np.ndarray,
+                 constant_indices: np.ndarray = None) -> None:
+        '''Hands new rows to the reducers, and then adds them to the end of 
+        the column arrays (unless is_keeping_rows is False). If the arrays are
+        full, they are enlarged (at least doubling, and in multiples of 
+        CHUNK_SIZE) so that adding rows one parameter set at a time doesn't 
+        require copying the arrays every time.
+
+        integer_data: np.ndarray
+            An array with one row per new row of data and one column per 
+            whole-number variable
+        float_data: np.ndarray
+            An array with one row per new row of data and one column per state
+            variable
+        constant_indices: np.ndarray
+            The index in constant_sets of every new row. If None, every new row
+            belongs to the current constant_data
+        '''
+        if constant_indices is None:
+            constant_indices = len(self.constant_sets) - 1
+        for reducer in self.reducers:
+            reducer.update(self, integer_data, float_data, constant_indices)
+        if not self.is_keeping_rows:
+            return
 
+        n_new_rows = len(integer_data)
+        n_rows = self.n_rows + n_new_rows
+        if n_rows > len(self.integer_columns):
+            capacity = max(2 * len(self.integer_columns), 
+                           -(-n_rows // self.CHUNK_SIZE) * self.CHUNK_SIZE)
+            for name in ["integer_columns", "float_columns", "constant_indices"]:
+                old_array = getattr(self, name)
+                new_array = np.empty((capacity,) + old_array.shape[1:], 
+                                     dtype=old_array.dtype)
+                new_array[:self.n_rows] = old_array[:self.n_rows]
+                setattr(self, name, new_array)
+
+        self.integer_columns[self.n_rows:n_rows] = integer_data
+        self.float_columns[self.n_rows:n_rows] = float_data
+        self.constant_indices[self.n_rows:n_rows] = constant_indices
+        self.n_rows = n_rows
+    
     def write_data(self) -> None:
-        '''Writes the data stored in the data_rows list to a .csv file in the
-        output folder. The column names in the .csv file will be the column names
-        stored in the VARIABLE_COLUMN_NAMES list and the CONSTANT_COLUMN_NAMES
-        list.
+        '''Writes the stored data to the output folder, in the format chosen by
+        output_format. The first call creates (or overwrites) the file(s) and 
+        writes the header. Every later call only appends the rows logged since 
+        the previous call, and the rows that have been written are forgotten. 
+        This way, the file is never rewritten, and only the rows of the current
+        parameter set have to be held in memory. Every reducer also writes the
+        summaries of the parameter sets logged since the previous call. If 
+        is_keeping_rows is False, only the reducers write anything.
+        '''
+        for reducer in self.reducers:
+            reducer.write_summary(self)
+        if not self.is_keeping_rows:
+            self.constant_sets = [self.constant_data]
+            return
+
+        if self.output_format == "Normalized":
+            self.write_normalized_data()
+        elif self.output_format == "Binary":
+            self.write_binary_data()
+        else:
+            self.write_wide_data()
+        self.is_header_written = True
+        self.n_rows_written += self.n_rows
+        self.n_rows = 0
+        self.constant_sets = [self.constant_data]
+
+    def write_wide_data(self) -> None:
+        '''Writes the stored data to output/<file_name>.csv. The column names in
+        the .csv file will be the column names stored in the 
+        VARIABLE_COLUMN_NAMES list and the CONSTANT_COLUMN_NAMES list. The 
+        constant values of every row are only looked up here.
+        '''
+        mode = 'a' if self.is_header_written else 'w'
+        with open(f'output/{self.file_name}.csv', mode, newline='') as f:
+            writer = csv.writer(f)
+            if not self.is_header_written:
+                writer.writerow(self.VARIABLE_COLUMN_NAMES + self.CONSTANT_COLUMN_NAMES)
+
+            constant_values = [[constants.get(column_name, "") for column_name
+                                in self.CONSTANT_COLUMN_NAMES]
+                               for constants in self.constant_sets]
+            writer.writerows(integer_values + float_values + constant_values[constant_index]
+                             for integer_values, float_values, constant_index in
+                             zip(self.integer_columns[:self.n_rows].tolist(),
+                                 self.float_columns[:self.n_rows].tolist(),
+                                 self.constant_indices[:self.n_rows].tolist()))
+
+    def write_normalized_data(self) -> None:
+        '''Writes the stored data to two files. Every parameter set that hasn't
+        been written before gets one row in output/<file_name>_params.csv, with
+        its ParamSetID followed by the CONSTANT_COLUMN_NAMES columns. Every row
+        of data is written to output/<file_name>_series.csv, with the ParamSetID
+        of its parameter set followed by the VARIABLE_COLUMN_NAMES columns. The
+        wide layout can be rebuilt with join_normalized_data.
+        '''
+        parameter_set_ids, new_parameter_sets = self.get_parameter_set_ids()
+
+        mode = 'a' if self.is_header_written else 'w'
+        with open(f'output/{self.file_name}_params.csv', mode, newline='') as f:
+            writer = csv.writer(f)
+            if not self.is_header_written:
+                writer.writerow(["ParamSetID"] + self.CONSTANT_COLUMN_NAMES)
+            writer.writerows(new_parameter_sets)
+
+        with open(f'output/{self.file_name}_series.csv', mode, newline='') as f:
+            writer = csv.writer(f)
+            if not self.is_header_written:
+                writer.writerow(["ParamSetID"] + self.VARIABLE_COLUMN_NAMES)
+            writer.writerows([parameter_set_ids[constant_index]] + integer_values + float_values
+                             for integer_values, float_values, constant_index in
+                             zip(self.integer_columns[:self.n_rows].tolist(),
+                                 self.float_columns[:self.n_rows].tolist(),
+                                 self.constant_indices[:self.n_rows].tolist()))
+
+    def write_binary_data(self) -> None:
+        '''Writes the stored data to the output/<file_name> folder. Every 
+        column of VARIABLE_COLUMN_NAMES, plus a ParamSetID column, is appended
+        to its own .npy file as one block of raw bytes, so no values are ever 
+        converted to text. The constant values of every parameter set are 
+        written to constants.json, together with the number of rows and the 
+        type of every column. The data can be read back with read_binary_data.
+        '''
+        parameter_set_ids, _ = self.get_parameter_set_ids()
+        parameter_set_ids = np.array([-1 if parameter_set_id is None else parameter_set_id
+                                      for parameter_set_id in parameter_set_ids],
+                                     dtype=np.int64)
+        columns = {"ParamSetID": parameter_set_ids[self.constant_indices[:self.n_rows]]}
+        n_integer_columns = len(self.VARIABLE_COLUMN_NAMES) - 3
+        for index, column_name in enumerate(self.VARIABLE_COLUMN_NAMES):
+            if index < n_integer_columns:
+                columns[column_name] = self.integer_columns[:self.n_rows, index]
+            else:
+                columns[column_name] = self.float_columns[:self.n_rows, index - n_integer_columns]
+
+        folder = f'output/{self.file_name}'
+        os.makedirs(folder, exist_ok=True)
+        n_rows = self.n_rows_written + self.n_rows
+        for column_name, column in columns.items():
+            write_npy_column(f'{folder}/{column_name}.npy', column, n_rows, 
+                             is_new_file = not self.is_header_written)
+
+        schema = {"n_rows": n_rows,
+                  "columns": {column_name: np.lib.format.dtype_to_descr(column.dtype)
+                              for column_name, column in columns.items()},
+                  "constant_columns": self.CONSTANT_COLUMN_NAMES,
+                  "parameter_sets": [{"ParamSetID": parameter_set_id, **dict(key)}
+                                     for key, parameter_set_id in self.parameter_set_ids.items()]}
+        with open(f'{folder}/constants.json', 'w') as f:
+            json.dump(schema, f, indent=1, 
+                      default=lambda value: value.item() if isinstance(value, np.generic) else str(value))
+
+    def get_parameter_set_ids(self) -> tuple[list]:
+        '''Looks up the ParamSetID of every dictionary in constant_sets that 
+        is about to be written, i.e. those that rows of data belong to, plus the
+        current constant_data (so that parameter sets without any logged rows 
+        still appear). Parameter sets are recognised by their constant values,
+        so the same parameter set logged by several dataframes (see merge) only 
+        gets one ParamSetID. Parameter sets that haven't been seen before are 
+        given the next ParamSetID.
+
+        Returns tuple[list]
+            The first element has the ParamSetID of every dictionary in 
+            constant_sets (None for those that aren't written). The second 
+            element has one row (the ParamSetID followed by the constant values)
+            for every parameter set that has just been given a ParamSetID
+        '''
+        used_indices = set(self.constant_indices[:self.n_rows].tolist())
+        parameter_set_ids = []
+        new_parameter_sets = []
+        for index, constants in enumerate(self.constant_sets):
+            is_written = (index in used_indices or 
+                          (constants is self.constant_data and len(constants) > 0))
+            if not is_written:
+                parameter_set_ids.append(None)
+                continue
+
+            key = tuple(constants.items())
+            if key not in self.parameter_set_ids:
+                self.parameter_set_ids[key] = len(self.parameter_set_ids)
+                new_parameter_sets.append([self.parameter_set_ids[key]] + 
+                                          [constants.get(column_name, "") for 
+                                           column_name in self.CONSTANT_COLUMN_NAMES])
+            parameter_set_ids.append(self.parameter_set_ids[key])
+        return parameter_set_ids, new_parameter_sets
+
+    def merge(self, other) -> None:
+        '''Appends the rows logged by another dataframe to this dataframe, e.g.
+        when the other dataframe was filled in by a worker process of the 
+        "Parallel" engine. The rows keep the constant data they were logged 
+        with.
+
+        other: an instance of the Dataframe class
+            The dataframe whose rows should be added after the rows of this one
         '''
-        with open(f'output/{self.file_name}.csv', 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames = self.VARIABLE_COLUMN_NAMES +
-                                                    self.CONSTANT_COLUMN_NAMES)
-            writer.writeheader()
-            writer.writerows(self.data_rows)
+        first_index = len(self.constant_sets)
+        self.constant_sets.extend(other.constant_sets)
+        self.add_rows(other.integer_columns[:other.n_rows],
+                      other.float_columns[:other.n_rows],
+                      other.constant_indices[:other.n_rows] + first_index)
+
+    def get_data_rows(self) -> list[dict]:
+        '''Returns the rows of data logged since the last write_data as 
+        dictionaries, in the same layout as the rows of the .csv file. Only
+        meant for inspecting the data (e.g. in tests), since this undoes the 
+        savings of storing the data column by column.
+
+        Returns list[dict]
+            One dictionary per row, where each key is a column name and each
+            value is the value of that column in that row
+        '''
+        data_rows = []
+        for integer_values, float_values, constant_index in zip(self.integer_columns[:self.n_rows].tolist(),
+                                                                self.float_columns[:self.n_rows].tolist(),
+                                                                self.constant_indices[:self.n_rows].tolist()):
+            data_dict = dict(zip(self.VARIABLE_COLUMN_NAMES, integer_values + float_values))
+            data_dict.update(self.constant_sets[constant_index])
+            data_rows.append(data_dict)
+        return data_rows
+
+def join_normalized_data(file_name: str) -> None:
+    '''Rebuilds the "Wide" output/<file_name>.csv file, with the constant 
+    values repeated on every row, from the output/<file_name>_params.csv and
+    output/<file_name>_series.csv files written in the "Normalized" format. 
+    The values are copied as text, so the result is identical to the file 
+    that the "Wide" format would have written. The series file is read one row
+    at a time, so this works for files that don't fit in memory.
+
+    file_name: str
+        The file_name that the data were written with (minus the "_params.csv"
+        and "_series.csv" endings)
+    '''
+    with open(f'output/{file_name}_params.csv', newline='') as f:
+        reader = csv.reader(f)
+        constant_column_names = next(reader)[1:]
+        parameter_sets = {row[0]: row[1:] for row in reader}
+
+    with open(f'output/{file_name}_series.csv', newline='') as series_file, \
+         open(f'output/{file_name}.csv', 'w', newline='') as wide_file:
+        reader = csv.reader(series_file)
+        writer = csv.writer(wide_file)
+        variable_column_names = next(reader)[1:]
+        writer.writerow(variable_column_names + constant_column_names)
+        writer.writerows(row[1:] + parameter_sets[row[0]] for row in reader)
+
+def read_binary_data(file_name: str) -> tuple[dict]:
+    '''Opens the data written in the "Binary" format. The columns are opened
+    with np.load(mmap_mode='r'), so nothing is read from the disk until the 
+    columns are sliced, which makes it possible to work with files that are 
+    much larger than the memory. For instance, the S values of the rows of the
+    parameter set with ParamSetID 3 are columns["S"][columns["ParamSetID"] == 3].
+
+    file_name: str
+        The file_name that the data were written with, i.e. the name of the 
+        folder in the output folder
+
+    Returns tuple[dict]
+        The first element maps every column name (ParamSetID and the 
+        VARIABLE_COLUMN_NAMES) to a read-only memory-mapped array. The second
+        element maps every ParamSetID to a dictionary of the constant values of
+        its parameter set
+    '''
+    folder = f'output/{file_name}'
+    with open(f'{folder}/constants.json') as f:
+        schema = json.load(f)
+
+    columns = {}
+    for column_name, descr in schema["columns"].items():
+        if schema["n_rows"] == 0:
+            columns[column_name] = np.empty(0, dtype=np.dtype(descr))
+        else:
+            columns[column_name] = np.load(f'{folder}/{column_name}.npy', 
+                                           mmap_mode='r')[:schema["n_rows"]]
+    parameter_sets = {}
+    for constants in schema["parameter_sets"]:
+        parameter_sets[constants.pop("ParamSetID")] = constants
+    return columns, parameter_sets
+
+def write_npy_column(path: str, column: np.ndarray, n_rows: int, 
+                     is_new_file: bool) -> None:
+    '''Appends the values of a column to the end of a .npy file in one block
+    of raw bytes, and rewrites the header of the file so that its shape 
+    includes them. The header always has the same size, so rewriting it never
+    moves the data.
+
+    path: str
+        The location of the .npy file
+
+    column: np.ndarray
+        The one-dimensional array of values to append
+
+    n_rows: int
+        The number of values in the file once the column has been appended
+
+    is_new_file: bool
+        Whether to create (or overwrite) the file instead of appending to it
+    '''
+    with open(path, 'wb' if is_new_file else 'r+b') as f:
+        f.write(get_npy_header(column.dtype, n_rows))
+        f.seek(0, os.SEEK_END)
+        np.ascontiguousarray(column).tofile(f)
+
+def get_npy_header(dtype: np.dtype, n_rows: int) -> bytes:
+    '''Returns the header of a version 1.0 .npy file holding a single column.
+    The header is padded with spaces to 128 bytes, no matter how many rows the
+    file has, which also keeps the data aligned for memory mapping.
+
+    dtype: np.dtype
+        The type of the values in the column
+
+    n_rows: int
+        The number of values in the column
+
+    Returns bytes
+        The header of the file
+    '''
+    header = repr({"descr": np.lib.format.dtype_to_descr(dtype), 
+                   "fortran_order": False, 
+                   "shape": (n_rows,)})
+    header = header.ljust(128 - 11) + "\n"
+    return np.lib.format.magic(1, 0) + struct.pack("<H", len(header)) + header.encode("latin1")
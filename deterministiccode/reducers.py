@@ -0,0 +1,218 @@
+'''This module contains the reducers that can be handed to the Dataframe class in
+logger.py. A reducer sees every row of data as it is logged, and only keeps a
+small summary of each parameter set (e.g. the highest and lowest prevalence),
+which it writes to its own .csv file in the output folder. Together with the
+keep_trajectories parameter (see parameters.py), this means that the full
+trajectories don't have to be stored or written when only the summary is
+needed.
+
+Within this module, there are two classes. The Reducer class holds everything
+that all reducers have in common, and new reducers are written by inheriting
+from it and overriding SUMMARY_NAME, SUMMARY_COLUMN_NAMES, reduce, and (if
+needed) get_summary_rows. The Reducer class has five methods:
+__init__
+    Initializes a reducer without any summaries
+
+update
+    Is called by the Dataframe class with every batch of newly logged rows,
+    and updates the summary of every parameter set that the rows belong to
+
+reduce
+    Combines the summary of a parameter set with some new rows of that
+    parameter set. This is the only method that a new reducer has to write.
+
+get_summary_rows
+    Turns the summary of a parameter set into the rows that are written
+
+write_summary
+    Is called by the Dataframe class when it writes its data, and appends the
+    summaries to output/<file_name>_<SUMMARY_NAME>.csv
+
+The PrevalenceExtrema class is a reducer that keeps the highest and the lowest
+prevalence (I / (S + I + R)) of every parameter set, and the Series and
+Timepoint at which they occurred.
+
+The module also has one function outside of the classes:
+get_reducers
+    Creates the reducers with the names given in parameters.py
+'''
+
+import csv
+import numpy as np
+
+class Reducer:
+    SUMMARY_NAME: str = ""
+    SUMMARY_COLUMN_NAMES: list[str] = []
+
+    def __init__(self) -> None:
+        '''Initializes a reducer without any summaries
+
+        Explanation of attributes
+        ---------
+
+        SUMMARY_NAME: str
+            The name that is added to the file_name of the dataframe to get the
+            name of the summary .csv file
+
+        SUMMARY_COLUMN_NAMES: list[str]
+            The column names of the summary values, which are written after the
+            constant columns of the parameter set
+
+        summaries: dict
+            Maps every parameter set (as a tuple of its constant column names
+            and values) that has rows since the last write_summary to its
+            summary, a list with one value per SUMMARY_COLUMN_NAMES
+
+        is_header_written: bool
+            False until write_summary has created the .csv file and written its
+            header. After that, write_summary only appends new rows to the file.
+        '''
+        self.summaries: dict = {}
+        self.is_header_written: bool = False
+
+    def update(self, dataframe, integer_data: np.ndarray, float_data: np.ndarray,
+               constant_indices) -> None:
+        '''Updates the summaries of the parameter sets with newly logged rows.
+        Parameter sets are recognised by their constant values, so rows of the
+        same parameter set logged by several dataframes (see merge in logger.py)
+        end up in the same summary.
+
+        dataframe: an instance of the Dataframe class from logger.py
+            The dataframe that the rows are being logged to
+
+        integer_data: np.ndarray
+            An array with one row per new row of data and one column per
+            whole-number variable
+
+        float_data: np.ndarray
+            An array with one row per new row of data and one column per state
+            variable
+
+        constant_indices
+            Either a single index in the constant_sets of the dataframe, if
+            every new row belongs to the same parameter set, or an array with
+            the index of every new row
+        '''
+        if len(integer_data) == 0:
+            return
+
+        if np.ndim(constant_indices) == 0:
+            groups = [(constant_indices, slice(None))]
+        else:
+            groups = [(constant_index, constant_indices == constant_index)
+                      for constant_index in np.unique(constant_indices)]
+        for constant_index, rows in groups:
+            key = tuple(dataframe.constant_sets[constant_index].items())
+            self.summaries[key] = self.reduce(self.summaries.get(key),
+                                              integer_data[rows], float_data[rows])
+
+    def reduce(self, summary: list, integer_data: np.ndarray,
+               float_data: np.ndarray) -> list:
+        '''Combines the summary of a parameter set with some new rows of that
+        parameter set. Has to be written by every reducer.
+
+        summary: list
+            The summary of the rows seen so far, or None if these are the first
+            rows of the parameter set
+
+        integer_data: np.ndarray
+            See update
+
+        float_data: np.ndarray
+            See update
+
+        Returns list
+            The new summary, with one value per SUMMARY_COLUMN_NAMES
+        '''
+        raise NotImplementedError
+
+    def get_summary_rows(self, summary) -> list[list]:
+        '''Turns the summary of a parameter set into the rows that are 
+        written. By default, the summary is already the values of a single row.
+
+        summary
+            The summary of all rows of the parameter set
+
+        Returns list[list]
+            One or more rows, each with one value per SUMMARY_COLUMN_NAMES
+        '''
+        return [summary]
+
+    def write_summary(self, dataframe) -> None:
+        '''Appends the summary rows of every summarised parameter set to
+        output/<file_name>_<SUMMARY_NAME>.csv, each with the constant values of
+        the parameter set followed by the summary values, and then forgets the
+        summaries. The first call creates (or overwrites) the file and writes 
+        the header. Every engine in model.py logs all rows of a parameter set 
+        before it writes the data, so every parameter set is only summarised 
+        once.
+
+        dataframe: an instance of the Dataframe class from logger.py
+            The dataframe that is writing its data
+        '''
+        mode = 'a' if self.is_header_written else 'w'
+        with open(f'output/{dataframe.file_name}_{self.SUMMARY_NAME}.csv', mode,
+                  newline='') as f:
+            writer = csv.writer(f)
+            if not self.is_header_written:
+                writer.writerow(dataframe.CONSTANT_COLUMN_NAMES + self.SUMMARY_COLUMN_NAMES)
+                self.is_header_written = True
+            for key, summary in self.summaries.items():
+                constants = dict(key)
+                constant_values = [constants.get(column_name, "") for column_name
+                                   in dataframe.CONSTANT_COLUMN_NAMES]
+                writer.writerows(constant_values + summary_row for summary_row
+                                 in self.get_summary_rows(summary))
+        self.summaries = {}
+
+class PrevalenceExtrema(Reducer):
+    SUMMARY_NAME: str = "prevalence_extrema"
+    SUMMARY_COLUMN_NAMES: list[str] = ["PMax", "PMaxSeries", "PMaxTimepoint",
+                                       "PMin", "PMinSeries", "PMinTimepoint"]
+
+    def reduce(self, summary: list, integer_data: np.ndarray,
+               float_data: np.ndarray) -> list:
+        '''Keeps the highest and the lowest prevalence of a parameter set, and
+        the Series and Timepoint of the first row at which each occurred. The
+        prevalence is I / (S + I + R), or zero if there are no hosts left.
+
+        summary: list
+            See Reducer.reduce
+
+        integer_data: np.ndarray
+            See Reducer.update
+
+        float_data: np.ndarray
+            See Reducer.update
+
+        Returns list
+            PMax, PMaxSeries, PMaxTimepoint, PMin, PMinSeries, and
+            PMinTimepoint
+        '''
+        popsize = float_data.sum(axis=1)
+        prevalence = np.divide(float_data[:, 1], popsize,
+                               out=np.zeros(len(popsize)), where=popsize > 0)
+        max_row = np.argmax(prevalence)
+        min_row = np.argmin(prevalence)
+        new_summary = ([prevalence[max_row].item()] + integer_data[max_row, -2:].tolist() +
+                       [prevalence[min_row].item()] + integer_data[min_row, -2:].tolist())
+        if summary is None:
+            return new_summary
+
+        if new_summary[0] > summary[0]:
+            summary[:3] = new_summary[:3]
+        if new_summary[3] < summary[3]:
+            summary[3:] = new_summary[3:]
+        return summary
+
+def get_reducers(reducer_names: list[str]) -> list:
+    '''Creates the reducers with the given names
+
+    reducer_names: list[str]
+        The names of the reducers (see the reducers parameter in parameters.py)
+
+    Returns list
+        One new instance of the named reducer class per name
+    '''
+    reducer_classes = {"PrevalenceExtrema": PrevalenceExtrema}
+    return [reducer_classes[reducer_name]() for reducer_name in reducer_names]
@@ -0,0 +1,130 @@
+'''This module writes and reads the bottleneck schedules of a run. Before a
+parameter set is simulated, the number of timesteps until every bottleneck and
+the size of every bottleneck are drawn in one go (see get_schedule in
+model.py). The schedule can be written to a .csv file, so that the timing and
+sizes of the bottlenecks of a run can be checked afterwards, and read back, so
+that a run can be repeated with exactly the same bottlenecks.
+
+The BottleneckSchedule class writes the schedules to a .csv file in the same
+way that the reducers of reducers.py write their summaries. On top of the
+methods of the Reducer class, it has one method:
+add_schedule
+    Stores the schedule of the current parameter set of a dataframe
+
+The module also has three functions outside of the class:
+read_schedules
+    Reads the schedules written by a BottleneckSchedule back in
+
+get_parameter_set_key
+    Turns the values of a parameter set into the number that identifies its
+    schedule
+
+get_number
+    Turns a value read from the .csv file back into an int or a float
+'''
+
+import csv
+import hashlib
+import json
+
+import deterministiccode.reducers as reducers
+
+class BottleneckSchedule(reducers.Reducer):
+    SUMMARY_NAME: str = "bottleneck_schedule"
+    SUMMARY_COLUMN_NAMES: list[str] = ["ParameterSetKey", "Bottleneck",
+                                       "TimeTillBottleneck", "BottleneckSize"]
+
+    def add_schedule(self, dataframe, parameter_set_key: int,
+                     time_till_bottleneck: list, bottleneck_size: list) -> None:
+        '''Stores the schedule of the current parameter set of a dataframe, to
+        be written by write_summary
+
+        dataframe: an instance of the Dataframe class from logger.py
+            Holds the constant data of the current parameter set
+
+        parameter_set_key: int
+            The number that identifies the parameter set by its values (see
+            get_parameter_set_key), which is how a replayed run finds the
+            schedule again
+
+        time_till_bottleneck: list
+            The number of timesteps until every bottleneck
+
+        bottleneck_size: list
+            The size of every bottleneck
+        '''
+        self.summaries[tuple(dataframe.constant_data.items())] = (parameter_set_key,
+                                                                time_till_bottleneck,
+                                                                bottleneck_size)
+
+    def get_summary_rows(self, summary: tuple) -> list[list]:
+        '''Turns the schedule of a parameter set into one row per bottleneck
+
+        summary: tuple
+            The parameter set key and the two lists given to add_schedule
+
+        Returns list[list]
+            One row per bottleneck
+        '''
+        parameter_set_key, time_till_bottleneck, bottleneck_size = summary
+        return [[parameter_set_key, bottleneck, time, size] for bottleneck, (time, size)
+                in enumerate(zip(time_till_bottleneck, bottleneck_size))]
+
+def read_schedules(file_name: str) -> dict:
+    '''Reads the schedules written by a BottleneckSchedule back in
+
+    file_name: str
+        The name of the .csv file in the output folder (minus the ".csv"
+        extension), e.g. "data_bottleneck_schedule"
+
+    Returns dict
+        Maps the key of every parameter set of the run (see
+        get_parameter_set_key) to its number of timesteps until every
+        bottleneck and its size of every bottleneck, as two lists with one
+        value per bottleneck
+    '''
+    rows = {}
+    with open(f"output/{file_name}.csv", newline='') as f:
+        for row in csv.DictReader(f):
+            rows.setdefault(int(row["ParameterSetKey"]), []).append(row)
+
+    schedules = {}
+    for parameter_set_key, parameter_set_rows in rows.items():
+        parameter_set_rows.sort(key=lambda row: int(row["Bottleneck"]))
+        schedules[parameter_set_key] = ([get_number(row["TimeTillBottleneck"])
+                                         for row in parameter_set_rows],
+                                        [get_number(row["BottleneckSize"])
+                                         for row in parameter_set_rows])
+    return schedules
+
+def get_parameter_set_key(parameter_set: list) -> int:
+    '''Turns the values of a parameter set into the number that identifies its
+    schedule, by hashing them. This way, a replayed run finds the schedule of a
+    parameter set by its values, and not by its position among the parameter
+    sets of the run, so the replayed run can range the parameters differently.
+
+    parameter_set: list
+        The rangeable parameter values of the parameter set, in the order 
+        produced by the iter.product method in the "run" function of model.py
+
+    Returns int
+        A number between 0 and 2**64 - 1
+    '''
+    text = json.dumps([float(value) for value in parameter_set])
+    return int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+
+def get_number(value: str):
+    '''Turns a value read from a .csv file back into the number that was 
+    written, so that a replayed schedule is written out exactly the same way
+
+    value: str
+        The value as it appears in the .csv file
+
+    Returns int or float
+        An int if the value was written as a whole number, and a float 
+        otherwise (e.g. a bottleneck_size_mean of 100.0)
+    '''
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
@@ -31,6 +31,11 @@ The main() function contains all the code required to recreate the datasets used
 in Bubrig and Gibson 2025. Each run command is commented out (with #) to prevent 
 the program from trying to run them all at the same time. Remove the # character
 from any run statement to get the program to run that parameter set.
+
+The same datasets are also described in datasets.json, from which batch.py can
+run any number of them at once in several processes, e.g.
+    python batch.py "figure_s6_low_res_*" --workers 4
+If you change a dataset here, change it in datasets.json as well.
 '''
 
 import deterministiccode.deterministic_parameters as det_params
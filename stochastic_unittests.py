@@ -1,9 +1,18 @@
 import unittest
+import csv
 import math
+import os
+import shutil
+import numpy as np
 
 import stochasticcode.stochastic_parameters as p
 import stochasticcode.stochastic_model as m
 import stochasticcode.logger as l
+import stochasticcode.reducers as red
+import stochasticcode.flow_cache as fc
+import stochasticcode.flow_map as fm
+import stochasticcode.markov_chain as mc
+import stochasticcode.result_cache as rc
 
 ####Testing parameters.py
 class TestSetFileName(unittest.TestCase):
@@ -475,6 +484,205 @@ class TestSetFractionalTimestepSize(unittest.TestCase):
         p1.set_fractional_timestep_size(value)
         self.assertEqual(p1.fractional_timestep_size, value)
 
+class TestSetEngine(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertEqual(p1.engine, "Serial")
+
+    def test_set(self):
+        for value in ["Batched", "Sweep", "Parallel", "MarkovChain", "Serial"]:
+            p1 = p.Parameters()
+            p1.set_engine(value)
+            self.assertEqual(p1.engine, value)
+
+    def test_for_error(self):
+        p1 = p.Parameters()
+        self.assertRaises(ValueError, p1.set_engine, "Incorrect String")
+
+class TestSetSweepChunkSize(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertEqual(p1.sweep_chunk_size, 10000)
+
+    def test_set(self):
+        value = 10
+        p1 = p.Parameters()
+        p1.set_sweep_chunk_size(value)
+        self.assertEqual(p1.sweep_chunk_size, value)
+
+class TestSetNWorkers(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertIsNone(p1.n_workers)
+
+    def test_set(self):
+        value = 4
+        p1 = p.Parameters()
+        p1.set_n_workers(value)
+        self.assertEqual(p1.n_workers, value)
+
+class TestSetSeed(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertEqual(p1.seed, 92500169789667897205027529303633824467)
+
+    def test_set(self):
+        value = 1
+        p1 = p.Parameters()
+        p1.set_seed(value)
+        self.assertEqual(p1.seed, value)
+
+class TestSetOutputFormat(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertEqual(p1.output_format, "Wide")
+
+    def test_set(self):
+        p1 = p.Parameters()
+        p1.set_output_format("Normalized")
+        self.assertEqual(p1.output_format, "Normalized")
+
+    def test_invalid(self):
+        p1 = p.Parameters()
+        with self.assertRaises(ValueError):
+            p1.set_output_format("Long")
+
+    def test_set_binary(self):
+        p1 = p.Parameters()
+        p1.set_output_format("Binary")
+        self.assertEqual(p1.output_format, "Binary")
+
+class TestSetReducers(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertEqual(p1.reducers, [])
+        self.assertTrue(p1.keep_trajectories)
+
+    def test_set(self):
+        p1 = p.Parameters()
+        p1.set_reducers(["ExtinctionProbability"])
+        self.assertEqual(p1.reducers, ["ExtinctionProbability"])
+        self.assertFalse(p1.keep_trajectories)
+
+    def test_keep_trajectories(self):
+        p1 = p.Parameters()
+        p1.set_reducers(["ExtinctionProbability"], keep_trajectories=True)
+        self.assertTrue(p1.keep_trajectories)
+
+    def test_invalid(self):
+        p1 = p.Parameters()
+        with self.assertRaises(ValueError):
+            p1.set_reducers(["PrevalenceExtrema"])
+
+class TestSetConfidenceLevel(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertEqual(p1.confidence_level, 0.95)
+
+    def test_set(self):
+        p1 = p.Parameters()
+        p1.set_confidence_level(0.99)
+        self.assertEqual(p1.confidence_level, 0.99)
+
+class TestSetFlowCacheSize(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertEqual(p1.flow_cache_size, 0)
+        self.assertIsNone(m.get_flow_cache(p1))
+
+    def test_set(self):
+        p1 = p.Parameters()
+        p1.set_flow_cache_size(1024)
+        self.assertEqual(p1.flow_cache_size, 1024)
+        self.assertIsInstance(m.get_flow_cache(p1), fc.FlowCache)
+
+class TestSetShareTrajectoryPrefixes(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        p1.set_flow_cache_size(1024)
+        self.assertFalse(p1.share_trajectory_prefixes)
+        self.assertIsInstance(m.get_flow_cache(p1), fc.FlowCache)
+
+    def test_set(self):
+        p1 = p.Parameters()
+        p1.set_flow_cache_size(1024)
+        p1.set_share_trajectory_prefixes(True)
+        self.assertTrue(p1.share_trajectory_prefixes)
+        self.assertIsInstance(m.get_flow_cache(p1), fc.TrajectoryStore)
+
+class TestSetFlowMapTolerance(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertIsNone(p1.flow_map_tolerance)
+
+    def test_set(self):
+        p1 = p.Parameters()
+        p1.set_flow_map_tolerance(0.01)
+        self.assertEqual(p1.flow_map_tolerance, 0.01)
+
+    def test_recovery_not_allowed(self):
+        p1 = p.Parameters()
+        p1.set_flow_map_tolerance(0.01)
+        p1.set_recovery_rate(0.01)
+        with self.assertRaises(ValueError):
+            m.get_flow_map_store(p1)
+
+    def test_parallel_not_allowed(self):
+        p1 = p.Parameters()
+        p1.set_file_name("test_flow_map_parallel")
+        p1.set_n_reps(2)
+        p1.set_n_bottlenecks(2)
+        p1.set_flow_map_tolerance(0.5)
+        p1.set_engine("Parallel")
+        with self.assertRaises(ValueError):
+            m.run(p1)
+
+class TestSetExportSchedule(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertFalse(p1.export_schedule)
+
+    def test_set(self):
+        p1 = p.Parameters()
+        p1.set_export_schedule(True)
+        self.assertTrue(p1.export_schedule)
+
+class TestSetReplaySchedule(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertIsNone(p1.replay_schedule)
+
+    def test_set(self):
+        value = "data_bottleneck_schedule"
+        p1 = p.Parameters()
+        p1.set_replay_schedule(value)
+        self.assertEqual(p1.replay_schedule, value)
+
+class TestSetCheckpointInterval(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertEqual(p1.checkpoint_interval, 0)
+
+    def test_set(self):
+        p1 = p.Parameters()
+        p1.set_checkpoint_interval(5)
+        self.assertEqual(p1.checkpoint_interval, 5)
+
+    def test_invalid(self):
+        p1 = p.Parameters()
+        with self.assertRaises(ValueError):
+            p1.set_checkpoint_interval(-1)
+
+class TestSetResultCache(unittest.TestCase):
+    def test_default(self):
+        p1 = p.Parameters()
+        self.assertFalse(p1.result_cache)
+
+    def test_set(self):
+        p1 = p.Parameters()
+        p1.set_result_cache(True)
+        self.assertTrue(p1.result_cache)
+
 class TestGetRange(unittest.TestCase):
     def test_max_zero(self):
         min = 10
@@ -535,6 +743,49 @@ class TestGetRange(unittest.TestCase):
 
 
 ####Testing model.py
+def run_model(file_name: str, engine: str, **settings) -> str:
+    '''Runs the model on a few short parameter sets and returns the data it
+    wrote. Every setting is given to the setter method of the same name (a
+    tuple is given as separate arguments), after the defaults of these tests.
+    The series number and the random number generator are reset first, so
+    every run starts from the same state.
+    '''
+    p1 = p.Parameters()
+    p1.set_file_name(file_name)
+    p1.set_n_reps(3)
+    p1.set_n_bottlenecks(3)
+    p1.set_engine(engine)
+    p1.set_n_workers(2)
+    for name, value in settings.items():
+        setter = getattr(p1, f"set_{name}")
+        if isinstance(value, tuple):
+            setter(*value)
+        else:
+            setter(value)
+
+    m.series = 1
+    m.random_number_generator = np.random.default_rng(p1.seed)
+    m.run(p1)
+    return read_output(file_name)
+
+def read_output(file_name: str) -> str:
+    '''Returns the contents of a .csv file in the output folder.'''
+    with open(f"output/{file_name}.csv") as f:
+        return f.read()
+
+def remove_output(file_names: list[str]) -> None:
+    '''Removes the .csv files, bottleneck schedules, and checkpoints that runs
+    of run_model have written, and resets the series number and the random
+    number generator of the model.
+    '''
+    m.series = 1
+    m.random_number_generator = np.random.default_rng(92500169789667897205027529303633824467)
+    for file_name in file_names:
+        for path in [f"output/{file_name}.csv", f"output/{file_name}_bottleneck_schedule.csv",
+                     f"output/{file_name}_checkpoint.pkl"]:
+            if os.path.exists(path):
+                os.remove(path)
+
 class TestRunModel(unittest.TestCase):
     '''The main unique things in this function are incrementing the series
     number and calling run_timepoint multiple times. I will run a model with
@@ -590,6 +841,62 @@ class TestRunModel(unittest.TestCase):
         self.assertAlmostEqual(s, 32)
         
 
+class TestRunSegment(unittest.TestCase):
+    '''run_segment should draw the same random numbers as run_model, so the 
+    final population state should be the same whether or not it is logged.
+    '''
+    def tearDown(self):
+        m.series = 1
+
+    def test_same_as_logged(self):
+        model_parameters = {"n_timepoints": 50, "fractional_timestep_size": 1.0,
+                            "s": 900, "i": 100, "r": 0,
+                            "birth_function": m.get_regulated_births,
+                            "host_birth_rate": 0.1, "carrying_capacity": 1000,
+                            "parasite_fecundity_effect": 0,
+                            "transmission_function": m.get_ddt_infections,
+                            "transmission_rate": 0.0001, "s_death_rate": 0.01,
+                            "i_death_rate": 0.01, "r_death_rate": 0.01,
+                            "recovery_rate": 0.01}
+        m.random_number_generator = np.random.default_rng(1)
+        logged = m.run_model(l.Dataframe(file_name = "test1"), current_rep = 0,
+                             is_logging = True, **model_parameters)
+        m.random_number_generator = np.random.default_rng(1)
+        not_logged = m.run_segment(**model_parameters)
+        self.assertEqual(logged, not_logged)
+
+class TestRunModelFlowCache(unittest.TestCase):
+    '''run_model should log and return exactly the same data with and without
+    a flow cache, and only calculate a trajectory the first time.
+    '''
+    def tearDown(self):
+        m.series = 1
+
+    def test_same_as_uncached(self):
+        model_parameters = {"n_timepoints": 30, "fractional_timestep_size": 0.5,
+                            "s": 90, "i": 10, "r": 0,
+                            "birth_function": m.get_regulated_births,
+                            "host_birth_rate": 0.1, "carrying_capacity": 1000,
+                            "parasite_fecundity_effect": 0.2,
+                            "transmission_function": m.get_ddt_infections,
+                            "transmission_rate": 0.0001, "s_death_rate": 0.01,
+                            "i_death_rate": 0.02, "r_death_rate": 0.01,
+                            "recovery_rate": 0.01}
+        uncached = l.Dataframe(file_name = "test1")
+        m.series = 2
+        expected = m.run_model(uncached, 0, True, **model_parameters)
+
+        cached = l.Dataframe(file_name = "test1")
+        flow_cache = fc.FlowCache()
+        for _ in range(3):
+            m.series = 2
+            result = m.run_model(cached, 0, True, flow_cache=flow_cache, 
+                                 **model_parameters)
+            self.assertEqual(result, expected)
+        self.assertEqual(cached.get_data_rows()[-31:], uncached.get_data_rows())
+        self.assertEqual(flow_cache.get_statistics()["Misses"], 1)
+        self.assertEqual(flow_cache.get_statistics()["Hits"], 2)
+
 class TestRunTimepoint(unittest.TestCase):
     '''Combines the results from several sub functions that are tested below.
     The main thing is to check that it is combining them correctly and that it
@@ -622,6 +929,61 @@ class TestRunTimepoint(unittest.TestCase):
         self.assertEqual(r, 0)
 
 
+class TestRunModelParasiteFree(unittest.TestCase):
+    '''Without infected hosts, the parasite-free shortcut should log exactly
+    the same data as run_model, and should reuse trajectories that start from
+    a population it has already seen.
+    '''
+    def tearDown(self):
+        m.series = 1
+
+    def run_both(self, n_timepoints, s, r, trajectories):
+        host_parameters = {"fractional_timestep_size": 0.1,
+                           "birth_function": m.get_regulated_births,
+                           "host_birth_rate": 0.1, "carrying_capacity": 100,
+                           "parasite_fecundity_effect": 0, "s_death_rate": 0.01,
+                           "r_death_rate": 0.02}
+        dataframe = l.Dataframe(file_name = "test1")
+        dataframe.add_constant_data({})
+        expected = m.run_model(dataframe, 0, True, n_timepoints, s=s, i=0, r=r,
+                               transmission_function=m.get_ddt_infections,
+                               transmission_rate=0.01, i_death_rate=0.1,
+                               recovery_rate=0.1, **host_parameters)
+        parasite_free_dataframe = l.Dataframe(file_name = "test1")
+        parasite_free_dataframe.add_constant_data({})
+        result = m.run_model_parasite_free(parasite_free_dataframe, 0, True,
+                                           n_timepoints, s=s, r=r,
+                                           trajectories=trajectories,
+                                           **host_parameters)
+        rows = dataframe.get_data_rows()
+        for row in rows:
+            row["Series"] += 1 #run_model was called first
+        return expected, result, rows, parasite_free_dataframe.get_data_rows()
+
+    def test_matches_run_model(self):
+        expected, result, rows, parasite_free_rows = self.run_both(10, 10, 5, {})
+        self.assertEqual(result, expected)
+        self.assertEqual(parasite_free_rows, rows)
+        self.assertEqual(m.series, 3)
+
+    def test_reuses_trajectories(self):
+        trajectories = {}
+        self.run_both(10, 10, 0, trajectories)
+        self.assertEqual(len(trajectories[(10, 0)]), 11)
+
+        #A shorter period from the same start is read from the stored trajectory
+        expected, result, rows, parasite_free_rows = self.run_both(5, 10, 0, trajectories)
+        self.assertEqual(result, expected)
+        self.assertEqual(parasite_free_rows, rows)
+        self.assertEqual(len(trajectories[(10, 0)]), 11)
+
+        #A longer one extends it
+        expected, result, rows, parasite_free_rows = self.run_both(15, 10, 0, trajectories)
+        self.assertEqual(result, expected)
+        self.assertEqual(parasite_free_rows, rows)
+        self.assertEqual(len(trajectories[(10, 0)]), 16)
+        self.assertEqual(len(trajectories), 1)
+
 class TestGetTimeTillBottleneck(unittest.TestCase):
     def test_no_variance(self):
         time_till_bottleneck_mean = 100
@@ -690,6 +1052,33 @@ class TestGetBottleneckSize(unittest.TestCase):
         self.assertLessEqual(mean, bottleneck_size_mean + tolerance)
             
       
+class TestGetTruncatedBottleneckSizes(unittest.TestCase):
+    def test_no_bigger_than_population(self):
+        n = 1000
+        sizes = m.get_truncated_bottleneck_sizes(np.full(n, 1.0), np.full(n, 510.0),
+                                                 np.full(n, 300.7))
+        self.assertEqual(len(sizes), n)
+        self.assertLessEqual(sizes.max(), 300)
+        self.assertGreaterEqual(sizes.min(), 0)
+
+    def test_population_far_below_mean(self):
+        #Redrawing would practically never fit, so almost every size is the whole population
+        sizes = m.get_truncated_bottleneck_sizes(np.array([400.0]), np.array([1.25]),
+                                                 np.array([10.0]))
+        self.assertEqual(sizes[0], 10)
+
+    def test_truncated_distribution(self):
+        #Shape 1 is an exponential distribution, so the chance that a draw rounds to 0 is known
+        n = 100000
+        scale = 100
+        total_pop_size = 5
+        chance = (1 - math.exp(-0.5 / scale)) / (1 - math.exp(-5.5 / scale))
+
+        sizes = m.get_truncated_bottleneck_sizes(np.full(n, 1.0), np.full(n, float(scale)),
+                                                 np.full(n, total_pop_size))
+        self.assertAlmostEqual(np.mean(sizes == 0), chance, delta=0.005)
+        self.assertLessEqual(sizes.max(), total_pop_size)
+
 class TestGetBottleneckSurvivors(unittest.TestCase):
     def test_guaranteed_sampling_s(self):
         s = 1000
@@ -821,6 +1210,442 @@ class TestGetBottleneckSurvivors(unittest.TestCase):
             
     
 
+class TestRunParameterSetBatched(unittest.TestCase):
+    '''The batched engine should log data in exactly the same layout as
+    run_parameter_set. Without any infected hosts, the bottleneck survivors are
+    no longer random, so both engines should produce identical data.
+    '''
+    def tearDown(self):
+        m.series = 1
+
+    def run_engine(self, run_function, n_reps, n_bottlenecks, burn_in,
+                   initial_prevalence, time_till_bottleneck_cv):
+        dataframe = l.Dataframe(file_name = "test1")
+        run_function(dataframe, n_reps=n_reps, n_bottlenecks=n_bottlenecks,
+                     burn_in=burn_in, initial_popsize=1000,
+                     initial_prevalence=initial_prevalence,
+                     bottleneck_size_mean=100, bottleneck_size_cv=0,
+                     time_till_bottleneck_mean=20,
+                     time_till_bottleneck_cv=time_till_bottleneck_cv,
+                     host_birth_rate=0.1, carrying_capacity=1000,
+                     birth_function=m.get_regulated_births,
+                     parasite_fecundity_effect=0, s_death_rate=0.01,
+                     i_death_rate=0, r_death_rate=0, transmission_rate=0.0001,
+                     transmission_function=m.get_ddt_infections,
+                     recovery_rate=0, fractional_timestep_size=1.0)
+        return dataframe.get_data_rows()
+
+    def test_matches_serial_without_infection(self):
+        m.series = 1
+        serial_rows = self.run_engine(m.run_parameter_set, n_reps=3,
+                                      n_bottlenecks=4, burn_in=1,
+                                      initial_prevalence=0,
+                                      time_till_bottleneck_cv=0)
+        serial_series = m.series
+
+        m.series = 1
+        batched_rows = self.run_engine(m.run_parameter_set_batched, n_reps=3,
+                                       n_bottlenecks=4, burn_in=1,
+                                       initial_prevalence=0,
+                                       time_till_bottleneck_cv=0)
+        
+        self.assertEqual(m.series, serial_series)
+        self.assertEqual(len(batched_rows), len(serial_rows))
+        for batched_row, serial_row in zip(batched_rows, serial_rows):
+            self.assertEqual(batched_row["Rep"], serial_row["Rep"])
+            self.assertEqual(batched_row["Series"], serial_row["Series"])
+            self.assertEqual(batched_row["Timepoint"], serial_row["Timepoint"])
+            self.assertAlmostEqual(batched_row["S"], serial_row["S"])
+            self.assertAlmostEqual(batched_row["I"], serial_row["I"])
+            self.assertAlmostEqual(batched_row["R"], serial_row["R"])
+
+    def test_variable_bottleneck_timing(self):
+        n_reps = 5
+        n_bottlenecks = 3
+        m.series = 1
+        rows = self.run_engine(m.run_parameter_set_batched, n_reps=n_reps,
+                               n_bottlenecks=n_bottlenecks, burn_in=0,
+                               initial_prevalence=0.5,
+                               time_till_bottleneck_cv=0.5)
+        
+        self.assertEqual(m.series, 1 + n_reps * n_bottlenecks)
+        for rep in range(n_reps):
+            for n in range(n_bottlenecks):
+                series_rows = [row for row in rows 
+                               if row["Series"] == 1 + rep * n_bottlenecks + n]
+                timepoints = [row["Timepoint"] for row in series_rows]
+                self.assertEqual(timepoints, list(range(len(series_rows))))
+                for row in series_rows:
+                    self.assertEqual(row["Rep"], rep)
+            
+        #After each bottleneck, the population should be exactly the bottleneck size
+        for row in rows:
+            is_first_series_of_rep = (row["Series"] - 1) % n_bottlenecks == 0
+            if row["Timepoint"] == 0 and not is_first_series_of_rep:
+                self.assertAlmostEqual(row["S"] + row["I"] + row["R"], 100)
+
+
+class TestRunSweep(unittest.TestCase):
+    '''Without any infected hosts, the bottleneck survivors are no longer
+    random, so the sweep engine should write exactly the same data as running
+    the parameter sets and replicates one at a time.
+    '''
+    settings = {"burn_in": 1, "initial_prevalence": 0, "time_till_bottleneck_mean": (20, 40, 10),
+                "host_birth_rate": (0.05, 0.1, 0.05), "sweep_chunk_size": 7}
+
+    def tearDown(self):
+        remove_output(["test_sweep_serial", "test_sweep_sweep", "test_sweep_batched"])
+
+    def test_matches_serial(self):
+        serial_data = run_model("test_sweep_serial", "Serial", **self.settings)
+        serial_series = m.series
+        sweep_data = run_model("test_sweep_sweep", "Sweep", **self.settings)
+
+        self.assertEqual(m.series, serial_series)
+        self.assertEqual(sweep_data, serial_data)
+
+    def test_random_bottlenecks(self):
+        #Every lane draws from the streams of its own replicate, so neither the chunks nor
+        #the engine change the data
+        settings = {"burn_in": 1, "time_till_bottleneck_mean": (20, 40, 10),
+                    "time_till_bottleneck_cv": 0.5, "bottleneck_size_cv": 0.3,
+                    "transmission_rate": (0.0001, 0.0003, 0.0001), "recovery_rate": (0, 0.02, 0.02)}
+        serial_data = run_model("test_sweep_serial", "Serial", **settings)
+        self.assertEqual(run_model("test_sweep_sweep", "Sweep", **settings, sweep_chunk_size=1),
+                         serial_data)
+        self.assertEqual(run_model("test_sweep_sweep", "Sweep", **settings, sweep_chunk_size=1000),
+                         serial_data)
+        self.assertEqual(run_model("test_sweep_batched", "Batched", **settings), serial_data)
+
+    def test_subset_of_parameter_sets(self):
+        settings = {"burn_in": 1, "time_till_bottleneck_cv": 0.5, "bottleneck_size_cv": 0.3}
+        all_data = run_model("test_sweep_sweep", "Sweep", **settings,
+                             time_till_bottleneck_mean=(20, 40, 10)).splitlines()
+        subset_data = run_model("test_sweep_serial", "Sweep", **settings,
+                                time_till_bottleneck_mean=(30, 40, 10)).splitlines()
+
+        #The rows of the last two parameter sets, apart from their Series numbers
+        series_column = all_data[0].split(",").index("Series")
+        for row, subset_row in zip(all_data[-len(subset_data) + 1:], subset_data[1:]):
+            row, subset_row = row.split(","), subset_row.split(",")
+            del row[series_column], subset_row[series_column]
+            self.assertEqual(row, subset_row)
+
+
+class TestResumeRun(unittest.TestCase):
+    '''A run that is interrupted after a checkpoint, and then run again with
+    the same parameters, should resume after the checkpoint and write exactly
+    the same files as a run that wasn't interrupted.
+    '''
+    class Interruption(Exception):
+        pass
+
+    settings = {"time_till_bottleneck_mean": (20, 50, 10), "time_till_bottleneck_cv": 0.5,
+                "bottleneck_size_cv": 0.2, "sweep_chunk_size": 6, "export_schedule": True,
+                "checkpoint_interval": 1}
+
+    def setUp(self):
+        self.save_checkpoint = m.save_checkpoint
+
+    def tearDown(self):
+        m.save_checkpoint = self.save_checkpoint
+        remove_output(["test_resume_uninterrupted", "test_resume_interrupted"])
+
+    def run_engine(self, engine, file_name, interrupt_after = None, **settings):
+        def save_checkpoint(checkpoint, n_completed, **state):
+            self.save_checkpoint(checkpoint, n_completed, **state)
+            if interrupt_after is not None and n_completed >= interrupt_after:
+                #Part of the next parameter set has already been written
+                with open(f"output/{file_name}.csv", 'a') as f:
+                    f.write("1,2,3\n")
+                raise self.Interruption()
+        m.save_checkpoint = save_checkpoint
+        try:
+            run_model(file_name, engine, **dict(self.settings, **settings))
+        except self.Interruption:
+            pass
+
+    def read_files(self, file_name):
+        return [read_output(file_name), read_output(f"{file_name}_bottleneck_schedule")]
+
+    def test_resume(self):
+        for engine in ["Serial", "Batched", "Sweep"]:
+            with self.subTest(engine=engine):
+                self.run_engine(engine, "test_resume_uninterrupted")
+                self.run_engine(engine, "test_resume_interrupted", interrupt_after=2)
+                self.assertTrue(os.path.exists("output/test_resume_interrupted_checkpoint.pkl"))
+                self.run_engine(engine, "test_resume_interrupted")
+
+                self.assertEqual(self.read_files("test_resume_interrupted"),
+                                 self.read_files("test_resume_uninterrupted"))
+                self.assertFalse(os.path.exists("output/test_resume_interrupted_checkpoint.pkl"))
+
+    def test_different_parameters(self):
+        self.run_engine("Serial", "test_resume_interrupted", interrupt_after=1)
+        with self.assertRaises(ValueError):
+            self.run_engine("Serial", "test_resume_interrupted", n_bottlenecks=4)
+
+class TestResultCache(unittest.TestCase):
+    '''A run that takes some of its parameter sets from the result cache 
+    should write exactly the same data as a run that calculates all of them.
+    '''
+    settings = {"time_till_bottleneck_cv": 0.5, "bottleneck_size_cv": 0.2}
+
+    def setUp(self):
+        self.cache_folder = rc.CACHE_FOLDER
+        rc.CACHE_FOLDER = "output/test_result_cache"
+
+    def tearDown(self):
+        rc.CACHE_FOLDER = self.cache_folder
+        if os.path.exists("output/test_result_cache"):
+            shutil.rmtree("output/test_result_cache")
+        remove_output(["test_cache_cached", "test_cache_calculated"])
+
+    def test_extended_range(self):
+        for engine in ["Serial", "Batched", "Parallel"]:
+            with self.subTest(engine=engine):
+                run_model("test_cache_cached", engine, **self.settings,
+                          time_till_bottleneck_mean=(20, 40, 10), result_cache=True)
+                self.assertEqual(len(os.listdir("output/test_result_cache")), 3)
+                cached = run_model("test_cache_cached", engine, **self.settings,
+                                   time_till_bottleneck_mean=(20, 60, 10), result_cache=True)
+                self.assertEqual(len(os.listdir("output/test_result_cache")), 5)
+                calculated = run_model("test_cache_calculated", engine, **self.settings,
+                                       time_till_bottleneck_mean=(20, 60, 10))
+                self.assertEqual(cached, calculated)
+                shutil.rmtree("output/test_result_cache")
+
+    def test_serial_and_parallel_share(self):
+        settings = dict(self.settings, time_till_bottleneck_mean=(20, 60, 10))
+        run_model("test_cache_calculated", "Serial", **settings, result_cache=True)
+        self.assertEqual(run_model("test_cache_cached", "Parallel", **settings,
+                                   result_cache=True),
+                         run_model("test_cache_calculated", "Serial", **settings))
+        self.assertEqual(len(os.listdir("output/test_result_cache")), 5)
+
+    def test_different_inputs(self):
+        p1 = p.Parameters()
+        p2 = p.Parameters()
+        p2.set_n_reps(3)
+        cache = rc.ResultCache()
+        parameter_set = [0.1, 100, 0, 100, 0, 0.1, 0, 0.01, 0.01, 0.01, 0.001, 0.1]
+        schedule = (np.zeros((1, 2), dtype=int), np.zeros((1, 2), dtype=int))
+        self.assertEqual(cache.get_key(p1, parameter_set, schedule),
+                         cache.get_key(p.Parameters(), parameter_set, schedule))
+        self.assertNotEqual(cache.get_key(p1, parameter_set, schedule),
+                            cache.get_key(p2, parameter_set, schedule))
+        self.assertNotEqual(cache.get_key(p1, parameter_set, schedule),
+                            cache.get_key(p1, [0.2] + parameter_set[1:], schedule))
+
+    def test_sweep_not_allowed(self):
+        with self.assertRaises(ValueError):
+            run_model("test_cache_cached", "Sweep", **self.settings,
+                      time_till_bottleneck_mean=(20, 40, 10), result_cache=True)
+
+class TestRunParallel(unittest.TestCase):
+    '''The parallel engine should write exactly the same data no matter how 
+    many workers are used, with the same series numbers as the serial engine.
+    '''
+    settings = {"n_reps": 5, "burn_in": 1, "time_till_bottleneck_mean": (20, 40, 20),
+                "time_till_bottleneck_cv": 0.2, "bottleneck_size_cv": 0.2}
+
+    def tearDown(self):
+        remove_output(["test_parallel_1", "test_parallel_3", "test_parallel_serial"])
+
+    def test_worker_count(self):
+        data_1 = run_model("test_parallel_1", "Parallel", **self.settings, n_workers=1)
+        series_1 = m.series
+        data_3 = run_model("test_parallel_3", "Parallel", **self.settings, n_workers=3)
+        series_3 = m.series
+        serial_data = run_model("test_parallel_serial", "Serial", **self.settings)
+
+        self.assertEqual(data_3, data_1)
+        self.assertEqual(data_1, serial_data)
+        self.assertEqual(series_1, m.series)
+        self.assertEqual(series_3, m.series)
+
+    def test_no_parameter_sets(self):
+        #A range whose maximum is below its minimum has no values, so no data are written
+        with self.assertRaises(FileNotFoundError):
+            run_model("test_parallel_1", "Parallel",
+                      **dict(self.settings, time_till_bottleneck_mean=(50, 40, 10)))
+        self.assertEqual(m.series, 1)
+
+class TestGetBottleneckSchedule(unittest.TestCase):
+    def test_shape(self):
+        key = m.get_random_key(1)
+        time_till_bottleneck, bottleneck_size_draws = m.get_bottleneck_schedule(4, 6, 100, 0.5,
+                                                                                10, 0.5, key)
+        self.assertEqual(time_till_bottleneck.shape, (4, 6))
+        self.assertEqual(bottleneck_size_draws.shape, (4, 6))
+        self.assertTrue(np.all(time_till_bottleneck >= 1))
+        self.assertTrue(np.all(bottleneck_size_draws >= 0))
+
+    def test_replicate_prefix(self):
+        key = m.get_random_key(1)
+        short = m.get_bottleneck_schedule(2, 6, 100, 0.5, 10, 0.5, key)
+        long = m.get_bottleneck_schedule(5, 6, 100, 0.5, 10, 0.5, key)
+        np.testing.assert_array_equal(long[0][:2], short[0])
+        np.testing.assert_array_equal(long[1][:2], short[1])
+
+    def test_parameter_set_streams(self):
+        key = m.get_random_key(1)
+        first = m.get_bottleneck_schedule(3, 6, 100, 0.5, 10, 0.5, key, 0)
+        second = m.get_bottleneck_schedule(3, 6, 100, 0.5, 10, 0.5, key, 1)
+        self.assertFalse(np.array_equal(first[0], second[0]))
+
+class TestReplaySchedule(unittest.TestCase):
+    '''A run that replays the exported schedule of another run should have
+    exactly the same bottlenecks, and therefore exactly the same data when the
+    random numbers of the bottleneck survivors are the same.
+    '''
+    settings = {"n_bottlenecks": 4, "time_till_bottleneck_mean": (20, 40, 20),
+                "time_till_bottleneck_cv": 0.5, "bottleneck_size_cv": 0.5,
+                "export_schedule": True}
+
+    def tearDown(self):
+        remove_output(["test_schedule_drawn", "test_schedule_replayed"])
+
+    def test_replay(self):
+        for engine in ["Serial", "Batched", "Sweep", "Parallel"]:
+            with self.subTest(engine=engine):
+                drawn_data = run_model("test_schedule_drawn", engine, **self.settings)
+                replayed_data = run_model("test_schedule_replayed", engine, **self.settings,
+                                          replay_schedule="test_schedule_drawn_bottleneck_schedule")
+                self.assertEqual(read_output("test_schedule_replayed_bottleneck_schedule"),
+                                 read_output("test_schedule_drawn_bottleneck_schedule"))
+                self.assertEqual(replayed_data, drawn_data)
+
+    def test_different_bottlenecks(self):
+        run_model("test_schedule_drawn", "Serial", **self.settings)
+        with self.assertRaises(ValueError):
+            run_model("test_schedule_replayed", "Serial", **dict(self.settings, n_bottlenecks=5),
+                      replay_schedule="test_schedule_drawn_bottleneck_schedule")
+
+    def test_other_parameter_sets(self):
+        for engine in ["Serial", "Batched", "Sweep", "Parallel"]:
+            with self.subTest(engine=engine):
+                drawn_data = run_model("test_schedule_drawn", engine,
+                                       **dict(self.settings,
+                                              time_till_bottleneck_mean=(20, 60, 20)))
+                drawn_data = drawn_data.splitlines()
+                #The last two parameter sets of the drawn run, one position earlier
+                replayed_data = run_model("test_schedule_replayed", engine,
+                                          **dict(self.settings,
+                                                 time_till_bottleneck_mean=(40, 60, 20)),
+                                          replay_schedule="test_schedule_drawn_bottleneck_schedule")
+                replayed_data = replayed_data.splitlines()
+
+                #The rows of the last two parameter sets, apart from their Series numbers
+                series_column = drawn_data[0].split(",").index("Series")
+                for row, replayed_row in zip(drawn_data[-len(replayed_data) + 1:],
+                                             replayed_data[1:]):
+                    row, replayed_row = row.split(","), replayed_row.split(",")
+                    del row[series_column], replayed_row[series_column]
+                    self.assertEqual(row, replayed_row)
+
+    def test_missing_parameter_set(self):
+        run_model("test_schedule_drawn", "Serial", **self.settings)
+        with self.assertRaises(ValueError):
+            run_model("test_schedule_replayed", "Serial",
+                      **dict(self.settings, time_till_bottleneck_mean=(20, 80, 20)),
+                      replay_schedule="test_schedule_drawn_bottleneck_schedule")
+
+class TestSeedRandomNumberGenerator(unittest.TestCase):
+    '''Every bottleneck cycle of every replicate should get its own stream,
+    which can be recreated on its own.
+    '''
+    def tearDown(self):
+        m.series = 1
+        m.random_number_generator = np.random.default_rng(92500169789667897205027529303633824467)
+
+    def test_streams(self):
+        random_key = m.get_random_key(1)
+        m.seed_random_number_generator(random_key, 2, 3, 4)
+        draws = m.random_number_generator.random(5)
+        m.seed_random_number_generator(random_key, 2, 3, 5)
+        other_draws = m.random_number_generator.random(5)
+        m.seed_random_number_generator(random_key, 2, 3, 4)
+        np.testing.assert_array_equal(m.random_number_generator.random(5), draws)
+        self.assertFalse(np.any(draws == other_draws))
+
+    def test_replicate_on_its_own(self):
+        run_arguments = {"n_bottlenecks": 3, "burn_in": 0, "initial_popsize": 1000,
+                         "initial_prevalence": 0.1, "bottleneck_size_mean": 50,
+                         "bottleneck_size_cv": 0.2, "time_till_bottleneck_mean": 20,
+                         "time_till_bottleneck_cv": 0.3, "host_birth_rate": 0.1,
+                         "carrying_capacity": 1000, 
+                         "birth_function": m.get_regulated_births,
+                         "parasite_fecundity_effect": 0, "s_death_rate": 0.01,
+                         "i_death_rate": 0.01, "r_death_rate": 0.01,
+                         "transmission_rate": 0.0001, 
+                         "transmission_function": m.get_ddt_infections,
+                         "recovery_rate": 0.01, "fractional_timestep_size": 1.0,
+                         "random_key": m.get_random_key(7), "stream_index": 1}
+        all_reps = l.Dataframe(file_name = "test1")
+        all_reps.add_constant_data({})
+        m.run_parameter_set(all_reps, n_reps=4, **run_arguments)
+        one_rep = l.Dataframe(file_name = "test1")
+        one_rep.add_constant_data({})
+        m.series = 7
+        m.run_parameter_set(one_rep, n_reps=1, first_rep=2, **run_arguments)
+        self.assertEqual(one_rep.get_data_rows(),
+                         [row for row in all_reps.get_data_rows() if row["Rep"] == 2])
+
+class TestRunMarkovChain(unittest.TestCase):
+    def tearDown(self):
+        if os.path.exists("output/test_markov_chain_exact_extinction_probability.csv"):
+            os.remove("output/test_markov_chain_exact_extinction_probability.csv")
+
+    def test_one_row_per_bottleneck(self):
+        p1 = p.Parameters()
+        p1.set_file_name("test_markov_chain")
+        p1.set_n_bottlenecks(4)
+        p1.set_bottleneck_size_mean(10, 20, 10)
+        p1.set_time_till_bottleneck_mean(20)
+        p1.set_time_till_bottleneck_cv(0.5)
+        p1.set_engine("MarkovChain")
+        m.run(p1)
+        with open("output/test_markov_chain_exact_extinction_probability.csv") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([row["Bottleneck"] for row in rows], ["1", "2", "3", "4"] * 2)
+        probabilities = [float(row["ExtinctionProbability"]) for row in rows]
+        self.assertEqual(probabilities[:4], sorted(probabilities[:4]))
+        self.assertTrue(all(0 <= probability <= 1 for probability in probabilities))
+
+    def test_bottleneck_size_cv_not_allowed(self):
+        p1 = p.Parameters()
+        p1.set_bottleneck_size_cv(0.1)
+        p1.set_engine("MarkovChain")
+        with self.assertRaises(ValueError):
+            m.run(p1)
+
+class TestGetBottleneckSurvivorsBatched(unittest.TestCase):
+    def test_guaranteed_sampling(self):
+        s = np.array([1000.0, 0.0, 0.0])
+        i = np.array([0.0, 1000.0, 0.0])
+        r = np.array([0.0, 0.0, 1000.0])
+        bottleneck_size = np.array([100, 50, 10])
+
+        new_s, new_i, new_r = m.get_bottleneck_survivors_batched(s, i, r, 
+                                                                 bottleneck_size)
+        self.assertEqual(list(new_s), [100, 0, 0])
+        self.assertEqual(list(new_i), [0, 50, 0])
+        self.assertEqual(list(new_r), [0, 0, 10])
+
+    def test_survivors_sum_to_bottleneck_size(self):
+        n_lanes = 1000
+        s = np.full(n_lanes, 300.5)
+        i = np.full(n_lanes, 500.5)
+        r = np.full(n_lanes, 199.0)
+        bottleneck_size = np.full(n_lanes, 100)
+
+        new_s, new_i, new_r = m.get_bottleneck_survivors_batched(s, i, r, 
+                                                                 bottleneck_size)
+        self.assertTrue(np.all(new_s + new_i + new_r == 100))
+        self.assertAlmostEqual(np.mean(new_i) / 100, 500.5 / 1000, delta=0.05)
+
+
 class TestGetRegulatedBirths(unittest.TestCase):
 
     def test_no_host_birth(self):
@@ -1460,5 +2285,444 @@ class TestGetRecoveries(unittest.TestCase):
 
 
 
+####Testing logger.py
+class TestWriteData(unittest.TestCase):
+    '''Each call to write_data should only append the rows logged since the
+    previous call, below a single header, and then forget them.
+    '''
+    def tearDown(self):
+        if os.path.exists("output/test_write_data.csv"):
+            os.remove("output/test_write_data.csv")
+
+    def test_streaming(self):
+        dataframe = l.Dataframe(file_name = "test_write_data")
+        dataframe.add_constant_data({"BirthRate": 0.1})
+        dataframe.log_data(True, [[0, 1, 0, 10, 0, 0], [0, 1, 1, 11, 0, 0]])
+        dataframe.write_data()
+        self.assertEqual(dataframe.get_data_rows(), [])
+
+        dataframe.add_constant_data({"BirthRate": 0.2})
+        dataframe.log_data(True, [[0, 2, 0, 10, 0, 0]])
+        dataframe.write_data()
+        self.assertEqual(dataframe.get_data_rows(), [])
+
+        with open("output/test_write_data.csv") as f:
+            rows = f.read().splitlines()
+        self.assertEqual(rows, ["Rep,Series,Timepoint,S,I,R,BirthRate",
+                                "0,1,0,10.0,0.0,0.0,0.1", "0,1,1,11.0,0.0,0.0,0.1",
+                                "0,2,0,10.0,0.0,0.0,0.2"])
+
+    def test_log_columns(self):
+        dataframe = l.Dataframe(file_name = "test_write_data")
+        dataframe.add_constant_data({"BirthRate": 0.1})
+        dataframe.log_columns(True, [2, 5, np.arange(3), np.array([1.0, 2.0, 3.0]),
+                                     0, np.array([0.5, 0.5, 0.5])])
+        dataframe.log_columns(False, [3, 6, np.arange(3), 0, 0, 0])
+
+        rows = dataframe.get_data_rows()
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[2], {"Rep": 2, "Series": 5, "Timepoint": 2, "S": 3.0,
+                                   "I": 0.0, "R": 0.5, "BirthRate": 0.1})
+
+    def test_merge(self):
+        dataframe = l.Dataframe(file_name = "test_write_data")
+        dataframe.add_constant_data({"BirthRate": 0.1})
+        dataframe.log_data(True, [[0, 1, 0, 10, 0, 0]])
+        other = l.Dataframe(file_name = "test_write_data")
+        other.add_constant_data({"BirthRate": 0.2})
+        other.log_data(True, [[0, 2, 0, 20, 0, 0]] * (l.Dataframe.CHUNK_SIZE + 1))
+
+        dataframe.merge(other)
+        rows = dataframe.get_data_rows()
+        self.assertEqual(len(rows), l.Dataframe.CHUNK_SIZE + 2)
+        self.assertEqual(rows[0]["BirthRate"], 0.1)
+        self.assertEqual(rows[-1]["BirthRate"], 0.2)
+        self.assertEqual(rows[-1]["S"], 20)
+
+    def test_overwrites_old_file(self):
+        with open("output/test_write_data.csv", "w") as f:
+            f.write("old data\n")
+        dataframe = l.Dataframe(file_name = "test_write_data")
+        dataframe.add_constant_data({"BirthRate": 0.1})
+        dataframe.write_data()
+
+        with open("output/test_write_data.csv") as f:
+            rows = f.read().splitlines()
+        self.assertEqual(len(rows), 1)
+
+class TestWriteNormalizedData(unittest.TestCase):
+    '''The "Normalized" format should write every parameter set once to the 
+    params file, and join_normalized_data should rebuild the "Wide" file.
+    '''
+    def tearDown(self):
+        for suffix in ["", "_params", "_series", "_wide"]:
+            if os.path.exists(f"output/test_write_data{suffix}.csv"):
+                os.remove(f"output/test_write_data{suffix}.csv")
+
+    def log(self, dataframe):
+        dataframe.add_constant_data({"BirthRate": 0.1, "DeathRate": 0.5})
+        dataframe.log_data(True, [[0, 1, 0, 10, 0, 0], [0, 1, 1, 11, 0, 0]])
+        dataframe.write_data()
+        dataframe.add_constant_data({"BirthRate": 0.2, "DeathRate": 0.5})
+        dataframe.log_data(True, [[0, 2, 0, 20, 0, 0]])
+        dataframe.write_data()
+
+    def test_normalized(self):
+        dataframe = l.Dataframe(file_name = "test_write_data", 
+                                output_format = "Normalized")
+        self.log(dataframe)
+
+        with open("output/test_write_data_params.csv") as f:
+            rows = f.read().splitlines()
+        self.assertEqual(rows, ["ParamSetID,BirthRate,DeathRate", 
+                                "0,0.1,0.5", "1,0.2,0.5"])
+        with open("output/test_write_data_series.csv") as f:
+            rows = f.read().splitlines()
+        self.assertEqual(rows, ["ParamSetID,Rep,Series,Timepoint,S,I,R", '0,0,1,0,10.0,0.0,0.0', '0,0,1,1,11.0,0.0,0.0', '1,0,2,0,20.0,0.0,0.0'])
+
+    def test_merge_shares_id(self):
+        dataframe = l.Dataframe(file_name = "test_write_data", 
+                                output_format = "Normalized")
+        dataframe.add_constant_data({"BirthRate": 0.1})
+        for rep in range(2):
+            other = l.Dataframe(file_name = "test_write_data")
+            other.add_constant_data({"BirthRate": 0.1})
+            other.log_data(True, [[rep, 1, 0, 10, 0, 0]])
+            dataframe.merge(other)
+        dataframe.write_data()
+
+        with open("output/test_write_data_params.csv") as f:
+            rows = f.read().splitlines()
+        self.assertEqual(rows, ["ParamSetID,BirthRate", "0,0.1"])
+        with open("output/test_write_data_series.csv") as f:
+            rows = f.read().splitlines()
+        self.assertEqual(rows[1:], ["0,0,1,0,10.0,0.0,0.0", "0,1,1,0,10.0,0.0,0.0"])
+
+    def test_join(self):
+        self.log(l.Dataframe(file_name = "test_write_data"))
+        os.rename("output/test_write_data.csv", "output/test_write_data_wide.csv")
+        self.log(l.Dataframe(file_name = "test_write_data", 
+                             output_format = "Normalized"))
+        l.join_normalized_data("test_write_data")
+
+        with open("output/test_write_data_wide.csv") as f:
+            wide = f.read()
+        with open("output/test_write_data.csv") as f:
+            joined = f.read()
+        self.assertEqual(joined, wide)
+
+class TestWriteBinaryData(unittest.TestCase):
+    '''The "Binary" format should append every column to its .npy file, and
+    read_binary_data should give back the same rows and constant values.
+    '''
+    def tearDown(self):
+        if os.path.exists("output/test_write_data"):
+            shutil.rmtree("output/test_write_data")
+
+    def test_binary(self):
+        dataframe = l.Dataframe(file_name = "test_write_data", 
+                                output_format = "Binary")
+        dataframe.add_constant_data({"BirthRate": 0.1, "BirthType": "Regulated"})
+        dataframe.log_data(True, [[0, 1, 0, 10, 0, 0], [0, 1, 1, 11, 0.5, 0]])
+        expected_rows = dataframe.get_data_rows()
+        dataframe.write_data()
+        dataframe.add_constant_data({"BirthRate": 0.2, "BirthType": "Regulated"})
+        dataframe.log_data(True, [[0, 2, 0, 20, 0, 0]])
+        expected_rows += dataframe.get_data_rows()
+        dataframe.write_data()
+
+        columns, parameter_sets = l.read_binary_data("test_write_data")
+        self.assertIsInstance(columns["S"], np.memmap)
+        self.assertEqual(parameter_sets, {0: {"BirthRate": 0.1, "BirthType": "Regulated"},
+                                          1: {"BirthRate": 0.2, "BirthType": "Regulated"}})
+        rows = [dict({column_name: column[index] for column_name, column in columns.items()
+                      if column_name != "ParamSetID"}, 
+                     **parameter_sets[columns["ParamSetID"][index]])
+                for index in range(len(columns["S"]))]
+        self.assertEqual(rows, expected_rows)
+
+    def test_no_rows(self):
+        dataframe = l.Dataframe(file_name = "test_write_data", 
+                                output_format = "Binary")
+        dataframe.add_constant_data({"BirthRate": 0.1})
+        dataframe.write_data()
+
+        columns, parameter_sets = l.read_binary_data("test_write_data")
+        self.assertEqual(len(columns["Rep"]), 0)
+        self.assertEqual(parameter_sets, {0: {"BirthRate": 0.1}})
+
+####Testing reducers.py
+class TestExtinctionProbability(unittest.TestCase):
+    '''A replicate should count as an extinction if any of its logged rows has
+    no infected hosts, and the summary should be written once per parameter set.
+    '''
+    def tearDown(self):
+        for suffix in ["", "_extinction_probability"]:
+            if os.path.exists(f"output/test_reducers{suffix}.csv"):
+                os.remove(f"output/test_reducers{suffix}.csv")
+
+    def test_summary_only(self):
+        dataframe = l.Dataframe(file_name = "test_reducers",
+                                reducers = [red.ExtinctionProbability()],
+                                is_keeping_rows = False)
+        dataframe.add_constant_data({"BirthRate": 0.1})
+        dataframe.log_data(True, [[0, 1, 0, 90, 10, 0], [0, 1, 1, 95, 0, 5],
+                                  [1, 2, 0, 90, 10, 0], [1, 2, 1, 90, 5, 5]])
+        dataframe.log_data(True, [[1, 3, 0, 90, 5, 5], [2, 4, 0, 100, 0, 0]])
+        self.assertEqual(dataframe.get_data_rows(), [])
+        dataframe.write_data()
+
+        self.assertFalse(os.path.exists("output/test_reducers.csv"))
+        with open("output/test_reducers_extinction_probability.csv") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["TotalReps"], "3")
+        self.assertEqual(rows[0]["ExtinctionCount"], "2")
+        self.assertAlmostEqual(float(rows[0]["ExtinctionProbability"]), 2 / 3)
+
+    def test_merge(self):
+        dataframe = l.Dataframe(file_name = "test_reducers",
+                                reducers = [red.ExtinctionProbability()],
+                                is_keeping_rows = False)
+        dataframe.add_constant_data({"BirthRate": 0.1})
+        for rep in range(4):
+            other = l.Dataframe(file_name = "test_reducers")
+            other.add_constant_data({"BirthRate": 0.1})
+            other.log_data(True, [[rep, 1, 0, 90, rep % 2, 0]])
+            dataframe.merge(other)
+        dataframe.write_data()
+
+        with open("output/test_reducers_extinction_probability.csv") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([(row["TotalReps"], row["ExtinctionCount"]) for row in rows],
+                         [("4", "2")])
+
+class TestExtinctionTimes(unittest.TestCase):
+    '''Every replicate should get one row with the first time it had no 
+    infected hosts, even when the rows of replicates are interleaved, and 
+    replicates without an extinction should be censored.
+    '''
+    def tearDown(self):
+        if os.path.exists("output/test_reducers_extinction_times.csv"):
+            os.remove("output/test_reducers_extinction_times.csv")
+
+    def test_reduce(self):
+        reducer = red.ExtinctionTimes()
+        summary = reducer.reduce(None, np.array([[0, 1, 0], [0, 1, 1], [0, 1, 2],
+                                                 [1, 4, 0], [1, 4, 1], [1, 4, 2]]),
+                                 np.array([[9, 1, 0], [9, 1, 0], [9, 1, 0],
+                                           [9, 1, 0], [9, 1, 0], [9, 1, 0]]))
+        summary = reducer.reduce(summary, np.array([[1, 5, 0], [1, 5, 1], [1, 5, 2],
+                                                    [0, 2, 0], [0, 2, 1], [0, 2, 2]]),
+                                 np.array([[9, 1, 0], [9, 1, 0], [9, 1, 0],
+                                           [9, 1, 0], [9, 0, 0], [9, 0, 0]]))
+        self.assertEqual(reducer.get_summary_rows(summary),
+                         [[0, 0, 0, 2, 1, 1, 3, 4], [1, 1, 0, None, None, None, None, 4]])
+
+    def test_burn_in(self):
+        reducer = red.ExtinctionTimes(burn_in=2)
+        summary = reducer.reduce(None, np.array([[0, 3, 0], [0, 3, 1], [0, 4, 0], [0, 4, 1],
+                                                 [1, 8, 0], [1, 8, 1], [1, 9, 0], [1, 9, 1]]),
+                                 np.array([[9, 1, 0], [9, 1, 0], [9, 1, 0], [9, 0, 0],
+                                           [9, 0, 0], [9, 0, 0], [9, 0, 0], [9, 0, 0]]))
+        #Replicate 1 had already lost its parasite when logging started
+        self.assertEqual(reducer.get_summary_rows(summary),
+                         [[0, 0, 0, 4, 3, 1, 2, 2], [1, 0, 1, None, None, None, None, 2]])
+
+    def test_write(self):
+        dataframe = l.Dataframe(file_name = "test_reducers",
+                                reducers = [red.ExtinctionTimes()],
+                                is_keeping_rows = False)
+        dataframe.add_constant_data({"BirthRate": 0.1})
+        dataframe.log_data(True, [[0, 1, 0, 90, 10, 0], [0, 1, 1, 95, 0, 5]])
+        dataframe.write_data()
+
+        with open("output/test_reducers_extinction_times.csv") as f:
+            rows = f.read().splitlines()
+        self.assertEqual(rows, ["BirthRate,Rep,Censored,ExtinctDuringBurnIn,ExtinctionSeries,"
+                                "ExtinctionBottleneck,ExtinctionTimepoint,ExtinctionTime,"
+                                "ObservedTime",
+                                "0.1,0,0,0,1,0,1,1,1"])
+
+class TestGetWilsonInterval(unittest.TestCase):
+    def test_half(self):
+        lower, upper = red.get_wilson_interval(5, 10, 0.95)
+        self.assertAlmostEqual(lower, 0.2366, places=4)
+        self.assertAlmostEqual(upper, 0.7634, places=4)
+
+    def test_none(self):
+        lower, upper = red.get_wilson_interval(0, 10, 0.95)
+        self.assertAlmostEqual(lower, 0)
+        self.assertAlmostEqual(upper, 0.2775, places=4)
+
+class TestGetClopperPearsonInterval(unittest.TestCase):
+    def test_half(self):
+        lower, upper = red.get_clopper_pearson_interval(5, 10, 0.95)
+        self.assertAlmostEqual(lower, 0.1871, places=4)
+        self.assertAlmostEqual(upper, 0.8129, places=4)
+
+    def test_none(self):
+        lower, upper = red.get_clopper_pearson_interval(0, 10, 0.95)
+        self.assertEqual(lower, 0)
+        self.assertAlmostEqual(upper, 0.3085, places=4)
+
+    def test_all(self):
+        lower, upper = red.get_clopper_pearson_interval(10, 10, 0.95)
+        self.assertAlmostEqual(lower, 0.6915, places=4)
+        self.assertEqual(upper, 1)
+
+class TestGetRegularizedIncompleteBeta(unittest.TestCase):
+    def test_uniform(self):
+        self.assertAlmostEqual(red.get_regularized_incomplete_beta(0.3, 1, 1), 0.3)
+
+    def test_value(self):
+        #1 - (0.7**6 + 6 * 0.3 * 0.7**5), from the binomial sum
+        self.assertAlmostEqual(red.get_regularized_incomplete_beta(0.3, 2, 5), 0.579825)
+
+    def test_bounds(self):
+        self.assertEqual(red.get_regularized_incomplete_beta(0, 2, 5), 0)
+        self.assertEqual(red.get_regularized_incomplete_beta(1, 2, 5), 1)
+
+####Testing flow_cache.py
+class TestFlowCache(unittest.TestCase):
+    def test_miss_then_hit(self):
+        flow_cache = fc.FlowCache(max_size = 2)
+        self.assertIsNone(flow_cache.get("a"))
+        flow_cache.put("a", 1)
+        self.assertEqual(flow_cache.get("a"), 1)
+        self.assertEqual(flow_cache.get_statistics(), {"Hits": 1, "Misses": 1, 
+                                                       "Evictions": 0, "Size": 1,
+                                                       "HitRate": 0.5})
+
+    def test_least_recently_used_is_evicted(self):
+        flow_cache = fc.FlowCache(max_size = 2)
+        flow_cache.put("a", 1)
+        flow_cache.put("b", 2)
+        flow_cache.get("a")
+        flow_cache.put("c", 3)
+        self.assertIsNone(flow_cache.get("b"))
+        self.assertEqual(flow_cache.get("a"), 1)
+        self.assertEqual(flow_cache.get("c"), 3)
+        self.assertEqual(flow_cache.get_statistics()["Evictions"], 1)
+
+class TestTrajectoryStore(unittest.TestCase):
+    '''Periods of different lengths from the same starting population should
+    share one stored trajectory, and give exactly the calculated trajectories.
+    '''
+    model_parameters = (0.5, m.get_regulated_births, 0.1, 1000, 0.2, 
+                        m.get_ddt_infections, 0.0001, 0.01, 0.02, 0.01, 0.01)
+
+    def test_shorter_and_longer_periods(self):
+        trajectory_store = fc.TrajectoryStore()
+        for n_timepoints in [20, 5, 50, 30]:
+            trajectory = trajectory_store.get_trajectory((90, 10, 0), n_timepoints,
+                                                         self.model_parameters,
+                                                         m.get_trajectory)
+            expected = m.get_trajectory(n_timepoints, 90, 10, 0, *self.model_parameters)
+            np.testing.assert_array_equal(trajectory, expected)
+        statistics = trajectory_store.get_statistics()
+        self.assertEqual(statistics["Size"], 1)
+        self.assertEqual(statistics["Misses"], 1)
+        self.assertEqual(statistics["Hits"], 3)
+        self.assertEqual(statistics["Extensions"], 1)
+
+####Testing markov_chain.py
+class TestGetExtinctionProbabilities(unittest.TestCase):
+    model_parameters = (1.0, m.get_regulated_births, 0.1, 1000, 0.2, 
+                        m.get_ddt_infections, 0.0001, 0.01, 0.02, 0.01, 0)
+
+    def integrate(self, n_timepoints, s, i, r):
+        return m.get_trajectory(n_timepoints, s, i, r, *self.model_parameters)
+
+    def test_first_bottleneck(self):
+        '''After one bottleneck, the parasite is extinct if none of the
+        survivors are infected
+        '''
+        end = self.integrate(30, 90, 10, 0)[-1]
+        probabilities = mc.get_extinction_probabilities(90, 10, 1, 15, 30, 0, self.integrate)
+        self.assertAlmostEqual(probabilities[0], (1 - end[1] / end.sum())**15)
+
+    def test_transition_matrix(self):
+        durations, duration_probabilities = mc.get_interval_distribution(30, 0.5)
+        transition_matrix = mc.get_transition_matrix(10, durations, duration_probabilities,
+                                                     self.integrate)
+        np.testing.assert_allclose(transition_matrix.sum(axis=1), 1)
+        self.assertEqual(transition_matrix[0, 0], 1)
+
+    def test_no_parasite(self):
+        probabilities = mc.get_extinction_probabilities(100, 0, 3, 15, 30, 0.5, self.integrate)
+        np.testing.assert_array_equal(probabilities, [1, 1, 1])
+
+class TestGetIntervalDistribution(unittest.TestCase):
+    def test_fixed(self):
+        durations, duration_probabilities = mc.get_interval_distribution(300, 0)
+        np.testing.assert_array_equal(durations, [300])
+        np.testing.assert_array_equal(duration_probabilities, [1.0])
+
+    def test_gamma(self):
+        durations, duration_probabilities = mc.get_interval_distribution(300, 0.3)
+        self.assertAlmostEqual(duration_probabilities.sum(), 1)
+        self.assertAlmostEqual((durations * duration_probabilities).sum(), 300, places=6)
+        self.assertTrue(np.all(duration_probabilities >= 0))
+
+class TestGetBinomialProbabilities(unittest.TestCase):
+    def test_values(self):
+        binomial_probabilities = mc.get_binomial_probabilities(4, np.array([0, 0.5, 1]))
+        np.testing.assert_allclose(binomial_probabilities,
+                                   [[1, 0, 0, 0, 0],
+                                    [1/16, 4/16, 6/16, 4/16, 1/16],
+                                    [0, 0, 0, 0, 1]])
+
+class TestGetRegularizedLowerIncompleteGamma(unittest.TestCase):
+    def test_exponential(self):
+        '''A gamma distribution with shape 1 is an exponential distribution'''
+        for x in [0.1, 1, 5, 30]:
+            self.assertAlmostEqual(mc.get_regularized_lower_incomplete_gamma(1, x),
+                                   1 - math.exp(-x))
+
+    def test_shape_two(self):
+        for x in [0.5, 2, 10]:
+            self.assertAlmostEqual(mc.get_regularized_lower_incomplete_gamma(2, x),
+                                   1 - math.exp(-x) * (1 + x))
+
+####Testing flow_map.py
+class TestFlowMap(unittest.TestCase):
+    '''Calculated trajectories should be handed out exactly, and interpolated
+    trajectories should be within the tolerance.
+    '''
+    model_parameters = (1.0, m.get_regulated_births, 0.1, 1000, 0.2, 
+                        m.get_ddt_infections, 0.0001, 0.01, 0.02, 0.01, 0)
+
+    def test_tolerance_zero_is_exact(self):
+        flow_map = fm.FlowMapStore(0.0, m.get_trajectory).get_flow_map(self.model_parameters)
+        for s, i in [(100, 0), (93, 7), (50, 50), (0, 100), (140, 9)]:
+            expected = m.get_trajectory(40, s, i, 0, *self.model_parameters)
+            np.testing.assert_array_equal(flow_map.get_trajectory(s, i, 40), expected)
+
+    def test_interpolation_within_tolerance(self):
+        flow_map_store = fm.FlowMapStore(0.5, m.get_trajectory)
+        flow_map = flow_map_store.get_flow_map(self.model_parameters)
+        errors = [np.abs(flow_map.get_trajectory(100 - i, i, 60) - 
+                         m.get_trajectory(60, 100 - i, i, 0, *self.model_parameters)).max()
+                  for i in range(101)]
+        self.assertLess(flow_map_store.get_statistics()["ExactLookups"], 101)
+        self.assertLessEqual(flow_map_store.get_statistics()["MaxError"], 0.5)
+        self.assertLess(max(errors), 1.0)
+
+    def test_extend_is_exact(self):
+        flow_map = fm.FlowMapStore(0.0, m.get_trajectory).get_flow_map(self.model_parameters)
+        flow_map.get_trajectory(70, 30, 10)
+        expected = m.get_trajectory(50, 70, 30, 0, *self.model_parameters)
+        np.testing.assert_array_equal(flow_map.get_trajectory(70, 30, 50), expected)
+
+    def test_shared_by_model_parameters(self):
+        flow_map_store = fm.FlowMapStore(0.1, m.get_trajectory)
+        flow_map = flow_map_store.get_flow_map(self.model_parameters)
+        self.assertIs(flow_map_store.get_flow_map(self.model_parameters), flow_map)
+        self.assertIsNot(flow_map_store.get_flow_map(self.model_parameters[:-1] + (0.5,)),
+                         flow_map)
+        self.assertEqual(flow_map_store.get_statistics()["Tables"], 2)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
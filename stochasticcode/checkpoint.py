@@ -0,0 +1,227 @@
+'''This module lets a long run be resumed after it has been interrupted (e.g.
+by a crash, or by a job being preempted on a cluster). Every engine in model.py
+writes the data of a parameter set to the output folder as soon as the
+parameter set is done, so the files already hold everything that was finished
+before the interruption, plus possibly part of the parameter set that was
+running. Every checkpoint_interval parameter sets (see parameters.py), the run
+saves a checkpoint to output/<file_name>_checkpoint.pkl with the parameter
+sets it has completed, the length of every output file, the state of the
+writers (e.g. whether they have written their header yet), and the state of
+the model that carries over from one parameter set to the next (the series
+number and the random number generator). A rerun with the same parameters cuts
+the output files back to the lengths of the last checkpoint, restores that
+state, and continues with the next parameter set, so that the output is
+identical to that of an uninterrupted run. The checkpoint is removed once the
+run is done.
+
+The Checkpoint class has five methods:
+__init__
+    Sets up the checkpoints of a run
+
+resume
+    Goes back to the last checkpoint of an interrupted run, if there is one
+
+update
+    Saves a checkpoint if checkpoint_interval parameter sets have been
+    completed since the last one
+
+save
+    Saves a checkpoint
+
+finish
+    Removes the checkpoint once the run is done
+
+The module also has two functions outside of the class:
+get_output_paths
+    Lists the files that a dataframe and its summaries append to
+
+get_parameter_values
+    Returns the parameters that have to match for a run to be resumed
+'''
+
+import os
+import pickle
+
+#Parameters that don't change the output, so they can differ when a run is resumed
+IGNORED_PARAMETERS: list[str] = ["checkpoint_interval", "n_workers"]
+
+#Attributes of the dataframe, reducers, and summaries that tell them what has been written
+WRITER_ATTRIBUTES: list[str] = ["is_header_written", "n_rows_written", "parameter_set_ids"]
+
+class Checkpoint:
+    def __init__(self, parameters, dataframe, summaries: list = None) -> None:
+        '''Sets up the checkpoints of a run. Nothing is saved until update or
+        save is called.
+
+        Explanation of attributes
+        ---------
+
+        file_path: str
+            Where the checkpoint is saved, output/<file_name>_checkpoint.pkl
+
+        interval: int
+            The number of parameter sets between checkpoints (see
+            checkpoint_interval in parameters.py). If 0, no checkpoints are
+            saved and no run is resumed.
+
+        parameter_values: dict
+            See get_parameter_values
+
+        dataframe: an instance of the Dataframe class from logger.py
+            The dataframe of the run, whose reducers are also checkpointed
+
+        summaries: list
+            Any other objects that write summaries in the same way as the
+            reducers (e.g. the BottleneckSchedule class of schedule.py).
+            Elements that are None are left out.
+
+        n_completed: int
+            The number of parameter sets completed at the last checkpoint
+        '''
+        self.file_path: str = f"output/{parameters.file_name}_checkpoint.pkl"
+        self.interval: int = parameters.checkpoint_interval
+        self.parameter_values: dict = get_parameter_values(parameters)
+        self.dataframe = dataframe
+        self.summaries: list = [summary for summary in (summaries or [])
+                                if summary is not None]
+        self.n_completed: int = 0
+
+    def resume(self) -> dict:
+        '''Goes back to the last checkpoint of an interrupted run: every output
+        file is cut back to its length at the checkpoint (dropping any part of
+        a parameter set that was written afterwards), and the dataframe, its
+        reducers, and the summaries get back the state they had.
+
+        Returns dict
+            The state of the model saved with the checkpoint (see save), plus
+            the indices of the completed parameter sets under
+            "completed_parameter_sets", or None if there is no checkpoint to
+            resume from
+
+        Raises ValueError
+            If the checkpoint was saved by a run with different parameters
+        '''
+        if self.interval == 0 or not os.path.exists(self.file_path):
+            return None
+
+        with open(self.file_path, 'rb') as f:
+            checkpoint = pickle.load(f)
+        if checkpoint["parameters"] != self.parameter_values:
+            raise ValueError(f'''The checkpoint {self.file_path} in checkpoint.py was
+                             saved by a run with different parameters. Delete it to
+                             start the run from the beginning.''')
+
+        for path, size in checkpoint["file_sizes"].items():
+            with open(path, 'r+b') as f:
+                f.truncate(size)
+        writers = [self.dataframe] + self.dataframe.reducers + self.summaries
+        for writer, writer_state in zip(writers, checkpoint["writers"]):
+            for name, value in writer_state.items():
+                setattr(writer, name, value)
+
+        self.n_completed = len(checkpoint["completed_parameter_sets"])
+        print(f"Resuming from {self.file_path} after {self.n_completed} parameter sets")
+        return {"completed_parameter_sets": checkpoint["completed_parameter_sets"],
+                **checkpoint["state"]}
+
+    def update(self, n_completed: int, state: dict) -> None:
+        '''Saves a checkpoint if at least interval parameter sets have been
+        completed since the last one. Has to be called right after the data
+        of a parameter set have been written.
+
+        n_completed: int
+            The number of parameter sets completed so far (in the order
+            produced by the iter.product method in the "run" function of
+            model.py)
+
+        state: dict
+            See save
+        '''
+        if self.interval > 0 and n_completed - self.n_completed >= self.interval:
+            self.save(n_completed, state)
+
+    def save(self, n_completed: int, state: dict) -> None:
+        '''Saves a checkpoint. The output files are flushed to disk first, and
+        the checkpoint is written to a temporary file that then replaces the
+        previous checkpoint, so that an interruption at any moment leaves
+        either the previous or the new checkpoint, never a broken one.
+
+        n_completed: int
+            See update
+
+        state: dict
+            The state of the model that carries over from one parameter set to
+            the next, e.g. the series number and the random number generator.
+            Everything in it has to be picklable.
+        '''
+        writers = [self.dataframe] + self.dataframe.reducers + self.summaries
+        file_sizes = {}
+        for path in get_output_paths(self.dataframe, self.summaries):
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    os.fsync(f.fileno())
+                file_sizes[path] = os.path.getsize(path)
+
+        checkpoint = {"parameters": self.parameter_values,
+                      "completed_parameter_sets": list(range(n_completed)),
+                      "file_sizes": file_sizes,
+                      "writers": [{name: getattr(writer, name) for name in WRITER_ATTRIBUTES
+                                   if hasattr(writer, name)} for writer in writers],
+                      "state": state}
+        temporary_path = f"{self.file_path}.tmp"
+        with open(temporary_path, 'wb') as f:
+            pickle.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_path, self.file_path)
+        self.n_completed = n_completed
+
+    def finish(self) -> None:
+        '''Removes the checkpoint once the run is done, so that the next run
+        with the same file_name starts from the beginning
+        '''
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+def get_output_paths(dataframe, summaries: list) -> list[str]:
+    '''Lists the files that a dataframe, its reducers, and other summaries
+    append to (see logger.py and reducers.py). Files that are rewritten
+    completely every time (the constants.json file of the "Binary" format)
+    aren't listed, since they are brought up to date by the next write.
+
+    dataframe: an instance of the Dataframe class from logger.py
+        See the Checkpoint class
+
+    summaries: list
+        See the Checkpoint class
+
+    Returns list[str]
+        The paths of the files, relative to the working directory
+    '''
+    file_name = dataframe.file_name
+    paths = []
+    if dataframe.is_keeping_rows:
+        if dataframe.output_format == "Normalized":
+            paths += [f"output/{file_name}_params.csv", f"output/{file_name}_series.csv"]
+        elif dataframe.output_format == "Binary":
+            paths += [f"output/{file_name}/{column_name}.npy" for column_name
+                      in ["ParamSetID"] + dataframe.VARIABLE_COLUMN_NAMES]
+        else:
+            paths.append(f"output/{file_name}.csv")
+    paths += [f"output/{file_name}_{summary.SUMMARY_NAME}.csv" for summary
+              in dataframe.reducers + summaries]
+    return paths
+
+def get_parameter_values(parameters) -> dict:
+    '''Returns the parameters that have to be the same for a run to be resumed
+    from a checkpoint, which are all of them except the ones in
+    IGNORED_PARAMETERS
+
+    parameters: an instance of the Parameters class in parameters.py
+        The parameters of the run
+
+    Returns dict
+        Maps the name of every parameter to its value
+    '''
+    return {name: value for name, value in vars(parameters).items()
+            if name not in IGNORED_PARAMETERS}
@@ -0,0 +1,227 @@
+'''This module contains the FlowCache class, which remembers the
+trajectories that the model has already calculated between two bottlenecks.
+Between bottlenecks, the stochastic model changes deterministically (only the
+bottleneck survivors and the bottleneck timing are random), and the survivors
+of a bottleneck are whole numbers that add up to the bottleneck size. So with
+a bottleneck size of 100, there are only about 101 different populations that
+a period can start from, and the same trajectory is calculated again and again
+across bottlenecks and replicates. The cache holds a limited number of
+trajectories, and forgets the one that was used the longest time ago when it
+is full.
+
+Within the FlowCache class, there are five methods:
+__init__
+    Initializes an empty cache that holds at most a given number of
+    trajectories
+
+get
+    Returns a remembered trajectory (and counts a hit), or None if the
+    trajectory hasn't been calculated yet (and counts a miss)
+
+put
+    Remembers a newly calculated trajectory, and forgets the least recently
+    used one if the cache is full
+
+get_trajectory
+    Returns the trajectory of a period, from the cache if it is there, and
+    otherwise calculates and remembers it
+
+get_statistics
+    Returns the number of hits, misses, and forgotten trajectories, which shows
+    how much work the cache has saved
+
+The TrajectoryStore class is a flow cache that shares trajectories between
+periods of different lengths. When the bottleneck timing varies, periods that
+start from the same population run for different numbers of timepoints, but 
+the shorter period is just the start of the longer one. So the store keeps a 
+single trajectory per starting population, the longest one calculated so far.
+Shorter periods are answered from its first rows, and longer periods extend it
+from its last timepoint instead of starting again. It overrides three methods:
+__init__
+    Initializes an empty store
+
+get_trajectory
+    Returns the first rows of the stored trajectory of a starting population,
+    calculating or extending it if necessary
+
+get_statistics
+    Also returns the number of trajectories that had to be extended
+'''
+
+import numpy as np
+from collections import OrderedDict
+from typing import Callable
+
+class FlowCache:
+    def __init__(self, max_size: int = 1024) -> None:
+        '''Initializes an empty cache
+
+        Explanation of attributes
+        ---------
+
+        max_size: int
+            The maximum number of trajectories that the cache holds
+
+        trajectories: OrderedDict
+            Maps the key of every remembered trajectory (see run_model in
+            model.py) to the trajectory, ordered from the least to the most
+            recently used
+
+        n_hits: int
+            The number of times that get found the requested trajectory
+
+        n_misses: int
+            The number of times that get didn't find the requested trajectory,
+            so it had to be calculated
+
+        n_evictions: int
+            The number of trajectories that have been forgotten to make room
+            for new ones
+        '''
+        self.max_size: int = max_size
+        self.trajectories: OrderedDict = OrderedDict()
+        self.n_hits: int = 0
+        self.n_misses: int = 0
+        self.n_evictions: int = 0
+
+    def get(self, key: tuple):
+        '''Looks up a trajectory, and marks it as the most recently used
+
+        key: tuple
+            The starting population, the number of timepoints, and the model
+            parameters of the trajectory
+
+        Returns the remembered trajectory, or None if there isn't one
+        '''
+        trajectory = self.trajectories.get(key)
+        if trajectory is None:
+            self.n_misses += 1
+            return None
+
+        self.n_hits += 1
+        self.trajectories.move_to_end(key)
+        return trajectory
+
+    def put(self, key: tuple, trajectory) -> None:
+        '''Remembers a trajectory. If the cache is then holding more than
+        max_size trajectories, the least recently used one is forgotten.
+
+        key: tuple
+            See get
+
+        trajectory
+            The trajectory to remember
+        '''
+        self.trajectories[key] = trajectory
+        self.trajectories.move_to_end(key)
+        if len(self.trajectories) > self.max_size:
+            self.trajectories.popitem(last=False)
+            self.n_evictions += 1
+
+    def get_trajectory(self, start: tuple, n_timepoints: int, model_parameters: tuple,
+                       integrate: Callable):
+        '''Returns the trajectory of a period. It is looked up by its starting
+        population, its number of timepoints, and the model parameters, and 
+        only calculated (and remembered) if it isn't in the cache.
+
+        start: tuple
+            The s, i, and r at the start of the period
+
+        n_timepoints: int
+            The number of timepoints of the period
+
+        model_parameters: tuple
+            The model parameters that integrate takes after the starting
+            population, in the same order
+
+        integrate: Callable
+            The get_trajectory function of model.py, which calculates the
+            trajectory
+
+        Returns np.ndarray
+            An array with one row per timepoint (starting with timepoint 0) and
+            one column for each of S, I, and R
+        '''
+        key = start + (n_timepoints,) + model_parameters
+        trajectory = self.get(key)
+        if trajectory is None:
+            trajectory = integrate(n_timepoints, *start, *model_parameters)
+            self.put(key, trajectory)
+        return trajectory
+
+    def get_statistics(self) -> dict:
+        '''Summarises how well the cache has worked so far
+
+        Returns dict
+            The number of Hits, Misses, and Evictions, the number of
+            trajectories currently held (Size), and the fraction of lookups
+            that were hits (HitRate)
+        '''
+        n_lookups = self.n_hits + self.n_misses
+        return {"Hits": self.n_hits,
+                "Misses": self.n_misses,
+                "Evictions": self.n_evictions,
+                "Size": len(self.trajectories),
+                "HitRate": self.n_hits / n_lookups if n_lookups > 0 else 0.0}
+
+class TrajectoryStore(FlowCache):
+    def __init__(self, max_size: int = 1024) -> None:
+        '''Initializes an empty store. See FlowCache for the other attributes.
+
+        Explanation of attributes
+        ---------
+
+        n_extensions: int
+            The number of times that a stored trajectory was too short for the
+            requested period, and had to be extended. These are also counted as
+            hits, since the stored part didn't have to be calculated again.
+        '''
+        super().__init__(max_size)
+        self.n_extensions: int = 0
+
+    def get_trajectory(self, start: tuple, n_timepoints: int, model_parameters: tuple,
+                       integrate: Callable):
+        '''Returns the trajectory of a period. The stored trajectory of the
+        starting population (looked up by the starting population and the 
+        model parameters) is sliced if it is long enough, extended by 
+        continuing the integration from its last timepoint if it isn't, and 
+        calculated if there is none. Continuing the integration gives exactly
+        the same values as integrating the longer period from the start.
+
+        start: tuple
+            See FlowCache.get_trajectory
+
+        n_timepoints: int
+            See FlowCache.get_trajectory
+
+        model_parameters: tuple
+            See FlowCache.get_trajectory
+
+        integrate: Callable
+            See FlowCache.get_trajectory
+
+        Returns np.ndarray
+            See FlowCache.get_trajectory
+        '''
+        key = start + model_parameters
+        trajectory = self.get(key)
+        if trajectory is None:
+            trajectory = integrate(n_timepoints, *start, *model_parameters)
+            self.put(key, trajectory)
+        elif len(trajectory) <= n_timepoints:
+            extension = integrate(n_timepoints - len(trajectory) + 1, *trajectory[-1],
+                                  *model_parameters)
+            trajectory = np.concatenate((trajectory, extension[1:]))
+            self.put(key, trajectory)
+            self.n_extensions += 1
+        return trajectory[:n_timepoints + 1]
+
+    def get_statistics(self) -> dict:
+        '''Summarises how well the store has worked so far
+
+        Returns dict
+            See FlowCache.get_statistics, with the number of Extensions added
+        '''
+        statistics = super().get_statistics()
+        statistics["Extensions"] = self.n_extensions
+        return statistics
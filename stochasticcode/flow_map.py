@@ -0,0 +1,368 @@
+'''This module contains lookup tables for the trajectories between bottlenecks.
+Between bottlenecks, the stochastic model changes deterministically, and if
+there is no recovery (so R stays zero) the population right after a bottleneck
+is fully described by its numbers of susceptible and infected hosts. So the
+trajectory of a period only depends on the S and I that it starts with, and the
+state after d timepoints is simply the row d of that trajectory. A FlowMap
+calculates the trajectories of the corners of a grid of starting (S, I) once,
+and answers every other starting population by bilinear interpolation between
+the four corners of the grid cell that it falls in.
+
+The grid is a quadtree: it starts as a single square cell, and a cell is split
+into four smaller squares if the interpolation error at its centre (compared
+with the calculated trajectory of the centre) is above a tolerance. Cells are
+only checked and split when a starting population inside them is requested,
+so only the part of the grid that the bottlenecks actually reach is ever
+calculated, and the same table serves every population size (and so every
+bottleneck_size_cv). Cells of one host are never split, since the bottleneck
+survivors are whole numbers, and their corners are exact. The trajectories are
+extended whenever a longer period is requested, and a cell is checked again
+when it is used for a longer period than it was checked for.
+
+Within this module, there are two classes. The FlowMap class holds the table
+for one set of model parameters, and has six methods:
+__init__
+    Initializes an empty table
+
+get_trajectory
+    Returns the (interpolated) trajectory of a period
+
+get_point
+    Returns the calculated trajectory of a starting population, calculating
+    or extending it if necessary
+
+check_cell
+    Compares the interpolated and the calculated trajectory at the centre of a
+    grid cell
+
+get_interpolated_trajectory
+    Interpolates between the trajectories of the corners of a grid cell
+
+__getstate__
+    Leaves the integrate function out when the table is pickled (e.g. for a
+    checkpoint, see checkpoint.py)
+
+The FlowMapStore class holds one FlowMap per set of model parameters, so that
+the tables can be shared by all replicates, and by parameter sets that only
+differ in their bottlenecks. It has five methods:
+__init__
+    Initializes an empty store
+
+get_flow_map
+    Returns the table for a set of model parameters, creating it if necessary
+
+get_integrate
+    Returns the function that calculates the trajectories of a table
+
+__setstate__
+    Gives every table its integrate function back when the store is unpickled
+
+get_statistics
+    Summarises how the tables have been used, including the largest estimated
+    interpolation error
+'''
+
+import numpy as np
+from typing import Callable
+
+class FlowMap:
+    def __init__(self, tolerance: float, integrate: Callable) -> None:
+        '''Initializes an empty table
+
+        Explanation of attributes
+        ---------
+
+        tolerance: float
+            The largest interpolation error (in number of hosts, for any of S,
+            I, or R, at any timepoint) that is accepted at the centre of a grid
+            cell
+
+        integrate: Callable
+            Takes a number of timepoints and the starting s, i, and r, and
+            returns an array with the population state at every timepoint (see
+            get_trajectory in model.py)
+
+        points: dict
+            Maps every starting (s, i) that has been calculated to its
+            trajectory, an array with one row per timepoint and one column for
+            each of S, I, and R
+
+        accepted_cells: dict
+            Maps every grid cell (its smallest s, smallest i, and width) whose
+            interpolation error is within the tolerance to the number of
+            timepoints it was checked for and the error found at its centre
+
+        split_cells: set
+            The grid cells that have been split into four smaller cells
+
+        root_size: int
+            The width of the cell that covers the whole grid, which starts at
+            (0, 0). Doubled whenever a starting population outside of it is
+            requested.
+
+        n_lookups: int
+            The number of trajectories that have been requested
+
+        n_exact_lookups: int
+            The number of requested trajectories that were calculated, so
+            didn't need to be interpolated
+        '''
+        self.tolerance: float = tolerance
+        self.integrate: Callable = integrate
+        self.points: dict = {}
+        self.accepted_cells: dict = {}
+        self.split_cells: set = set()
+        self.root_size: int = 1
+        self.n_lookups: int = 0
+        self.n_exact_lookups: int = 0
+
+    def get_trajectory(self, s: float, i: float, n_timepoints: int) -> np.ndarray:
+        '''Returns the trajectory of a period that starts with s susceptible
+        hosts, i infected hosts, and no recovered hosts. Starting from the
+        cell that covers the whole grid, the cell that the population falls in
+        is split until it is one host wide or its interpolation error is within
+        the tolerance, and the trajectory is interpolated from its corners. 
+        With a tolerance of 0, a whole-number population would always end up 
+        at the corner of a cell, so it is calculated straight away.
+
+        s: float
+            The number of susceptible hosts at the start of the period
+
+        i: float
+            The number of infected hosts at the start of the period
+
+        n_timepoints: int
+            The number of timepoints of the period
+
+        Returns np.ndarray
+            An array with one row per timepoint (starting with timepoint 0) and
+            one column for each of S, I, and R
+        '''
+        n_timepoints = int(n_timepoints)
+        self.n_lookups += 1
+        is_whole_number = float(s).is_integer() and float(i).is_integer()
+        if (s, i) in self.points or (self.tolerance == 0 and is_whole_number):
+            self.n_exact_lookups += 1
+            return self.get_point(s, i, n_timepoints)
+
+        while max(s, i) > self.root_size:
+            self.root_size *= 2
+            self.split_cells.add((0, 0, self.root_size))
+
+        cell_s, cell_i, cell_size = 0, 0, self.root_size
+        while cell_size > 1:
+            cell = (cell_s, cell_i, cell_size)
+            if cell not in self.split_cells:
+                checked_timepoints, _ = self.accepted_cells.get(cell, (-1, None))
+                if checked_timepoints >= n_timepoints:
+                    break
+                if self.check_cell(cell_s, cell_i, cell_size,
+                                   max(n_timepoints, 2 * checked_timepoints)):
+                    break
+                self.split_cells.add(cell)
+
+            cell_size //= 2
+            if s >= cell_s + cell_size:
+                cell_s += cell_size
+            if i >= cell_i + cell_size:
+                cell_i += cell_size
+
+        return self.get_interpolated_trajectory(s, i, cell_s, cell_i, cell_size,
+                                                n_timepoints)
+
+    def get_point(self, s: int, i: int, n_timepoints: int) -> np.ndarray:
+        '''Returns the calculated trajectory of a starting population. A
+        trajectory that is too short is extended by continuing the integration
+        from its last timepoint (to at least twice its length, so that it
+        isn't extended again and again), which gives exactly the same values
+        as integrating the longer period from the start.
+
+        s: int
+            The number of susceptible hosts at the start of the period
+
+        i: int
+            The number of infected hosts at the start of the period
+
+        n_timepoints: int
+            The number of timepoints of the period
+
+        Returns np.ndarray
+            See get_trajectory
+        '''
+        trajectory = self.points.get((s, i))
+        if trajectory is None:
+            trajectory = self.integrate(n_timepoints, s, i, 0)
+            self.points[(s, i)] = trajectory
+        elif len(trajectory) <= n_timepoints:
+            length = max(n_timepoints, 2 * (len(trajectory) - 1))
+            extension = self.integrate(length - len(trajectory) + 1, *trajectory[-1])
+            trajectory = np.concatenate((trajectory, extension[1:]))
+            self.points[(s, i)] = trajectory
+        return trajectory[:n_timepoints + 1]
+
+    def check_cell(self, cell_s: int, cell_i: int, cell_size: int,
+                   n_timepoints: int) -> bool:
+        '''Compares the interpolated and the calculated trajectory at the centre
+        of a grid cell, and remembers the cell as accepted if the largest
+        difference is within the tolerance.
+
+        cell_s: int
+            The smallest number of susceptible hosts in the cell
+
+        cell_i: int
+            The smallest number of infected hosts in the cell
+
+        cell_size: int
+            The width of the cell, at least 2
+
+        n_timepoints: int
+            The number of timepoints to check
+
+        Returns bool
+            Whether the cell was accepted
+        '''
+        centre_s = cell_s + cell_size // 2
+        centre_i = cell_i + cell_size // 2
+        interpolated = self.get_interpolated_trajectory(centre_s, centre_i, cell_s,
+                                                        cell_i, cell_size, n_timepoints)
+        error = np.abs(interpolated - self.get_point(centre_s, centre_i, n_timepoints)).max()
+        if error > self.tolerance:
+            self.accepted_cells.pop((cell_s, cell_i, cell_size), None)
+            return False
+
+        self.accepted_cells[(cell_s, cell_i, cell_size)] = (n_timepoints, error)
+        return True
+
+    def get_interpolated_trajectory(self, s: float, i: float, cell_s: int,
+                                    cell_i: int, cell_size: int,
+                                    n_timepoints: int) -> np.ndarray:
+        '''Interpolates bilinearly between the trajectories of the four corners
+        of a grid cell
+
+        s: float
+            The number of susceptible hosts at the start of the period, inside
+            the cell
+
+        i: float
+            The number of infected hosts at the start of the period, inside
+            the cell
+
+        cell_s: int
+            See check_cell
+
+        cell_i: int
+            See check_cell
+
+        cell_size: int
+            The width of the cell
+
+        n_timepoints: int
+            The number of timepoints of the period
+
+        Returns np.ndarray
+            See get_trajectory
+        '''
+        s_weight = (s - cell_s) / cell_size
+        i_weight = (i - cell_i) / cell_size
+        return ((1 - s_weight) * (1 - i_weight) * self.get_point(cell_s, cell_i, n_timepoints) +
+                s_weight * (1 - i_weight) * self.get_point(cell_s + cell_size, cell_i,
+                                                           n_timepoints) +
+                (1 - s_weight) * i_weight * self.get_point(cell_s, cell_i + cell_size,
+                                                           n_timepoints) +
+                s_weight * i_weight * self.get_point(cell_s + cell_size, cell_i + cell_size,
+                                                     n_timepoints))
+
+    def __getstate__(self) -> dict:
+        '''Returns the attributes that are pickled, which are all of them 
+        except integrate, since it is usually a lambda (see get_integrate of 
+        the FlowMapStore class), which can't be pickled. The FlowMapStore that
+        holds the table gives it back when it is unpickled.
+
+        Returns dict
+            The attributes of the table, minus integrate
+        '''
+        state = self.__dict__.copy()
+        del state["integrate"]
+        return state
+
+class FlowMapStore:
+    def __init__(self, tolerance: float, get_trajectory: Callable) -> None:
+        '''Initializes an empty store
+
+        Explanation of attributes
+        ---------
+
+        tolerance: float
+            The tolerance of every FlowMap in the store
+
+        get_trajectory: Callable
+            The get_trajectory function of model.py, which calculates the
+            trajectories of the tables
+
+        flow_maps: dict
+            Maps the model parameters of every table to the table
+        '''
+        self.tolerance: float = tolerance
+        self.get_trajectory: Callable = get_trajectory
+        self.flow_maps: dict = {}
+
+    def get_flow_map(self, model_parameters: tuple) -> FlowMap:
+        '''Returns the table for a set of model parameters, and creates it if it
+        doesn't exist yet
+
+        model_parameters: tuple
+            The model parameters that get_trajectory in model.py takes after
+            the starting population, in the same order
+
+        Returns an instance of the FlowMap class
+        '''
+        if model_parameters not in self.flow_maps:
+            self.flow_maps[model_parameters] = FlowMap(self.tolerance,
+                                                       self.get_integrate(model_parameters))
+        return self.flow_maps[model_parameters]
+
+    def get_integrate(self, model_parameters: tuple) -> Callable:
+        '''Returns the function that calculates the trajectories of the table
+        for a set of model parameters
+
+        model_parameters: tuple
+            See get_flow_map
+
+        Returns Callable
+            Takes a number of timepoints and the starting s, i, and r, and 
+            returns the trajectory (see get_trajectory in model.py)
+        '''
+        return (lambda n_timepoints, s, i, r:
+                self.get_trajectory(n_timepoints, s, i, r, *model_parameters))
+
+    def __setstate__(self, state: dict) -> None:
+        '''Restores a pickled store (e.g. from a checkpoint, see 
+        checkpoint.py), and gives every table back the integrate function that
+        was left out when it was pickled (see __getstate__ of the FlowMap 
+        class)
+
+        state: dict
+            The attributes of the store
+        '''
+        self.__dict__.update(state)
+        for model_parameters, flow_map in self.flow_maps.items():
+            flow_map.integrate = self.get_integrate(model_parameters)
+
+    def get_statistics(self) -> dict:
+        '''Summarises how the tables have been used
+
+        Returns dict
+            The number of tables (Tables), the total number of calculated
+            trajectories (Points) and of requested trajectories (Lookups), the
+            number of requested trajectories that didn't need to be
+            interpolated (ExactLookups), and the largest interpolation error
+            that was found at the centre of an accepted grid cell (MaxError),
+            which estimates the largest interpolation error of the tables
+        '''
+        flow_maps = self.flow_maps.values()
+        return {"Tables": len(flow_maps),
+                "Points": sum(len(flow_map.points) for flow_map in flow_maps),
+                "Lookups": sum(flow_map.n_lookups for flow_map in flow_maps),
+                "ExactLookups": sum(flow_map.n_exact_lookups for flow_map in flow_maps),
+                "MaxError": max((error for flow_map in flow_maps for _, error
+                                 in flow_map.accepted_cells.values()), default=0.0)}
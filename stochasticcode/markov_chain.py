@@ -0,0 +1,330 @@
+'''This module calculates the exact extinction probabilities of the stochastic
+model, instead of estimating them from many replicates. Between bottlenecks,
+the model is deterministic, and the only randomness is in the bottleneck
+timing and in the binomial draw of the infected survivors of each bottleneck.
+So if every bottleneck has the same size N and R stays zero (no recovery),
+the population right after a bottleneck is fully described by its number of
+infected hosts, 0 to N, and these numbers form a Markov chain: the chance of
+going from i to j infected hosts is the chance of a binomial(N, p) draw being
+j, where p is the prevalence at the end of the period that started with i
+infected hosts, averaged over the possible lengths of the period. The chain is
+propagated through every bottleneck, and the probability of zero infected
+hosts after each bottleneck is the extinction probability (zero is absorbing,
+since a period without infected hosts can't create any).
+
+The ExactExtinctionProbability class writes the probabilities to a .csv file in
+the same way that the reducers of reducers.py write their summaries. On top of
+the methods of the Reducer class, it has one method:
+add_probabilities
+    Stores the extinction probabilities of the current parameter set of a
+    dataframe
+
+The module also has six functions outside of the class:
+get_extinction_probabilities
+    Calculates the probability that the parasite is extinct after each
+    bottleneck
+
+get_transition_matrix
+    Calculates the chance of going from every number of infected survivors to
+    every other number at the next bottleneck
+
+get_survivor_distribution
+    Calculates the distribution of the infected survivors of the bottleneck at
+    the end of one period
+
+get_interval_distribution
+    Calculates the distribution of the number of timesteps until the next
+    bottleneck
+
+get_binomial_probabilities
+    Calculates binomial probabilities for several survival probabilities at
+    once
+
+get_regularized_lower_incomplete_gamma
+    Calculates the cumulative distribution function of a gamma distribution
+'''
+
+import math
+import numpy as np
+from typing import Callable
+
+import stochasticcode.reducers as reducers
+
+class ExactExtinctionProbability(reducers.Reducer):
+    SUMMARY_NAME: str = "exact_extinction_probability"
+    SUMMARY_COLUMN_NAMES: list[str] = ["Bottleneck", "ExtinctionProbability"]
+
+    def add_probabilities(self, dataframe, probabilities: np.ndarray) -> None:
+        '''Stores the extinction probabilities of the current parameter set of a
+        dataframe, to be written by write_summary
+
+        dataframe: an instance of the Dataframe class from logger.py
+            Holds the constant data of the current parameter set
+
+        probabilities: np.ndarray
+            The probability that the parasite is extinct after each bottleneck
+            (see get_extinction_probabilities)
+        '''
+        self.summaries[tuple(dataframe.constant_data.items())] = probabilities
+
+    def get_summary_rows(self, summary: np.ndarray) -> list[list]:
+        '''Turns the extinction probabilities of a parameter set into one row
+        per bottleneck
+
+        summary: np.ndarray
+            See add_probabilities
+
+        Returns list[list]
+            One row per bottleneck with the number of bottlenecks so far
+            (starting at 1) and the extinction probability
+        '''
+        return [[bottleneck, probability] for bottleneck, probability
+                in enumerate(summary.tolist(), start=1)]
+
+def get_extinction_probabilities(initial_s: float, initial_i: float,
+                                 n_bottlenecks: int, bottleneck_size: int,
+                                 time_till_bottleneck_mean: int,
+                                 time_till_bottleneck_cv: float,
+                                 integrate: Callable,
+                                 tail_probability: float = 1e-12) -> np.ndarray:
+    '''Calculates the probability that the parasite is extinct after each
+    bottleneck. The first period starts from the initial population, and every
+    later period from the survivors of a bottleneck of size bottleneck_size.
+
+    initial_s: float
+        The number of susceptible hosts at the start of the first period
+
+    initial_i: float
+        The number of infected hosts at the start of the first period
+
+    n_bottlenecks: int
+        The number of bottlenecks
+
+    bottleneck_size: int
+        The number of hosts that survive every bottleneck
+
+    time_till_bottleneck_mean: int
+        The mean number of timesteps between bottlenecks
+
+    time_till_bottleneck_cv: float
+        The coefficient of variation of the number of timesteps between
+        bottlenecks (see get_time_till_bottleneck in model.py)
+
+    integrate: Callable
+        Takes a number of timepoints and the starting s, i, and r, and returns
+        an array with the population state at every timepoint (see
+        get_trajectory in model.py)
+
+    tail_probability: float
+        See get_interval_distribution
+
+    Returns np.ndarray
+        One extinction probability per bottleneck. The data of the model only
+        show extinctions up to the second-to-last bottleneck (the survivors of
+        the last bottleneck aren't run), so the ExtinctionProbability reducer
+        estimates the second-to-last value.
+    '''
+    bottleneck_size = int(bottleneck_size)
+    durations, duration_probabilities = get_interval_distribution(time_till_bottleneck_mean,
+                                                                  time_till_bottleneck_cv,
+                                                                  tail_probability)
+    probabilities = np.empty(n_bottlenecks)
+    if n_bottlenecks == 0:
+        return probabilities
+
+    trajectory = integrate(int(durations[-1]), initial_s, initial_i, 0)
+    distribution = get_survivor_distribution(trajectory, bottleneck_size, durations,
+                                             duration_probabilities)
+    probabilities[0] = distribution[0]
+    if n_bottlenecks > 1:
+        transition_matrix = get_transition_matrix(bottleneck_size, durations,
+                                                  duration_probabilities, integrate)
+    for bottleneck in range(1, n_bottlenecks):
+        distribution = distribution @ transition_matrix
+        probabilities[bottleneck] = distribution[0]
+    return probabilities
+
+def get_transition_matrix(bottleneck_size: int, durations: np.ndarray,
+                          duration_probabilities: np.ndarray,
+                          integrate: Callable) -> np.ndarray:
+    '''Calculates the chance of going from every number of infected survivors
+    of a bottleneck to every number of infected survivors of the next one.
+
+    bottleneck_size: int
+        See get_extinction_probabilities
+
+    durations: np.ndarray
+        See get_interval_distribution
+
+    duration_probabilities: np.ndarray
+        See get_interval_distribution
+
+    integrate: Callable
+        See get_extinction_probabilities
+
+    Returns np.ndarray
+        An array with one row and one column per number of infected hosts (0 to
+        bottleneck_size), where the value in row i and column j is the chance
+        of going from i to j. Every row adds up to 1.
+    '''
+    transition_matrix = np.zeros((bottleneck_size + 1, bottleneck_size + 1))
+    transition_matrix[0, 0] = 1
+    for i in range(1, bottleneck_size + 1):
+        trajectory = integrate(int(durations[-1]), bottleneck_size - i, i, 0)
+        transition_matrix[i] = get_survivor_distribution(trajectory, bottleneck_size,
+                                                         durations, duration_probabilities)
+    return transition_matrix
+
+def get_survivor_distribution(trajectory: np.ndarray, bottleneck_size: int,
+                              durations: np.ndarray,
+                              duration_probabilities: np.ndarray) -> np.ndarray:
+    '''Calculates the distribution of the number of infected survivors of the
+    bottleneck at the end of a period, in the same way as
+    get_bottleneck_survivors in model.py (a binomial draw with the prevalence
+    at the time of the bottleneck), averaged over the possible lengths of the
+    period.
+
+    trajectory: np.ndarray
+        The population state at every timepoint of the longest possible period,
+        with one column for each of S, I, and R
+
+    bottleneck_size: int
+        See get_extinction_probabilities
+
+    durations: np.ndarray
+        See get_interval_distribution
+
+    duration_probabilities: np.ndarray
+        See get_interval_distribution
+
+    Returns np.ndarray
+        The chance of every number of infected survivors, from 0 to
+        bottleneck_size
+    '''
+    end_states = trajectory[durations]
+    popsizes = end_states.sum(axis=1)
+    prevalences = np.divide(end_states[:, 1], popsizes, out=np.zeros(len(popsizes)),
+                            where=popsizes > 0)
+    prevalences = np.clip(prevalences, 0, 1)
+    return duration_probabilities @ get_binomial_probabilities(bottleneck_size, prevalences)
+
+def get_interval_distribution(time_till_bottleneck_mean: int,
+                              time_till_bottleneck_cv: float,
+                              tail_probability: float = 1e-12) -> tuple[np.ndarray]:
+    '''Calculates the distribution of the number of timesteps until the next
+    bottleneck, as drawn by get_time_till_bottleneck in model.py (a gamma
+    distribution rounded to a whole number, where 0 becomes 1). The very
+    shortest and longest numbers of timesteps are so unlikely that they are
+    left out, and their chance (at most tail_probability altogether) is added
+    to the shortest and longest number that is kept.
+
+    time_till_bottleneck_mean: int
+        See get_extinction_probabilities
+
+    time_till_bottleneck_cv: float
+        See get_extinction_probabilities
+
+    tail_probability: float
+        The largest total chance of the numbers of timesteps that are left out
+
+    Returns tuple[np.ndarray]
+        The possible numbers of timesteps, in increasing order, and the chance
+        of each
+    '''
+    if time_till_bottleneck_cv == 0:
+        return np.array([int(time_till_bottleneck_mean)]), np.array([1.0])
+
+    #In the gamma distribution, mean = alpha*beta and variance = alpha*beta*beta, therefore:
+    beta = (time_till_bottleneck_cv * time_till_bottleneck_mean)**2 / time_till_bottleneck_mean
+    alpha = time_till_bottleneck_mean / beta
+
+    #Keeps the chance of a draw below d + 0.5 for every number of timesteps d that is kept
+    durations = []
+    cumulative_probabilities = []
+    duration = 1
+    while True:
+        cumulative_probability = get_regularized_lower_incomplete_gamma(alpha,
+                                                                        (duration + 0.5) / beta)
+        if cumulative_probability > tail_probability / 2:
+            durations.append(duration)
+            cumulative_probabilities.append(cumulative_probability)
+        if 1 - cumulative_probability <= tail_probability / 2:
+            break
+        duration += 1
+
+    cumulative_probabilities[-1] = 1.0
+    return np.array(durations), np.diff(cumulative_probabilities, prepend=0.0)
+
+def get_binomial_probabilities(n: int, probabilities: np.ndarray) -> np.ndarray:
+    '''Calculates the probabilities of every number of successes (0 to n) of a
+    binomial distribution with n trials, for several chances of success at
+    once. The binomial coefficients are calculated from sums of logarithms so
+    that they don't overflow.
+
+    n: int
+        The number of trials
+
+    probabilities: np.ndarray
+        The chances of success, between 0 and 1
+
+    Returns np.ndarray
+        One row per chance of success and one column per number of successes
+    '''
+    successes = np.arange(n + 1)
+    log_factorials = np.concatenate(([0.0], np.cumsum(np.log(np.arange(1, n + 1)))))
+    log_coefficients = log_factorials[n] - log_factorials - log_factorials[::-1]
+
+    binomial_probabilities = np.zeros((len(probabilities), n + 1))
+    inside = (probabilities > 0) & (probabilities < 1)
+    p = probabilities[inside, np.newaxis]
+    binomial_probabilities[inside] = np.exp(log_coefficients + successes * np.log(p) +
+                                            (n - successes) * np.log1p(-p))
+    binomial_probabilities[probabilities <= 0, 0] = 1
+    binomial_probabilities[probabilities >= 1, n] = 1
+    return binomial_probabilities
+
+def get_regularized_lower_incomplete_gamma(a: float, x: float) -> float:
+    '''Calculates the cumulative distribution function of a gamma distribution
+    with shape a and scale 1 at x, using its series when x is small and the
+    continued fraction of the upper incomplete gamma function (evaluated with
+    the modified Lentz method) when x is large.
+
+    a: float
+        The shape of the gamma distribution
+
+    x: float
+        The value at which the function is calculated
+
+    Returns float
+        The fraction of the distribution that lies below x
+    '''
+    if x <= 0:
+        return 0.0
+
+    log_front = a * math.log(x) - x - math.lgamma(a)
+    if x < a + 1:
+        term = 1 / a
+        total = term
+        for n in range(1, 1000):
+            term *= x / (a + n)
+            total += term
+            if abs(term) < abs(total) * 1e-16:
+                break
+        return min(1.0, math.exp(log_front) * total)
+
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    fraction = d
+    for n in range(1, 1000):
+        numerator = -n * (n - a)
+        b += 2
+        d = numerator * d + b
+        d = 1 / (d if abs(d) > tiny else tiny)
+        c = b + numerator / c
+        c = c if abs(c) > tiny else tiny
+        fraction *= d * c
+        if abs(d * c - 1) < 1e-16:
+            break
+    return max(0.0, 1 - math.exp(log_front) * fraction)
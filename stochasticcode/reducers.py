@@ -0,0 +1,502 @@
+'''This module contains the reducers that can be handed to the Dataframe class in
+logger.py. A reducer sees every row of data as it is logged, and only keeps a
+small summary of each parameter set (e.g. how many replicates lost the
+parasite), which it writes to its own .csv file in the output folder. Together
+with the keep_trajectories parameter (see parameters.py), this means that the
+full trajectories don't have to be stored or written when only the summary is
+needed.
+
+Within this module, there are three classes. The Reducer class holds everything
+that all reducers have in common, and new reducers are written by inheriting
+from it and overriding SUMMARY_NAME, SUMMARY_COLUMN_NAMES, reduce, and (if
+needed) get_summary_rows. The Reducer class has five methods:
+__init__
+    Initializes a reducer without any summaries
+
+update
+    Is called by the Dataframe class with every batch of newly logged rows,
+    and updates the summary of every parameter set that the rows belong to
+
+reduce
+    Combines the summary of a parameter set with some new rows of that
+    parameter set. This is the only method that a new reducer has to write.
+
+get_summary_rows
+    Turns the summary of a parameter set into the rows that are written
+
+write_summary
+    Is called by the Dataframe class when it writes its data, and appends the
+    summaries to output/<file_name>_<SUMMARY_NAME>.csv
+
+The ExtinctionProbability class is a reducer that counts the replicates of
+every parameter set in which the parasite went extinct (i.e. the number of
+infected hosts reached zero at a logged timepoint), and writes the extinction
+probability with its Wilson and Clopper-Pearson confidence intervals.
+
+The ExtinctionTimes class is a reducer that records, for every replicate, the
+bottleneck cycle and time at which the number of infected hosts first reached
+zero (or that it never did, or that it did during the burn in), and writes one
+row per replicate, which is enough for survival-curve analysis.
+
+The module also has five functions outside of the classes:
+get_reducers
+    Creates the reducers with the names given in parameters.py
+
+get_wilson_interval
+    Calculates the Wilson score interval of a binomial proportion
+
+get_clopper_pearson_interval
+    Calculates the exact (Clopper-Pearson) interval of a binomial proportion
+
+get_beta_quantile
+    Finds the value below which a given fraction of a beta distribution lies
+
+get_regularized_incomplete_beta
+    Calculates the cumulative distribution function of a beta distribution
+'''
+
+import csv
+import math
+import statistics
+import numpy as np
+
+class Reducer:
+    SUMMARY_NAME: str = ""
+    SUMMARY_COLUMN_NAMES: list[str] = []
+
+    def __init__(self) -> None:
+        '''Initializes a reducer without any summaries
+
+        Explanation of attributes
+        ---------
+
+        SUMMARY_NAME: str
+            The name that is added to the file_name of the dataframe to get the
+            name of the summary .csv file
+
+        SUMMARY_COLUMN_NAMES: list[str]
+            The column names of the summary values, which are written after the
+            constant columns of the parameter set
+
+        summaries: dict
+            Maps every parameter set (as a tuple of its constant column names
+            and values) that has rows since the last write_summary to its
+            summary
+
+        is_header_written: bool
+            False until write_summary has created the .csv file and written its
+            header. After that, write_summary only appends new rows to the file.
+        '''
+        self.summaries: dict = {}
+        self.is_header_written: bool = False
+
+    def update(self, dataframe, integer_data: np.ndarray, float_data: np.ndarray,
+               constant_indices) -> None:
+        '''Updates the summaries of the parameter sets with newly logged rows.
+        Parameter sets are recognised by their constant values, so rows of the
+        same parameter set logged by several dataframes (see merge in logger.py)
+        end up in the same summary.
+
+        dataframe: an instance of the Dataframe class from logger.py
+            The dataframe that the rows are being logged to
+
+        integer_data: np.ndarray
+            An array with one row per new row of data and one column per
+            whole-number variable
+
+        float_data: np.ndarray
+            An array with one row per new row of data and one column per state
+            variable
+
+        constant_indices
+            Either a single index in the constant_sets of the dataframe, if
+            every new row belongs to the same parameter set, or an array with
+            the index of every new row
+        '''
+        if len(integer_data) == 0:
+            return
+
+        if np.ndim(constant_indices) == 0:
+            groups = [(constant_indices, slice(None))]
+        else:
+            groups = [(constant_index, constant_indices == constant_index)
+                      for constant_index in np.unique(constant_indices)]
+        for constant_index, rows in groups:
+            key = tuple(dataframe.constant_sets[constant_index].items())
+            self.summaries[key] = self.reduce(self.summaries.get(key),
+                                              integer_data[rows], float_data[rows])
+
+    def reduce(self, summary, integer_data: np.ndarray, float_data: np.ndarray):
+        '''Combines the summary of a parameter set with some new rows of that
+        parameter set. Has to be written by every reducer.
+
+        summary
+            The summary of the rows seen so far, or None if these are the first
+            rows of the parameter set
+
+        integer_data: np.ndarray
+            See update
+
+        float_data: np.ndarray
+            See update
+
+        Returns the new summary
+        '''
+        raise NotImplementedError
+
+    def get_summary_rows(self, summary) -> list[list]:
+        '''Turns the summary of a parameter set into the rows that are 
+        written. By default, the summary is already the values of a single row.
+
+        summary
+            The summary of all rows of the parameter set
+
+        Returns list[list]
+            One or more rows, each with one value per SUMMARY_COLUMN_NAMES
+        '''
+        return [summary]
+
+    def write_summary(self, dataframe) -> None:
+        '''Appends the summary rows of every summarised parameter set to
+        output/<file_name>_<SUMMARY_NAME>.csv, each with the constant values of
+        the parameter set followed by the summary values, and then forgets the
+        summaries. The first call creates (or overwrites) the file and writes 
+        the header. Every engine in model.py logs all rows of a parameter set 
+        before it writes the data, so every parameter set is only summarised 
+        once.
+
+        dataframe: an instance of the Dataframe class from logger.py
+            The dataframe that is writing its data
+        '''
+        mode = 'a' if self.is_header_written else 'w'
+        with open(f'output/{dataframe.file_name}_{self.SUMMARY_NAME}.csv', mode,
+                  newline='') as f:
+            writer = csv.writer(f)
+            if not self.is_header_written:
+                writer.writerow(dataframe.CONSTANT_COLUMN_NAMES + self.SUMMARY_COLUMN_NAMES)
+                self.is_header_written = True
+            for key, summary in self.summaries.items():
+                constants = dict(key)
+                constant_values = [constants.get(column_name, "") for column_name
+                                   in dataframe.CONSTANT_COLUMN_NAMES]
+                writer.writerows(constant_values + summary_row for summary_row
+                                 in self.get_summary_rows(summary))
+        self.summaries = {}
+
+class ExtinctionProbability(Reducer):
+    SUMMARY_NAME: str = "extinction_probability"
+    SUMMARY_COLUMN_NAMES: list[str] = ["TotalReps", "ExtinctionCount",
+                                       "ExtinctionProbability",
+                                       "WilsonLower", "WilsonUpper",
+                                       "ClopperPearsonLower", "ClopperPearsonUpper"]
+
+    def __init__(self, confidence_level: float = 0.95) -> None:
+        '''Initializes the reducer without any summaries
+
+        confidence_level: float
+            The confidence level of the intervals around the extinction
+            probability, e.g. 0.95 for 95% confidence intervals
+        '''
+        super().__init__()
+        self.confidence_level: float = confidence_level
+
+    def reduce(self, summary: tuple[set], integer_data: np.ndarray,
+               float_data: np.ndarray) -> tuple[set]:
+        '''Keeps track of the replicates of a parameter set that have logged
+        rows, and of those in which the parasite went extinct, i.e. that have
+        logged a row without infected hosts. This is the same as the
+        ExtinctionOccurred column that Visualization.R calculates from the full
+        data (a minimum prevalence of zero).
+
+        summary: tuple[set]
+            The replicates seen so far and the replicates in which the parasite
+            went extinct, or None if these are the first rows of the parameter
+            set
+
+        integer_data: np.ndarray
+            See Reducer.update
+
+        float_data: np.ndarray
+            See Reducer.update
+
+        Returns tuple[set]
+            The replicates seen so far and the replicates in which the parasite
+            went extinct
+        '''
+        if summary is None:
+            summary = (set(), set())
+        all_reps, extinct_reps = summary
+        reps = integer_data[:, 0]
+        all_reps.update(np.unique(reps).tolist())
+        extinct_reps.update(np.unique(reps[float_data[:, 1] == 0]).tolist())
+        return summary
+
+    def get_summary_rows(self, summary: tuple[set]) -> list[list]:
+        '''Counts the replicates and extinctions of a parameter set, and
+        calculates the extinction probability and its confidence intervals
+
+        summary: tuple[set]
+            See reduce
+
+        Returns list[list]
+            A single row with TotalReps, ExtinctionCount, ExtinctionProbability,
+            WilsonLower, WilsonUpper, ClopperPearsonLower, and 
+            ClopperPearsonUpper
+        '''
+        all_reps, extinct_reps = summary
+        n_reps = len(all_reps)
+        n_extinctions = len(extinct_reps)
+        return [[n_reps, n_extinctions, n_extinctions / n_reps] +
+                list(get_wilson_interval(n_extinctions, n_reps, self.confidence_level)) +
+                list(get_clopper_pearson_interval(n_extinctions, n_reps,
+                                                  self.confidence_level))]
+
+class ExtinctionTimes(Reducer):
+    SUMMARY_NAME: str = "extinction_times"
+    SUMMARY_COLUMN_NAMES: list[str] = ["Rep", "Censored", "ExtinctDuringBurnIn",
+                                       "ExtinctionSeries", "ExtinctionBottleneck",
+                                       "ExtinctionTimepoint", "ExtinctionTime",
+                                       "ObservedTime"]
+
+    def __init__(self, burn_in: int = 0) -> None:
+        '''Initializes the reducer without any summaries
+
+        burn_in: int
+            The number of bottleneck cycles before the first logged one (see
+            the burn_in parameter in parameters.py), so that the bottleneck 
+            cycles are numbered from the start of the replicate
+        '''
+        super().__init__()
+        self.burn_in: int = burn_in
+
+    def reduce(self, summary: dict, integer_data: np.ndarray,
+               float_data: np.ndarray) -> dict:
+        '''Follows every replicate of a parameter set through its bottleneck
+        cycles until the first logged row without infected hosts. The rows of
+        a replicate arrive in order, although rows of different replicates may
+        be interleaved (e.g. with the "Batched" engine). Every replicate is
+        described by a list of its current Series, the number of bottleneck
+        cycles before the current one, the time that passed before the current
+        cycle, the last Timepoint of the current cycle, and its extinction 
+        (whether it happened during the burn in, Series, bottleneck cycle, 
+        Timepoint, and time), or None if the parasite hasn't gone extinct. 
+        Bottleneck cycles are numbered from the start of the replicate, but 
+        only logged rows are seen, so the times are counted from the end of the
+        burn in. Infected hosts are only lost at a bottleneck, so a replicate 
+        whose first logged row has none lost its parasite at a bottleneck of 
+        the burn in, whose Series, bottleneck cycle, and time aren't known.
+
+        summary: dict
+            Maps every replicate seen so far to its list, or None if these are
+            the first rows of the parameter set
+
+        integer_data: np.ndarray
+            See Reducer.update
+
+        float_data: np.ndarray
+            See Reducer.update
+
+        Returns dict
+            The lists of the replicates seen so far
+        '''
+        if summary is None:
+            summary = {}
+        order = np.lexsort((integer_data[:, 1], integer_data[:, 0]))
+        reps, all_series, timepoints = integer_data[order].T
+        no_extinction = np.iinfo(np.int64).max
+        extinct_timepoints = np.where(float_data[order, 1] == 0, timepoints, no_extinction)
+        starts = np.flatnonzero(np.r_[True, (reps[1:] != reps[:-1]) | 
+                                            (all_series[1:] != all_series[:-1])])
+        for rep, series, last_timepoint, extinct_timepoint in zip(
+                reps[starts].tolist(), all_series[starts].tolist(),
+                np.maximum.reduceat(timepoints, starts).tolist(),
+                np.minimum.reduceat(extinct_timepoints, starts).tolist()):
+            state = summary.setdefault(rep, [None, 0, 0, 0, None])
+            #The first logged row of the replicate already had no infected hosts
+            if state[0] is None and self.burn_in > 0 and extinct_timepoint == 0:
+                state[4] = (1, None, None, None, None)
+            if series != state[0]:
+                if state[0] is not None:
+                    state[1] += 1
+                    state[2] += state[3]
+                state[0] = series
+                state[3] = 0
+            state[3] = max(state[3], last_timepoint)
+            if state[4] is None and extinct_timepoint != no_extinction:
+                state[4] = (0, series, self.burn_in + state[1], extinct_timepoint, 
+                            state[2] + extinct_timepoint)
+        return summary
+
+    def get_summary_rows(self, summary: dict) -> list[list]:
+        '''Writes one row per replicate. Replicates in which the parasite never
+        went extinct are censored, and only have their ObservedTime (the time
+        from the first to the last logged row), which is what survival analysis
+        needs. Replicates that went extinct during the burn in are marked by
+        ExtinctDuringBurnIn.
+
+        summary: dict
+            See reduce
+
+        Returns list[list]
+            One row per replicate, with Rep, Censored, ExtinctDuringBurnIn,
+            ExtinctionSeries, ExtinctionBottleneck, ExtinctionTimepoint, 
+            ExtinctionTime, and ObservedTime
+        '''
+        summary_rows = []
+        for rep, (_, _, time_before_cycle, last_timepoint, extinction) in sorted(summary.items()):
+            is_censored = extinction is None
+            if is_censored:
+                extinction = (0, None, None, None, None)
+            summary_rows.append([rep, int(is_censored)] + list(extinction) +
+                                [time_before_cycle + last_timepoint])
+        return summary_rows
+
+def get_reducers(reducer_names: list[str], confidence_level: float = 0.95,
+                 burn_in: int = 0) -> list:
+    '''Creates the reducers with the given names
+
+    reducer_names: list[str]
+        The names of the reducers (see the reducers parameter in parameters.py)
+
+    confidence_level: float
+        The confidence level of the intervals calculated by the reducers
+
+    burn_in: int
+        The number of bottleneck cycles before the first logged one
+
+    Returns list
+        One new instance of the named reducer class per name
+    '''
+    reducer_classes = {"ExtinctionProbability": lambda: ExtinctionProbability(confidence_level),
+                       "ExtinctionTimes": lambda: ExtinctionTimes(burn_in)}
+    return [reducer_classes[reducer_name]() for reducer_name in reducer_names]
+
+def get_wilson_interval(n_successes: int, n_trials: int,
+                        confidence_level: float) -> tuple[float]:
+    '''Calculates the Wilson score interval of a binomial proportion, which
+    (unlike the usual normal approximation) stays between 0 and 1 and behaves
+    well when the proportion is close to 0 or 1.
+
+    n_successes: int
+        The number of successes, e.g. replicates in which the parasite went
+        extinct
+
+    n_trials: int
+        The number of trials, e.g. replicates
+
+    confidence_level: float
+        The confidence level of the interval, e.g. 0.95
+
+    Returns tuple[float]
+        The lower and upper bounds of the interval
+    '''
+    z = statistics.NormalDist().inv_cdf(1 - (1 - confidence_level) / 2)
+    proportion = n_successes / n_trials
+    denominator = 1 + z**2 / n_trials
+    center = (proportion + z**2 / (2 * n_trials)) / denominator
+    half_width = (z / denominator *
+                  math.sqrt(proportion * (1 - proportion) / n_trials +
+                            z**2 / (4 * n_trials**2)))
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+def get_clopper_pearson_interval(n_successes: int, n_trials: int,
+                                 confidence_level: float) -> tuple[float]:
+    '''Calculates the exact (Clopper-Pearson) interval of a binomial
+    proportion, from the quantiles of beta distributions. The interval is
+    conservative, i.e. it covers the true proportion at least as often as the
+    confidence level says.
+
+    n_successes: int
+        See get_wilson_interval
+
+    n_trials: int
+        See get_wilson_interval
+
+    confidence_level: float
+        See get_wilson_interval
+
+    Returns tuple[float]
+        The lower and upper bounds of the interval
+    '''
+    alpha = 1 - confidence_level
+    if n_successes == 0:
+        lower = 0.0
+    else:
+        lower = get_beta_quantile(alpha / 2, n_successes, n_trials - n_successes + 1)
+    if n_successes == n_trials:
+        upper = 1.0
+    else:
+        upper = get_beta_quantile(1 - alpha / 2, n_successes + 1, n_trials - n_successes)
+    return lower, upper
+
+def get_beta_quantile(probability: float, a: float, b: float) -> float:
+    '''Finds the value x for which a fraction probability of a beta(a, b)
+    distribution lies below x, by bisection (the cumulative distribution
+    function only increases, so this always converges).
+
+    probability: float
+        The fraction of the distribution that should lie below the returned
+        value
+
+    a: float
+        The first shape parameter of the beta distribution
+
+    b: float
+        The second shape parameter of the beta distribution
+
+    Returns float
+        The quantile
+    '''
+    lower, upper = 0.0, 1.0
+    for _ in range(100):
+        middle = (lower + upper) / 2
+        if get_regularized_incomplete_beta(middle, a, b) < probability:
+            lower = middle
+        else:
+            upper = middle
+        if upper - lower < 1e-15:
+            break
+    return (lower + upper) / 2
+
+def get_regularized_incomplete_beta(x: float, a: float, b: float) -> float:
+    '''Calculates the cumulative distribution function of a beta(a, b)
+    distribution at x, using the continued fraction of the incomplete beta
+    function (evaluated with the modified Lentz method).
+
+    x: float
+        The value at which the function is calculated, between 0 and 1
+
+    a: float
+        The first shape parameter of the beta distribution
+
+    b: float
+        The second shape parameter of the beta distribution
+
+    Returns float
+        The fraction of the distribution that lies below x
+    '''
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    if x > (a + 1) / (a + b + 2):
+        return 1 - get_regularized_incomplete_beta(1 - x, b, a)
+
+    log_front = (math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) +
+                 a * math.log(x) + b * math.log1p(-x))
+    tiny = 1e-300
+    c = 1.0
+    d = 1 - (a + b) * x / (a + 1)
+    d = 1 / (d if abs(d) > tiny else tiny)
+    fraction = d
+    for m in range(1, 1000):
+        for numerator in [m * (b - m) * x / ((a + 2*m - 1) * (a + 2*m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2*m) * (a + 2*m + 1))]:
+            d = 1 + numerator * d
+            d = 1 / (d if abs(d) > tiny else tiny)
+            c = 1 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            fraction *= d * c
+        if abs(d * c - 1) < 1e-15:
+            break
+    return math.exp(log_front) * fraction / a
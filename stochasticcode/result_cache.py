@@ -0,0 +1,240 @@
+'''This module keeps the results of parameter sets in a cache on disk, in the
+output/.cache folder, so that a run only has to calculate the parameter sets
+that no earlier run has calculated. This is useful when a range is extended
+(e.g. set_time_till_bottleneck_mean(10, 610, 10) becoming
+set_time_till_bottleneck_mean(10, 1010, 10)), since all of the combinations
+of the first run are then taken from the cache, and the output is assembled
+from the cached and the new parameter sets in the usual order.
+
+Every result is stored under a key, which is a hash of every input that the
+result depends on: the values of the parameter set, every parameter that is
+the same for all parameter sets (e.g. n_reps, birth_type,
+fractional_timestep_size, and seed), and the bottleneck schedule of the
+parameter set. The random numbers of a parameter set only depend on the seed
+and on its own values (see get_stream_index in model.py), not on its position
+in the run, so a cached result is exactly what running the parameter set again
+would give. The result itself is the rows of data of the parameter set, with
+the Series numbers counted from the first series of the parameter set, so that
+they can be shifted to wherever the parameter set ends up in a new run.
+
+The ResultCache class has six methods:
+__init__
+    Sets up the cache
+
+get_key
+    Returns the key of the result of a parameter set
+
+is_cached
+    Checks whether the result of a parameter set is in the cache
+
+load
+    Logs the cached result of a parameter set to a dataframe, if there is one
+
+save
+    Stores the result of a parameter set
+
+get_statistics
+    Counts how many parameter sets were taken from the cache
+
+The module also has two functions outside of the class:
+get_model_inputs
+    Returns the parameters that the results of every parameter set depend on
+
+get_json_value
+    Turns the numpy values among the inputs into values that can be hashed
+'''
+
+import hashlib
+import json
+import os
+import numpy as np
+
+#The folder that holds the cached results, unless another one is given to ResultCache
+CACHE_FOLDER: str = "output/.cache"
+
+#Raise whenever a change to model.py changes its results, so that older results aren't reused
+CACHE_VERSION: int = 1
+
+#The rangeable parameters, in the order of the values of a parameter set
+RANGEABLE_PARAMETERS: list[str] = ["initial_prevalence", "bottleneck_size_mean",
+                                   "bottleneck_size_cv", "time_till_bottleneck_mean",
+                                   "time_till_bottleneck_cv", "host_birth_rate",
+                                   "parasite_fecundity_effect", "s_death_rate",
+                                   "i_death_rate", "r_death_rate", "transmission_rate",
+                                   "recovery_rate"]
+
+#Parameters that only change how the results are calculated or written, not the results
+IGNORED_PARAMETERS: list[str] = ["file_name", "birth_function", "transmission_function",
+                                 "sweep_chunk_size", "n_workers", "output_format",
+                                 "reducers", "keep_trajectories", "confidence_level",
+                                 "flow_cache_size", "share_trajectory_prefixes",
+                                 "export_schedule", "replay_schedule",
+                                 "checkpoint_interval", "result_cache"]
+
+class ResultCache:
+    def __init__(self, folder: str = None) -> None:
+        '''Sets up the cache. The folder is only created once the first result
+        is stored.
+
+        folder: str
+            See the folder attribute. Defaults to CACHE_FOLDER.
+
+        Explanation of attributes
+        ---------
+
+        folder: str
+            The folder that holds one .npz file per cached result, named after
+            its key
+
+        n_hits: int
+            The number of parameter sets that were taken from the cache
+
+        n_misses: int
+            The number of parameter sets that had to be calculated (and were
+            then stored)
+        '''
+        self.folder: str = folder if folder is not None else CACHE_FOLDER
+        self.n_hits: int = 0
+        self.n_misses: int = 0
+
+    def get_key(self, parameters, parameter_set: list, bottleneck_schedule: tuple) -> str:
+        '''Returns the key of the result of a parameter set, a hash of every
+        input that the result depends on. The inputs are written out as JSON
+        with sorted keys (and floats written exactly), so that the same inputs
+        always give the same key.
+
+        parameters: an instance of the Parameters class in parameters.py
+            The parameters of the run
+
+        parameter_set: list
+            The rangeable parameter values of the parameter set, in the order
+            produced by the iter.product method in the "run" function of
+            model.py
+
+        bottleneck_schedule: tuple
+            The bottleneck schedule of the parameter set (see get_schedule in
+            model.py)
+
+        Returns str
+            The SHA-256 hash of the inputs, as 64 hexadecimal digits
+        '''
+        inputs = {"version": CACHE_VERSION,
+                  "parameters": get_model_inputs(parameters),
+                  "parameter_set": dict(zip(RANGEABLE_PARAMETERS, parameter_set)),
+                  "schedule": [np.asarray(part).tolist() for part in bottleneck_schedule]}
+        text = json.dumps(inputs, sort_keys=True, default=get_json_value)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def is_cached(self, key: str) -> bool:
+        '''Checks whether the result of a parameter set is in the cache
+
+        key: str
+            See get_key
+
+        Returns bool
+            True if the result is in the cache
+        '''
+        return os.path.exists(f"{self.folder}/{key}.npz")
+
+    def load(self, key: str, dataframe, first_series: int) -> int:
+        '''Logs the cached result of a parameter set to a dataframe, if there
+        is one, with its Series numbers starting at first_series
+
+        key: str
+            See get_key
+
+        dataframe: an instance of the Dataframe class from logger.py
+            The dataframe to log the rows of data to, which already holds the
+            constant data of the parameter set
+
+        first_series: int
+            The series number of the first bottleneck of the parameter set in
+            this run
+
+        Returns int
+            The number of series numbers that the parameter set uses, or None
+            if the result isn't in the cache
+        '''
+        if not self.is_cached(key):
+            return None
+
+        with np.load(f"{self.folder}/{key}.npz") as result:
+            integer_data = result["integer_columns"]
+            float_data = result["float_columns"]
+            n_series = int(result["n_series"])
+        integer_data[:, dataframe.VARIABLE_COLUMN_NAMES.index("Series")] += first_series
+        dataframe.add_rows(integer_data, float_data)
+        self.n_hits += 1
+        return n_series
+
+    def save(self, key: str, dataframe, first_series: int, n_series: int) -> None:
+        '''Stores the result of a parameter set. The result is written to a
+        temporary file that is then renamed, so that an interrupted run never
+        leaves a broken result in the cache.
+
+        key: str
+            See get_key
+
+        dataframe: an instance of the Dataframe class from logger.py
+            Holds every row of data of the parameter set, and nothing else
+
+        first_series: int
+            The series number of the first bottleneck of the parameter set
+
+        n_series: int
+            The number of series numbers that the parameter set used
+        '''
+        integer_data = dataframe.integer_columns[:dataframe.n_rows].copy()
+        integer_data[:, dataframe.VARIABLE_COLUMN_NAMES.index("Series")] -= first_series
+
+        os.makedirs(self.folder, exist_ok=True)
+        path = f"{self.folder}/{key}.npz"
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'wb') as f:
+            np.savez(f, integer_columns=integer_data,
+                     float_columns=dataframe.float_columns[:dataframe.n_rows],
+                     n_series=n_series)
+        os.replace(temporary_path, path)
+        self.n_misses += 1
+
+    def get_statistics(self) -> dict:
+        '''Counts how many parameter sets were taken from the cache
+
+        Returns dict
+            The number of parameter sets taken from the cache (Hits) and the
+            number that had to be calculated (Misses)
+        '''
+        return {"Hits": self.n_hits, "Misses": self.n_misses}
+
+def get_model_inputs(parameters) -> dict:
+    '''Returns the parameters that the results of every parameter set depend
+    on, which are all of them except the rangeable ones (whose values are
+    those of the parameter set) and the ones in IGNORED_PARAMETERS. The
+    "Serial" and "Parallel" engines give exactly the same results, so they
+    share their cached results.
+
+    parameters: an instance of the Parameters class in parameters.py
+        The parameters of the run
+
+    Returns dict
+        Maps the name of every parameter to its value
+    '''
+    model_inputs = {name: value for name, value in vars(parameters).items()
+                    if name not in RANGEABLE_PARAMETERS + IGNORED_PARAMETERS}
+    if model_inputs["engine"] == "Parallel":
+        model_inputs["engine"] = "Serial"
+    return model_inputs
+
+def get_json_value(value):
+    '''Turns a value that JSON can't write (e.g. a numpy integer) into one that
+    it can
+
+    value
+        Any value among the inputs of get_key
+
+    Returns the value as a plain Python number, or as a string if it isn't a
+    number
+    '''
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
@@ -0,0 +1,104 @@
+'''This module writes and reads the bottleneck schedules of a run. Before a
+parameter set is simulated, the number of timesteps until every bottleneck of
+every replicate is drawn in one go, together with a first draw of the size of
+every bottleneck (see get_bottleneck_schedule in model.py). The size draw can
+only be used if it is no bigger than the population at the time of the
+bottleneck, which isn't known in advance, so a size that doesn't fit is drawn
+again when the bottleneck happens. The schedule can be written to a .csv file,
+so that the timing and sizes of the bottlenecks of a run can be checked
+afterwards, and read back, so that a run can be repeated with exactly the same
+bottlenecks.
+
+The BottleneckSchedule class writes the schedules to a .csv file in the same
+way that the reducers of reducers.py write their summaries. On top of the
+methods of the Reducer class, it has one method:
+add_schedule
+    Stores the schedule of the current parameter set of a dataframe
+
+The module also has one function outside of the class:
+read_schedules
+    Reads the schedules written by a BottleneckSchedule back in
+'''
+
+import csv
+import numpy as np
+
+import stochasticcode.reducers as reducers
+
+class BottleneckSchedule(reducers.Reducer):
+    SUMMARY_NAME: str = "bottleneck_schedule"
+    SUMMARY_COLUMN_NAMES: list[str] = ["ParameterSetKey", "Rep", "Bottleneck",
+                                       "TimeTillBottleneck", "BottleneckSizeDraw"]
+
+    def add_schedule(self, dataframe, parameter_set_key: int,
+                     time_till_bottleneck: np.ndarray,
+                     bottleneck_size_draws: np.ndarray) -> None:
+        '''Stores the schedule of the current parameter set of a dataframe, to
+        be written by write_summary
+
+        dataframe: an instance of the Dataframe class from logger.py
+            Holds the constant data of the current parameter set
+
+        parameter_set_key: int
+            The number that identifies the parameter set by its values (see
+            get_stream_index in model.py), which is how a replayed run finds the
+            schedule again
+
+        time_till_bottleneck: np.ndarray
+            The number of timesteps until every bottleneck, with one row per
+            replicate and one column per bottleneck
+
+        bottleneck_size_draws: np.ndarray
+            The first draw of the size of every bottleneck, in the same layout
+        '''
+        self.summaries[tuple(dataframe.constant_data.items())] = (parameter_set_key,
+                                                                time_till_bottleneck,
+                                                                bottleneck_size_draws)
+
+    def get_summary_rows(self, summary: tuple) -> list[list]:
+        '''Turns the schedule of a parameter set into one row per bottleneck of
+        every replicate
+
+        summary: tuple
+            The parameter set key and the two arrays given to add_schedule
+
+        Returns list[list]
+            One row per replicate and bottleneck, ordered by replicate
+        '''
+        parameter_set_key, time_till_bottleneck, bottleneck_size_draws = summary
+        n_reps, n_bottlenecks = time_till_bottleneck.shape
+        return [[parameter_set_key, rep, bottleneck,
+                 time_till_bottleneck[rep, bottleneck].item(),
+                 bottleneck_size_draws[rep, bottleneck].item()]
+                for rep in range(n_reps) for bottleneck in range(n_bottlenecks)]
+
+def read_schedules(file_name: str) -> dict:
+    '''Reads the schedules written by a BottleneckSchedule back in
+
+    file_name: str
+        The name of the .csv file in the output folder (minus the ".csv"
+        extension), e.g. "data_bottleneck_schedule"
+
+    Returns dict
+        Maps the key of every parameter set of the run (see add_schedule) to
+        its number of timesteps until every bottleneck and its first draw of
+        the size of every bottleneck, as two arrays with one row per replicate
+        and one column per bottleneck
+    '''
+    rows = {}
+    with open(f"output/{file_name}.csv", newline='') as f:
+        for row in csv.DictReader(f):
+            rows.setdefault(int(row["ParameterSetKey"]), []).append(row)
+
+    schedules = {}
+    for parameter_set_key, parameter_set_rows in rows.items():
+        n_reps = max(int(row["Rep"]) for row in parameter_set_rows) + 1
+        n_bottlenecks = max(int(row["Bottleneck"]) for row in parameter_set_rows) + 1
+        time_till_bottleneck = np.zeros((n_reps, n_bottlenecks), dtype=int)
+        bottleneck_size_draws = np.zeros((n_reps, n_bottlenecks), dtype=int)
+        for row in parameter_set_rows:
+            rep, bottleneck = int(row["Rep"]), int(row["Bottleneck"])
+            time_till_bottleneck[rep, bottleneck] = int(row["TimeTillBottleneck"])
+            bottleneck_size_draws[rep, bottleneck] = int(row["BottleneckSizeDraw"])
+        schedules[parameter_set_key] = (time_till_bottleneck, bottleneck_size_draws)
+    return schedules
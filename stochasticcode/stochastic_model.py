@@ -32,6 +32,23 @@ run
     and returns a list of all possible combinations, which means that you can 
     vary one parameter across a range to get a one-dimensional parameter space, 
     two parameters across ranges to get a two-dimensional parameter space, etc.
+get_replayed_schedules
+    Reads the bottleneck schedules of an earlier run that should be replayed,
+    if any.
+get_schedule
+    Returns the bottleneck schedule of a parameter set, either replayed or 
+    newly drawn.
+resume_run
+    Goes back to the last checkpoint of an interrupted run, if there is one
+    (see checkpoint.py).
+save_checkpoint
+    Saves a checkpoint of the run every checkpoint_interval parameter sets.
+get_result_cache
+    Creates the cache of the results of parameter sets, if it has been turned
+    on (see result_cache.py).
+run_cached
+    Logs the data of a parameter set from the result cache, or runs it and
+    stores its data in the cache.
 log_parameter_set
     Gives the parameters and their values for this parameter set to a dataframe in the
     logger module so that the logger can make sure to fill in these columns in
@@ -40,7 +57,11 @@ log_parameter_set
 run_parameter_set
     Runs the model such that the initial population experiences periods of
     normal population growth/parasite transmission punctuated by bottleneck 
-    events.
+    events. Once a replicate has lost its parasite, the remaining periods are
+    run with run_model_parasite_free instead.
+get_bottleneck_schedule
+    Draws the timing of every bottleneck of every replicate of a parameter 
+    set, and a first draw of every bottleneck size, all at once.
 get_time_till_bottleneck
     Returns the number of timesteps until the next bottleneck.
     This will be a whole number value. The value could be exact and 
@@ -51,15 +72,81 @@ get_bottleneck_size
     Returns the size of the bottleneck, i.e. the number of hosts that should 
     survive through the botteneck. This size could be exact and predetermined, 
     or pulled from a normal distribution.
+get_truncated_bottleneck_sizes
+    Draws bottleneck sizes that are no bigger than the current population, by
+    inverse transform sampling instead of redrawing.
+get_flow_cache
+    Creates the cache that remembers trajectories between bottlenecks, unless
+    it has been turned off.
+get_flow_map_store
+    Creates the store of interpolated tables of trajectories between 
+    bottlenecks, if they have been turned on.
 run_model
     Runs multiple timepoints of the model, returns the final population state,
     and logs the data generated (if not in a burn-in period).
+run_segment
+    Used by run_model during a burn-in period. Runs multiple timepoints of the
+    model and only returns the final population state, without building any
+    rows of data.
+get_trajectory
+    Used by run_model when a flow cache is given, and by the tables of 
+    flow_map.py. Runs multiple timepoints of
+    the model and returns the population state at every timepoint as an 
+    array, which the cache can hand out again.
 run_timepoint
     Runs and returns the results of a single timepoint of the model. This 
     timepoint may be run in one step, or in multiple fractional steps.
+run_model_parasite_free
+    Used instead of run_model when there are no infected hosts left. Reuses the
+    host-only trajectory whenever a period starts from a population that has 
+    been seen before, and logs the same data that run_model would have.
+run_timepoint_parasite_free
+    Runs a single timepoint of the model without any infected hosts, so only
+    host births and deaths are calculated.
 get_bottleneck_survivors
     Subjects the host population to a bottleneck by sampling a number of 
     survivors from the population.
+run_parameter_set_batched
+    Used instead of run_parameter_set when the "Batched" engine is selected.
+    Runs all replicates of a parameter set together as numpy arrays and logs
+    the data in the same layout as run_parameter_set.
+run_sweep
+    Used instead of looping over run_parameter_set when the "Sweep" engine is
+    selected. Runs every replicate of every parameter set together as numpy
+    arrays, in chunks of bounded size.
+log_batch
+    Logs the trajectories of one parameter set's replicates from the output of
+    run_batch.
+run_batch
+    Runs several replicates ("lanes") of the model in lock-step, masking out
+    lanes whose bottleneck comes earlier than the others.
+get_bottleneck_size_batched
+    The batched equivalent of get_bottleneck_size.
+run_model_batched
+    The batched equivalent of run_model.
+get_bottleneck_survivors_batched
+    The batched equivalent of get_bottleneck_survivors, using vectorized
+    binomial draws.
+run_parallel
+    Used instead of looping over run_parameter_set when the "Parallel" engine
+    is selected. Spreads blocks of replicates across worker processes and logs
+    their data in order.
+run_task
+    Runs one block of replicates of one parameter set inside a worker process.
+run_markov_chain
+    Used instead of running replicates when the "MarkovChain" engine is 
+    selected. Calculates the exact extinction probability of every parameter
+    set after every bottleneck (see markov_chain.py).
+get_random_key
+    Turns the root seed into the key of the counter-based random number 
+    streams.
+get_stream_index
+    Turns the values of a parameter set into the number that selects its
+    random number streams.
+seed_random_number_generator
+    Resets the random number generator to the stream of one bottleneck cycle
+    of one replicate of one parameter set, so that every replicate gives the
+    same data no matter which process runs it, or in which order.
 get_regulated_births
     Calculates and returns the number of new hosts that should be born in this
     timestep due to a birth process which is regulated by carrying capacity
@@ -86,11 +173,22 @@ get_recoveries
     in this timestep
 '''
 
+import os
+import hashlib
+import json
 import numpy as np
 import itertools as iter
+from concurrent.futures import ProcessPoolExecutor
 from typing import Callable
 
 import stochasticcode.logger as logger
+import stochasticcode.reducers as reducers
+import stochasticcode.flow_cache as flow_cache_module
+import stochasticcode.flow_map as flow_map
+import stochasticcode.markov_chain as markov_chain
+import stochasticcode.schedule as schedule_module
+import stochasticcode.checkpoint as checkpoint_module
+import stochasticcode.result_cache as result_cache_module
 
 random_number_generator = np.random.default_rng(92500169789667897205027529303633824467)
 series = 1
@@ -105,14 +203,21 @@ def run(parameters) -> None:
     method in this function takes thoses lists and returns a list of all possible
     combinations, which means that you can vary one parameter across a range to
     get a one-dimensional parameter space, two parameters across ranges to get
-    a two-dimensional parameter space, etc.
+    a two-dimensional parameter space, etc. If checkpoint_interval is set, the
+    run saves checkpoints as it goes, and resumes from the last one if it was
+    interrupted (see checkpoint.py).
 
     parameters: an instance of the Parameters class in parameters.py
         Contains attributes which are the parameter values that the model
         should be run with. See parameters.py for more detail.
     '''
 
-    dataframe = logger.Dataframe(file_name = parameters.file_name)
+    dataframe = logger.Dataframe(file_name = parameters.file_name,
+                                 output_format = parameters.output_format,
+                                 reducers = reducers.get_reducers(parameters.reducers,
+                                                                  parameters.confidence_level,
+                                                                  parameters.burn_in),
+                                 is_keeping_rows = parameters.keep_trajectories)
 
     all_parameter_sets = iter.product(parameters.initial_prevalence,
                                       parameters.bottleneck_size_mean,
@@ -126,30 +231,297 @@ def run(parameters) -> None:
                                       parameters.r_death_rate,
                                       parameters.transmission_rate,
                                       parameters.recovery_rate)
-    for parameter_set in all_parameter_sets:
+
+    result_cache = get_result_cache(parameters)
+
+    if parameters.engine == "Sweep":
+        run_sweep(dataframe, parameters, list(all_parameter_sets))
+        return
+
+    if parameters.engine == "Parallel":
+        run_parallel(dataframe, parameters, list(all_parameter_sets), result_cache)
+        return
+
+    if parameters.engine == "MarkovChain":
+        run_markov_chain(dataframe, parameters, list(all_parameter_sets))
+        return
+
+    flow_cache = None
+    flow_map_store = None
+    random_key = get_random_key(parameters.seed)
+    replayed_schedules = get_replayed_schedules(parameters)
+    schedule_summary = schedule_module.BottleneckSchedule() if parameters.export_schedule else None
+    checkpoint = checkpoint_module.Checkpoint(parameters, dataframe, [schedule_summary])
+    state = resume_run(checkpoint)
+    if parameters.engine == "Batched":
+        run_function = run_parameter_set_batched
+        run_arguments = {"random_key": random_key}
+    else:
+        flow_cache = get_flow_cache(parameters)
+        flow_map_store = state.get("flow_map_store") or get_flow_map_store(parameters)
+        run_function = run_parameter_set
+        run_arguments = {"flow_cache": flow_cache, "flow_map_store": flow_map_store,
+                         "random_key": random_key}
+
+    for parameter_set_index, parameter_set in iter.islice(enumerate(all_parameter_sets),
+                                                          len(state["completed_parameter_sets"]),
+                                                          None):
         log_parameter_set(dataframe, parameters, parameter_set)
-        run_parameter_set(dataframe, n_reps=parameters.n_reps,
-                          n_bottlenecks=parameters.n_bottlenecks,
-                          burn_in = parameters.burn_in,
-                          initial_popsize=parameters.initial_popsize,
-                          initial_prevalence=parameter_set[0],
-                          bottleneck_size_mean=parameter_set[1],
-                          bottleneck_size_cv=parameter_set[2],
-                          time_till_bottleneck_mean=parameter_set[3],
-                          time_till_bottleneck_cv=parameter_set[4],
-                          host_birth_rate=parameter_set[5],
-                          carrying_capacity=parameters.carrying_capacity,
-                          birth_function=parameters.birth_function,
-                          parasite_fecundity_effect=parameter_set[6],
-                          s_death_rate=parameter_set[7],
-                          i_death_rate=parameter_set[8],
-                          r_death_rate=parameter_set[9],
-                          transmission_rate=parameter_set[10],
-                          transmission_function=parameters.transmission_function,
-                          recovery_rate=parameter_set[11],
-                          fractional_timestep_size=parameters.fractional_timestep_size)
+        bottleneck_schedule = get_schedule(parameters, parameter_set, random_key,
+                                           replayed_schedules)
+        run_arguments["stream_index"] = get_stream_index(parameter_set)
+        run_cached(dataframe, parameters, parameter_set, bottleneck_schedule, result_cache,
+                   lambda set_dataframe:
+                   run_function(set_dataframe, n_reps=parameters.n_reps,
+                                n_bottlenecks=parameters.n_bottlenecks,
+                                burn_in = parameters.burn_in,
+                                initial_popsize=parameters.initial_popsize,
+                                initial_prevalence=parameter_set[0],
+                                bottleneck_size_mean=parameter_set[1],
+                                bottleneck_size_cv=parameter_set[2],
+                                time_till_bottleneck_mean=parameter_set[3],
+                                time_till_bottleneck_cv=parameter_set[4],
+                                host_birth_rate=parameter_set[5],
+                                carrying_capacity=parameters.carrying_capacity,
+                                birth_function=parameters.birth_function,
+                                parasite_fecundity_effect=parameter_set[6],
+                                s_death_rate=parameter_set[7],
+                                i_death_rate=parameter_set[8],
+                                r_death_rate=parameter_set[9],
+                                transmission_rate=parameter_set[10],
+                                transmission_function=parameters.transmission_function,
+                                recovery_rate=parameter_set[11],
+                                fractional_timestep_size=parameters.fractional_timestep_size,
+                                schedule=bottleneck_schedule, **run_arguments))
         dataframe.write_data()
+        if schedule_summary is not None:
+            schedule_summary.add_schedule(dataframe, get_stream_index(parameter_set),
+                                          *bottleneck_schedule)
+            schedule_summary.write_summary(dataframe)
+        save_checkpoint(checkpoint, parameter_set_index + 1, flow_map_store=flow_map_store)
+    checkpoint.finish()
+
+    if result_cache is not None:
+        statistics = result_cache.get_statistics()
+        print(f"Result cache: {statistics['Hits']} parameter sets reused, "
+              f"{statistics['Misses']} calculated")
+    if flow_cache is not None:
+        statistics = flow_cache.get_statistics()
+        print(f"Flow cache: {statistics['Hits']} hits, {statistics['Misses']} misses, "
+              f"{statistics['Evictions']} evictions ({statistics['HitRate']:.1%} hit rate)")
+        if "Extensions" in statistics:
+            print(f"Flow cache: {statistics['Extensions']} stored trajectories extended")
+    if flow_map_store is not None:
+        statistics = flow_map_store.get_statistics()
+        print(f"Flow maps: {statistics['Tables']} tables, {statistics['Points']} "
+              f"calculated trajectories, {statistics['Lookups']} lookups "
+              f"({statistics['ExactLookups']} exact), largest interpolation error "
+              f"{statistics['MaxError']:.3g} hosts")
+
+def get_flow_cache(parameters):
+    '''Creates the flow cache that remembers trajectories between bottlenecks
+    (see flow_cache.py), or returns None if it has been turned off.
+
+    parameters: an instance of the Parameters class in parameters.py
+        Contains the flow_cache_size and share_trajectory_prefixes parameters.
+        See parameters.py for more detail.
+
+    Returns an instance of the FlowCache class from flow_cache.py (or of the
+    TrajectoryStore class if share_trajectory_prefixes is True), or None if
+    flow_cache_size is 0
+    '''
+    if parameters.flow_cache_size == 0:
+        return None
+    if parameters.share_trajectory_prefixes:
+        return flow_cache_module.TrajectoryStore(parameters.flow_cache_size)
+    return flow_cache_module.FlowCache(parameters.flow_cache_size)
+
+def get_flow_map_store(parameters):
+    '''Creates the store of interpolated tables of trajectories between 
+    bottlenecks (see flow_map.py), or returns None if they haven't been turned
+    on. The tables assume that R stays zero, so they can't be used with 
+    recovery.
+
+    parameters: an instance of the Parameters class in parameters.py
+        Contains the flow_map_tolerance and recovery_rate parameters. See 
+        parameters.py for more detail.
+
+    Returns an instance of the FlowMapStore class from flow_map.py, or None if
+    flow_map_tolerance is None
+    '''
+    if parameters.flow_map_tolerance is None:
+        return None
+    if any(recovery_rate != 0 for recovery_rate in parameters.recovery_rate):
+        raise ValueError('''The flow map tables in model.py can only be used when 
+                         every value of recovery_rate is 0''')
+    return flow_map.FlowMapStore(parameters.flow_map_tolerance, get_trajectory)
         
+def get_replayed_schedules(parameters):
+    '''Reads the bottleneck schedules of an earlier run that should be 
+    replayed (see schedule.py), unless no schedule is being replayed.
+
+    parameters: an instance of the Parameters class in parameters.py
+        Contains the replay_schedule parameter. See parameters.py for more 
+        detail.
+
+    Returns dict
+        See read_schedules in schedule.py, or None if replay_schedule is None
+    '''
+    if parameters.replay_schedule is None:
+        return None
+    return schedule_module.read_schedules(parameters.replay_schedule)
+
+def get_schedule(parameters, parameter_set: list, random_key: np.ndarray,
+                 replayed_schedules: dict = None) -> tuple:
+    '''Returns the bottleneck schedule of a parameter set: the one of the 
+    replayed run if a schedule is being replayed, and otherwise a newly drawn
+    one (see get_bottleneck_schedule).
+
+    parameters: an instance of the Parameters class in parameters.py
+        Contains the n_reps and n_bottlenecks parameters. See parameters.py 
+        for more detail.
+    parameter_set: list
+        The rangeable parameter values of the parameter set, in the order 
+        produced by the iter.product method in the "run" function. A replayed
+        schedule is found by these values (see get_stream_index), so the 
+        replayed run can range the parameters differently as long as it only
+        has parameter sets of the run it replays
+    random_key: np.ndarray
+        See get_random_key
+    replayed_schedules: dict
+        See get_replayed_schedules
+
+    Returns tuple(np.ndarray, np.ndarray)
+        See get_bottleneck_schedule
+
+    Raises ValueError
+        If the replayed run has no schedule for this parameter set, or one 
+        with a different number of replicates or bottlenecks
+    '''
+    if replayed_schedules is None:
+        return get_bottleneck_schedule(parameters.n_reps, parameters.n_bottlenecks,
+                                       parameter_set[1], parameter_set[2],
+                                       parameter_set[3], parameter_set[4],
+                                       random_key, get_stream_index(parameter_set))
+
+    bottleneck_schedule = replayed_schedules.get(get_stream_index(parameter_set))
+    if (bottleneck_schedule is None or
+        bottleneck_schedule[0].shape != (parameters.n_reps, parameters.n_bottlenecks)):
+        raise ValueError(f'''The schedule replayed from {parameters.replay_schedule} in 
+                         model.py has no schedule for parameter set 
+                         {parameter_set} with {parameters.n_reps} replicates
+                         and {parameters.n_bottlenecks} bottlenecks''')
+    return bottleneck_schedule
+        
+def resume_run(checkpoint) -> dict:
+    '''Goes back to the last checkpoint of an interrupted run, if there is
+    one (see resume in checkpoint.py), and restores the series number and the
+    random number generator of this module to what they were at the 
+    checkpoint.
+
+    checkpoint: an instance of the Checkpoint class from checkpoint.py
+        The checkpoints of the run
+
+    Returns dict
+        The state saved with the checkpoint (see save_checkpoint), with the 
+        indices of the completed parameter sets under 
+        "completed_parameter_sets", which is empty if the run starts from the
+        beginning
+    '''
+    global series
+    global random_number_generator
+
+    state = checkpoint.resume()
+    if state is None:
+        return {"completed_parameter_sets": []}
+    series = state["series"]
+    random_number_generator = state["random_number_generator"]
+    return state
+
+def save_checkpoint(checkpoint, n_completed: int, **state) -> None:
+    '''Saves a checkpoint of the run (see update in checkpoint.py) if 
+    checkpoint_interval parameter sets have been completed since the last one,
+    with the series number and the random number generator of this module.
+    Has to be called right after the data of a parameter set are written.
+
+    checkpoint: an instance of the Checkpoint class from checkpoint.py
+        The checkpoints of the run
+    n_completed: int
+        The number of parameter sets completed so far
+    state
+        Anything else that carries over to the next parameter set, e.g. the
+        flow map tables, or a series number that hasn't been stored in this
+        module yet
+    '''
+    checkpoint.update(n_completed, {"series": series,
+                                    "random_number_generator": random_number_generator,
+                                    **state})
+
+def get_result_cache(parameters):
+    '''Creates the cache of the results of parameter sets (see 
+    result_cache.py), or returns None if it hasn't been turned on or isn't 
+    used by the engine.
+
+    parameters: an instance of the Parameters class in parameters.py
+        Contains the result_cache, engine, and flow_map_tolerance parameters.
+        See parameters.py for more detail.
+
+    Returns an instance of the ResultCache class from result_cache.py, or 
+    None if result_cache is False or the engine is "MarkovChain"
+
+    Raises ValueError
+        If the engine is "Sweep" or flow_map_tolerance is set, since the 
+        results of a parameter set then also depend on the other parameter 
+        sets of the run (through the random numbers shared by a whole chunk, 
+        or through the tables shared by every parameter set)
+    '''
+    if not parameters.result_cache or parameters.engine == "MarkovChain":
+        return None
+    if parameters.engine == "Sweep" or parameters.flow_map_tolerance is not None:
+        raise ValueError('''The result cache in model.py can't be used with the "Sweep"
+                         engine or with flow_map_tolerance''')
+    return result_cache_module.ResultCache()
+
+def run_cached(dataframe, parameters, parameter_set: list, bottleneck_schedule: tuple,
+               result_cache, run: Callable) -> None:
+    '''Logs the data of a parameter set to the dataframe. If the parameter set
+    has been calculated before, its data are taken from the result cache (see 
+    result_cache.py), and otherwise it is run and its data are stored in the
+    cache. Either way, the series numbers carry on as if it had been run.
+
+    dataframe: an instance of the Dataframe class from logger.py
+        Stores the data as it comes in from the simulation, and already holds
+        the constant data of the parameter set
+    parameters: an instance of the Parameters class in parameters.py
+        The parameters of the run
+    parameter_set: list
+        The rangeable parameter values of the parameter set, in the order 
+        produced by the iter.product method in the "run" function
+    bottleneck_schedule: tuple
+        See get_schedule
+    result_cache: an instance of the ResultCache class from result_cache.py
+        If None, the parameter set is simply run
+    run: Callable
+        Takes a dataframe, and runs the parameter set and logs its data to it
+    '''
+    global series
+
+    if result_cache is None:
+        run(dataframe)
+        return
+
+    key = result_cache.get_key(parameters, parameter_set, bottleneck_schedule)
+    set_dataframe = logger.Dataframe(file_name = parameters.file_name)
+    log_parameter_set(set_dataframe, parameters, parameter_set)
+    first_series = series
+    n_series = result_cache.load(key, set_dataframe, first_series)
+    if n_series is None:
+        run(set_dataframe)
+        result_cache.save(key, set_dataframe, first_series, series - first_series)
+    else:
+        series = first_series + n_series
+    dataframe.merge(set_dataframe)
+
 def log_parameter_set(dataframe, parameters, parameter_set: list) -> None:
     '''Gives the parameters and their values for this parameter set to the
     logger module so that the logger can make sure to fill in these columns in
@@ -187,7 +559,8 @@ def log_parameter_set(dataframe, parameters, parameter_set: list) -> None:
                          "TransmissionRate": parameter_set[10],
                          "TransmissionType": parameters.transmission_type,
                          "RecoveryRate": parameter_set[11],
-                         "FractTimestepSize": parameters.fractional_timestep_size}
+                         "FractTimestepSize": parameters.fractional_timestep_size,
+                         "Seed": parameters.seed}
     dataframe.add_constant_data(constant_data)
 
 def run_parameter_set(dataframe, n_reps: int, n_bottlenecks: int, burn_in: int, 
@@ -199,7 +572,10 @@ def run_parameter_set(dataframe, n_reps: int, n_bottlenecks: int, burn_in: int,
                       parasite_fecundity_effect: float, s_death_rate: float, 
                       i_death_rate: float, r_death_rate: float,
                       transmission_rate: float, transmission_function: Callable,
-                      recovery_rate: float, fractional_timestep_size: float) -> None:
+                      recovery_rate: float, fractional_timestep_size: float,
+                      first_rep: int = 0, random_key = None,
+                      stream_index: int = 0, flow_cache = None,
+                      flow_map_store = None, schedule: tuple = None) -> None:
     '''Runs the model such that the initial population experiences periods of
     normal population growth/parasite transmission punctuated by bottleneck 
     events.
@@ -265,29 +641,143 @@ def run_parameter_set(dataframe, n_reps: int, n_bottlenecks: int, burn_in: int,
         substeps to improve accuracy. The value is the size of the timestep, so
         a value of 0.1 means that the timestep will be run in 10 substeps of size 
         0.1
+    first_rep: int
+        The number of the first replicate to run. Replicates first_rep to 
+        first_rep + n_reps - 1 are run
+    random_key: np.ndarray
+        If not None, the key of the counter-based random number streams (see
+        get_random_key). The random number generator is reset to the stream
+        of the parameter set, replicate, and bottleneck before every bottleneck
+        cycle (see seed_random_number_generator), so any replicate can be run
+        on its own and gives the same data
+    stream_index: int
+        Selects the random number streams of this parameter set (see 
+        get_stream_index)
+    flow_cache: an instance of the FlowCache or TrajectoryStore class from 
+        flow_cache.py
+        If not None, the trajectories between bottlenecks are looked up in 
+        this cache before they are calculated (see run_model)
+    flow_map_store: an instance of the FlowMapStore class from flow_map.py
+        If not None, the trajectories that start right after a bottleneck 
+        without recovered hosts are interpolated from its tables (see 
+        run_model). The first period of every replicate starts from the 
+        initial population, which only happens once, so it is calculated.
+    schedule: tuple(np.ndarray, np.ndarray)
+        The number of timesteps until every bottleneck and the first draw of
+        the size of every bottleneck (see get_bottleneck_schedule), with one
+        row for every replicate of the parameter set (not just the ones that
+        are run). If None, the schedule is drawn here for replicates 0 to 
+        first_rep + n_reps - 1
     '''    
     print(f"Bottleneck Size Mean: {bottleneck_size_mean}")
     print(f"Bottleneck Size CV: {bottleneck_size_cv}")
 
-    for rep in range(n_reps):
+    if schedule is None:
+        schedule = get_bottleneck_schedule(first_rep + n_reps, n_bottlenecks,
+                                           bottleneck_size_mean, bottleneck_size_cv,
+                                           time_till_bottleneck_mean,
+                                           time_till_bottleneck_cv, random_key,
+                                           stream_index)
+    all_time_till_bottleneck, all_bottleneck_size_draws = schedule
+
+    #Host-only trajectories, shared by every replicate that loses its parasite
+    parasite_free_trajectories = {}
+
+    for rep in range(first_rep, first_rep + n_reps):
         i = initial_popsize * initial_prevalence
         s = initial_popsize - i
         r = 0
 
         for n in range(n_bottlenecks):
+            if random_key is not None:
+                seed_random_number_generator(random_key, stream_index, rep, n)
             is_logging = (n >= burn_in)
-            time_till_bottleneck = get_time_till_bottleneck(time_till_bottleneck_mean,
-                                                            time_till_bottleneck_cv)
-            s, i, r = run_model(dataframe, rep, is_logging, time_till_bottleneck, 
-                                fractional_timestep_size, s, i, r, birth_function, 
-                                host_birth_rate, carrying_capacity, 
-                                parasite_fecundity_effect, transmission_function, 
-                                transmission_rate, s_death_rate, i_death_rate, 
-                                r_death_rate, recovery_rate)
+            time_till_bottleneck = all_time_till_bottleneck[rep, n]
+            if i == 0:
+                s, i, r = run_model_parasite_free(dataframe, rep, is_logging,
+                                                  time_till_bottleneck,
+                                                  fractional_timestep_size, s, r,
+                                                  birth_function, host_birth_rate,
+                                                  carrying_capacity,
+                                                  parasite_fecundity_effect,
+                                                  s_death_rate, r_death_rate,
+                                                  parasite_free_trajectories)
+            else:
+                s, i, r = run_model(dataframe, rep, is_logging, time_till_bottleneck, 
+                                    fractional_timestep_size, s, i, r, birth_function, 
+                                    host_birth_rate, carrying_capacity, 
+                                    parasite_fecundity_effect, transmission_function, 
+                                    transmission_rate, s_death_rate, i_death_rate, 
+                                    r_death_rate, recovery_rate, flow_cache,
+                                    flow_map_store if n > 0 else None)
             bottleneck_size = get_bottleneck_size(s, i, r, bottleneck_size_mean,
-                                                bottleneck_size_cv)
+                                                bottleneck_size_cv,
+                                                all_bottleneck_size_draws[rep, n])
             s, i, r = get_bottleneck_survivors(s, i, r, bottleneck_size)
-    
+
+def get_bottleneck_schedule(n_reps: int, n_bottlenecks: int, bottleneck_size_mean: int,
+                            bottleneck_size_cv: float, time_till_bottleneck_mean: int,
+                            time_till_bottleneck_cv: float, random_key = None,
+                            stream_index: int = 0) -> tuple:
+    '''Draws the number of timesteps until every bottleneck of every 
+    replicate (from the same gamma distribution as get_time_till_bottleneck),
+    and a first draw of the size of every bottleneck (from the gamma 
+    distribution of get_bottleneck_size, before it is limited to the 
+    population), all in one go. The draws of every replicate follow those of
+    the replicate before it (its timing, then its sizes), so the schedule of
+    the first replicates doesn't depend on how many replicates are drawn.
+
+    n_reps: int
+        The number of replicates to draw the schedule of
+    n_bottlenecks: int
+        The number of bottlenecks of every replicate
+    bottleneck_size_mean: int
+        The mean number of hosts that survive a bottleneck
+    bottleneck_size_cv: float
+        The coefficient of variation for bottleneck size
+    time_till_bottleneck_mean: int
+        The mean number of timesteps until the next bottleneck
+    time_till_bottleneck_cv: float
+        The coefficient of variation for bottleneck timing
+    random_key: np.ndarray
+        If not None, the key of the counter-based random number streams (see
+        get_random_key), and the schedule is drawn from its own stream of the
+        parameter set. Otherwise it is drawn from the random number generator
+        of this module.
+    stream_index: int
+        Selects the stream of the parameter set (see get_stream_index)
+
+    Returns tuple(np.ndarray, np.ndarray)
+        Two integer arrays with one row per replicate and one column per 
+        bottleneck. The first holds the number of timesteps until every 
+        bottleneck (each greater than 0), and the second the first draw of the
+        size of every bottleneck (see get_bottleneck_size)
+    '''
+
+    if random_key is None:
+        generator = random_number_generator
+    else:
+        #A bottleneck number that no run reaches, so the stream is separate from every bottleneck cycle
+        counter = np.array([0, np.iinfo(np.uint64).max, 0, stream_index],
+                           dtype=np.uint64)
+        generator = np.random.Generator(np.random.Philox(key=random_key, counter=counter))
+
+    #One row for the timing and one for the size
+    mean = np.array([[time_till_bottleneck_mean], [bottleneck_size_mean]], dtype=float)
+    cv = np.array([[time_till_bottleneck_cv], [bottleneck_size_cv]], dtype=float)
+    draws = np.broadcast_to(mean, (n_reps, 2, n_bottlenecks))
+    is_variable = cv > 0
+    if is_variable.any():
+        #In the gamma distribution, mean = alpha*beta and variance = alpha*beta*beta, therefore:
+        beta = np.where(is_variable, (cv * mean)**2 / mean, 1)
+        alpha = np.where(is_variable, mean / beta, 1)
+        draws = np.where(is_variable,
+                         np.round(generator.gamma(alpha, beta, (n_reps, 2, n_bottlenecks))),
+                         mean)
+
+    time_till_bottleneck = np.maximum(draws[:, 0], 1).astype(int)
+    return time_till_bottleneck, draws[:, 1].astype(int)
+
 def get_time_till_bottleneck(time_till_bottleneck_mean: int,
                              time_till_bottleneck_cv: float) -> int:
     '''This function returns the number of timesteps until the next bottleneck.
@@ -318,20 +808,22 @@ def get_time_till_bottleneck(time_till_bottleneck_mean: int,
     #In the gamma distribution, mean = alpha*beta and variance = alpha*beta*beta, therefore:
     beta = variance/time_till_bottleneck_mean
     alpha = time_till_bottleneck_mean/beta
-    time_till_bottleneck = round(np.random.gamma(alpha, beta))
+    time_till_bottleneck = round(random_number_generator.gamma(alpha, beta))
     if time_till_bottleneck == 0:
         return 1
     return time_till_bottleneck
 
 
 def get_bottleneck_size(s: float, i: float, r: float, bottleneck_size_mean: int, 
-                        bottleneck_size_cv: float) -> int:
+                        bottleneck_size_cv: float, bottleneck_size_draw: int = None) -> int:
     '''This function returns the size of the bottleneck, i.e. the number of hosts that should make
     it through the botteneck. This size could be exact and predetermined, or
-    pulled from a normal distribution. This function ensures
+    pulled from a gamma distribution. This function ensures
     that the value returned is equal to or less than the number of individuals
     currently in the popuation (i.e., individuals cannot be "created" in the
-    bottleneck process).
+    bottleneck process). If the first draw is too big, the size is drawn from
+    the gamma distribution truncated to the current population instead (see
+    get_truncated_bottleneck_sizes), rather than redrawing until it fits.
 
     s: float
         The number of susceptible hosts in this timestep
@@ -344,6 +836,9 @@ def get_bottleneck_size(s: float, i: float, r: float, bottleneck_size_mean: int,
     bottleneck_size_cv: float
         The coefficient of variation for bottleneck size. If zero, then all 
         bottlenecks are exactly of size bottleneck_size_mean
+    bottleneck_size_draw: int
+        If not None, the first draw of the size, drawn in advance by 
+        get_bottleneck_schedule
 
     Returns bottleneck_size: int
         The number of hosts that survive this bottleneck
@@ -359,14 +854,79 @@ def get_bottleneck_size(s: float, i: float, r: float, bottleneck_size_mean: int,
     beta = variance/bottleneck_size_mean
     alpha = bottleneck_size_mean/beta
     total_pop_size = s + i + r
-    bottleneck_size = total_pop_size * 10 #starting out with an absurdly high value
-    while bottleneck_size > total_pop_size:
-        bottleneck_size = round(np.random.gamma(alpha, beta))
+    bottleneck_size = bottleneck_size_draw
+    if bottleneck_size is None:
+        bottleneck_size = round(random_number_generator.gamma(alpha, beta))
+    if bottleneck_size > total_pop_size:
+        bottleneck_size = get_truncated_bottleneck_sizes(np.array([alpha]), np.array([beta]),
+                                                         np.array([total_pop_size]))[0]
     if bottleneck_size == 0:
         return 1
 
-    return bottleneck_size
+    return int(bottleneck_size)
+
+
+def get_truncated_bottleneck_sizes(alpha: np.ndarray, beta: np.ndarray,
+                                   total_pop_size: np.ndarray) -> np.ndarray:
+    '''Draws bottleneck sizes from the gamma distribution of 
+    get_bottleneck_size (rounded to whole numbers), on the condition that they
+    are no bigger than the current population, for several bottlenecks at 
+    once. Redrawing until a size fits takes very many tries when the mean is
+    close to or above the population size, so those sizes are drawn by 
+    inverse transform sampling instead: each uniform draw is scaled to the 
+    chance that a size fits, and the size is the smallest whole number whose 
+    cumulative chance reaches it, found by bisection. Sizes that fit at least
+    a tenth of the time are still redrawn, since that takes fewer than ten
+    tries on average and is cheaper than the bisection. Both ways give 
+    exactly the same (truncated) distribution.
+
+    get_bottleneck_size and get_bottleneck_size_batched only call this 
+    function once a first draw hasn't fit. That still gives exactly the 
+    truncated distribution: a size that fits straight away is already a draw
+    from it, and a size that doesn't is replaced by one.
+
+    alpha: np.ndarray
+        The shape of the gamma distribution of each bottleneck
+    beta: np.ndarray
+        The scale of the gamma distribution of each bottleneck
+    total_pop_size: np.ndarray
+        The number of hosts right before each bottleneck
+
+    Returns np.ndarray
+        An integer array with one bottleneck size per bottleneck, each between
+        0 and the population size (0 is turned into 1 by the callers)
+    '''
 
+    get_gamma_cdf = np.frompyfunc(markov_chain.get_regularized_lower_incomplete_gamma, 2, 1)
+
+    #A draw rounds to at most the largest whole number of hosts if it is below that number + 0.5
+    largest_size = np.floor(total_pop_size).astype(int)
+    fitting_chance = get_gamma_cdf(alpha, (largest_size + 0.5) / beta).astype(float)
+    bottleneck_size = np.empty(len(alpha), dtype=int)
+
+    is_redrawing = fitting_chance >= 0.1
+    while is_redrawing.any():
+        bottleneck_size[is_redrawing] = np.round(random_number_generator.gamma(alpha[is_redrawing],
+                                                                               beta[is_redrawing]))
+        is_redrawing &= bottleneck_size > largest_size
+
+    is_inverting = fitting_chance < 0.1
+    if is_inverting.any():
+        alpha = alpha[is_inverting]
+        beta = beta[is_inverting]
+        chances = (1 - random_number_generator.random(len(alpha))) * fitting_chance[is_inverting]
+        lowest = np.zeros(len(alpha), dtype=int)
+        highest = largest_size[is_inverting]
+        while (lowest < highest).any():
+            middle = (lowest + highest) // 2
+            is_reached = get_gamma_cdf(alpha, (middle + 0.5) / beta).astype(float) >= chances
+            highest = np.where(is_reached, middle, highest)
+            lowest = np.where(is_reached, lowest, middle + 1)
+        #If the chance that a size fits is too small to represent, it all lies on the largest size
+        bottleneck_size[is_inverting] = np.where(chances > 0, lowest,
+                                                 largest_size[is_inverting])
+
+    return bottleneck_size
 
 def run_model(dataframe, current_rep: int, is_logging: bool, n_timepoints: int, 
               fractional_timestep_size: float, s: int, i: int, r: int, 
@@ -374,7 +934,8 @@ def run_model(dataframe, current_rep: int, is_logging: bool, n_timepoints: int,
               carrying_capacity: int, parasite_fecundity_effect: float, 
               transmission_function: Callable, transmission_rate: float, 
               s_death_rate: float, i_death_rate: float, r_death_rate: float, 
-              recovery_rate: float) -> tuple[int]:
+              recovery_rate: float, flow_cache = None,
+              flow_map_store = None) -> tuple[int]:
     '''Runs multiple timepoints of the model, returns the final population state,
     and (possibly) logs the data generated.
 
@@ -430,6 +991,19 @@ def run_model(dataframe, current_rep: int, is_logging: bool, n_timepoints: int,
     recovery_rate: float
         The number of recoveries (conversion from I to R) per infected host per
         timestep. Often represented by gamma in the literature
+    flow_cache: an instance of the FlowCache or TrajectoryStore class from 
+        flow_cache.py
+        If not None, the trajectory is looked up in the cache (by its starting
+        population, its number of timepoints, and the model parameters) 
+        instead of being calculated again. A TrajectoryStore also answers 
+        shorter periods from the same starting population, and extends the 
+        stored trajectory for longer ones. Since the model is deterministic
+        between bottlenecks, the data are exactly the same either way.
+    flow_map_store: an instance of the FlowMapStore class from flow_map.py
+        If not None, and the period starts without recovered hosts (and there
+        is no recovery), the trajectory is interpolated from the table of the
+        model parameters instead of being calculated. Takes precedence over 
+        flow_cache.
 
     Returns tuple[int]
         The first element is s, the updated number of susceptible hosts after
@@ -440,6 +1014,35 @@ def run_model(dataframe, current_rep: int, is_logging: bool, n_timepoints: int,
     
     global series
 
+    is_using_flow_map = flow_map_store is not None and r == 0 and recovery_rate == 0
+    if is_using_flow_map or flow_cache is not None:
+        model_parameters = (fractional_timestep_size, birth_function, host_birth_rate,
+                            carrying_capacity, parasite_fecundity_effect,
+                            transmission_function, transmission_rate, s_death_rate,
+                            i_death_rate, r_death_rate, recovery_rate)
+        if is_using_flow_map:
+            trajectory = flow_map_store.get_flow_map(model_parameters).get_trajectory(
+                s, i, n_timepoints)
+        else:
+            trajectory = flow_cache.get_trajectory((s, i, r), int(n_timepoints),
+                                                   model_parameters, get_trajectory)
+        dataframe.log_columns(is_logging, [current_rep, series, 
+                                           np.arange(len(trajectory)),
+                                           trajectory[:, 0], trajectory[:, 1],
+                                           trajectory[:, 2]])
+        series += 1
+        s, i, r = trajectory[-1].tolist()
+        return s, i, r
+
+    if not is_logging:
+        s, i, r = run_segment(n_timepoints, fractional_timestep_size, s, i, r, 
+                              birth_function, host_birth_rate, carrying_capacity,
+                              parasite_fecundity_effect, transmission_function,
+                              transmission_rate, s_death_rate, i_death_rate,
+                              r_death_rate, recovery_rate)
+        series += 1
+        return s, i, r
+
     new_data = []
     new_data.append([current_rep, series, 0, s, i, r])
 
@@ -456,6 +1059,63 @@ def run_model(dataframe, current_rep: int, is_logging: bool, n_timepoints: int,
     series += 1
     return s, i, r
 
+def run_segment(n_timepoints: int, fractional_timestep_size: float, s: int, 
+                i: int, r: int, birth_function: Callable, host_birth_rate: float,
+                carrying_capacity: int, parasite_fecundity_effect: float,
+                transmission_function: Callable, transmission_rate: float,
+                s_death_rate: float, i_death_rate: float, r_death_rate: float,
+                recovery_rate: float) -> tuple[int]:
+    '''Runs multiple timepoints of the model in exactly the same way as 
+    run_model (drawing the same random numbers in the same order), but only 
+    keeps the current population state, so nothing is built or allocated per
+    timepoint. run_model uses this during a burn-in period, when none of the
+    timepoints would be logged anyway. It takes nothing but the model 
+    parameters, so any other engine that only needs the state at the end of a
+    period can use it too.
+
+    n_timepoints: int
+        The number of timepoints the model will be run for
+    fractional_timestep_size: float
+        See run_model
+    s: int
+        The number of susceptible hosts at the start of the period
+    i: int
+        The number of infected hosts at the start of the period
+    r: int
+        The number of recovered hosts at the start of the period
+    birth_function: Callable
+        See run_model
+    host_birth_rate: float
+        See run_model
+    carrying_capacity: int
+        See run_model
+    parasite_fecundity_effect: float
+        See run_model
+    transmission_function: Callable
+        See run_model
+    transmission_rate: float
+        See run_model
+    s_death_rate: float
+        See run_model
+    i_death_rate: float
+        See run_model
+    r_death_rate: float
+        See run_model
+    recovery_rate: float
+        See run_model
+
+    Returns tuple[int]
+        The values of s, i, and r at the end of the period
+    '''
+    
+    for _ in range(int(n_timepoints)):
+        s, i, r = run_timepoint(fractional_timestep_size, s, i, r, birth_function,
+                                host_birth_rate, carrying_capacity, 
+                                parasite_fecundity_effect, transmission_function,
+                                transmission_rate, s_death_rate, i_death_rate,
+                                r_death_rate, recovery_rate)
+    return s, i, r
+
 def run_timepoint(fractional_timestep_size: float, s: int, i: int, r: int,
                   birth_function: Callable, host_birth_rate: float,
                   carrying_capacity: int, parasite_fecundity_effect: float,
@@ -530,6 +1190,151 @@ def run_timepoint(fractional_timestep_size: float, s: int, i: int, r: int,
     
     return (s, i, r)
 
+def get_trajectory(n_timepoints: int, s: int, i: int, r: int, 
+                   fractional_timestep_size: float, birth_function: Callable, 
+                   host_birth_rate: float, carrying_capacity: int, 
+                   parasite_fecundity_effect: float, transmission_function: Callable,
+                   transmission_rate: float, s_death_rate: float, 
+                   i_death_rate: float, r_death_rate: float,
+                   recovery_rate: float) -> np.ndarray:
+    '''Runs multiple timepoints of the model in exactly the same way as 
+    run_model, and returns the population state at every timepoint. The 
+    arguments are in the same order as the model parameters in the keys of 
+    the flow cache (see run_model).
+
+    n_timepoints: int
+        The number of timepoints the model will be run for
+    s: int
+        The number of susceptible hosts at the start of the period
+    i: int
+        The number of infected hosts at the start of the period
+    r: int
+        The number of recovered hosts at the start of the period
+    fractional_timestep_size: float
+        See run_model
+    birth_function: Callable
+        See run_model
+    host_birth_rate: float
+        See run_model
+    carrying_capacity: int
+        See run_model
+    parasite_fecundity_effect: float
+        See run_model
+    transmission_function: Callable
+        See run_model
+    transmission_rate: float
+        See run_model
+    s_death_rate: float
+        See run_model
+    i_death_rate: float
+        See run_model
+    r_death_rate: float
+        See run_model
+    recovery_rate: float
+        See run_model
+
+    Returns np.ndarray
+        An array with one row per timepoint (starting with timepoint 0, the
+        starting population) and one column for each of S, I, and R
+    '''
+    
+    trajectory = np.empty((n_timepoints + 1, 3))
+    trajectory[0] = s, i, r
+    for timepoint in range(n_timepoints):
+        s, i, r = run_timepoint(fractional_timestep_size, s, i, r, birth_function,
+                                host_birth_rate, carrying_capacity, 
+                                parasite_fecundity_effect, transmission_function,
+                                transmission_rate, s_death_rate, i_death_rate,
+                                r_death_rate, recovery_rate)
+        trajectory[timepoint + 1] = s, i, r
+    return trajectory
+
+def run_model_parasite_free(dataframe, current_rep: int, is_logging: bool,
+                            n_timepoints: int, fractional_timestep_size: float,
+                            s: int, r: int, birth_function: Callable,
+                            host_birth_rate: float, carrying_capacity: int,
+                            parasite_fecundity_effect: float, s_death_rate: float,
+                            r_death_rate: float, trajectories: dict) -> tuple[int]:
+    '''Used instead of run_model when there are no infected hosts. Without 
+    infected hosts there can be no new infections or recoveries, and no 
+    bottleneck can bring the parasite back, so the replicate stays 
+    parasite-free and only the hosts' births and deaths need to be calculated.
+    These host-only dynamics don't depend on anything but the starting values
+    of S and R, and every bottleneck resets the population to a handful of 
+    possible sizes, so the same trajectory is usually needed over and over. 
+    Each trajectory is therefore stored in trajectories the first time it is 
+    calculated, extended if a later period runs for longer, and reused after 
+    that. The data logged (and the series number) are exactly the same as if
+    run_model had been called.
+
+    current_rep: int
+        The number of the current replicate the simulation is processing
+    trajectories: dict
+        The host-only trajectories calculated so far for this parameter set.
+        Each key is a starting (s, r), and each value is a list of the (s, r)
+        values at every timepoint from that start. Updated in place.
+
+    See run_model for an explanation of all other arguments.
+
+    Returns tuple[int]
+        The updated values of s, i (always zero), and r after running these
+        timesteps
+    '''
+    
+    global series
+
+    n_timepoints = int(n_timepoints)
+    trajectory = trajectories.setdefault((s, r), [(s, r)])
+    while len(trajectory) <= n_timepoints:
+        trajectory.append(run_timepoint_parasite_free(fractional_timestep_size,
+                                                      *trajectory[-1], 
+                                                      birth_function,
+                                                      host_birth_rate,
+                                                      carrying_capacity,
+                                                      parasite_fecundity_effect,
+                                                      s_death_rate, r_death_rate))
+
+    if is_logging:
+        #After the first timepoint, run_timepoint would have turned i into a float
+        new_data = [[current_rep, series, 0, s, 0, r]]
+        new_data += [[current_rep, series, timepoint, new_s, 0.0, new_r] for 
+                     timepoint, (new_s, new_r) in enumerate(trajectory[1:n_timepoints + 1],
+                                                            start=1)]
+        dataframe.log_data(is_logging, new_data)
+    series += 1
+
+    s, r = trajectory[n_timepoints]
+    return s, 0.0, r
+
+def run_timepoint_parasite_free(fractional_timestep_size: float, s: int, r: int,
+                                birth_function: Callable, host_birth_rate: float,
+                                carrying_capacity: int,
+                                parasite_fecundity_effect: float,
+                                s_death_rate: float, r_death_rate: float) -> tuple[int]:
+    '''Runs and returns the results of a single timepoint of the model when there 
+    are no infected hosts. Only births and deaths of susceptible and recovered 
+    hosts are calculated, in the same order as run_timepoint, so the results
+    are identical to calling run_timepoint with i = 0.
+
+    See run_timepoint for an explanation of all arguments.
+
+    Returns tuple[int]
+        The first element is s, the updated number of susceptible hosts after
+        running this timestep. The second element is r, the updated number of 
+        recovered hosts after running this timestep.
+    '''
+
+    for _ in range(int(1 / fractional_timestep_size)):
+        new_births = birth_function(s, 0, r, host_birth_rate, carrying_capacity, 
+                                    parasite_fecundity_effect,
+                                    fractional_timestep_size)
+        new_s_deaths = get_s_deaths(s, s_death_rate, fractional_timestep_size)
+        new_r_deaths = get_r_deaths(r, r_death_rate, fractional_timestep_size)
+
+        s = s + new_births - new_s_deaths
+        r = r - new_r_deaths
+    
+    return (s, r)
 
 def get_bottleneck_survivors(s: float, i: float, r: float, 
                              bottleneck_size: int) -> tuple[int]:
@@ -579,6 +1384,677 @@ def get_bottleneck_survivors(s: float, i: float, r: float,
     return new_s, new_i, new_r
 
 
+def run_parameter_set_batched(dataframe, n_reps: int, n_bottlenecks: int,
+                              burn_in: int, initial_popsize: int,
+                              initial_prevalence: float,
+                              bottleneck_size_mean: int, bottleneck_size_cv: float,
+                              time_till_bottleneck_mean: int,
+                              time_till_bottleneck_cv: float,
+                              host_birth_rate: float, carrying_capacity: int,
+                              birth_function: Callable,
+                              parasite_fecundity_effect: float,
+                              s_death_rate: float, i_death_rate: float,
+                              r_death_rate: float, transmission_rate: float,
+                              transmission_function: Callable, recovery_rate: float,
+                              fractional_timestep_size: float,
+                              random_key: np.ndarray = None, stream_index: int = 0,
+                              schedule: tuple = None) -> None:
+    '''Does the same job as run_parameter_set, but instead of running each
+    replicate one after the other, all replicates of this parameter set are held
+    in numpy arrays and advanced together. Births, transmission, deaths,
+    recoveries and the bottleneck itself are all calculated for every replicate
+    at once, which avoids paying the Python interpreter cost n_reps times over.
+    The data are logged in the same order and with the same Rep and Series
+    numbers as run_parameter_set would produce. Given a random_key, every
+    replicate draws its bottleneck survivors from the same streams as in
+    run_parameter_set (see run_batch), so the two functions produce identical
+    replicates. Without one, the survivors of all replicates are drawn 
+    together from the random number generator of this module, so the 
+    replicates are statistically equivalent (but not identical).
+
+    See run_parameter_set for an explanation of all arguments. If schedule is
+    None, it is drawn from the random number generator of this module.
+    '''
+
+    print(f"Bottleneck Size Mean: {bottleneck_size_mean}")
+    print(f"Bottleneck Size CV: {bottleneck_size_cv}")
+
+    if schedule is None:
+        schedule = get_bottleneck_schedule(n_reps, n_bottlenecks, bottleneck_size_mean,
+                                           bottleneck_size_cv, time_till_bottleneck_mean,
+                                           time_till_bottleneck_cv)
+    time_till_bottleneck, bottleneck_size_draws = schedule
+
+    logged_segments = run_batch(n_reps, n_bottlenecks, burn_in, initial_popsize,
+                                initial_prevalence, bottleneck_size_mean,
+                                bottleneck_size_cv, time_till_bottleneck.T,
+                                bottleneck_size_draws.T, host_birth_rate,
+                                carrying_capacity, birth_function,
+                                parasite_fecundity_effect, s_death_rate,
+                                i_death_rate, r_death_rate, transmission_rate,
+                                transmission_function, recovery_rate,
+                                fractional_timestep_size, random_key,
+                                [stream_index] * n_reps, list(range(n_reps)))
+    log_batch(dataframe, logged_segments, 0, n_reps, n_bottlenecks)
+
+def run_sweep(dataframe, parameters, all_parameter_sets: list) -> None:
+    '''Used instead of looping over run_parameter_set when the "Sweep" engine
+    is selected. Every replicate of every parameter set becomes one lane of
+    run_batch, so the whole parameter space is integrated simultaneously. To
+    keep memory bounded for large parameter spaces, the parameter sets are
+    split into chunks of at most parameters.sweep_chunk_size lanes, and each
+    chunk is logged and written out before the next one is started. Every 
+    lane draws its bottleneck survivors from the streams of its own parameter
+    set and replicate (see run_batch), so the data are identical to looping 
+    over run_parameter_set, with the same Series numbers, no matter how the 
+    parameter sets are split into chunks.
+
+    dataframe: an instance of the Dataframe class from logger.py
+        Stores the data as it comes in from the simulation and contains methods
+        to write data to .csv files in the output folder
+    parameters: an instance of the Parameter class from parameters.py
+        Contains the parameter values that are the same across all parameter 
+        sets. See parameters.py for more detail.
+    all_parameter_sets: list
+        Every combination of rangeable parameter values, in the order produced
+        by the iter.product method in the "run" function
+    '''
+
+    n_reps = parameters.n_reps
+    sets_per_chunk = max(1, parameters.sweep_chunk_size // n_reps)
+    random_key = get_random_key(parameters.seed)
+    replayed_schedules = get_replayed_schedules(parameters)
+    schedule_summary = schedule_module.BottleneckSchedule() if parameters.export_schedule else None
+    checkpoint = checkpoint_module.Checkpoint(parameters, dataframe, [schedule_summary])
+    n_completed = len(resume_run(checkpoint)["completed_parameter_sets"])
+
+    #Checkpoints are only saved at the end of a chunk, so the chunks stay the same when resuming
+    for chunk_start in range(n_completed, len(all_parameter_sets), sets_per_chunk):
+        chunk = all_parameter_sets[chunk_start:chunk_start + sets_per_chunk]
+        #One row per lane, one column per rangeable parameter (in iter.product order)
+        lane_values = np.repeat(np.array(chunk, dtype=float), n_reps, axis=0)
+        schedules = [get_schedule(parameters, parameter_set, random_key, replayed_schedules)
+                     for parameter_set in chunk]
+        time_till_bottleneck = np.concatenate([schedule[0] for schedule in schedules])
+        bottleneck_size_draws = np.concatenate([schedule[1] for schedule in schedules])
+
+        logged_segments = run_batch(len(lane_values), parameters.n_bottlenecks,
+                                    parameters.burn_in, parameters.initial_popsize,
+                                    initial_prevalence=lane_values[:, 0],
+                                    bottleneck_size_mean=lane_values[:, 1],
+                                    bottleneck_size_cv=lane_values[:, 2],
+                                    time_till_bottleneck=time_till_bottleneck.T,
+                                    bottleneck_size_draws=bottleneck_size_draws.T,
+                                    host_birth_rate=lane_values[:, 5],
+                                    carrying_capacity=parameters.carrying_capacity,
+                                    birth_function=parameters.birth_function,
+                                    parasite_fecundity_effect=lane_values[:, 6],
+                                    s_death_rate=lane_values[:, 7],
+                                    i_death_rate=lane_values[:, 8],
+                                    r_death_rate=lane_values[:, 9],
+                                    transmission_rate=lane_values[:, 10],
+                                    transmission_function=parameters.transmission_function,
+                                    recovery_rate=lane_values[:, 11],
+                                    fractional_timestep_size=parameters.fractional_timestep_size,
+                                    random_key=random_key,
+                                    stream_indices=[get_stream_index(parameter_set)
+                                                    for parameter_set in chunk
+                                                    for rep in range(n_reps)],
+                                    reps=list(range(n_reps)) * len(chunk))
+
+        for chunk_index, parameter_set in enumerate(chunk):
+            print(f"Bottleneck Size Mean: {parameter_set[1]}")
+            print(f"Bottleneck Size CV: {parameter_set[2]}")
+            log_parameter_set(dataframe, parameters, parameter_set)
+            log_batch(dataframe, logged_segments, chunk_index * n_reps, n_reps,
+                      parameters.n_bottlenecks)
+            dataframe.write_data()
+            if schedule_summary is not None:
+                schedule_summary.add_schedule(dataframe, get_stream_index(parameter_set),
+                                              *schedules[chunk_index])
+                schedule_summary.write_summary(dataframe)
+        save_checkpoint(checkpoint, chunk_start + len(chunk))
+    checkpoint.finish()
+
+def log_batch(dataframe, logged_segments: list[tuple], first_lane: int,
+              n_reps: int, n_bottlenecks: int) -> None:
+    '''Logs the trajectories of one parameter set's replicates from the output
+    of run_batch. Series numbers are handed out rep by rep, bottleneck by
+    bottleneck, exactly as they would be if each replicate had been run on its
+    own with run_model.
+
+    dataframe: an instance of the Dataframe class from logger.py
+        Stores the data as it comes in from the simulation and contains methods
+        to write data to .csv files in the output folder
+    logged_segments: list[tuple]
+        The output of run_batch
+    first_lane: int
+        The lane of run_batch that holds replicate 0 of this parameter set. The
+        remaining replicates are in the lanes directly after it
+    n_reps: int
+        The number of replicates of this parameter set
+    n_bottlenecks: int
+        The number of bottleneck events that each replicate experienced
+    '''
+    global series
+
+    first_series = series
+    for rep in range(n_reps):
+        lane = first_lane + rep
+        for n, n_timepoints, trajectory in logged_segments:
+            rep_series = first_series + rep * n_bottlenecks + n
+            segment = trajectory[:n_timepoints[lane] + 1, :, lane]
+            dataframe.log_columns(True, [rep, rep_series, np.arange(len(segment)),
+                                         segment[:, 0], segment[:, 1], segment[:, 2]])
+    series = first_series + n_reps * n_bottlenecks
+
+def run_batch(n_lanes: int, n_bottlenecks: int, burn_in: int,
+              initial_popsize: int, initial_prevalence, bottleneck_size_mean,
+              bottleneck_size_cv, time_till_bottleneck: np.ndarray,
+              bottleneck_size_draws: np.ndarray, host_birth_rate, carrying_capacity: int,
+              birth_function: Callable, parasite_fecundity_effect, s_death_rate,
+              i_death_rate, r_death_rate, transmission_rate,
+              transmission_function: Callable, recovery_rate,
+              fractional_timestep_size: float, random_key: np.ndarray = None,
+              stream_indices: list[int] = None, reps: list[int] = None) -> list[tuple]:
+    '''Runs n_lanes independent replicates of the model in lock-step, holding
+    the state of every replicate (a "lane") in numpy arrays. The rangeable model
+    parameters may either be single values shared by every lane or numpy arrays
+    with one value per lane. Lanes whose bottlenecks fall at different times
+    (time_till_bottleneck_cv > 0) are kept in lock-step by masking: a lane that
+    has reached its bottleneck simply stops updating until every lane has
+    reached theirs. Given a random_key, the bottleneck of every lane is drawn
+    from the stream of its own parameter set, replicate, and bottleneck (see
+    seed_random_number_generator), exactly as in run_parameter_set, so every
+    lane gives the same data no matter which other lanes it is run with.
+    Otherwise, the bottlenecks of all lanes are drawn together from the random
+    number generator of this module.
+
+    n_lanes: int
+        The number of replicates to run side by side
+    time_till_bottleneck: np.ndarray
+        An integer array of shape (n_bottlenecks, n_lanes) with the number of
+        timepoints before each bottleneck of each lane (see 
+        get_bottleneck_schedule)
+    bottleneck_size_draws: np.ndarray
+        An integer array of the same shape with the first draw of the size of
+        each bottleneck of each lane (see get_bottleneck_size_batched)
+    random_key: np.ndarray
+        If not None, the key of the counter-based random number streams (see
+        get_random_key)
+    stream_indices: list[int]
+        Only used with a random_key. Selects the streams of the parameter set
+        of every lane (see get_stream_index)
+    reps: list[int]
+        Only used with a random_key. The replicate that every lane runs
+
+    See run_parameter_set for an explanation of all other arguments.
+
+    Returns list[tuple]
+        One element for every bottleneck that occurs after the burn-in. Each
+        element is a tuple of (bottleneck number, numpy array with the number of
+        timepoints run by each lane, numpy array of shape
+        (max timepoints + 1, 3, n_lanes) with the values of S, I, and R for
+        every lane and timepoint). Entries past a lane's own number of
+        timepoints should be ignored.
+    '''
+
+    i = np.zeros(n_lanes) + initial_popsize * initial_prevalence
+    s = initial_popsize - i
+    r = np.zeros(n_lanes)
+    lane_size_mean = np.broadcast_to(bottleneck_size_mean, n_lanes)
+    lane_size_cv = np.broadcast_to(bottleneck_size_cv, n_lanes)
+
+    logged_segments = []
+    for n in range(n_bottlenecks):
+        is_logging = (n >= burn_in)
+        s, i, r, trajectory = run_model_batched(is_logging, time_till_bottleneck[n],
+                                                fractional_timestep_size, s, i, r,
+                                                birth_function, host_birth_rate,
+                                                carrying_capacity,
+                                                parasite_fecundity_effect,
+                                                transmission_function,
+                                                transmission_rate, s_death_rate,
+                                                i_death_rate, r_death_rate,
+                                                recovery_rate)
+        if is_logging:
+            logged_segments.append((n, time_till_bottleneck[n], trajectory))
+        if random_key is None:
+            bottleneck_size = get_bottleneck_size_batched(s, i, r, bottleneck_size_mean,
+                                                          bottleneck_size_cv,
+                                                          bottleneck_size_draws[n])
+            s, i, r = get_bottleneck_survivors_batched(s, i, r, bottleneck_size)
+            continue
+
+        #Once per bottleneck rather than per timepoint, so one lane at a time is cheap enough
+        for lane in range(n_lanes):
+            seed_random_number_generator(random_key, stream_indices[lane], reps[lane], n)
+            bottleneck_size = get_bottleneck_size(s[lane], i[lane], r[lane],
+                                                  lane_size_mean[lane], lane_size_cv[lane],
+                                                  bottleneck_size_draws[n, lane])
+            s[lane], i[lane], r[lane] = get_bottleneck_survivors(s[lane], i[lane], r[lane],
+                                                                 bottleneck_size)
+
+    return logged_segments
+
+def get_bottleneck_size_batched(s: np.ndarray, i: np.ndarray, r: np.ndarray,
+                                bottleneck_size_mean, bottleneck_size_cv,
+                                bottleneck_size_draws: np.ndarray = None) -> np.ndarray:
+    '''The batched equivalent of get_bottleneck_size. Returns one bottleneck
+    size for every lane, drawn from the same gamma distribution and subject to
+    the same rule that a bottleneck cannot be bigger than the current
+    population. Lanes that draw a bottleneck that is too big are drawn again,
+    all at once, from the truncated distribution (see 
+    get_truncated_bottleneck_sizes).
+
+    s: np.ndarray
+        The number of susceptible hosts in each lane
+    i: np.ndarray
+        The number of infected hosts in each lane
+    r: np.ndarray
+        The number of recovered hosts in each lane
+    bottleneck_size_mean: int or np.ndarray
+        The mean number of hosts that survive this bottleneck, either shared by
+        all lanes or given per lane
+    bottleneck_size_cv: float or np.ndarray
+        The coefficient of variation for bottleneck size, either shared by all
+        lanes or given per lane. Lanes with a CV of zero always get a bottleneck
+        of exactly bottleneck_size_mean
+    bottleneck_size_draws: np.ndarray
+        If not None, the first draw of the size of each lane, drawn in advance
+        by get_bottleneck_schedule
+
+    Returns np.ndarray
+        An integer array with the number of hosts that survive this bottleneck
+        in each lane
+    '''
+
+    n_lanes = len(s)
+    mean = np.broadcast_to(np.asarray(bottleneck_size_mean, dtype=float), n_lanes)
+    cv = np.broadcast_to(np.asarray(bottleneck_size_cv, dtype=float), n_lanes)
+    bottleneck_size = mean.astype(int)
+
+    is_variable = cv > 0
+    if is_variable.any():
+        #In the gamma distribution, mean = alpha*beta and variance = alpha*beta*beta, therefore:
+        beta = (cv[is_variable] * mean[is_variable])**2 / mean[is_variable]
+        alpha = mean[is_variable] / beta
+        total_pop_size = (s + i + r)[is_variable]
+        if bottleneck_size_draws is None:
+            draws = np.round(random_number_generator.gamma(alpha, beta)).astype(int)
+        else:
+            draws = bottleneck_size_draws[is_variable].astype(int)
+        is_too_big = draws > total_pop_size
+        if is_too_big.any():
+            draws[is_too_big] = get_truncated_bottleneck_sizes(alpha[is_too_big],
+                                                               beta[is_too_big],
+                                                               total_pop_size[is_too_big])
+        bottleneck_size[is_variable] = np.maximum(draws, 1)
+    return bottleneck_size
+
+def run_model_batched(is_logging: bool, n_timepoints: np.ndarray,
+                      fractional_timestep_size: float, s: np.ndarray,
+                      i: np.ndarray, r: np.ndarray, birth_function: Callable,
+                      host_birth_rate, carrying_capacity: int,
+                      parasite_fecundity_effect, transmission_function: Callable,
+                      transmission_rate, s_death_rate, i_death_rate, r_death_rate,
+                      recovery_rate) -> tuple:
+    '''The batched equivalent of run_model. Runs every lane for its own number
+    of timepoints. All lanes are advanced together through run_timepoint; once
+    a lane has run for its number of timepoints, it is masked out and keeps its
+    final state while the remaining lanes catch up.
+
+    is_logging: bool
+        If True, the full trajectory of every lane is stored and returned. If
+        False (e.g. during a burn-in period), only the final state is returned
+    n_timepoints: np.ndarray
+        An integer array with the number of timepoints each lane will be run for
+
+    See run_model for an explanation of all other arguments. The state
+    variables s, i, and r are numpy arrays with one value per lane, and the
+    rangeable model parameters may either be single values or numpy arrays with
+    one value per lane.
+
+    Returns tuple
+        The first three elements are the updated s, i, and r arrays. The fourth
+        element is None if is_logging is False, otherwise a numpy array of shape
+        (max(n_timepoints) + 1, 3, n_lanes) holding S, I, and R for every lane
+        and timepoint, starting with the state before the first timepoint
+    '''
+
+    max_timepoints = int(n_timepoints.max())
+    is_masking = (n_timepoints != max_timepoints).any()
+
+    trajectory = None
+    if is_logging:
+        trajectory = np.empty((max_timepoints + 1, 3, len(s)))
+        trajectory[0] = s, i, r
+
+    for timepoint in range(max_timepoints):
+        new_s, new_i, new_r = run_timepoint(fractional_timestep_size, s, i, r,
+                                            birth_function, host_birth_rate,
+                                            carrying_capacity,
+                                            parasite_fecundity_effect,
+                                            transmission_function,
+                                            transmission_rate, s_death_rate,
+                                            i_death_rate, r_death_rate,
+                                            recovery_rate)
+        if is_masking:
+            is_active = timepoint < n_timepoints
+            new_s = np.where(is_active, new_s, s)
+            new_i = np.where(is_active, new_i, i)
+            new_r = np.where(is_active, new_r, r)
+        s, i, r = new_s, new_i, new_r
+
+        if is_logging:
+            trajectory[timepoint + 1] = s, i, r
+
+    return s, i, r, trajectory
+
+def get_bottleneck_survivors_batched(s: np.ndarray, i: np.ndarray, r: np.ndarray,
+                                     bottleneck_size: np.ndarray) -> tuple:
+    '''The batched equivalent of get_bottleneck_survivors. Samples the surviving
+    hosts of every lane with one vectorized binomial draw for the infected hosts
+    and, only in lanes that have recovered hosts, a second vectorized binomial
+    draw to split the remainder between susceptible and recovered hosts.
+
+    s: np.ndarray
+        The number of susceptible hosts in each lane
+    i: np.ndarray
+        The number of infected hosts in each lane
+    r: np.ndarray
+        The number of recovered hosts in each lane
+    bottleneck_size: np.ndarray
+        The number of hosts that should survive the bottleneck in each lane
+
+    Returns tuple(np.ndarray, np.ndarray, np.ndarray)
+        The updated values for s, i, and r in each lane (whole numbers, stored
+        as floats)
+    '''
+    pop_size = s + i + r
+    s_frequency = s / pop_size
+    i_frequency = i / pop_size
+    r_frequency = r / pop_size
+
+    #Find Is first
+    new_i = random_number_generator.binomial(n = bottleneck_size, p = i_frequency)
+    remainder = bottleneck_size - new_i
+
+    new_s = remainder.astype(float)
+    new_r = np.zeros(len(s))
+    has_r = r_frequency != 0
+    if has_r.any():
+        new_s[has_r] = random_number_generator.binomial(n = remainder[has_r],
+                                                        p = s_frequency[has_r])
+        new_r[has_r] = remainder[has_r] - new_s[has_r]
+
+    return new_s, new_i.astype(float), new_r
+
+def run_parallel(dataframe, parameters, all_parameter_sets: list,
+                 result_cache = None) -> None:
+    '''Used instead of looping over run_parameter_set when the "Parallel" 
+    engine is selected. The replicates of every parameter set are split into
+    blocks, and each block is run by run_task in one of parameters.n_workers
+    worker processes. Every bottleneck cycle of every replicate gets its own
+    stream of random numbers (see seed_random_number_generator), and every 
+    replicate its own range of series numbers, worked out in advance from the
+    replicate's position in the full run. The data are therefore identical to
+    those of the "Serial" engine, no matter how many workers there are or 
+    which worker runs which replicate. The workers send their data back, and
+    it is logged and written out in the same order as the "Serial" engine
+    would. Parameter sets that are in the result cache aren't sent to the 
+    workers at all. The flow map tables (see flow_map.py) can't be used, since
+    they are refined as they are used, so every worker would interpolate from
+    a different grid and the data would depend on which worker runs which
+    replicate.
+
+    dataframe: an instance of the Dataframe class from logger.py
+        Stores the data as it comes in from the simulation and contains methods
+        to write data to .csv files in the output folder
+    parameters: an instance of the Parameter class from parameters.py
+        Contains the parameter values that are the same across all parameter 
+        sets. See parameters.py for more detail.
+    all_parameter_sets: list
+        Every combination of rangeable parameter values, in the order produced
+        by the iter.product method in the "run" function
+    result_cache: an instance of the ResultCache class from result_cache.py
+        If not None, parameter sets are taken from this cache if they have 
+        been calculated before, and stored in it otherwise (see run_cached)
+
+    Raises ValueError
+        If flow_map_tolerance isn't None
+    '''
+    global series
+
+    if parameters.flow_map_tolerance is not None:
+        raise ValueError('''The flow map tables in model.py can't be used with the 
+                         "Parallel" engine. Use the "Serial" engine instead.''')
+    if len(all_parameter_sets) == 0:
+        return
+
+    n_workers = parameters.n_workers or os.cpu_count()
+    n_reps = parameters.n_reps
+    n_bottlenecks = parameters.n_bottlenecks
+
+    #Enough blocks to keep every worker busy, without needlessly small blocks
+    n_blocks = min(n_reps, max(1, -(-4 * n_workers // len(all_parameter_sets))))
+    reps_per_block = -(-n_reps // n_blocks)
+
+    random_key = get_random_key(parameters.seed)
+    replayed_schedules = get_replayed_schedules(parameters)
+    schedule_summary = schedule_module.BottleneckSchedule() if parameters.export_schedule else None
+    checkpoint = checkpoint_module.Checkpoint(parameters, dataframe, [schedule_summary])
+    n_completed = len(resume_run(checkpoint)["completed_parameter_sets"])
+    remaining_parameter_sets = list(enumerate(all_parameter_sets))[n_completed:]
+    schedules = {k: get_schedule(parameters, parameter_set, random_key, replayed_schedules)
+                 for k, parameter_set in remaining_parameter_sets}
+    keys = {}
+    if result_cache is not None:
+        keys = {k: result_cache.get_key(parameters, parameter_set, schedules[k])
+                for k, parameter_set in remaining_parameter_sets}
+
+    tasks = []
+    for k, parameter_set in remaining_parameter_sets:
+        if k in keys and result_cache.is_cached(keys[k]):
+            continue
+        for first_rep in range(0, n_reps, reps_per_block):
+            n_block_reps = min(reps_per_block, n_reps - first_rep)
+            first_series = series + ((k - n_completed) * n_reps + first_rep) * n_bottlenecks
+            tasks.append((parameters, parameter_set, first_rep, n_block_reps,
+                          first_series, schedules[k]))
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        results = executor.map(run_task, tasks)
+        for k, parameter_set in remaining_parameter_sets:
+            log_parameter_set(dataframe, parameters, parameter_set)
+            if result_cache is None:
+                for first_rep in range(0, n_reps, reps_per_block):
+                    dataframe.merge(next(results))
+            else:
+                #As in run_cached, but the series numbers are worked out in advance
+                set_dataframe = logger.Dataframe(file_name = parameters.file_name)
+                log_parameter_set(set_dataframe, parameters, parameter_set)
+                first_series = series + (k - n_completed) * n_reps * n_bottlenecks
+                if result_cache.load(keys[k], set_dataframe, first_series) is None:
+                    for first_rep in range(0, n_reps, reps_per_block):
+                        set_dataframe.merge(next(results))
+                    result_cache.save(keys[k], set_dataframe, first_series,
+                                      n_reps * n_bottlenecks)
+                dataframe.merge(set_dataframe)
+            dataframe.write_data()
+            if schedule_summary is not None:
+                schedule_summary.add_schedule(dataframe, get_stream_index(parameter_set),
+                                              *schedules[k])
+                schedule_summary.write_summary(dataframe)
+            save_checkpoint(checkpoint, k + 1,
+                            series=series + (k + 1 - n_completed) * n_reps * n_bottlenecks)
+    checkpoint.finish()
+
+    series += len(remaining_parameter_sets) * n_reps * n_bottlenecks
+    if result_cache is not None:
+        statistics = result_cache.get_statistics()
+        print(f"Result cache: {statistics['Hits']} parameter sets reused, "
+              f"{statistics['Misses']} calculated")
+
+def run_task(task: tuple):
+    '''Runs one block of replicates of one parameter set inside a worker
+    process of the "Parallel" engine, and returns the data logged.
+
+    task: tuple
+        The Parameters instance, the parameter set, the number of the first 
+        replicate in the block, the number of replicates in the block, the
+        series number of the block's first bottleneck, and the bottleneck 
+        schedule of the parameter set
+
+    Returns an instance of the Dataframe class from logger.py
+        Holds the data logged by the block of replicates
+    '''
+    global series
+
+    parameters, parameter_set, first_rep, n_reps, first_series, bottleneck_schedule = task
+    dataframe = logger.Dataframe(file_name = parameters.file_name)
+    log_parameter_set(dataframe, parameters, parameter_set)
+
+    series = first_series
+    run_parameter_set(dataframe, n_reps=n_reps,
+                      n_bottlenecks=parameters.n_bottlenecks,
+                      burn_in = parameters.burn_in,
+                      initial_popsize=parameters.initial_popsize,
+                      initial_prevalence=parameter_set[0],
+                      bottleneck_size_mean=parameter_set[1],
+                      bottleneck_size_cv=parameter_set[2],
+                      time_till_bottleneck_mean=parameter_set[3],
+                      time_till_bottleneck_cv=parameter_set[4],
+                      host_birth_rate=parameter_set[5],
+                      carrying_capacity=parameters.carrying_capacity,
+                      birth_function=parameters.birth_function,
+                      parasite_fecundity_effect=parameter_set[6],
+                      s_death_rate=parameter_set[7],
+                      i_death_rate=parameter_set[8],
+                      r_death_rate=parameter_set[9],
+                      transmission_rate=parameter_set[10],
+                      transmission_function=parameters.transmission_function,
+                      recovery_rate=parameter_set[11],
+                      fractional_timestep_size=parameters.fractional_timestep_size,
+                      first_rep=first_rep, 
+                      random_key=get_random_key(parameters.seed),
+                      stream_index=get_stream_index(parameter_set),
+                      flow_cache=get_flow_cache(parameters),
+                      schedule=bottleneck_schedule)
+    return dataframe
+
+def run_markov_chain(dataframe, parameters, all_parameter_sets: list) -> None:
+    '''Used instead of running replicates when the "MarkovChain" engine is
+    selected. With a fixed bottleneck size and no recovery, the number of
+    infected survivors of each bottleneck is a Markov chain, so the exact
+    probability that the parasite is extinct after every bottleneck can be
+    calculated from its transition matrix (see markov_chain.py) instead of
+    being estimated from replicates. The probabilities are written to
+    output/<file_name>_exact_extinction_probability.csv, with one row per
+    parameter set and bottleneck, and no trajectories are written.
+
+    dataframe: an instance of the Dataframe class from logger.py
+        Holds the constant data of every parameter set
+    parameters: an instance of the Parameter class from parameters.py
+        Contains the parameter values that are the same across all parameter 
+        sets. See parameters.py for more detail.
+    all_parameter_sets: list
+        Every combination of rangeable parameter values, in the order produced
+        by the iter.product method in the "run" function
+
+    Raises ValueError
+        If any parameter set has a bottleneck_size_cv or a recovery_rate other
+        than 0
+    '''
+    if any(parameter_set[2] != 0 or parameter_set[11] != 0 
+           for parameter_set in all_parameter_sets):
+        raise ValueError('''The "MarkovChain" engine in model.py can only be used when
+                         every value of bottleneck_size_cv and of recovery_rate 
+                         is 0''')
+
+    summary = markov_chain.ExactExtinctionProbability()
+    checkpoint = checkpoint_module.Checkpoint(parameters, dataframe, [summary])
+    n_completed = len(resume_run(checkpoint)["completed_parameter_sets"])
+    for parameter_set_index, parameter_set in iter.islice(enumerate(all_parameter_sets),
+                                                          n_completed, None):
+        print(f"Bottleneck Size Mean: {parameter_set[1]}")
+        print(f"Bottleneck Size CV: {parameter_set[2]}")
+        log_parameter_set(dataframe, parameters, parameter_set)
+        model_parameters = (parameters.fractional_timestep_size, parameters.birth_function,
+                            parameter_set[5], parameters.carrying_capacity,
+                            parameter_set[6], parameters.transmission_function,
+                            parameter_set[10], parameter_set[7], parameter_set[8],
+                            parameter_set[9], parameter_set[11])
+        initial_i = parameters.initial_popsize * parameter_set[0]
+        probabilities = markov_chain.get_extinction_probabilities(
+            parameters.initial_popsize - initial_i, initial_i, parameters.n_bottlenecks,
+            parameter_set[1], parameter_set[3], parameter_set[4],
+            lambda n_timepoints, s, i, r: get_trajectory(n_timepoints, s, i, r,
+                                                         *model_parameters))
+        summary.add_probabilities(dataframe, probabilities)
+        summary.write_summary(dataframe)
+        save_checkpoint(checkpoint, parameter_set_index + 1)
+    checkpoint.finish()
+
+def get_random_key(seed: int) -> np.ndarray:
+    '''Turns the root seed into the key of the counter-based (Philox) random
+    number streams. Every stream of a run uses the same key, and is told apart
+    by its counter (see seed_random_number_generator).
+
+    seed: int
+        The root seed (see parameters.py)
+
+    Returns np.ndarray
+        The key, two unsigned 64-bit integers
+    '''
+    return np.random.SeedSequence(seed).generate_state(2, dtype=np.uint64)
+
+def get_stream_index(parameter_set: list) -> int:
+    '''Turns the values of a parameter set into the number that selects its
+    random number streams (see seed_random_number_generator), by hashing them.
+    This way, the random numbers of a parameter set only depend on the seed 
+    and on its own values, and not on its position among the parameter sets of
+    the run, so a parameter set gives the same data in every run that includes
+    it (which is what lets result_cache.py reuse its data).
+
+    parameter_set: list
+        The rangeable parameter values of the parameter set, in the order 
+        produced by the iter.product method in the "run" function
+
+    Returns int
+        A number between 0 and 2**64 - 1
+    '''
+    text = json.dumps([float(value) for value in parameter_set])
+    return int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+
+def seed_random_number_generator(random_key: np.ndarray, stream_index: int,
+                                 rep: int, bottleneck: int) -> None:
+    '''Resets the random number generator used by this module (for the 
+    bottleneck timing, size, and survivors) to the stream of one bottleneck
+    cycle of one replicate of one parameter set. A Philox generator turns its
+    key and a counter into random numbers, so the stream is addressed by 
+    putting the parameter set, replicate, and bottleneck in the upper words of
+    the counter. The lowest word counts the random numbers drawn, and a 
+    bottleneck cycle draws far fewer than 2**64, so streams never overlap.
+    Every stream can be recreated on its own, without drawing any of the 
+    numbers that came before it.
+
+    random_key: np.ndarray
+        See get_random_key
+    stream_index: int
+        Selects the streams of the parameter set (see get_stream_index)
+    rep: int
+        The number of the replicate
+    bottleneck: int
+        The number of the bottleneck cycle within the replicate
+    '''
+    global random_number_generator
+
+    counter = np.array([0, bottleneck, rep, stream_index], dtype=np.uint64)
+    random_number_generator = np.random.Generator(np.random.Philox(key=random_key,
+                                                                   counter=counter))
+
+
 def get_regulated_births(s: float, i: float, r: float, host_birth_rate: float,
                         carrying_capacity: int, parasite_fecundity_effect: float,
                         fractional_timestep_size: float) -> float:
@@ -613,8 +2089,9 @@ def get_regulated_births(s: float, i: float, r: float, host_birth_rate: float,
     population_size = s + i + r
     
     birth_rate_multiplier = (carrying_capacity - population_size) / carrying_capacity
-    if birth_rate_multiplier < 0:
-        birth_rate_multiplier = 0
+    #Clamping negative multipliers to zero without an if statement means that
+    #this also works on numpy arrays of populations (see run_model_batched)
+    birth_rate_multiplier = birth_rate_multiplier * (birth_rate_multiplier > 0)
     effective_birth_rate = host_birth_rate * birth_rate_multiplier
     infected_birth_rate = effective_birth_rate * (1 - parasite_fecundity_effect)
 
@@ -199,6 +199,197 @@ fractional_timestep_size: float
     the fractional timestep size is one tenth of a whole timestep. 
     Not rangeable.
     Default = 1.0
+
+engine: str
+    A name that represents how the replicates of a parameter set are run. A 
+    value of "Serial" (the default) runs the replicates one after the other. A
+    value of "Batched" holds all replicates of a parameter set in numpy arrays
+    and advances them together, which is much faster when n_reps is large. A
+    value of "Sweep" goes one step further and advances the replicates of 
+    every parameter set together (see sweep_chunk_size below). Both give 
+    exactly the same data as "Serial" (see seed below). A value of 
+    "Parallel" runs the replicates like "Serial", but spreads the parameter 
+    sets and blocks of replicates across several processes (see n_workers and
+    seed below). A value of "MarkovChain" doesn't run any replicates: with a
+    fixed bottleneck size (bottleneck_size_cv of 0) and no recovery, the 
+    number of infected survivors of each bottleneck is a Markov chain, so the 
+    exact probability that the parasite is extinct after every bottleneck is 
+    calculated instead (see markov_chain.py) and written to 
+    file_name_exact_extinction_probability.csv. Trying to use any other value
+    in the method set_engine will result in an error.
+    Possible values = "Serial", "Batched", "Sweep", "Parallel", "MarkovChain"
+    Default = "Serial"
+
+sweep_chunk_size: int
+    Only used by the "Sweep" engine. The maximum number of replicates (summed
+    across parameter sets) that are held in memory and run together. Larger
+    parameter spaces are split into chunks of this size, which keeps memory
+    use bounded no matter how many parameter sets are requested. The data 
+    are the same for every chunk size.
+    Not rangeable.
+    Default = 10000
+
+n_workers: int
+    Only used by the "Parallel" engine. The number of processes that run 
+    replicates at the same time. If None, one process per CPU is used.
+    Not rangeable.
+    Default = None
+
+seed: int
+    The root seed of all random numbers (bottleneck timing, bottleneck size,
+    and bottleneck survivors), which is written to the Seed column of the 
+    output. Every bottleneck cycle of every replicate of every parameter set
+    gets its own counter-based stream of random numbers, addressed by a hash
+    of the values of the parameter set (see get_stream_index in model.py), 
+    the replicate, and the bottleneck. So the data of a replicate don't 
+    depend on which other replicates or parameter sets are run, or in which
+    order, and the "Batched", "Sweep", and "Parallel" engines give exactly the
+    same data as the "Serial" engine, no matter how many workers are used or
+    how the parameter sets are split into chunks.
+    Not rangeable.
+    Default = 92500169789667897205027529303633824467
+
+output_format: str
+    How the output is written. A value of "Wide" (the default) writes a single
+    file_name.csv file, where every row holds the values of the variables and
+    the constant values of its parameter set. A value of "Normalized" writes 
+    the constant values only once per parameter set, to file_name_params.csv 
+    (with a ParamSetID column), and writes the variables to 
+    file_name_series.csv (with the ParamSetID of their parameter set). This
+    makes the output much smaller. The wide file can be rebuilt with the 
+    function join_normalized_data in logger.py. A value of "Binary" writes a
+    file_name folder with every column as a raw .npy array and the constant
+    values in a constants.json file, which is much faster to write and can be 
+    read without loading it into memory with the function read_binary_data in
+    logger.py. Trying to use any other value in the method set_output_format 
+    will result in an error.
+    Possible values = "Wide", "Normalized", "Binary"
+    Default = "Wide"
+
+reducers: list[str]
+    The names of the reducers (see reducers.py) that summarise every parameter
+    set while the model runs, each writing a file_name_<summary name>.csv file 
+    with one row per parameter set. "ExtinctionProbability" counts the 
+    replicates in which the parasite went extinct, and writes the extinction 
+    probability with its Wilson and Clopper-Pearson confidence intervals, 
+    which is all that is needed for plots like figures 4 and 5. 
+    "ExtinctionTimes" records, for every replicate, the bottleneck cycle and 
+    time at which the parasite first went extinct (or that it never did), 
+    which is all that is needed for survival curves or the extinction times of
+    figure 3. Bottleneck cycles are numbered from the start of the replicate,
+    but times are counted from the end of the burn in, and replicates that 
+    lost the parasite during the burn in are marked as such. Trying to use any other name in the method set_reducers will 
+    result in an error.
+    Possible values = any combination of "ExtinctionProbability", 
+                      "ExtinctionTimes"
+    Not rangeable.
+    Default = [] (no reducers)
+
+keep_trajectories: bool
+    Whether the full trajectories (every timepoint of every series of every 
+    replicate) are written to the output file(s). Setting reducers with the 
+    method set_reducers turns this off unless it is explicitly requested, so 
+    that only the summaries are kept.
+    Not rangeable.
+    Default = True
+
+confidence_level: float
+    The confidence level of the intervals calculated by the reducers, e.g. 0.95
+    for 95% confidence intervals.
+    Not rangeable.
+    Default = 0.95
+
+flow_cache_size: int
+    Only used by the "Serial" and "Parallel" engines. Between bottlenecks the 
+    model is deterministic, and the bottleneck survivors are whole numbers, so
+    the same trajectory (from the same starting population, for the same 
+    number of timepoints) is often calculated many times. The flow cache (see
+    flow_cache.py) remembers up to flow_cache_size of these trajectories and
+    hands them out again, which gives exactly the same data much faster. A 
+    value of 0 (the default) turns the cache off. When the cache is on, its 
+    number of hits and misses is printed when the model finishes. A size of 
+    1024 is usually plenty.
+    Not rangeable.
+    Default = 0 (the cache isn't used)
+
+share_trajectory_prefixes: bool
+    Only used when the flow cache is on (see flow_cache_size). When 
+    time_till_bottleneck_cv is above 0, periods that start from the same 
+    population run for different numbers of timepoints, so the flow cache 
+    would calculate and remember each of them separately. If True, the flow cache keeps one trajectory per 
+    starting population instead (the longest so far), answers shorter periods
+    from its first timepoints, and extends it for longer periods. The data 
+    are exactly the same either way.
+    Not rangeable.
+    Default = False
+
+flow_map_tolerance: float
+    Only used by the "Serial" engine, and only when there is no recovery 
+    (every value of recovery_rate is 0). Without recovery, the 
+    trajectory between two bottlenecks only depends on the numbers of 
+    susceptible and infected hosts right after the bottleneck. If not None, 
+    the model calculates these trajectories for a grid of starting populations
+    (see flow_map.py), and interpolates between them for every other 
+    bottleneck, in every replicate and for every value of bottleneck_size_cv.
+    The grid is made finer wherever the interpolation error at the centre of a
+    grid cell is above flow_map_tolerance hosts, and the largest error found 
+    is printed when the model finishes. With a value of 0, every bottleneck 
+    survivor population that is used ends up in the grid, so the data are the
+    same as without the tables. The grid depends on the order in which the
+    bottlenecks are looked up, so trying to use a value of flow_map_tolerance
+    with the "Parallel" engine, where every worker would build its own grid,
+    will result in an error, as will a non-zero recovery_rate.
+    Possible values = None or any value >= 0
+    Not rangeable.
+    Default = None (the tables aren't used)
+
+export_schedule: bool
+    Not used by the "MarkovChain" engine. Before a parameter set is run, the 
+    number of timesteps until every bottleneck of every replicate and a first
+    draw of every bottleneck size are drawn in one go (see schedule.py). If 
+    True, this schedule is written to file_name_bottleneck_schedule.csv, with
+    one row per bottleneck of every replicate, so that the bottlenecks of a 
+    run can be checked or replayed.
+    Not rangeable.
+    Default = False
+
+replay_schedule: str
+    Not used by the "MarkovChain" engine. If not None, the name of a schedule
+    file written with export_schedule (minus the ".csv" extension) in the 
+    output folder, and the bottlenecks are taken from that file instead of 
+    being drawn. The parameter sets are matched by their values, so the run
+    can range the parameters differently, but every parameter set has to be 
+    one of the run that wrote the file, with the same number of replicates 
+    and bottlenecks. Together with the same seed, its data are then exactly 
+    the same as in that run.
+    Not rangeable.
+    Default = None (the schedule is drawn)
+
+checkpoint_interval: int
+    The number of parameter sets between checkpoints, or 0 for no checkpoints.
+    A checkpoint (output/file_name_checkpoint.pkl) records which parameter 
+    sets are done, how far the output files have been written, and the state
+    of the random number generator, so that a run that was interrupted can be
+    resumed by running it again with the same parameters. The resumed run 
+    continues after the last checkpoint, and its output is identical to that
+    of an uninterrupted run (see checkpoint.py). The checkpoint is removed 
+    when the run is done.
+    With the "Sweep" engine, checkpoints are only saved at the end of a chunk
+    (see sweep_chunk_size).
+    Not rangeable.
+    Default = 0 (no checkpoints)
+
+result_cache: bool
+    Not used by the "MarkovChain" engine. If True, the data of every parameter
+    set are stored in the output/.cache folder under a hash of every input
+    they depend on (see result_cache.py), and a later run that has a parameter
+    set with exactly the same inputs (e.g. after a range has been extended)
+    takes its data from the cache instead of simulating it again. The data 
+    are exactly the same either way. Can't be used with the "Sweep" engine, 
+    whose parameter sets share their random numbers, or with 
+    flow_map_tolerance, whose tables depend on the other parameter sets.
+    Not rangeable.
+    Default = False
 '''
 
 import numpy as np
@@ -242,6 +433,21 @@ class Parameters:
         self.transmission_function: Callable = stoch_model.get_ddt_infections
         self.recovery_rate: list[float] = [0]
         self.fractional_timestep_size: float = 1.0
+        self.engine: str = "Serial"
+        self.sweep_chunk_size: int = 10000
+        self.n_workers: int = None
+        self.seed: int = 92500169789667897205027529303633824467
+        self.output_format: str = "Wide"
+        self.reducers: list[str] = []
+        self.keep_trajectories: bool = True
+        self.confidence_level: float = 0.95
+        self.flow_cache_size: int = 0
+        self.share_trajectory_prefixes: bool = False
+        self.flow_map_tolerance: float = None
+        self.export_schedule: bool = False
+        self.replay_schedule: str = None
+        self.checkpoint_interval: int = 0
+        self.result_cache: bool = False
 
     def set_file_name(self, file_name: str) -> None:
         '''Changes the file name of the output file from its default. This
@@ -627,6 +833,207 @@ class Parameters:
 
         self.fractional_timestep_size = fractional_timestep_size
 
+    def set_engine(self, engine: str) -> None:
+        '''Changes how the replicates of each parameter set are run. This model
+        parameter is not rangeable.
+
+        engine: str
+            The only permitted values are "Serial", to run the replicates one
+            after the other, "Batched", to run all replicates of a parameter
+            set together as numpy arrays, "Sweep", to run all replicates of
+            all parameter sets together as numpy arrays, "Parallel", to run 
+            the replicates in several processes at once, or "MarkovChain", to 
+            calculate the exact extinction probabilities instead of running 
+            replicates.
+
+        Raises ValueError
+            If engine is something other than "Serial", "Batched", "Sweep", 
+            "Parallel" or "MarkovChain"
+        '''
+
+        if engine in ["Serial", "Batched", "Sweep", "Parallel", "MarkovChain"]:
+            self.engine = engine
+        else:
+            raise ValueError('''The method set_engine in parameters.py only takes
+                                engine="Serial", engine="Batched", 
+                                engine="Sweep", engine="Parallel" or 
+                                engine="MarkovChain".''')
+
+    def set_sweep_chunk_size(self, sweep_chunk_size: int) -> None:
+        '''Changes the model parameter sweep_chunk_size from its default. This
+        model parameter is not rangeable.
+
+        sweep_chunk_size: int
+            The maximum number of replicates (summed across parameter sets) that
+            the "Sweep" engine holds in memory and runs together
+        '''
+
+        self.sweep_chunk_size = sweep_chunk_size
+
+    def set_n_workers(self, n_workers: int) -> None:
+        '''Changes the model parameter n_workers from its default. This model
+        parameter is not rangeable.
+
+        n_workers: int
+            The number of processes that the "Parallel" engine runs replicates
+            in, or None to use one process per CPU
+        '''
+
+        self.n_workers = n_workers
+
+    def set_seed(self, seed: int) -> None:
+        '''Changes the model parameter seed from its default. This model 
+        parameter is not rangeable.
+
+        seed: int
+            The root seed that the engines create the random number
+            streams of every replicate from
+        '''
+
+        self.seed = seed
+
+    def set_output_format(self, output_format: str) -> None:
+        '''Changes the model parameter output_format from its default. This 
+        model parameter is not rangeable.
+
+        output_format: str
+            A name that represents how the output is written, either "Wide", 
+            "Normalized", or "Binary"
+
+        Raises ValueError
+            If output_format is something other than "Wide", "Normalized", or 
+            "Binary"
+        '''
+
+        if output_format in ["Wide", "Normalized", "Binary"]:
+            self.output_format = output_format
+        else:
+            raise ValueError('''The method set_output_format in parameters.py only
+                                takes output_format="Wide", 
+                                output_format="Normalized", or 
+                                output_format="Binary".''')
+
+    def set_reducers(self, reducers: list[str], keep_trajectories: bool = False) -> None:
+        '''Changes the model parameters reducers and keep_trajectories from 
+        their defaults. These model parameters are not rangeable.
+
+        reducers: list[str]
+            The names of the reducers that summarise every parameter set. The 
+            only permitted names are "ExtinctionProbability" and 
+            "ExtinctionTimes"
+        keep_trajectories: bool
+            Whether the full trajectories should still be written. Defaults to
+            False, so that only the summaries are kept
+
+        Raises ValueError
+            If reducers has a name other than "ExtinctionProbability" or 
+            "ExtinctionTimes"
+        '''
+
+        if all(reducer in ["ExtinctionProbability", "ExtinctionTimes"] 
+               for reducer in reducers):
+            self.reducers = list(reducers)
+            self.keep_trajectories = keep_trajectories
+        else:
+            raise ValueError('''The method set_reducers in parameters.py only takes
+                                reducers=["ExtinctionProbability"] and/or
+                                reducers=["ExtinctionTimes"].''')
+
+    def set_confidence_level(self, confidence_level: float) -> None:
+        '''Changes the model parameter confidence_level from its default. This
+        model parameter is not rangeable.
+
+        confidence_level: float
+            The confidence level of the intervals calculated by the reducers,
+            between 0 and 1
+        '''
+
+        self.confidence_level = confidence_level
+
+    def set_flow_cache_size(self, flow_cache_size: int) -> None:
+        '''Changes the model parameter flow_cache_size from its default. This
+        model parameter is not rangeable.
+
+        flow_cache_size: int
+            The maximum number of trajectories between bottlenecks that the 
+            flow cache remembers, or 0 to turn the cache off
+        '''
+
+        self.flow_cache_size = flow_cache_size
+
+    def set_share_trajectory_prefixes(self, share_trajectory_prefixes: bool) -> None:
+        '''Changes the model parameter share_trajectory_prefixes from its 
+        default. This model parameter is not rangeable.
+
+        share_trajectory_prefixes: bool
+            Whether the flow cache keeps one trajectory per starting population
+            and shares it between periods of different lengths
+        '''
+
+        self.share_trajectory_prefixes = share_trajectory_prefixes
+
+    def set_flow_map_tolerance(self, flow_map_tolerance: float) -> None:
+        '''Changes the model parameter flow_map_tolerance from its default. This
+        model parameter is not rangeable.
+
+        flow_map_tolerance: float
+            The largest interpolation error (in hosts) accepted in the tables 
+            of trajectories between bottlenecks, or None to not use the tables
+        '''
+
+        self.flow_map_tolerance = flow_map_tolerance
+
+    def set_export_schedule(self, export_schedule: bool) -> None:
+        '''Changes the model parameter export_schedule from its default. This
+        model parameter is not rangeable.
+
+        export_schedule: bool
+            Whether the bottleneck schedule of every parameter set is written
+            to file_name_bottleneck_schedule.csv
+        '''
+
+        self.export_schedule = export_schedule
+
+    def set_replay_schedule(self, replay_schedule: str) -> None:
+        '''Changes the model parameter replay_schedule from its default. This
+        model parameter is not rangeable.
+
+        replay_schedule: str
+            The name of a schedule file in the output folder (minus the ".csv"
+            extension) whose bottlenecks should be replayed, or None to draw
+            the bottlenecks
+        '''
+
+        self.replay_schedule = replay_schedule
+
+    def set_checkpoint_interval(self, checkpoint_interval: int) -> None:
+        '''Changes the model parameter checkpoint_interval from its default.
+        This model parameter is not rangeable.
+
+        checkpoint_interval: int
+            The number of parameter sets between checkpoints, or 0 for no
+            checkpoints
+
+        Raises ValueError
+            If checkpoint_interval is negative
+        '''
+
+        if checkpoint_interval < 0:
+            raise ValueError('''The method set_checkpoint_interval in parameters.py
+                                only takes a checkpoint_interval of 0 or more.''')
+        self.checkpoint_interval = checkpoint_interval
+
+    def set_result_cache(self, result_cache: bool) -> None:
+        '''Changes the model parameter result_cache from its default. This
+        model parameter is not rangeable.
+
+        result_cache: bool
+            Whether the data of every parameter set are taken from, and stored
+            in, the cache of earlier results
+        '''
+
+        self.result_cache = result_cache
+
     @staticmethod
     def get_range(min, max, step_size) -> list:
         '''Takes information about the characteristics of a desired parameter